@@ -35,6 +35,7 @@ from config import settings
 from src.logging_config import get_logger, log_performance, log_security_event
 from src.performance_metrics import get_app_metrics, record_request, measure_time
 from src.circuit_breaker import CircuitBreakerRegistry
+from src.clients.http_pool import close_http_clients
 from src.redis_operations_optimized import get_redis_client, get_redis_from_pool
 from src.exceptions import (
     MCPBaseException, 
@@ -281,6 +282,9 @@ async def lifespan(app: FastAPI):
             await app_metrics.stop_collection()
             if rag_instance:
                 await rag_instance.close()
+
+            # Fermeture des pools HTTP partagés (connexions keepalive amont)
+            await close_http_clients()
             logger.info("Nettoyage terminé")
         except Exception as e:
             logger.error("Erreur lors du nettoyage", error=str(e))
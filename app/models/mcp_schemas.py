@@ -136,7 +136,7 @@ class PriorityActionsRequest(BaseModel):
 
 class BulkAnalysisRequest(BaseModel):
     """Requête d'analyse en masse"""
-    pubkeys: List[str] = Field(..., max_items=50)
+    pubkeys: List[str] = Field(..., max_items=1000)
     analysis_types: List[str] = Field(default_factory=lambda: ["basic"])
     use_cache: bool = Field(default=True)
 
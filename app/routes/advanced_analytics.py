@@ -6,11 +6,13 @@ Max Flow, Graph Theory, Financial Analysis
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import asyncio
 import logging
 
 from app.services.auth import verify_api_key
 from src.lightning.max_flow_analysis import LightningMaxFlowAnalyzer
 from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+from src.lightning.graph_store import lightning_graph_store
 from src.lightning.financial_analysis import LightningFinancialAnalyzer
 from src.data.graph_data_manager import GraphDataManager
 
@@ -18,8 +20,8 @@ logger = logging.getLogger("mcp.advanced_analytics")
 router = APIRouter()
 
 # Instances globales des analyseurs
-max_flow_analyzer = LightningMaxFlowAnalyzer()
-graph_analyzer = LightningGraphAnalyzer()
+max_flow_analyzer = LightningMaxFlowAnalyzer(lightning_graph_store)
+graph_analyzer = LightningGraphAnalyzer(lightning_graph_store)
 financial_analyzer = LightningFinancialAnalyzer()
 data_manager = GraphDataManager()
 
@@ -207,8 +209,10 @@ async def get_hopness_analysis(
         nodes, channels = await data_manager.get_network_data()
         graph_analyzer.build_graph(nodes, channels)
         
-        # Calculer les métriques de hopness
-        hopness_result = graph_analyzer.calculate_hopness_metrics(source_list, sample_size)
+        # Calculer les métriques de hopness (CPU, hors de la boucle asyncio)
+        hopness_result = await asyncio.to_thread(
+            graph_analyzer.calculate_hopness_metrics, source_list, sample_size
+        )
         
         if "error" in hopness_result:
             raise HTTPException(status_code=400, detail=hopness_result["error"])
@@ -12,6 +12,7 @@ from datetime import datetime
 from app.services.auth import verify_api_key
 from src.lightning.max_flow_analysis import LightningMaxFlowAnalyzer
 from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+from src.lightning.graph_store import lightning_graph_store
 from src.lightning.financial_analysis import LightningFinancialAnalyzer
 from src.clients.anthropic_client import AnthropicClient
 
@@ -39,8 +40,8 @@ class ChatbotIntelligence:
     
     def __init__(self):
         self.anthropic = AnthropicClient()
-        self.max_flow_analyzer = LightningMaxFlowAnalyzer()
-        self.graph_analyzer = LightningGraphAnalyzer()
+        self.max_flow_analyzer = LightningMaxFlowAnalyzer(lightning_graph_store)
+        self.graph_analyzer = LightningGraphAnalyzer(lightning_graph_store)
         self.financial_analyzer = LightningFinancialAnalyzer()
         
     async def analyze_node_context(self, node_pubkey: str) -> Dict[str, Any]:
@@ -4,11 +4,13 @@ Version adaptée de mcp-light avec fonctionnalités étendues
 """
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query
-from fastapi.responses import JSONResponse
-from typing import Optional, List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Any, AsyncIterator, Dict, Tuple
 import logging
 from datetime import datetime
 import asyncio
+import json
 
 from ..models.mcp_schemas import (
     NodeInfoResponse, 
@@ -39,6 +41,9 @@ lnbits_client = LNBitsClient()
 # Métriques de performance
 performance_metrics = PerformanceMetrics()
 
+# Appels Sparkseer simultanés pour l'analyse en masse
+BULK_ANALYSIS_CONCURRENCY = 16
+
 async def update_metrics(endpoint: str, response_time: float, success: bool):
     """Met à jour les métriques de performance"""
     global performance_metrics
@@ -349,71 +354,64 @@ async def get_priority_actions(
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
 
 @router.post("/nodes/bulk-analysis", response_model=BulkAnalysisResponse)
-async def bulk_node_analysis(request: BulkAnalysisRequest):
-    """Analyse en masse de plusieurs nœuds"""
+async def bulk_node_analysis(
+    request: BulkAnalysisRequest,
+    stream: bool = Query(default=False, description="Résultats en NDJSON au fil de l'eau")
+):
+    """
+    Analyse en masse de plusieurs nœuds
+    
+    Les pubkeys sont dédupliquées, les entrées en cache lues en un seul MGET et
+    les autres réparties sur un pool de workers à concurrence bornée. Par défaut
+    la réponse agrégée BulkAnalysisResponse est retournée à la fin ; avec
+    stream=true, chaque résultat est envoyé en NDJSON dès qu'il est prêt (une
+    ligne "result" ou "error" par nœud, puis une ligne "summary").
+    """
     start_time = datetime.utcnow()
     
+    if stream:
+        async def ndjson_lines() -> AsyncIterator[str]:
+            successful = failed = 0
+            try:
+                async for pubkey, result in _analyze_nodes(request.pubkeys, request.use_cache):
+                    response, error = _bulk_result(pubkey, result)
+                    if response is not None:
+                        successful += 1
+                        line = {"type": "result", **jsonable_encoder(response)}
+                    else:
+                        failed += 1
+                        line = {"type": "error", **error}
+                    yield json.dumps(line) + "\n"
+            except Exception as e:
+                logger.error(f"Erreur lors de l'analyse en masse: {str(e)}")
+                yield json.dumps({"type": "error", "error": f"Erreur serveur: {str(e)}"}) + "\n"
+            
+            processing_time = (datetime.utcnow() - start_time).total_seconds()
+            yield json.dumps({
+                "type": "summary",
+                "total_analyzed": successful + failed,
+                "successful": successful,
+                "failed": failed,
+                "processing_time_seconds": processing_time,
+                "generated_at": datetime.utcnow().isoformat()
+            }) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
     try:
         results = []
         errors = []
-        
-        # Traitement en parallèle par batches de 10
-        batch_size = 10
-        for i in range(0, len(request.pubkeys), batch_size):
-            batch = request.pubkeys[i:i+batch_size]
-            
-            # Création des tâches pour le batch
-            tasks = []
-            for pubkey in batch:
-                if request.use_cache:
-                    task = _get_cached_or_fetch_node_info(pubkey)
-                else:
-                    task = sparkseer_client.get_node_info(pubkey)
-                tasks.append((pubkey, task))
-            
-            # Exécution du batch
-            batch_results = await asyncio.gather(
-                *[task[1] for task in tasks], 
-                return_exceptions=True
-            )
-            
-            # Traitement des résultats
-            for j, (pubkey, _) in enumerate(tasks):
-                result = batch_results[j]
-                
-                if isinstance(result, Exception):
-                    errors.append({
-                        "pubkey": pubkey,
-                        "error": str(result)
-                    })
-                elif result:
-                    try:
-                        response_data = {
-                            "pubkey": pubkey,
-                            "node_info": result.get("node_info", {}),
-                            "metrics": result.get("metrics", {}),
-                            "channels": result.get("channels", []),
-                            "network_position": result.get("network_position", {}),
-                            "timestamp": datetime.utcnow(),
-                            "source": result.get("source", "sparkseer"),
-                            "cache_hit": result.get("cache_hit", False)
-                        }
-                        results.append(NodeInfoResponse(**response_data))
-                    except Exception as e:
-                        errors.append({
-                            "pubkey": pubkey,
-                            "error": f"Erreur de traitement: {str(e)}"
-                        })
-                else:
-                    errors.append({
-                        "pubkey": pubkey,
-                        "error": "Nœud non trouvé"
-                    })
+        async for pubkey, result in _analyze_nodes(request.pubkeys, request.use_cache):
+            response, error = _bulk_result(pubkey, result)
+            if response is not None:
+                results.append(response)
+            else:
+                errors.append(error)
         
         processing_time = (datetime.utcnow() - start_time).total_seconds()
         
         return BulkAnalysisResponse(
-            total_analyzed=len(request.pubkeys),
+            total_analyzed=len(results) + len(errors),
             successful=len(results),
             failed=len(errors),
             results=results,
@@ -472,22 +470,82 @@ async def _get_local_node_data(pubkey: str) -> dict:
     
     return {}
 
-async def _get_cached_or_fetch_node_info(pubkey: str) -> dict:
-    """Récupère les infos du nœud depuis le cache ou les sources"""
-    cache_key = f"node_info:{pubkey}:True:False"
+def _node_info_cache_key(pubkey: str) -> str:
+    return f"node_info:{pubkey}:True:False"
+
+async def _analyze_nodes(pubkeys: List[str], use_cache: bool) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Produit (pubkey, données ou exception) pour chaque pubkey distincte, dans
+    l'ordre de complétion : d'abord les entrées du cache (un seul MGET), puis
+    les appels Sparkseer répartis sur BULK_ANALYSIS_CONCURRENCY workers.
+    Fermer l'itérateur (client déconnecté) annule les appels en cours.
+    """
+    pending = list(dict.fromkeys(pubkeys))
+    
+    if use_cache and pending:
+        cached = await cache_manager.get_many([_node_info_cache_key(pk) for pk in pending], "node_info")
+        misses = []
+        for pubkey in pending:
+            cached_data = cached.get(_node_info_cache_key(pubkey))
+            if isinstance(cached_data, dict) and cached_data:
+                cached_data["cache_hit"] = True
+                yield pubkey, cached_data
+            else:
+                misses.append(pubkey)
+        pending = misses
+    
+    if not pending:
+        return
     
-    cached_data = await cache_manager.get(cache_key, "node_info")
-    if cached_data:
-        cached_data["cache_hit"] = True
-        return cached_data
+    queue: asyncio.Queue = asyncio.Queue()
+    for pubkey in pending:
+        queue.put_nowait(pubkey)
+    completed: asyncio.Queue = asyncio.Queue()
     
-    # Fallback vers Sparkseer
-    node_data = await sparkseer_client.get_node_info(pubkey)
-    if node_data:
-        node_data["cache_hit"] = False
-        await cache_manager.set(cache_key, node_data, data_type="node_info")
+    async def worker():
+        while True:
+            try:
+                pubkey = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                node_data = await sparkseer_client.get_node_info(pubkey)
+                if use_cache and node_data:
+                    node_data["cache_hit"] = False
+                    await cache_manager.set(_node_info_cache_key(pubkey), node_data, data_type="node_info")
+                completed.put_nowait((pubkey, node_data))
+            except Exception as e:
+                completed.put_nowait((pubkey, e))
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(BULK_ANALYSIS_CONCURRENCY, len(pending)))]
+    try:
+        for _ in range(len(pending)):
+            yield await completed.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+def _bulk_result(pubkey: str, result: Any) -> Tuple[Optional[NodeInfoResponse], Optional[Dict[str, str]]]:
+    """Convertit le résultat d'un nœud en NodeInfoResponse ou en erreur"""
+    if isinstance(result, Exception):
+        return None, {"pubkey": pubkey, "error": str(result)}
+    if not result:
+        return None, {"pubkey": pubkey, "error": "Nœud non trouvé"}
     
-    return node_data or {}
+    try:
+        response_data = {
+            "pubkey": pubkey,
+            "node_info": result.get("node_info", {}),
+            "metrics": result.get("metrics", {}),
+            "channels": result.get("channels", []),
+            "network_position": result.get("network_position", {}),
+            "timestamp": datetime.utcnow(),
+            "source": result.get("source", "sparkseer"),
+            "cache_hit": result.get("cache_hit", False)
+        }
+        return NodeInfoResponse(**response_data), None
+    except Exception as e:
+        return None, {"pubkey": pubkey, "error": f"Erreur de traitement: {str(e)}"}
 
 async def _log_priority_request(pubkey: str, request_data: dict, actions_count: int):
     """Log les requêtes de priorités pour analytics"""
@@ -9,6 +9,7 @@ from app.auth import verify_jwt_and_get_tenant
 from app.services.auth import verify_api_key
 from src.lightning.max_flow_analysis import LightningMaxFlowAnalyzer
 from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+from src.lightning.graph_store import lightning_graph_store
 from src.lightning.financial_analysis import LightningFinancialAnalyzer
 from src.data.graph_data_manager import GraphDataManager
 
@@ -16,8 +17,8 @@ logger = logging.getLogger("mcp.lightning_routes")
 router = APIRouter(prefix="/lightning", tags=["Lightning Network"])
 
 # Initialize analyzers
-max_flow_analyzer = LightningMaxFlowAnalyzer()
-graph_analyzer = LightningGraphAnalyzer()
+max_flow_analyzer = LightningMaxFlowAnalyzer(lightning_graph_store)
+graph_analyzer = LightningGraphAnalyzer(lightning_graph_store)
 financial_analyzer = LightningFinancialAnalyzer()
 data_manager = GraphDataManager()
 
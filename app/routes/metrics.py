@@ -16,6 +16,7 @@ from config import settings
 from src.logging_config import get_logger
 from src.performance_metrics import get_app_metrics
 from src.circuit_breaker import CircuitBreakerRegistry
+from src.clients.http_pool import http_pool_stats
 from src.redis_operations_optimized import redis_ops, get_redis_client
 from src.exceptions import exception_handler
 import structlog
@@ -247,6 +248,24 @@ async def circuit_breaker_metrics():
         raise HTTPException(status_code=500, detail=f"Erreur circuit breakers: {str(e)}")
 
 
+@router.get("/http-pools")
+async def http_pool_metrics():
+    """Métriques des pools HTTP partagés (un client par hôte amont)"""
+    try:
+        pools = http_pool_stats()
+        
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "total_pools": len(pools),
+            "total_requests": sum(pool["requests"] for pool in pools),
+            "pools": pools
+        }
+        
+    except Exception as e:
+        logger.error("Erreur métriques pools HTTP", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Erreur pools HTTP: {str(e)}")
+
+
 @router.get("/errors")
 async def error_metrics():
     """Métriques et statistiques d'erreurs"""
@@ -1,12 +1,18 @@
 # app/services/lightning_scoring.py
 import asyncio
 import logging
+import time
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Tuple, Union, Any
 
 import numpy as np
 from motor.core import AgnosticCollection, AgnosticDatabase
 from bson import ObjectId
+from pymongo import UpdateOne
+
+from src.lightning import csr_graph
+from src.lightning.csr_graph import CSRGraph
 
 from app.models import (
     LightningNode, LightningChannel, LightningNodeScore, ScoreMetrics,
@@ -21,6 +27,10 @@ NODES_COLLECTION = "lightning_nodes"
 CHANNELS_COLLECTION = "lightning_channels"
 SCORES_COLLECTION = "lightning_scores"
 CONFIG_COLLECTION = "lightning_config"
+GRAPH_METADATA_COLLECTION = "graph_metadata"
+# Compteur incrémenté par la synchronisation du graphe (src.integrations.network_graph_sync)
+GRAPH_VERSION_ID = "graph_version"
+CHANNEL_PROJECTION = {"_id": 0, "node1_pub": 1, "node2_pub": 1, "capacity": 1}
 
 # Configuration par défaut
 DEFAULT_CONFIG = {
@@ -35,17 +45,53 @@ DEFAULT_CONFIG = {
     }
 }
 
+# Recalcul en lot
+SCORE_FRESHNESS = timedelta(days=1)  # Un score plus récent n'est pas recalculé
+RECALCULATION_BATCH_SIZE = 500  # Nœuds par bulk_write
+RECALCULATION_CONCURRENCY = 32  # Calculs de score simultanés
+
+# Betweenness réseau (Brandes échantillonné), calculée une fois par version du graphe
+BETWEENNESS_EPSILON = 0.1  # Erreur absolue maximale sur la betweenness normalisée
+BETWEENNESS_DELTA = 0.05  # Probabilité de dépasser cette erreur
+BETWEENNESS_SEED = 42  # Sources identiques pour une même version du graphe
+BETWEENNESS_MAX_SOURCES = 1000  # Plafond de sources (epsilon=0.1 en demande ≈670 pour 15k nœuds)
+BETWEENNESS_CACHE_SIZE = 4  # Versions du graphe conservées
+
+# Partagé entre les instances (une instance de service par requête)
+_betweenness_cache: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+# Calcul en cours par version : les requêtes concurrentes attendent le même calcul
+_betweenness_inflight: Dict[str, "asyncio.Task[Dict[str, float]]"] = {}
+# Index (node1_pub) et (node2_pub) des canaux créés par ce processus
+_channel_indexes_ready = False
+
 class LightningScoreService:
     """Service responsable du calcul et de la gestion des scores des nœuds Lightning."""
     
-    def __init__(self, db: AgnosticDatabase):
-        """Initialise le service avec une instance de base de données."""
+    def __init__(self, db: AgnosticDatabase,
+                 betweenness_epsilon: float = BETWEENNESS_EPSILON,
+                 betweenness_delta: float = BETWEENNESS_DELTA,
+                 betweenness_max_sources: Optional[int] = BETWEENNESS_MAX_SOURCES):
+        """
+        Initialise le service avec une instance de base de données.
+        
+        Args:
+            db: Base de données MongoDB
+            betweenness_epsilon: Erreur maximale tolérée sur la betweenness normalisée
+            betweenness_delta: Probabilité de dépasser cette erreur
+            betweenness_max_sources: Plafond de sources échantillonnées (None = borne seule)
+        """
         self.db = db
+        self.betweenness_epsilon = betweenness_epsilon
+        self.betweenness_delta = betweenness_delta
+        self.betweenness_max_sources = betweenness_max_sources
         self.nodes_collection = db[NODES_COLLECTION]
         self.channels_collection = db[CHANNELS_COLLECTION]
         self.scores_collection = db[SCORES_COLLECTION]
         self.config_collection = db[CONFIG_COLLECTION]
+        self.graph_metadata = db[GRAPH_METADATA_COLLECTION]
         self._config = None
+        self.last_recalculation: Dict[str, Any] = {}
+        self._score_indexes_ready = False
     
     async def get_config(self) -> Dict[str, Any]:
         """Récupère la configuration actuelle ou utilise la configuration par défaut."""
@@ -175,19 +221,30 @@ class LightningScoreService:
             "user_score": user_score
         }
     
-    async def _calculate_detailed_scores(self, node_id: str) -> DetailedScores:
-        """Calcule les scores détaillés pour un nœud."""
-        # Récupérer les canaux du nœud
-        channels = await self.channels_collection.find(
-            {"$or": [{"node1_pub": node_id}, {"node2_pub": node_id}]}
-        ).to_list(length=None)
+    async def _calculate_detailed_scores(
+        self, node_id: str, snapshot: Optional[Dict[str, Any]] = None
+    ) -> DetailedScores:
+        """
+        Calcule les scores détaillés pour un nœud.
         
-        # Récupérer tous les nœuds pour les calculs de centralité
-        all_nodes = await self.nodes_collection.find().to_list(length=None)
+        Args:
+            node_id: ID du nœud
+            snapshot: Instantané du graphe partagé par un recalcul en lot
+                (voir _load_graph_snapshot) ; chargé depuis la base si absent
+        """
+        if snapshot is None:
+            # Calcul unitaire : seuls les canaux du nœud sont lus ; la betweenness
+            # d'une version précédente est servie pendant que la version courante
+            # est calculée en arrière-plan
+            channels = await self._node_channels(node_id)
+            graph_betweenness = await self._graph_betweenness(await self._graph_version(), wait=False)
+        else:
+            channels = snapshot["channels_by_node"].get(node_id, [])
+            graph_betweenness = snapshot["betweenness"]
         
         # Calculer les métriques de centralité
         degree_centrality = len(channels)
-        betweenness = await self._calculate_betweenness(node_id, all_nodes, channels)
+        betweenness = await self._calculate_betweenness(node_id, graph_betweenness)
         
         # Calculer les métriques de performance
         uptime = await self._calculate_uptime(node_id)
@@ -212,54 +269,143 @@ class LightningScoreService:
             }
         }
     
-    async def _calculate_betweenness(
-        self, node_id: str, all_nodes: List[dict], channels: List[dict]
-    ) -> float:
+    async def _calculate_betweenness(self, node_id: str, graph_betweenness: Dict[str, float]) -> float:
         """
-        Calcule la centralité d'intermédiarité approximative du nœud.
-        Cette implémentation est une approximation simplifiée.
+        Centralité d'intermédiarité du nœud (en pourcentage) lue dans la
+        betweenness réseau (voir _graph_betweenness).
         """
-        # Dans une implémentation réelle, on utiliserait un algorithme de graphe complet.
-        # Pour cette démonstration, nous utilisons une approximation.
-        num_nodes = len(all_nodes)
-        if num_nodes <= 2:
-            return 0
+        return graph_betweenness.get(node_id, 0.0) * 100  # Convertir en pourcentage
+    
+    async def _node_channels(self, node_id: str) -> List[dict]:
+        """Canaux d'un nœud (deux requêtes indexées) sans parcourir le graphe."""
+        global _channel_indexes_ready
+        if not _channel_indexes_ready:
+            await self.channels_collection.create_index([("node1_pub", 1)])
+            await self.channels_collection.create_index([("node2_pub", 1)])
+            _channel_indexes_ready = True
+        
+        query = {"$or": [{"node1_pub": node_id}, {"node2_pub": node_id}]}
+        return [channel async for channel in self.channels_collection.find(query, CHANNEL_PROJECTION)]
+    
+    async def _graph_version(self) -> str:
+        """
+        Version courante du graphe, lue sans le parcourir.
         
-        # Extraire le graphe des canaux
-        edges = {}
-        for channel in channels:
-            node1 = channel["node1_pub"]
-            node2 = channel["node2_pub"]
-            if node1 not in edges:
-                edges[node1] = []
-            if node2 not in edges:
-                edges[node2] = []
-            edges[node1].append(node2)
-            edges[node2].append(node1)
-        
-        # Calculer le nombre de chemins passant par ce nœud
-        # Dans une implémentation réelle, on calculerait tous les plus courts chemins
-        num_paths_through_node = 0
-        sampled_nodes = min(100, num_nodes)  # Limiter l'échantillon pour des raisons de performance
-        
-        for _ in range(sampled_nodes):
-            # Prendre 2 nœuds aléatoires
-            source = all_nodes[np.random.randint(0, num_nodes)]["public_key"]
-            target = all_nodes[np.random.randint(0, num_nodes)]["public_key"]
-            
-            if source == target or source == node_id or target == node_id:
-                continue
-            
-            # Vérifier si un chemin existe entre source et target passant par node_id
-            # C'est une simplification - en réalité, on vérifierait tous les plus courts chemins
-            if source in edges and node_id in edges[source] and target in edges and node_id in edges[target]:
-                num_paths_through_node += 1
+        Compteur incrémenté par la synchronisation du graphe (graph_metadata),
+        complété par le nombre de nœuds et de canaux (métadonnées des collections)
+        pour les écritures faites hors synchronisation, et par les paramètres
+        d'échantillonnage de la betweenness.
+        """
+        counter = await self.graph_metadata.find_one({"_id": GRAPH_VERSION_ID})
+        nodes = await self.nodes_collection.estimated_document_count()
+        channels = await self.channels_collection.estimated_document_count()
+        return (
+            f"{counter.get('version', 0) if counter else 0}:{nodes}:{channels}:"
+            f"{self.betweenness_epsilon}:{self.betweenness_delta}:{self.betweenness_max_sources}"
+        )
+    
+    async def _load_graph(self) -> Tuple[List[dict], List[dict]]:
+        """Nœuds (public_key) et canaux du graphe, parcourus avec projection."""
+        nodes = [node async for node in self.nodes_collection.find({}, {"_id": 0, "public_key": 1})]
+        channels = [channel async for channel in self.channels_collection.find({}, CHANNEL_PROJECTION)]
+        return nodes, channels
+    
+    async def _graph_betweenness(
+        self, version: str, graph: Optional[Tuple[List[dict], List[dict]]] = None,
+        wait: bool = True
+    ) -> Dict[str, float]:
+        """
+        Betweenness normalisée de tous les nœuds, calculée une fois par version du graphe.
         
-        # Normaliser
-        max_possible_paths = sampled_nodes * (sampled_nodes - 1) / 2
-        betweenness = num_paths_through_node / max(1, max_possible_paths)
+        Brandes sur la représentation CSR avec un nombre de sources échantillonnées
+        dérivé des bornes d'erreur (betweenness_epsilon, betweenness_delta) et
+        plafonné par betweenness_max_sources. Tant que la version (voir
+        _graph_version) ne change pas, le résultat mis en cache est réutilisé sans
+        lire le graphe. Un seul calcul par version est lancé, quel que soit le
+        nombre de requêtes concurrentes.
         
-        return betweenness * 100  # Convertir en pourcentage
+        Args:
+            version: Version courante du graphe
+            graph: Nœuds et canaux déjà chargés (lus par le calcul si None)
+            wait: Si False et qu'une version précédente est en cache, la retourne
+                sans attendre le calcul de la version courante (lancé en arrière-plan)
+        """
+        cached = _betweenness_cache.get(version)
+        if cached is not None:
+            _betweenness_cache.move_to_end(version)
+            return cached
+        
+        task = self._betweenness_task(version, graph)
+        if not wait and _betweenness_cache:
+            return next(reversed(_betweenness_cache.values()))
+        # shield : l'annulation d'une requête n'interrompt pas le calcul partagé
+        return await asyncio.shield(task)
+    
+    def _betweenness_task(
+        self, version: str, graph: Optional[Tuple[List[dict], List[dict]]]
+    ) -> "asyncio.Task[Dict[str, float]]":
+        """Tâche de calcul de la betweenness d'une version (créée une seule fois)"""
+        loop = asyncio.get_running_loop()
+        task = _betweenness_inflight.get(version)
+        if task is not None and task.get_loop() is loop:
+            return task
+        
+        task = loop.create_task(self._compute_betweenness(version, graph))
+        # L'erreur est journalisée par _compute_betweenness, même sans attente
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _betweenness_inflight[version] = task
+        return task
+    
+    async def _compute_betweenness(
+        self, version: str, graph: Optional[Tuple[List[dict], List[dict]]]
+    ) -> Dict[str, float]:
+        started = time.monotonic()
+        try:
+            nodes, channels = graph or await self._load_graph()
+            csr = CSRGraph.from_edges(
+                ((channel["node1_pub"], channel["node2_pub"]) for channel in channels),
+                nodes=sorted(node["public_key"] for node in nodes)
+            )
+            k = csr_graph.betweenness_sample_size(
+                len(csr), self.betweenness_epsilon, self.betweenness_delta, self.betweenness_max_sources
+            )
+            # Calcul CPU hors de la boucle d'événements
+            betweenness = await asyncio.to_thread(
+                csr_graph.betweenness_centrality, csr, k=k, seed=BETWEENNESS_SEED
+            )
+        except Exception as e:
+            logger.error(f"Erreur calcul betweenness (version {version}): {e}")
+            raise
+        finally:
+            _betweenness_inflight.pop(version, None)
+        
+        epsilon = csr_graph.betweenness_error_bound(len(csr), k, self.betweenness_delta)
+        if epsilon > self.betweenness_epsilon:
+            logger.warning(
+                f"Betweenness plafonnée à {k} sources sur {len(csr)} nœuds : erreur "
+                f"garantie ±{epsilon:.3f} au lieu de ±{self.betweenness_epsilon}"
+            )
+        logger.info(
+            f"Betweenness calculée sur {len(csr)} nœuds ({k or len(csr)} sources, "
+            f"erreur ±{epsilon:.3f}) en {time.monotonic() - started:.1f}s"
+        )
+        
+        _betweenness_cache[version] = betweenness
+        if len(_betweenness_cache) > BETWEENNESS_CACHE_SIZE:
+            _betweenness_cache.popitem(last=False)
+        return betweenness
+    
+    async def warm_betweenness(self) -> None:
+        """
+        Précalcule la betweenness de la version courante du graphe.
+        
+        À lancer en tâche de fond (démarrage, après une synchronisation du
+        graphe) pour que les calculs unitaires trouvent le résultat en cache.
+        """
+        try:
+            await self._graph_betweenness(await self._graph_version())
+        except Exception as e:
+            logger.warning(f"Précalcul de la betweenness impossible: {e}")
     
     async def _calculate_uptime(self, node_id: str) -> float:
         """
@@ -295,10 +441,31 @@ class LightningScoreService:
         
         # Récupérer la configuration
         config = await self.get_config()
-        weights = config["weights"]
         
+        score = await self._compute_node_score(node_id, config["weights"])
+        
+        # Sauvegarder le score dans la base de données
+        score_dict = {k: v for k, v in score.dict(exclude={"id"}).items()}
+        await self.scores_collection.insert_one(score_dict)
+        
+        return score
+    
+    async def _compute_node_score(
+        self, node_id: str, weights: Dict[str, float],
+        snapshot: Optional[Dict[str, Any]] = None,
+        timestamp: Optional[datetime] = None
+    ) -> LightningNodeScore:
+        """
+        Calcule le score d'un nœud sans le sauvegarder.
+        
+        Args:
+            node_id: ID du nœud
+            weights: Pondérations des composantes du score
+            snapshot: Instantané du graphe partagé (optionnel)
+            timestamp: Horodatage du score (maintenant par défaut)
+        """
         # Calculer les scores détaillés
-        detailed = await self._calculate_detailed_scores(node_id)
+        detailed = await self._calculate_detailed_scores(node_id, snapshot)
         
         # Normaliser les scores (sur 100)
         # Ces facteurs de normalisation devraient être ajustés en fonction des données réelles
@@ -335,18 +502,151 @@ class LightningScoreService:
         )
         
         # Créer et retourner le score
-        score = LightningNodeScore(
+        return LightningNodeScore(
             node_id=node_id,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp or datetime.utcnow(),
             metrics=metrics,
             metadata=metadata
         )
+    
+    async def _load_graph_snapshot(self, node_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Charge en une passe les nœuds et les canaux partagés par tous les calculs d'un lot.
         
-        # Sauvegarder le score dans la base de données
-        score_dict = {k: v for k, v in score.dict(exclude={"id"}).items()}
-        await self.scores_collection.insert_one(score_dict)
+        Les curseurs sont parcourus avec projection : aucun document complet n'est
+        matérialisé et chaque nœud retrouve ses canaux sans requête supplémentaire.
         
-        return score
+        Args:
+            node_ids: Nœuds à recalculer (tous si None)
+        
+        Returns:
+            Dict avec les nœuds du graphe, les canaux par nœud, la betweenness
+            réseau et les nœuds à recalculer
+        """
+        version = await self._graph_version()
+        nodes, channels = await self._load_graph()
+        
+        channels_by_node = defaultdict(list)
+        for channel in channels:
+            channels_by_node[channel["node1_pub"]].append(channel)
+            if channel["node2_pub"] != channel["node1_pub"]:
+                channels_by_node[channel["node2_pub"]].append(channel)
+        
+        betweenness = await self._graph_betweenness(version, (nodes, channels))
+        
+        known = [node["public_key"] for node in nodes]
+        if node_ids is not None:
+            existing = set(known)
+            for node_id in node_ids:
+                if node_id not in existing:
+                    logger.warning(f"Nœud {node_id} non trouvé, ignoré")
+            known = [node_id for node_id in dict.fromkeys(node_ids) if node_id in existing]
+        
+        return {
+            "nodes": nodes,
+            "channels_by_node": channels_by_node,
+            "betweenness": betweenness,
+            "targets": known
+        }
+    
+    async def _fresh_node_ids(self, since: datetime, node_ids: Optional[List[str]] = None) -> set:
+        """
+        Nœuds ayant un score plus récent que `since`, en une seule agrégation.
+        """
+        match: Dict[str, Any] = {"timestamp": {"$gt": since}}
+        if node_ids is not None:
+            match["node_id"] = {"$in": node_ids}
+        
+        cursor = self.scores_collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$node_id"}}
+        ])
+        return {doc["_id"] async for doc in cursor}
+    
+    async def _recalculate(
+        self, node_ids: Optional[List[str]], force: bool,
+        batch_size: int = RECALCULATION_BATCH_SIZE,
+        concurrency: int = RECALCULATION_CONCURRENCY
+    ) -> int:
+        """
+        Pipeline de recalcul en lot : sélection des nœuds obsolètes, calcul à
+        concurrence bornée sur un instantané partagé du graphe, puis écriture
+        par bulk_write. Les upserts sont indexés sur (node_id, timestamp du lot) :
+        rejouer un lot n'insère pas de doublon dans l'historique.
+        """
+        started = time.monotonic()
+        run_timestamp = datetime.utcnow()
+        
+        # Index (node_id, timestamp) : fraîcheur, historique et upserts du lot
+        if not self._score_indexes_ready:
+            await self.scores_collection.create_index([("node_id", 1), ("timestamp", -1)])
+            self._score_indexes_ready = True
+        
+        config = await self.get_config()
+        weights = config["weights"]
+        snapshot = await self._load_graph_snapshot(node_ids)
+        
+        targets = snapshot["targets"]
+        if not force:
+            fresh = await self._fresh_node_ids(run_timestamp - SCORE_FRESHNESS, node_ids)
+            targets = [node_id for node_id in targets if node_id not in fresh]
+            logger.info(f"{len(fresh)} nœuds ont un score récent, pas de recalcul nécessaire")
+        
+        total = len(targets)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def score(node_id: str) -> Optional[LightningNodeScore]:
+            async with semaphore:
+                try:
+                    return await self._compute_node_score(node_id, weights, snapshot, run_timestamp)
+                except Exception as e:
+                    logger.error(f"Erreur lors du calcul du score pour {node_id}: {e}")
+                    return None
+        
+        count = 0
+        errors = 0
+        for start in range(0, total, batch_size):
+            batch = targets[start:start + batch_size]
+            scores = [s for s in await asyncio.gather(*(score(node_id) for node_id in batch)) if s]
+            errors += len(batch) - len(scores)
+            
+            operations = [
+                UpdateOne(
+                    {"node_id": s.node_id, "timestamp": s.timestamp},
+                    {"$setOnInsert": s.dict(exclude={"id"})},
+                    upsert=True
+                )
+                for s in scores
+            ]
+            if operations:
+                try:
+                    await self.scores_collection.bulk_write(operations, ordered=False)
+                    count += len(operations)
+                except Exception as e:
+                    errors += len(operations)
+                    logger.error(f"Erreur lors de l'écriture d'un lot de {len(operations)} scores: {e}")
+            
+            elapsed = time.monotonic() - started
+            processed = min(start + batch_size, total)
+            logger.info(
+                f"Recalcul des scores: {processed}/{total} nœuds "
+                f"({processed / max(elapsed, 1e-9):.0f} nœuds/s)"
+            )
+        
+        elapsed = time.monotonic() - started
+        self.last_recalculation = {
+            "timestamp": run_timestamp,
+            "candidates": len(snapshot["targets"]),
+            "recalculated": count,
+            "errors": errors,
+            "duration_seconds": elapsed,
+            "nodes_per_second": count / max(elapsed, 1e-9)
+        }
+        logger.info(
+            f"Recalcul des scores terminé: {count} scores mis à jour en {elapsed:.1f}s "
+            f"({self.last_recalculation['nodes_per_second']:.0f} nœuds/s, {errors} erreurs)"
+        )
+        return count
     
     async def recalculate_all_scores(self, force: bool = False) -> int:
         """
@@ -359,34 +659,7 @@ class LightningScoreService:
             Nombre de scores recalculés
         """
         logger.info("Démarrage du recalcul de tous les scores")
-        
-        # Récupérer tous les nœuds
-        nodes = await self.nodes_collection.find().to_list(length=None)
-        count = 0
-        
-        for node in nodes:
-            node_id = node["public_key"]
-            
-            # Vérifier si un recalcul est nécessaire
-            if not force:
-                # Vérifier si un score récent existe
-                recent_score = await self.scores_collection.find_one(
-                    {"node_id": node_id, "timestamp": {"$gt": datetime.utcnow() - timedelta(days=1)}}
-                )
-                if recent_score:
-                    logger.debug(f"Score récent trouvé pour {node_id}, pas de recalcul nécessaire")
-                    continue
-            
-            # Recalculer le score
-            try:
-                await self.calculate_node_score(node_id)
-                count += 1
-                logger.debug(f"Score recalculé pour {node_id}")
-            except Exception as e:
-                logger.error(f"Erreur lors du calcul du score pour {node_id}: {e}")
-        
-        logger.info(f"Recalcul des scores terminé: {count} scores mis à jour")
-        return count
+        return await self._recalculate(None, force)
     
     async def recalculate_scores(self, node_ids: List[str] = None, force: bool = False) -> int:
         """
@@ -402,32 +675,7 @@ class LightningScoreService:
         if node_ids is None:
             return await self.recalculate_all_scores(force)
         
-        count = 0
-        for node_id in node_ids:
-            # Vérifier si le nœud existe
-            node = await self.nodes_collection.find_one({"public_key": node_id})
-            if not node:
-                logger.warning(f"Nœud {node_id} non trouvé, ignoré")
-                continue
-            
-            # Vérifier si un recalcul est nécessaire
-            if not force:
-                recent_score = await self.scores_collection.find_one(
-                    {"node_id": node_id, "timestamp": {"$gt": datetime.utcnow() - timedelta(days=1)}}
-                )
-                if recent_score:
-                    logger.debug(f"Score récent trouvé pour {node_id}, pas de recalcul nécessaire")
-                    continue
-            
-            # Recalculer le score
-            try:
-                await self.calculate_node_score(node_id)
-                count += 1
-                logger.debug(f"Score recalculé pour {node_id}")
-            except Exception as e:
-                logger.error(f"Erreur lors du calcul du score pour {node_id}: {e}")
-        
-        return count
+        return await self._recalculate(list(node_ids), force)
     
     async def generate_recommendations(self, node_id: str) -> NodeRecommendations:
         """
@@ -2,6 +2,7 @@
 import httpx
 from fastapi import HTTPException, status
 from app.db import get_lnbits_headers
+from src.clients.http_pool import pooled_client
 import os
 from dotenv import load_dotenv
 from typing import Dict, List, Optional, Any
@@ -84,7 +85,7 @@ class LNbitsService:
         headers = self.admin_headers if admin else self.headers
         url = f"{self.base_url}{endpoint}"
         
-        async with httpx.AsyncClient() as client:
+        async with pooled_client(self.base_url) as client:
             try:
                 response = await client.request(method, url, json=data, headers=headers)
                 response.raise_for_status()
@@ -201,7 +202,7 @@ class LNbitsService:
 
     async def get_wallet_details(self):
         """Obtenir les détails du portefeuille, y compris le solde."""
-        async with httpx.AsyncClient() as client:
+        async with pooled_client(self.base_url) as client:
             try:
                 response = await client.get(
                     f"{self.base_url}/api/v1/wallet",
@@ -217,7 +218,7 @@ class LNbitsService:
 
     async def get_transactions(self):
         """Obtenir l'historique des transactions."""
-        async with httpx.AsyncClient() as client:
+        async with pooled_client(self.base_url) as client:
             try:
                 response = await client.get(
                     f"{self.base_url}/api/v1/payments",
@@ -238,7 +239,7 @@ class LNbitsService:
             amount: Montant en sats
             memo: Description de la facture
         """
-        async with httpx.AsyncClient() as client:
+        async with pooled_client(self.base_url) as client:
             try:
                 response = await client.post(
                     f"{self.base_url}/api/v1/payments",
@@ -263,7 +264,7 @@ class LNbitsService:
         Args:
             bolt11: Facture Lightning au format BOLT11
         """
-        async with httpx.AsyncClient() as client:
+        async with pooled_client(self.base_url) as client:
             try:
                 response = await client.post(
                     f"{self.base_url}/api/v1/payments",
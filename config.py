@@ -89,7 +89,16 @@ class Settings(BaseSettings):
     perf_enable_system_metrics: bool = Field(False, alias="PERF_ENABLE_SYSTEM_METRICS")  # Désactivé par défaut en prod pour réduire CPU
     perf_response_cache_ttl: int = Field(3600, alias="PERF_RESPONSE_CACHE_TTL")
     perf_embedding_cache_ttl: int = Field(86400, alias="PERF_EMBEDDING_CACHE_TTL")
+    perf_embedding_cache_dtype: str = Field("float32", alias="PERF_EMBEDDING_CACHE_DTYPE")  # float32 ou float16
+    perf_embedding_cache_l1_entries: int = Field(4096, alias="PERF_EMBEDDING_CACHE_L1_ENTRIES")  # 0 désactive le L1
+    perf_embedding_cache_max_entries: int = Field(50000, alias="PERF_EMBEDDING_CACHE_MAX_ENTRIES")  # fallback mémoire
     perf_max_workers: int = Field(4, alias="PERF_MAX_WORKERS")
+    perf_http_max_connections_per_host: int = Field(20, alias="PERF_HTTP_MAX_CONNECTIONS_PER_HOST")
+    perf_http_max_keepalive_connections: int = Field(10, alias="PERF_HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    perf_http_keepalive_expiry: float = Field(30.0, alias="PERF_HTTP_KEEPALIVE_EXPIRY")  # secondes
+    perf_http2: bool = Field(True, alias="PERF_HTTP2")  # actif seulement si le paquet h2 est installé
+    perf_vector_store_path: str = Field("data/rag/vector_store", alias="PERF_VECTOR_STORE_PATH")
+    perf_vector_store_dtype: str = Field("float32", alias="PERF_VECTOR_STORE_DTYPE")  # float32 ou float16
 
     # Logging
     log_level: str = Field("INFO", alias="LOG_LEVEL")
@@ -142,8 +142,13 @@ class RAGSettings(BaseSettings):
     INDEX_TYPE: str = "redis_hnsw"  # "faiss" ou "redis_hnsw"
     INDEX_USE_GPU: bool = False  # GPU pour embeddings (si disponible)
     
+    # Store d'embeddings persistant (np.memmap, partagé entre workers)
+    VECTOR_STORE_PATH: str = "data/rag/ollama_vector_store"
+    VECTOR_STORE_DTYPE: str = "float32"  # "float32" ou "float16"
+    
     # Batch Processing
     EMBEDDING_BATCH_SIZE: int = 32  # CPU: 32, GPU: 128
+    EMBEDDING_BATCH_MAX_TOKENS: int = 8192  # Tokens estimés max par requête /api/embed
     EMBEDDING_MAX_CONCURRENT_BATCHES: int = 4
     
     class Config:
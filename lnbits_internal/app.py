@@ -56,7 +56,11 @@ from .commands import migrate_databases
 from .core import init_core_routers
 from .core.db import core_app_extra
 from .core.models.extensions import Extension, ExtensionMeta, InstallableExtension
-from .core.services import check_admin_settings, check_webpush_settings
+from .core.services import (
+    check_admin_settings,
+    check_webpush_settings,
+    reconcile_pending_payments,
+)
 from .middleware import (
     AuditMiddleware,
     ExtensionsRedirectMiddleware,
@@ -470,6 +474,7 @@ def register_async_tasks():
     create_permanent_task(wait_notification_messages)
 
     create_permanent_task(check_pending_payments)
+    create_permanent_task(reconcile_pending_payments)
     create_permanent_task(invoice_listener)
     create_permanent_task(internal_invoice_listener)
     create_permanent_task(cache.invalidate_forever)
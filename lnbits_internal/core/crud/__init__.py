@@ -32,8 +32,10 @@ from .payments import (
     get_payments_paginated,
     get_standalone_payment,
     get_wallet_payment,
+    get_wallet_withdrawn_24h,
     is_internal_status_success,
     mark_webhook_sent,
+    rebuild_daily_payment_rollup,
     update_payment,
     update_payment_checking_id,
     update_payment_extra,
@@ -117,8 +119,10 @@ __all__ = [
     "get_payments_paginated",
     "get_standalone_payment",
     "get_wallet_payment",
+    "get_wallet_withdrawn_24h",
     "is_internal_status_success",
     "mark_webhook_sent",
+    "rebuild_daily_payment_rollup",
     "update_payment",
     "update_payment_checking_id",
     "update_payment_extra",
@@ -1,10 +1,11 @@
+from datetime import datetime
 from time import time
 from typing import Any, Optional, Tuple
 
 from lnbits_internal.core.crud.wallets import get_total_balance, get_wallet, get_wallets_ids
 from lnbits_internal.core.db import db
 from lnbits_internal.core.models import PaymentState
-from lnbits_internal.db import Connection, DateTrunc, Filters, Page
+from lnbits_internal.db import Connection, DateTrunc, Filters, Operator, Page
 
 from ..models import (
     CreatePayment,
@@ -19,10 +20,124 @@ from ..models import (
 )
 
 
+# filter fields that map onto columns of the daily rollup table
+ROLLUP_FILTER_FIELDS = {"wallet_id", "status", "tag"}
+ROLLUP_GROUPS = {"day", "month"}
+
+# outgoing amounts are summed over this window for the daily withdraw limit
+WITHDRAW_WINDOW_SECONDS = 24 * 60 * 60
+
+
 def update_payment_extra():
     pass
 
 
+async def _rollup_payments(
+    conn: Connection, where: str, values: dict, sign: int = 1
+) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) the payments matching `where` to/from
+    the daily rollup and the per-minute withdraw rollup. Must run in the
+    transaction that writes the payments.
+    """
+    await conn.execute(
+        f"""
+        INSERT INTO apipayments_daily
+            (wallet_id, time, status, direction, tag, extension,
+             payments_count, amount, fee, abs_fee)
+        SELECT wallet_id, {conn.datetime_grouping("day")}, status,
+               CASE WHEN amount > 0 THEN 'in'
+                    WHEN amount < 0 THEN 'out' ELSE 'none' END,
+               COALESCE(tag, ''), COALESCE(extension, ''),
+               {sign} * COUNT(*), {sign} * SUM(amount),
+               {sign} * SUM(fee), {sign} * SUM(ABS(fee))
+        FROM apipayments
+        WHERE {where}
+        GROUP BY 1, 2, 3, 4, 5, 6
+        ON CONFLICT (wallet_id, time, status, direction, tag, extension)
+        DO UPDATE SET
+            payments_count = apipayments_daily.payments_count
+                + excluded.payments_count,
+            amount = apipayments_daily.amount + excluded.amount,
+            fee = apipayments_daily.fee + excluded.fee,
+            abs_fee = apipayments_daily.abs_fee + excluded.abs_fee
+        """,
+        values,
+    )
+    await conn.execute(
+        f"""
+        INSERT INTO apipayments_withdrawn (wallet_id, time, amount)
+        SELECT wallet_id, {conn.datetime_grouping("minute")}, {-sign} * SUM(amount)
+        FROM apipayments
+        WHERE ({where}) AND amount < 0
+        AND status IN ('{PaymentState.PENDING}', '{PaymentState.SUCCESS}')
+        GROUP BY 1, 2
+        ON CONFLICT (wallet_id, time)
+        DO UPDATE SET amount = apipayments_withdrawn.amount + excluded.amount
+        """,
+        values,
+    )
+
+
+async def rebuild_daily_payment_rollup(conn: Optional[Connection] = None) -> None:
+    """Recompute the rollups from apipayments (one-shot backfill)."""
+    async with db.reuse_conn(conn) if conn else db.connect() as conn:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM apipayments_daily")
+            await conn.execute("DELETE FROM apipayments_withdrawn")
+            await _rollup_payments(conn, "1 = 1", {})
+            await _prune_withdrawn(conn)
+
+
+def _use_rollup(filters: Filters) -> bool:
+    """
+    The rollup answers a query if it only filters on wallet, status, tag or
+    on whole days (`time >= midnight` / `time < midnight`).
+    """
+    if filters.search:
+        return False
+    for page_filter in filters.filters:
+        if page_filter.field in ROLLUP_FILTER_FIELDS:
+            continue
+        if page_filter.field != "time" or page_filter.op not in {
+            Operator.GE,
+            Operator.LT,
+        }:
+            return False
+        for value in (page_filter.values or {}).values():
+            if not isinstance(value, datetime) or int(value.timestamp()) % 86400:
+                return False
+    return True
+
+
+async def get_wallet_withdrawn_24h(
+    wallet_id: str, conn: Optional[Connection] = None
+) -> int:
+    """
+    Outgoing msat (pending or successful) of the wallet over the last 24h,
+    summed from the per-minute rollup shared by all workers.
+    """
+    row = await (conn or db).fetchone(
+        f"""
+        SELECT COALESCE(SUM(amount), 0) AS withdrawn FROM apipayments_withdrawn
+        WHERE wallet_id = :wallet_id AND time > {db.timestamp_placeholder("since")}
+        """,
+        {"wallet_id": wallet_id, "since": int(time()) - WITHDRAW_WINDOW_SECONDS},
+    )
+    return int(row["withdrawn"])
+
+
+async def _prune_withdrawn(conn: Connection) -> None:
+    """Drop the per-minute withdraw buckets that left the 24h window."""
+    await conn.execute(
+        f"""
+        DELETE FROM apipayments_withdrawn
+        WHERE time <= {db.timestamp_placeholder("since")}
+        """,
+        {"since": int(time()) - WITHDRAW_WINDOW_SECONDS},
+    )
+
+
 async def get_payment(checking_id: str, conn: Optional[Connection] = None) -> Payment:
     return await (conn or db).fetchone(
         "SELECT * FROM apipayments WHERE checking_id = :checking_id",
@@ -167,6 +282,7 @@ async def get_payments_paginated(
         values,
         filters=filters,
         model=Payment,
+        keyset="checking_id",
     )
 
 
@@ -230,23 +346,21 @@ async def delete_expired_invoices(
 ) -> None:
     # first we delete all invoices older than one month
 
-    await (conn or db).execute(
-        f"""
-        DELETE FROM apipayments
-        WHERE status = '{PaymentState.PENDING}' AND amount > 0
-        AND time < {db.timestamp_placeholder("delta")}
-        """,
-        {"delta": int(time() - 2592000)},
-    )
-    # then we delete all invoices whose expiry date is in the past
-    await (conn or db).execute(
-        f"""
-        DELETE FROM apipayments
-        WHERE status = '{PaymentState.PENDING}' AND amount > 0
-        AND expiry < {db.timestamp_placeholder("now")}
-        """,
-        {"now": int(time())},
-    )
+    expired = [
+        (
+            f"time < {db.timestamp_placeholder('delta')}",
+            {"delta": int(time() - 2592000)},
+        ),
+        # then we delete all invoices whose expiry date is in the past
+        (f"expiry < {db.timestamp_placeholder('now')}", {"now": int(time())}),
+    ]
+    async with db.reuse_conn(conn) if conn else db.connect() as conn:
+        for clause, values in expired:
+            where = f"status = '{PaymentState.PENDING}' AND amount > 0 AND {clause}"
+            async with conn.transaction():
+                await _rollup_payments(conn, where, values, sign=-1)
+                await conn.execute(f"DELETE FROM apipayments WHERE {where}", values)
+        await _prune_withdrawn(conn)
 
 
 async def create_payment(
@@ -277,7 +391,12 @@ async def create_payment(
         extra=extra,
     )
 
-    await (conn or db).insert("apipayments", payment)
+    async with db.reuse_conn(conn) if conn else db.connect() as conn:
+        async with conn.transaction():
+            await conn.insert("apipayments", payment)
+            await _rollup_payments(
+                conn, "checking_id = :checking_id", {"checking_id": checking_id}
+            )
 
     return payment
 
@@ -296,11 +415,18 @@ async def update_payment(
     new_checking_id: Optional[str] = None,
     conn: Optional[Connection] = None,
 ) -> None:
-    await (conn or db).update(
-        "apipayments", payment, "WHERE checking_id = :checking_id"
-    )
-    if new_checking_id and new_checking_id != payment.checking_id:
-        await update_payment_checking_id(payment.checking_id, new_checking_id, conn)
+    values = {"checking_id": payment.checking_id}
+    async with db.reuse_conn(conn) if conn else db.connect() as conn:
+        async with conn.transaction():
+            await _rollup_payments(conn, "checking_id = :checking_id", values, -1)
+            await conn.update(
+                "apipayments", payment, "WHERE checking_id = :checking_id"
+            )
+            await _rollup_payments(conn, "checking_id = :checking_id", values)
+            if new_checking_id and new_checking_id != payment.checking_id:
+                await update_payment_checking_id(
+                    payment.checking_id, new_checking_id, conn
+                )
 
 
 async def get_payments_history(
@@ -317,26 +443,45 @@ async def get_payments_history(
         "wallet_id": wallet_id,
     }
     # count outgoing payments if they are still pending
-    where = [
-        f"""
-        wallet_id = :wallet_id AND (
-            status = '{PaymentState.SUCCESS}'
-            OR (amount < 0 AND status = '{PaymentState.PENDING}')
-        )
+    if group in ROLLUP_GROUPS and _use_rollup(filters):
+        where = [
+            f"""
+            wallet_id = :wallet_id AND payments_count > 0 AND (
+                status = '{PaymentState.SUCCESS}'
+                OR (direction = 'out' AND status = '{PaymentState.PENDING}')
+            )
+            """
+        ]
+        query = f"""
+            SELECT {date_trunc} date,
+                   SUM(CASE WHEN direction = 'in' THEN amount ELSE 0 END) income,
+                   SUM(CASE WHEN direction = 'out' THEN abs_fee - amount ELSE 0 END)
+                   spending
+            FROM apipayments_daily
+            {filters.where(where)}
+            GROUP BY date
+            ORDER BY date DESC
         """
-    ]
-    transactions: list[dict] = await db.fetchall(
-        f"""
-        SELECT {date_trunc} date,
-               SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) income,
-               SUM(CASE WHEN amount < 0 THEN abs(amount) + abs(fee) ELSE 0 END) spending
-        FROM apipayments
-        {filters.where(where)}
-        GROUP BY date
-        ORDER BY date DESC
-        """,
-        filters.values(values),
-    )
+    else:
+        where = [
+            f"""
+            wallet_id = :wallet_id AND (
+                status = '{PaymentState.SUCCESS}'
+                OR (amount < 0 AND status = '{PaymentState.PENDING}')
+            )
+            """
+        ]
+        query = f"""
+            SELECT {date_trunc} date,
+                   SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) income,
+                   SUM(CASE WHEN amount < 0 THEN abs(amount) + abs(fee) ELSE 0 END)
+                   spending
+            FROM apipayments
+            {filters.where(where)}
+            GROUP BY date
+            ORDER BY date DESC
+        """
+    transactions: list[dict] = await db.fetchall(query, filters.values(values))
     if wallet_id:
         wallet = await get_wallet(wallet_id)
         if wallet:
@@ -371,15 +516,25 @@ async def get_payment_count_stats(
 
     if not filters:
         filters = Filters()
-    clause = filters.where()
-    data = await (conn or db).fetchall(
-        query=f"""
+    if _use_rollup(filters):
+        query = f"""
+            SELECT {field} as field, SUM(payments_count) as total
+            FROM apipayments_daily
+            {filters.where(["payments_count > 0"])}
+            GROUP BY {field}
+            HAVING SUM(payments_count) > 0
+            ORDER BY {field}
+        """
+    else:
+        query = f"""
             SELECT {field} as field, count(*) as total
             FROM apipayments
-            {clause}
+            {filters.where()}
             GROUP BY {field}
             ORDER BY {field}
-        """,
+        """
+    data = await (conn or db).fetchall(
+        query=query,
         values=filters.values(),
         model=PaymentCountStat,
     )
@@ -395,25 +550,56 @@ async def get_daily_stats(
     if not filters:
         filters = Filters()
 
-    in_clause = filters.where(
-        ["(apipayments.status = 'success' AND apipayments.amount > 0)"]
-    )
-    out_clause = filters.where(
-        ["(apipayments.status IN ('success', 'pending') AND apipayments.amount < 0)"]
-    )
     date_trunc = db.datetime_grouping("day")
-    query = """
-        SELECT {date_trunc} date,
-            SUM(apipayments.amount - ABS(apipayments.fee)) AS balance,
-            ABS(SUM(apipayments.fee)) as fee,
-            COUNT(*) as payments_count
-        FROM wallets
-        LEFT JOIN apipayments ON apipayments.wallet_id = wallets.id
-        {clause}
-        AND (wallets.deleted = false OR wallets.deleted is NULL)
-        GROUP BY date
-        ORDER BY date ASC
-    """
+    if _use_rollup(filters):
+        in_clause = filters.where(
+            [
+                "(apipayments_daily.status = 'success'"
+                " AND apipayments_daily.direction = 'in')",
+                "apipayments_daily.payments_count > 0",
+            ]
+        )
+        out_clause = filters.where(
+            [
+                "(apipayments_daily.status IN ('success', 'pending')"
+                " AND apipayments_daily.direction = 'out')",
+                "apipayments_daily.payments_count > 0",
+            ]
+        )
+        query = """
+            SELECT {date_trunc} date,
+                SUM(apipayments_daily.amount - apipayments_daily.abs_fee) AS balance,
+                ABS(SUM(apipayments_daily.fee)) as fee,
+                SUM(apipayments_daily.payments_count) as payments_count
+            FROM wallets
+            JOIN apipayments_daily ON apipayments_daily.wallet_id = wallets.id
+            {clause}
+            AND (wallets.deleted = false OR wallets.deleted is NULL)
+            GROUP BY date
+            ORDER BY date ASC
+        """
+    else:
+        in_clause = filters.where(
+            ["(apipayments.status = 'success' AND apipayments.amount > 0)"]
+        )
+        out_clause = filters.where(
+            [
+                "(apipayments.status IN ('success', 'pending')"
+                " AND apipayments.amount < 0)"
+            ]
+        )
+        query = """
+            SELECT {date_trunc} date,
+                SUM(apipayments.amount - ABS(apipayments.fee)) AS balance,
+                ABS(SUM(apipayments.fee)) as fee,
+                COUNT(*) as payments_count
+            FROM wallets
+            LEFT JOIN apipayments ON apipayments.wallet_id = wallets.id
+            {clause}
+            AND (wallets.deleted = false OR wallets.deleted is NULL)
+            GROUP BY date
+            ORDER BY date ASC
+        """
 
     data_in = await (conn or db).fetchall(
         query=query.format(date_trunc=date_trunc, clause=in_clause),
@@ -474,10 +660,12 @@ async def get_wallets_stats(
 async def delete_wallet_payment(
     checking_id: str, wallet_id: str, conn: Optional[Connection] = None
 ) -> None:
-    await (conn or db).execute(
-        "DELETE FROM apipayments WHERE checking_id = :checking_id AND wallet = :wallet",
-        {"checking_id": checking_id, "wallet": wallet_id},
-    )
+    where = "checking_id = :checking_id AND wallet_id = :wallet_id"
+    values = {"checking_id": checking_id, "wallet_id": wallet_id}
+    async with db.reuse_conn(conn) if conn else db.connect() as conn:
+        async with conn.transaction():
+            await _rollup_payments(conn, where, values, sign=-1)
+            await conn.execute(f"DELETE FROM apipayments WHERE {where}", values)
 
 
 async def check_internal(
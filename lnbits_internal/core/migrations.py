@@ -2,10 +2,10 @@ import json
 from time import time
 from typing import Any
 
+import bolt11
 from loguru import logger
 from sqlalchemy.exc import OperationalError
 
-from lnbits import bolt11
 from lnbits_internal.db import Connection
 
 
@@ -711,3 +711,82 @@ async def m031_add_color_and_icon_to_wallets(db: Connection):
     Adds icon and color columns to wallets.
     """
     await db.execute("ALTER TABLE wallets ADD COLUMN extra TEXT")
+
+
+async def m032_add_daily_payment_rollup(db: Connection):
+    """
+    Per-wallet daily payment aggregates, maintained together with apipayments
+    and read by the payment stats queries. `time` holds the start of the day.
+    """
+    await db.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS apipayments_daily (
+            wallet_id TEXT NOT NULL,
+            time TIMESTAMP NOT NULL,
+            status TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            tag TEXT NOT NULL DEFAULT '',
+            extension TEXT NOT NULL DEFAULT '',
+            payments_count {db.big_int} NOT NULL DEFAULT 0,
+            amount {db.big_int} NOT NULL DEFAULT 0,
+            fee {db.big_int} NOT NULL DEFAULT 0,
+            abs_fee {db.big_int} NOT NULL DEFAULT 0,
+            PRIMARY KEY (wallet_id, time, status, direction, tag, extension)
+        );
+        """
+    )
+    await db.execute(
+        f"""
+        INSERT INTO apipayments_daily
+            (wallet_id, time, status, direction, tag, extension,
+             payments_count, amount, fee, abs_fee)
+        SELECT wallet_id, {db.datetime_grouping("day")}, status,
+               CASE WHEN amount > 0 THEN 'in'
+                    WHEN amount < 0 THEN 'out' ELSE 'none' END,
+               COALESCE(tag, ''), COALESCE(extension, ''),
+               COUNT(*), SUM(amount), SUM(fee), SUM(ABS(fee))
+        FROM apipayments
+        GROUP BY 1, 2, 3, 4, 5, 6
+        """
+    )
+
+
+async def m033_add_wallet_time_index_to_apipayments(db: Connection):
+    """
+    Index backing keyset pagination of wallet payments by time.
+    """
+    await db.execute(
+        """
+        CREATE INDEX IF NOT EXISTS apipayments_wallet_time
+        ON apipayments (wallet_id, time, checking_id)
+        """
+    )
+
+
+async def m034_add_withdraw_minute_rollup(db: Connection):
+    """
+    Per-wallet outgoing amounts (pending or successful) by minute, maintained
+    together with apipayments and summed by the daily withdraw limit check.
+    `time` holds the start of the minute; only the last 24h are kept.
+    """
+    await db.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS apipayments_withdrawn (
+            wallet_id TEXT NOT NULL,
+            time TIMESTAMP NOT NULL,
+            amount {db.big_int} NOT NULL DEFAULT 0,
+            PRIMARY KEY (wallet_id, time)
+        );
+        """
+    )
+    await db.execute(
+        f"""
+        INSERT INTO apipayments_withdrawn (wallet_id, time, amount)
+        SELECT wallet_id, {db.datetime_grouping("minute")}, -SUM(amount)
+        FROM apipayments
+        WHERE amount < 0 AND status IN ('pending', 'success')
+        AND time > {db.timestamp_placeholder("since")}
+        GROUP BY 1, 2
+        """,
+        {"since": int(time()) - 60 * 60 * 24},
+    )
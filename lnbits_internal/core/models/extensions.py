@@ -11,7 +11,7 @@ from typing import Any
 
 import httpx
 from loguru import logger
-from pydantic import BaseModel
+from pydantic.v1 import BaseModel
 
 from lnbits_internal.helpers import (
     download_url,
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Callable
 
 import bcrypt
-from pydantic import BaseModel
+from pydantic.v1 import BaseModel
 
 
 def _do_nothing(*_):
@@ -1,6 +1,6 @@
 from enum import Enum
 
-from pydantic import BaseModel
+from pydantic.v1 import BaseModel
 
 
 class NotificationType(Enum):
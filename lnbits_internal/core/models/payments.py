@@ -5,7 +5,7 @@ from enum import Enum
 from typing import Literal
 
 from fastapi import Query
-from pydantic import BaseModel, Field, validator
+from pydantic.v1 import BaseModel, Field, validator
 
 from lnbits_internal.db import FilterModel
 from lnbits_internal.utils.exchange_rates import allowed_currencies
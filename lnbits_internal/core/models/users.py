@@ -5,7 +5,7 @@ from uuid import UUID
 
 from fastapi import Query
 from passlib.context import CryptContext
-from pydantic import BaseModel, Field
+from pydantic.v1 import BaseModel, Field
 
 from lnbits_internal.core.models.misc import SimpleItem
 from lnbits_internal.db import FilterModel
@@ -7,7 +7,7 @@ from datetime import datetime, timezone
 from enum import Enum
 
 from ecdsa import SECP256k1, SigningKey
-from pydantic import BaseModel, Field
+from pydantic.v1 import BaseModel, Field
 
 from lnbits_internal.helpers import url_for
 from lnbits_internal.lnurl import encode as lnurl_encode
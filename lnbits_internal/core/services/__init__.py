@@ -12,8 +12,10 @@ from .payments import (
     fee_reserve,
     fee_reserve_total,
     pay_invoice,
+    reconcile_pending_payments,
     service_fee,
     update_pending_payments,
+    update_pending_payments_batch,
     update_wallet_balance,
 )
 from .settings import (
@@ -47,8 +49,10 @@ __all__ = [
     "fee_reserve",
     "fee_reserve_total",
     "pay_invoice",
+    "reconcile_pending_payments",
     "service_fee",
     "update_pending_payments",
+    "update_pending_payments_batch",
     "update_wallet_balance",
     # settings
     "check_webpush_settings",
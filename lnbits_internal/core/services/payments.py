@@ -16,6 +16,7 @@ from lnbits_internal.decorators import check_user_extension_access
 from lnbits_internal.exceptions import InvoiceError, PaymentError
 from lnbits_internal.settings import settings
 from lnbits_internal.tasks import create_task
+from lnbits_internal.utils.cache import cache
 from lnbits_internal.utils.crypto import fake_privkey, random_secret_and_hash
 from lnbits_internal.utils.exchange_rates import fiat_amount_as_satoshis, satoshis_amount_as_fiat
 from lnbits_internal.wallets import fake_wallet, get_funding_source
@@ -30,8 +31,10 @@ from ..crud import (
     check_internal,
     create_payment,
     get_payments,
+    get_payments_paginated,
     get_standalone_payment,
     get_wallet,
+    get_wallet_withdrawn_24h,
     get_wallet_payment,
     is_internal_status_success,
     update_payment,
@@ -44,6 +47,12 @@ from ..models import (
 )
 from .notifications import send_payment_notification
 
+# concurrent funding source status checks
+PENDING_CHECK_CONCURRENCY = 10
+# background reconciler: payments per round and pause between rounds (seconds)
+PENDING_RECONCILE_BATCH = 200
+PENDING_RECONCILE_INTERVAL = 60
+
 
 async def pay_invoice(
     *,
@@ -177,8 +186,87 @@ async def update_pending_payments(wallet_id: str):
         pending=True,
         exclude_uncheckable=True,
     )
-    for payment in pending_payments:
-        await update_pending_payment(payment)
+    # skip payments the background reconciler has just checked
+    pending_payments = [
+        payment
+        for payment in pending_payments
+        if not cache.get(f"pending-checked-{payment.checking_id}")
+    ]
+    await update_pending_payments_batch(pending_payments)
+
+
+async def _check_pending_payment(
+    payment: Payment, semaphore: asyncio.Semaphore
+) -> Optional[Payment]:
+    async with semaphore:
+        try:
+            status = await payment.check_status()
+        except Exception as exc:
+            logger.warning(f"Could not check payment {payment.checking_id}: {exc}")
+            return None
+    cache.set(
+        f"pending-checked-{payment.checking_id}",
+        True,
+        expiry=PENDING_RECONCILE_INTERVAL,
+    )
+    if status.failed:
+        payment.status = PaymentState.FAILED
+        return payment
+    if status.success:
+        payment.status = PaymentState.SUCCESS
+        return payment
+    return None
+
+
+async def update_pending_payments_batch(
+    payments: list[Payment], concurrency: int = PENDING_CHECK_CONCURRENCY
+) -> list[Payment]:
+    """
+    Check the status of `payments` concurrently (at most `concurrency` calls to
+    the funding source at once) and store the settled ones in one transaction.
+    Returns the settled payments.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    checked = await asyncio.gather(
+        *[_check_pending_payment(payment, semaphore) for payment in payments]
+    )
+    settled = [payment for payment in checked if payment]
+    if settled:
+        async with db.connect() as conn:
+            async with conn.transaction():
+                for payment in settled:
+                    await update_payment(payment, conn=conn)
+    return settled
+
+
+async def reconcile_pending_payments():
+    """
+    Background reconciler: walks the pending payments oldest first, one batch
+    per round, so that wallet requests find them already settled.
+    """
+    cursor: Optional[str] = None
+    while settings.lnbits_running:
+        try:
+            page = await get_payments_paginated(
+                pending=True,
+                exclude_uncheckable=True,
+                filters=Filters(
+                    limit=PENDING_RECONCILE_BATCH,
+                    sortby="time",
+                    direction="asc",
+                    cursor=cursor,
+                    count=False,
+                ),
+            )
+            settled = await update_pending_payments_batch(page.data)
+            if settled:
+                logger.info(f"Reconciled {len(settled)} pending payments.")
+            # start again from the oldest once the end is reached
+            cursor = page.next_cursor
+        except Exception as exc:
+            logger.error(f"Error reconciling pending payments: {exc}")
+            cursor = None
+        await asyncio.sleep(PENDING_RECONCILE_INTERVAL)
 
 
 async def update_pending_payment(payment: Payment) -> bool:
@@ -319,21 +407,8 @@ async def check_wallet_daily_withdraw_limit(
     if limit < 0:
         raise ValueError("It is not allowed to spend funds from this server.")
 
-    payments = await get_payments(
-        since=int(time.time()) - 60 * 60 * 24,
-        outgoing=True,
-        wallet_id=wallet_id,
-        limit=1,
-        conn=conn,
-    )
-    if len(payments) == 0:
-        return
-
-    total = 0
-    for pay in payments:
-        total += pay.amount
-    total = total - amount_msat
-    if limit * 1000 + total < 0:
+    withdrawn = await get_wallet_withdrawn_24h(wallet_id, conn=conn)
+    if withdrawn + amount_msat > limit * 1000:
         raise ValueError(
             "Daily withdrawal limit of "
             + str(settings.lnbits_wallet_limit_daily_max_withdraw)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import hmac
 import json
 import os
 import re
@@ -11,7 +13,7 @@ from enum import Enum
 from typing import Any, Generic, Literal, TypeVar, get_origin
 
 from loguru import logger
-from pydantic import BaseModel, ValidationError, root_validator
+from pydantic.v1 import BaseModel, ValidationError, root_validator
 from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
 from sqlalchemy.sql import text
@@ -22,8 +24,9 @@ POSTGRES = "POSTGRES"
 COCKROACH = "COCKROACH"
 SQLITE = "SQLITE"
 
-DateTrunc = Literal["hour", "day", "month"]
+DateTrunc = Literal["minute", "hour", "day", "month"]
 sqlite_formats = {
+    "minute": "%Y-%m-%d %H:%M:00",
     "hour": "%Y-%m-%d %H:00:00",
     "day": "%Y-%m-%d 00:00:00",
     "month": "%Y-%m-01 00:00:00",
@@ -140,6 +143,32 @@ class Connection(Compat):
         self.type = typ
         self.name = name
         self.schema = schema
+        self._in_transaction = False
+
+    async def _commit(self):
+        if not self._in_transaction:
+            await self.conn.commit()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Run the enclosed statements in a single transaction: they are committed
+        together when the block exits and rolled back if it raises.
+        Nested blocks join the outer transaction.
+        """
+        if self._in_transaction:
+            yield self
+            return
+        self._in_transaction = True
+        try:
+            yield self
+        except BaseException:
+            await self.conn.rollback()
+            raise
+        else:
+            await self.conn.commit()
+        finally:
+            self._in_transaction = False
 
     def rewrite_query(self, query) -> str:
         if self.type in {POSTGRES, COCKROACH}:
@@ -200,13 +229,13 @@ class Connection(Compat):
         await self.conn.execute(
             text(update_query(table_name, model, where)), model_to_dict(model)
         )
-        await self.conn.commit()
+        await self._commit()
 
     async def insert(self, table_name: str, model: BaseModel):
         await self.conn.execute(
             text(insert_query(table_name, model)), model_to_dict(model)
         )
-        await self.conn.commit()
+        await self._commit()
 
     async def fetch_page(
         self,
@@ -216,10 +245,20 @@ class Connection(Compat):
         filters: Filters | None = None,
         model: type[TModel] | None = None,
         group_by: list[str] | None = None,
+        keyset: str | None = None,
     ) -> Page[TModel]:
+        """
+        Fetch one page of `query`. With `keyset` (a unique column, usually the
+        primary key) the page also carries a `next_cursor`: passing it back as
+        `filters.cursor` seeks straight to the next page instead of scanning
+        `OFFSET` rows. In keyset mode the total is only counted when
+        `filters.count` is set; otherwise the total of an earlier count is
+        served from a short-lived cache, or left as None.
+        """
         if not filters:
             filters = Filters()
-        clause = filters.where(where)
+        where = list(where or [])
+        clause = filters.where(list(where))
         parsed_values = filters.values(values)
 
         group_by_string = ""
@@ -231,33 +270,81 @@ class Connection(Compat):
                     raise ValueError("Value for GROUP BY is invalid")
             group_by_string = f"GROUP BY {', '.join(group_by)}"
 
+        use_keyset = bool(keyset and filters.limit) and not group_by
+        cursor = decode_cursor(filters.cursor) if use_keyset and filters.cursor else {}
+        page_clause = clause
+        page_values = dict(parsed_values)
+        order_by = filters.order_by()
+        pagination = filters.pagination()
+        offset = filters.offset or 0
+        if use_keyset:
+            assert keyset
+            sortby = filters.sortby or keyset
+            direction = filters.direction or "asc"
+            order_by = f"ORDER BY {sortby} {direction}"
+            if sortby != keyset:
+                order_by += f", {keyset} {direction}"
+            if cursor:
+                offset = cursor["offset"]
+            if (
+                cursor.get("value") is not None
+                and cursor["sort"] == sortby
+                and cursor["direction"] == direction
+            ):
+                seek = self.keyset_clause(cursor, keyset)
+                page_clause = filters.where([*where, seek])
+                page_values["cursor_value"] = cursor["value"]
+                page_values["cursor_key"] = cursor["key"]
+                pagination = f"LIMIT {filters.limit + 1}" if filters.limit else ""
+            elif filters.limit:
+                # first page, or a cursor that cannot seek (NULL sort value,
+                # different ordering): fall back to the offset
+                pagination = f"LIMIT {filters.limit + 1} OFFSET {offset}"
+
         rows = await self.fetchall(
             f"""
             {query}
-            {clause}
+            {page_clause}
             {group_by_string}
-            {filters.order_by()}
-            {filters.pagination()}
+            {order_by}
+            {pagination}
             """,
-            self.rewrite_values(parsed_values),
+            self.rewrite_values(page_values),
             model,
         )
-        if rows:
+
+        next_cursor = None
+        if use_keyset and filters.limit and len(rows) > filters.limit:
+            assert keyset
+            rows = rows[: filters.limit]
+            next_cursor = encode_cursor(
+                rows[-1],
+                filters.sortby or keyset,
+                filters.direction or "asc",
+                keyset,
+                offset + filters.limit,
+            )
+
+        count_query = f"""
+            SELECT COUNT(*) as count FROM (
+                {query}
+                {clause}
+                {group_by_string}
+            ) as count
+        """
+        count: int | None
+        if filters.count is False:
+            count = None
+        elif use_keyset and not filters.count:
+            count = _page_counts.get(self.name, count_query, parsed_values)
+        elif rows or filters.count:
             # no need for extra query if no pagination is specified
-            if filters.offset or filters.limit:
-                result = await self.execute(
-                    f"""
-                    SELECT COUNT(*) as count FROM (
-                        {query}
-                        {clause}
-                        {group_by_string}
-                    ) as count
-                    """,
-                    parsed_values,
-                )
+            if filters.offset or filters.limit or filters.count:
+                result = await self.execute(count_query, parsed_values)
                 row = result.mappings().first()
                 result.close()
                 count = int(row.get("count", 0))
+                _page_counts.set(self.name, count_query, parsed_values, count)
             else:
                 count = len(rows)
         else:
@@ -266,12 +353,33 @@ class Connection(Compat):
         return Page(
             data=rows,
             total=count,
+            next_cursor=next_cursor,
         )
 
+    def keyset_clause(self, cursor: dict, keyset: str) -> str:
+        """Rows strictly after the cursor in (sort column, keyset) order."""
+        op = ">" if cursor["direction"] == "asc" else "<"
+        if cursor["sort"] == keyset:
+            return f"{keyset} {op} :cursor_key"
+        sortby = cursor["sort"]
+        value = (
+            compat_timestamp_placeholder("cursor_value")
+            if cursor["datetime"]
+            else ":cursor_value"
+        )
+        clause = (
+            f"{sortby} {op} {value}"
+            f" OR ({sortby} = {value} AND {keyset} {op} :cursor_key)"
+        )
+        # NULL sort values come after every value in this ordering
+        if (self.type == POSTGRES) == (cursor["direction"] == "asc"):
+            clause += f" OR {sortby} IS NULL"
+        return f"({clause})"
+
     async def execute(self, query: str, values: dict | None = None):
         params = self.rewrite_values(values) if values else {}
         result = await self.conn.execute(text(self.rewrite_query(query)), params)
-        await self.conn.commit()
+        await self._commit()
         return result
 
 
@@ -383,9 +491,12 @@ class Database(Compat):
         filters: Filters | None = None,
         model: type[TModel] | None = None,
         group_by: list[str] | None = None,
+        keyset: str | None = None,
     ) -> Page[TModel]:
         async with self.connect() as conn:
-            return await conn.fetch_page(query, where, values, filters, model, group_by)
+            return await conn.fetch_page(
+                query, where, values, filters, model, group_by, keyset
+            )
 
     async def execute(self, query: str, values: dict | None = None):
         async with self.connect() as conn:
@@ -455,7 +566,9 @@ TFilterModel = TypeVar("TFilterModel", bound=FilterModel)
 
 class Page(BaseModel, Generic[T]):
     data: list[T]
-    total: int
+    # `None` when the total was not counted (cursor pagination)
+    total: int | None = None
+    next_cursor: str | None = None
 
 
 class Filter(BaseModel, Generic[TFilterModel]):
@@ -521,6 +634,10 @@ class Filters(BaseModel, Generic[TFilterModel]):
 
     offset: int | None = None
     limit: int | None = None
+    # opaque `Page.next_cursor` of the previous page (keyset pagination)
+    cursor: str | None = None
+    # count the total rows (None: only for offset pagination)
+    count: bool | None = None
 
     sortby: str | None = None
     direction: Literal["asc", "desc"] | None = None
@@ -584,6 +701,102 @@ class Filters(BaseModel, Generic[TFilterModel]):
         return values
 
 
+def encode_cursor(
+    row: Any, sortby: str, direction: str, keyset: str, offset: int
+) -> str:
+    """
+    Opaque cursor pointing after `row` (see `Connection.fetch_page`), signed
+    with the auth secret so that clients cannot forge or edit it.
+    """
+
+    def _get(column: str) -> Any:
+        return getattr(row, column) if isinstance(row, BaseModel) else row[column]
+
+    value = _get(sortby)
+    is_datetime = isinstance(value, datetime)
+    if is_datetime:
+        value = value.timestamp()
+    elif value is not None and not isinstance(value, (str, int, float)):
+        value = None
+    data = {
+        "sort": sortby,
+        "direction": direction,
+        "value": value,
+        "datetime": is_datetime,
+        "key": str(_get(keyset)),
+        "offset": offset,
+    }
+    payload = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+    return f"{payload}.{_cursor_signature(payload)}"
+
+
+def _cursor_signature(payload: str) -> str:
+    digest = hmac.new(
+        settings.auth_secret_key.encode(), payload.encode(), "sha256"
+    ).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor from `encode_cursor`, rejecting forged or altered ones."""
+    payload, _, signature = cursor.rpartition(".")
+    if not hmac.compare_digest(
+        signature.encode(), _cursor_signature(payload).encode()
+    ):
+        raise ValueError("Invalid cursor")
+    try:
+        data = json.loads(base64.urlsafe_b64decode(payload.encode()))
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+    if (
+        not isinstance(data, dict)
+        or not isinstance(data.get("sort"), str)
+        or not isinstance(data.get("offset"), int)
+        or data.get("direction") not in ("asc", "desc")
+        or "key" not in data
+        or "value" not in data
+    ):
+        raise ValueError("Invalid cursor")
+    if data.get("datetime") and data["value"] is not None:
+        try:
+            data["value"] = datetime.fromtimestamp(data["value"], timezone.utc)
+        except (TypeError, ValueError, OverflowError, OSError) as exc:
+            raise ValueError("Invalid cursor") from exc
+    return data
+
+
+class PageCountCache:
+    """
+    Short-lived totals of paginated queries, keyed by database, query and
+    values. Writes do not invalidate it: totals are approximate for `ttl`.
+    """
+
+    def __init__(self, ttl: float = 30, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._counts: dict[str, tuple[float, int]] = {}
+
+    def _key(self, db_name: str, query: str, values: dict) -> str:
+        return json.dumps([db_name, query, values], sort_keys=True, default=str)
+
+    def get(self, db_name: str, query: str, values: dict) -> int | None:
+        entry = self._counts.get(self._key(db_name, query, values))
+        if entry and entry[0] > time.time():
+            return entry[1]
+        return None
+
+    def set(self, db_name: str, query: str, values: dict, count: int) -> None:
+        now = time.time()
+        if len(self._counts) >= self.maxsize:
+            self._counts = {k: v for k, v in self._counts.items() if v[0] > now}
+            while len(self._counts) >= self.maxsize:
+                self._counts.pop(next(iter(self._counts)))
+        self._counts[self._key(db_name, query, values)] = (now + self.ttl, count)
+
+
+_page_counts = PageCountCache()
+
+
 def insert_query(table_name: str, model: BaseModel) -> str:
     """
     Generate an insert query with placeholders for a given table and model
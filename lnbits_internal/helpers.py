@@ -12,7 +12,7 @@ import jwt
 import shortuuid
 from fastapi.routing import APIRoute
 from packaging import version
-from pydantic.schema import field_schema
+from pydantic.v1.schema import field_schema
 
 from lnbits_internal.jinja2_templating import Jinja2Templates
 from lnbits_internal.nodes import get_node_class
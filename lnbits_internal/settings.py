@@ -15,7 +15,7 @@ from typing import Any
 from uuid import uuid4
 
 from loguru import logger
-from pydantic import BaseModel, BaseSettings, Extra, Field, validator
+from pydantic.v1 import BaseModel, BaseSettings, Extra, Field, validator
 
 
 def list_parse_fallback(v: str):
@@ -986,7 +986,11 @@ settings = Settings()
 
 settings.lnbits_path = str(path.dirname(path.realpath(__file__)))
 
-settings.version = importlib.metadata.version("lnbits")
+try:
+    settings.version = importlib.metadata.version("lnbits")
+except importlib.metadata.PackageNotFoundError:
+    # embedded copy: no lnbits distribution is installed
+    settings.version = "0.0.0"
 
 settings.check_auth_secret_key()
 
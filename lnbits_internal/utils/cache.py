@@ -1,13 +1,28 @@
 from __future__ import annotations
 
 import asyncio
+from collections import OrderedDict
+from functools import wraps
 from time import time
-from typing import Any, NamedTuple
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
 
 from loguru import logger
 
 from lnbits_internal.settings import settings
 
+try:
+    from prometheus_client import Counter
+
+    CACHE_EVENTS: Optional[Counter] = Counter(
+        "lnbits_cache_events_total",
+        "Cache hits, misses and evictions",
+        ["cache", "event"],
+    )
+except ImportError:
+    CACHE_EVENTS = None
+
+_missing = object()
+
 
 class Cached(NamedTuple):
     value: Any
@@ -17,23 +32,51 @@ class Cached(NamedTuple):
 class Cache:
     """
     Small caching utility providing simple get/set interface (very much like redis)
+
+    Entries are kept in LRU order and the least recently used ones are evicted
+    beyond `maxsize`. Concurrent `save_result` calls for the same missing key
+    share a single call of the coroutine.
     """
 
-    def __init__(self, interval: float = 10) -> None:
+    def __init__(
+        self, interval: float = 10, maxsize: int = 10_000, name: str = "default"
+    ) -> None:
         self.interval = interval
-        self._values: dict[Any, Cached] = {}
+        self.maxsize = maxsize
+        self.name = name
+        self._values: OrderedDict[Any, Cached] = OrderedDict()
+        self._inflight: dict[Any, asyncio.Future] = {}
+        self.stats = {"hit": 0, "miss": 0, "eviction": 0}
 
-    def get(self, key: str, default=None) -> Any | None:
+    def _count(self, event: str) -> None:
+        self.stats[event] += 1
+        if CACHE_EVENTS is not None:
+            CACHE_EVENTS.labels(self.name, event).inc()
+
+    def _lookup(self, key: Any) -> Any:
         cached = self._values.get(key)
         if cached is not None:
             if cached.expiry > time():
+                self._values.move_to_end(key)
                 return cached.value
             else:
                 self._values.pop(key)
-        return default
+        return _missing
+
+    def get(self, key: str, default=None) -> Any | None:
+        value = self._lookup(key)
+        if value is _missing:
+            self._count("miss")
+            return default
+        self._count("hit")
+        return value
 
     def set(self, key: str, value: Any, expiry: float = 10):
         self._values[key] = Cached(value, time() + expiry)
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+            self._count("eviction")
 
     def pop(self, key: str, default=None) -> Any | None:
         cached = self._values.pop(key, None)
@@ -43,15 +86,73 @@ class Cache:
 
     async def save_result(self, coro, key: str, expiry: float = 10):
         """
-        If `key` exists, return its value, otherwise call coro and cache its result
+        If `key` exists, return its value, otherwise call coro and cache its result.
+        Callers missing the same key meanwhile wait for that call instead of
+        calling coro again.
         """
-        cached = self.get(key)
-        if cached:
-            return cached
-        else:
+        while True:
+            value = self._lookup(key)
+            if value is not _missing:
+                self._count("hit")
+                return value
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                value = await asyncio.shield(inflight)
+                self._count("hit")
+                return value
+            except asyncio.CancelledError:
+                # the call we waited for was cancelled: retry it ourselves
+                if not inflight.cancelled():
+                    raise
+
+        self._count("miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
             value = await coro()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # waiters re-raise it, no need to log it as never retrieved
+            future.exception()
+            raise
+        else:
             self.set(key, value, expiry=expiry)
+            future.set_result(value)
             return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def cached(
+        self,
+        expiry: float = 10,
+        key: Optional[Callable[..., str]] = None,
+    ) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+        """
+        Decorator form of `save_result` for async functions. The cache key is
+        `key(*args, **kwargs)`, by default the function name and its arguments.
+        """
+
+        def decorator(func: Callable[..., Awaitable[Any]]):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_key = (
+                    key(*args, **kwargs)
+                    if key
+                    else f"{func.__module__}.{func.__qualname__}"
+                    f":{args!r}:{sorted(kwargs.items())!r}"
+                )
+                return await self.save_result(
+                    lambda: func(*args, **kwargs), cache_key, expiry
+                )
+
+            return wrapper
+
+        return decorator
 
     async def invalidate_forever(self):
         while settings.lnbits_running:
@@ -66,3 +167,4 @@ class Cache:
 
 
 cache = Cache()
+cached = cache.cached
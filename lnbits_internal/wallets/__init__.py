@@ -45,7 +45,7 @@ def get_funding_source() -> Wallet:
     return funding_source
 
 
-wallets_module = importlib.import_module("lnbits.wallets")
+wallets_module = importlib.import_module("lnbits_internal.wallets")
 fake_wallet = FakeWallet()
 
 # initialize as fake wallet
@@ -1 +1,169 @@
-# mcp/graph_analysis.py\n\nimport networkx as nx\nimport time\n\ndef build_graph(filtered_nodes_data: list) -> nx.Graph:\n    """\n    Builds a networkx graph from the pre-filtered list of node data.\n\n    Args:\n        filtered_nodes_data: A list of dictionaries, where each dictionary\n                             represents a node that has passed initial filtering.\n                             Each node dict should have at least \'pubkey\' and\n                             \'channels\': [{'peer_pubkey': str, ...}, ...].\n\n    Returns:\n        A networkx Graph object representing the connections between filtered nodes.\n        Nodes are identified by their public keys.\n    """\n    G = nx.Graph()\n    if not filtered_nodes_data:\n        return G # Return empty graph if no nodes\n\n    print(f"Building networkx graph from {len(filtered_nodes_data)} filtered nodes...")\n    start_time = time.time()\n\n    node_pubkeys = {node[\'pubkey\'] for node in filtered_nodes_data if \'pubkey\' in node}\n    G.add_nodes_from(node_pubkeys)\n\n    edges_added = 0\n    for node_data in filtered_nodes_data:\n        node_pubkey = node_data.get(\'pubkey\')\n        if not node_pubkey: continue # Skip if no pubkey\n\n        channels = node_data.get(\'channels\', [])\n        for channel in channels:\n            peer_pubkey = channel.get(\'peer_pubkey\')\n            # Add edge only if the peer is also in our filtered node set\n            # and the edge hasn\'t been added already (nx.Graph handles duplicates)\n            if peer_pubkey and peer_pubkey in node_pubkeys:\n                 # Optionally add channel capacity as weight if needed later\n                 # capacity = channel.get(\'capacity_sats\', 1) # Default weight 1 if none\n                 # G.add_edge(node_pubkey, peer_pubkey, capacity=capacity)\n                 G.add_edge(node_pubkey, peer_pubkey)\n                 edges_added += 1 # Count logical edges considered\n\n    end_time = time.time()\n    # Note: G.number_of_edges() counts unique edges (undirected)\n    print(f"Graph built in {end_time - start_time:.2f}s. Nodes: {G.number_of_nodes()}, Edges: {G.number_of_edges()}")\n    return G\n\ndef calculate_centralities(G: nx.Graph) -> dict:\n    """\n    Calculates various centrality measures for all nodes in the graph.\n\n    Args:\n        G: The networkx Graph object.\n\n    Returns:\n        A dictionary where keys are node public keys and values are another\n        dictionary containing the calculated centrality metrics:\n        {\n            \'node_pubkey\': {\n                \'degree\': float, \n                \'betweenness\': float,\n                \'closeness\': float, \n                \'eigenvector\': float\n            }, ...\n        }\n        Returns an empty dict if the graph is empty.\n    """\n    centrality_results = {}\n    if not G or G.number_of_nodes() == 0:\n        print("Cannot calculate centralities: Graph is empty.")\n        return centrality_results\n\n    print("Calculating centralities...")\n    start_time = time.time()\n\n    # 1. Degree Centrality (Normalized by N-1 where N is number of nodes)\n    # networkx.degree_centrality gives degree/(N-1)\n    print("  Calculating degree centrality...")\n    degree_centrality = nx.degree_centrality(G)\n    # Hydrus normalized by total number of *channels*. Let\'s stick to networkx default (N-1) for now,\n    # as it\'s standard. We can adapt if needed.\n\n    # 2. Betweenness Centrality\n    # k=None uses all nodes, can be slow. Consider sampling (k=...) for large graphs.\n    print("  Calculating betweenness centrality (this may take time)...")\n    # Using approximate betweenness for potentially large graphs (k=number_of_nodes * some_fraction)\n    # Set k to None for exact calculation if performance allows\n    k_betweenness = None # Set to e.g., int(G.number_of_nodes() * 0.1) for approx on large graphs\n    if k_betweenness and k_betweenness >= G.number_of_nodes():\n         k_betweenness = None # Ensure k is smaller than N if specified\n    betweenness_centrality = nx.betweenness_centrality(G, k=k_betweenness, normalized=True)\n\n    # 3. Closeness Centrality\n    # Calculates (N-1) / sum_of_distances for reachable nodes in each component.\n    # Note: For disconnected graphs, closeness is calculated per component.\n    # Nodes unreachable from a node 'u' are not considered in the average path length for 'u'.\n    print("  Calculating closeness centrality...")\n    closeness_centrality = nx.closeness_centrality(G)\n\n    # 4. Eigenvector Centrality\n    # Can fail on graphs with multiple components. max_iter increase might be needed.\n    # tol = tolerance for convergence\n    print("  Calculating eigenvector centrality...")\n    try:\n        # Increase max_iter for potentially better convergence on complex graphs\n        eigenvector_centrality = nx.eigenvector_centrality(G, max_iter=1000, tol=1.0e-6)\n    except nx.PowerIterationFailedConvergence:\n        print("  Warning: Eigenvector centrality did not converge with increased max_iter. Results might be approximate.")\n        # Attempt with default parameters as fallback\n        try:\n            eigenvector_centrality = nx.eigenvector_centrality(G, tol=1.0e-4) # Try slightly looser default tolerance\n        except Exception as e:\n             print(f"  Error: Eigenvector centrality failed definitively: {e}. Assigning 0.")\n             # Assign 0 as a fallback if it completely fails\n             eigenvector_centrality = {node: 0.0 for node in G.nodes()}\n    except Exception as e: # Catch other potential errors\n        print(f"  Error calculating Eigenvector centrality: {e}. Assigning 0.")\n        eigenvector_centrality = {node: 0.0 for node in G.nodes()}\n\n\n    end_time = time.time()\n    print(f"Centralities calculated in {end_time - start_time:.2f}s.")\n\n    # Combine results into the desired output format\n    for node in G.nodes():\n        centrality_results[node] = {\n            \'degree\': degree_centrality.get(node, 0.0),\n            \'betweenness\': betweenness_centrality.get(node, 0.0),\n            \'closeness\': closeness_centrality.get(node, 0.0),\n            \'eigenvector\': eigenvector_centrality.get(node, 0.0)\n        }\n\n    return centrality_results\n\n# Example Usage (for testing, would be called by the API handler)\nif __name__ == \'__main__\':\n    # Sample data mimicking filtered_nodes_data structure\n    sample_nodes = [\n        {\'pubkey\': \'A\', \'channels\': [{\'peer_pubkey\': \'B\'}, {\'peer_pubkey\': \'C\'}]},\n        {\'pubkey\': \'B\', \'channels\': [{\'peer_pubkey\': \'A\'}, {\'peer_pubkey\': \'C\'}, {\'peer_pubkey\': \'D\'}]},\n        {\'pubkey\': \'C\', \'channels\': [{\'peer_pubkey\': \'A\'}, {\'peer_pubkey\': \'B\'}, {\'peer_pubkey\': \'D\'}]},\n        {\'pubkey\': \'D\', \'channels\': [{\'peer_pubkey\': \'B\'}, {\'peer_pubkey\': \'C\'}, {\'peer_pubkey\': \'E\'}]},\n        {\'pubkey\': \'E\', \'channels\': [{\'peer_pubkey\': \'D\'}]},\n        {\'pubkey\': \'F\', \'channels\': []} # Isolated node\n    ]\n\n    graph = build_graph(sample_nodes)\n\n    if graph.number_of_nodes() > 0:\n        centralities = calculate_centralities(graph)\n        print("\nCalculated Centralities:")\n        for node, metrics in centralities.items():\n            print(f"  Node {node}:")\n            print(f"    Degree:      {metrics[\'degree\']:.4f}")\n            print(f"    Betweenness: {metrics[\'betweenness\']:.4f}")\n            print(f"    Closeness:   {metrics[\'closeness\']:.4f}")\n            print(f"    Eigenvector: {metrics[\'eigenvector\']:.4f}")\n\n 
\ No newline at end of file
+# mcp/graph_analysis.py
+
+import networkx as nx
+import time
+
+from src.lightning import csr_graph
+
+def build_graph(filtered_nodes_data: list) -> nx.Graph:
+    """
+    Builds a networkx graph from the pre-filtered list of node data.
+
+    Args:
+        filtered_nodes_data: A list of dictionaries, where each dictionary
+                             represents a node that has passed initial filtering.
+                             Each node dict should have at least 'pubkey' and
+                             'channels': [{'peer_pubkey': str, ...}, ...].
+
+    Returns:
+        A networkx Graph object representing the connections between filtered nodes.
+        Nodes are identified by their public keys.
+    """
+    G = nx.Graph()
+    if not filtered_nodes_data:
+        return G # Return empty graph if no nodes
+
+    print(f"Building networkx graph from {len(filtered_nodes_data)} filtered nodes...")
+    start_time = time.time()
+
+    node_pubkeys = {node['pubkey'] for node in filtered_nodes_data if 'pubkey' in node}
+    G.add_nodes_from(node_pubkeys)
+
+    edges_added = 0
+    for node_data in filtered_nodes_data:
+        node_pubkey = node_data.get('pubkey')
+        if not node_pubkey: continue # Skip if no pubkey
+
+        channels = node_data.get('channels', [])
+        for channel in channels:
+            peer_pubkey = channel.get('peer_pubkey')
+            # Add edge only if the peer is also in our filtered node set
+            # and the edge hasn't been added already (nx.Graph handles duplicates)
+            if peer_pubkey and peer_pubkey in node_pubkeys:
+                 # Optionally add channel capacity as weight if needed later
+                 # capacity = channel.get('capacity_sats', 1) # Default weight 1 if none
+                 # G.add_edge(node_pubkey, peer_pubkey, capacity=capacity)
+                 G.add_edge(node_pubkey, peer_pubkey)
+                 edges_added += 1 # Count logical edges considered
+
+    end_time = time.time()
+    # Note: G.number_of_edges() counts unique edges (undirected)
+    print(f"Graph built in {end_time - start_time:.2f}s. Nodes: {G.number_of_nodes()}, Edges: {G.number_of_edges()}")
+    return G
+
+def calculate_centralities(G: nx.Graph, k_betweenness: int = None, k_closeness: int = None) -> dict:
+    """
+    Calculates various centrality measures for all nodes in the graph.
+
+    The graph is converted once to a compact CSR representation (integer node ids,
+    SciPy sparse adjacency) and all measures run on arrays, see src.lightning.csr_graph.
+
+    Args:
+        G: The networkx Graph object.
+        k_betweenness: Number of sampled sources for approximate betweenness (None = exact).
+        k_closeness: Number of sampled sources for approximate closeness (None = exact).
+
+    Returns:
+        A dictionary where keys are node public keys and values are another
+        dictionary containing the calculated centrality metrics:
+        {
+            'node_pubkey': {
+                'degree': float, 
+                'betweenness': float,
+                'closeness': float, 
+                'eigenvector': float
+            }, ...
+        }
+        Returns an empty dict if the graph is empty.
+    """
+    centrality_results = {}
+    if not G or G.number_of_nodes() == 0:
+        print("Cannot calculate centralities: Graph is empty.")
+        return centrality_results
+
+    print("Calculating centralities...")
+    start_time = time.time()
+    csr = csr_graph.CSRGraph.from_networkx(G)
+
+    # 1. Degree Centrality (Normalized by N-1 where N is number of nodes)
+    # networkx.degree_centrality gives degree/(N-1)
+    print("  Calculating degree centrality...")
+    degree_centrality = csr_graph.degree_centrality(csr)
+    # Hydrus normalized by total number of *channels*. Let's stick to networkx default (N-1) for now,
+    # as it's standard. We can adapt if needed.
+
+    # 2. Betweenness Centrality
+    # k=None uses all nodes, can be slow. Consider sampling (k=...) for large graphs.
+    print("  Calculating betweenness centrality (this may take time)...")
+    # Using approximate betweenness for potentially large graphs (k=number_of_nodes * some_fraction)
+    # Leave k to None for exact calculation if performance allows
+    if k_betweenness and k_betweenness >= G.number_of_nodes():
+         k_betweenness = None # Ensure k is smaller than N if specified
+    betweenness_centrality = csr_graph.betweenness_centrality(csr, k=k_betweenness, normalized=True)
+
+    # 3. Closeness Centrality
+    # Calculates (N-1) / sum_of_distances for reachable nodes in each component.
+    # Note: For disconnected graphs, closeness is calculated per component.
+    # Nodes unreachable from a node 'u' are not considered in the average path length for 'u'.
+    # Exact closeness runs a bit-parallel multi-source BFS (64 sources per machine word).
+    print("  Calculating closeness centrality...")
+    closeness_centrality = csr_graph.closeness_centrality(csr, k=k_closeness)
+
+    # 4. Eigenvector Centrality
+    # Can fail on graphs with multiple components. max_iter increase might be needed.
+    # tol = tolerance for convergence
+    print("  Calculating eigenvector centrality...")
+    try:
+        # Increase max_iter for potentially better convergence on complex graphs
+        eigenvector_centrality = csr_graph.eigenvector_centrality(csr, max_iter=1000, tol=1.0e-6)
+    except nx.PowerIterationFailedConvergence:
+        print("  Warning: Eigenvector centrality did not converge with increased max_iter. Results might be approximate.")
+        # Attempt with default parameters as fallback
+        try:
+            eigenvector_centrality = csr_graph.eigenvector_centrality(csr, tol=1.0e-4) # Try slightly looser default tolerance
+        except Exception as e:
+             print(f"  Error: Eigenvector centrality failed definitively: {e}. Assigning 0.")
+             # Assign 0 as a fallback if it completely fails
+             eigenvector_centrality = {node: 0.0 for node in G.nodes()}
+    except Exception as e: # Catch other potential errors
+        print(f"  Error calculating Eigenvector centrality: {e}. Assigning 0.")
+        eigenvector_centrality = {node: 0.0 for node in G.nodes()}
+
+
+    end_time = time.time()
+    print(f"Centralities calculated in {end_time - start_time:.2f}s.")
+
+    # Combine results into the desired output format
+    for node in G.nodes():
+        centrality_results[node] = {
+            'degree': degree_centrality.get(node, 0.0),
+            'betweenness': betweenness_centrality.get(node, 0.0),
+            'closeness': closeness_centrality.get(node, 0.0),
+            'eigenvector': eigenvector_centrality.get(node, 0.0)
+        }
+
+    return centrality_results
+
+# Example Usage (for testing, would be called by the API handler)
+if __name__ == '__main__':
+    # Sample data mimicking filtered_nodes_data structure
+    sample_nodes = [
+        {'pubkey': 'A', 'channels': [{'peer_pubkey': 'B'}, {'peer_pubkey': 'C'}]},
+        {'pubkey': 'B', 'channels': [{'peer_pubkey': 'A'}, {'peer_pubkey': 'C'}, {'peer_pubkey': 'D'}]},
+        {'pubkey': 'C', 'channels': [{'peer_pubkey': 'A'}, {'peer_pubkey': 'B'}, {'peer_pubkey': 'D'}]},
+        {'pubkey': 'D', 'channels': [{'peer_pubkey': 'B'}, {'peer_pubkey': 'C'}, {'peer_pubkey': 'E'}]},
+        {'pubkey': 'E', 'channels': [{'peer_pubkey': 'D'}]},
+        {'pubkey': 'F', 'channels': []} # Isolated node
+    ]
+
+    graph = build_graph(sample_nodes)
+
+    if graph.number_of_nodes() > 0:
+        centralities = calculate_centralities(graph)
+        print("\nCalculated Centralities:")
+        for node, metrics in centralities.items():
+            print(f"  Node {node}:")
+            print(f"    Degree:      {metrics['degree']:.4f}")
+            print(f"    Betweenness: {metrics['betweenness']:.4f}")
+            print(f"    Closeness:   {metrics['closeness']:.4f}")
+            print(f"    Eigenvector: {metrics['eigenvector']:.4f}")
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 class Heuristic:
     """
     Represents a single weighted heuristic used for scoring nodes or channels.
@@ -147,6 +149,52 @@ class Heuristic:
         # 4. Apply weight
         return final_score_before_weight * self.weight
 
+    def update_many(self, values: np.ndarray):
+        """
+        Updates the observed range with an array of values (same result as calling
+        update on each value).
+
+        Args:
+            values: float64 array; NaN marks missing or non-numeric values.
+        """
+        if self.weight == 0:
+            return
+
+        finite = values[np.isfinite(values)]
+        if finite.size == 0:
+            return
+        self.highest = max(self.highest, float(finite.max()))
+        self.lowest = min(self.lowest, float(finite.min()))
+
+    def get_scores(self, values: np.ndarray) -> np.ndarray:
+        """
+        Vectorized get_score: same scores, element by element.
+
+        Args:
+            values: float64 array; NaN marks missing or non-numeric values.
+
+        Returns:
+            float64 array of weighted scores.
+        """
+        scores = np.zeros(values.shape, dtype=np.float64)
+        if self.weight == 0:
+            return scores
+        if self.highest == float('-inf') or self.lowest == float('inf'):
+            return scores
+
+        valid = np.isfinite(values)
+        if self.highest == self.lowest:
+            if not (self.lowest == 0 and not self.lower_is_better):
+                scores[valid & (values == self.lowest)] = 1.0 * self.weight
+            return scores
+
+        clamped = np.clip(values[valid], self.lowest, self.highest)
+        score_normalized = (clamped - self.lowest) / (self.highest - self.lowest)
+        if self.lower_is_better:
+            score_normalized = 1.0 - score_normalized
+        scores[valid] = score_normalized * self.weight
+        return scores
+
     def __repr__(self):
         """Provides a developer-friendly representation of the heuristic."""
         direction = "lower_is_better" if self.lower_is_better else "higher_is_better"
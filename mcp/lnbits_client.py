@@ -1,5 +1,5 @@
 import httpx
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Set, BinaryIO
 
 class LNBitsClientError(Exception):
     """Custom exception for LNBits client errors."""
@@ -114,6 +114,43 @@ class LNBitsClient:
         # Return empty lists or mock data for testing if needed
         # return [], []
 
+    async def download_graph_data(self, destination: BinaryIO, path: str = "/lngraph/api/v1/graph") -> int:
+        """
+        Streams the raw graph JSON (DescribeGraph format) into a binary file, chunk by chunk,
+        without holding the response in memory. Parse it with mcp.preprocessing.stream_graph.
+
+        *** The endpoint is hypothetical, see get_graph_data. ***
+
+        Args:
+            destination: Writable, seekable binary file object (e.g. tempfile.TemporaryFile()),
+                         rewound to its start on return.
+            path: Graph endpoint path.
+
+        Returns:
+            The number of bytes written.
+        """
+        print("--- LNBitsClient: Downloading graph data ---")
+        size = 0
+        try:
+            async with self.client.stream("GET", path) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    destination.write(chunk)
+                    size += len(chunk)
+        except httpx.TimeoutException as e:
+            print(f"Error: Timeout connecting to LNBits at {self.endpoint}{path}")
+            raise LNBitsClientError(f"Timeout: {e}") from e
+        except httpx.RequestError as e:
+            print(f"Error: Could not connect to LNBits at {self.endpoint}{path}: {e}")
+            raise LNBitsClientError(f"Connection Error: {e}") from e
+        except httpx.HTTPStatusError as e:
+            # Body not read on streamed responses
+            print(f"Error: LNBits API request failed ({e.response.status_code})")
+            raise LNBitsClientError(f"LNBits API Error ({e.response.status_code})") from e
+        destination.flush()
+        destination.seek(0)
+        return size
+
     async def get_local_node_info(self) -> Dict[str, Any]:
         """
         Fetches available information about the local node managed by LNBits.
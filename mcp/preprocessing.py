@@ -1 +1,486 @@
-# mcp/preprocessing.py\n\nimport statistics\nfrom collections import defaultdict\nimport time\n\n# --- Configuration Constants (adapt based on desired strictness) ---\n# Fees are often in msat/ppm, check LNBits data format\nMAX_CHANNEL_FEE_RATE_PPM = 20000 # Max allowed fee rate in ppm (Hydrus: 20k)\nMAX_CHANNEL_BASE_FEE_MSAT = 100000 # Max allowed base fee in msat (Hydrus: 100k)\n\ndef get_channel_age_blocks(channel_id: int) -> int:\n    """\n    Estimates the block height (age proxy) from the channel ID.\n    Assumes standard channel ID format (block_height:tx_index:output_index).\n\n    Args:\n        channel_id: The numeric channel ID (uint64).\n\n    Returns:\n        The estimated block height (int), or 0 if ID is invalid.\n    """\n    if not isinstance(channel_id, int) or channel_id <= 0:\n        return 0\n    # Extract the first 3 bytes (24 bits) for block height\n    block_height = channel_id >> 40\n    return block_height\n\ndef filter_channels(raw_edges_data: list) -> tuple[dict[str, list], int, int]:\n    """\n    Filters raw channel/edge data based on policies and validity.\n    Regroups valid channels by the public key of the node they belong to.\n\n    Args:\n        raw_edges_data: A list of dictionaries, each representing a channel edge\n                        from the graph source (e.g., LNBits). Expected keys per edge:\n                        \'channel_id\': int, \'chan_point\': str, \'capacity\': int (sats),\n                        \'node1_pub\': str, \'node2_pub\': str,\n                        \'node1_policy\': dict or None (with \'disabled\', \'fee_base_msat\', \'fee_rate_milli_msat\'),\n                        \'node2_policy\': dict or None (similar structure).\n\n    Returns:\n        A tuple containing:\n        - channels_by_node (dict[str, list]): A dictionary where keys are node pubkeys\n          and values are lists of processed channel dictionaries belonging to that node.\n          Channel dict structure: {\'channel_id\': int, \'chan_point\': str, \'peer_pubkey\': str,\n                                   \'capacity_sats\': int, \'age_blocks\': int, \'base_fee_msat\': int,\n                                   \'fee_rate_ppm\': int, \'min_htlc_msat\': int, \'max_htlc_msat\': int}\n        - total_valid_capacity (int): Sum of capacities of all valid, non-discarded channels.\n        - skipped_edges_count (int): Number of raw edges skipped due to missing policies or being discarded.\n    """\n    print(f"Filtering {len(raw_edges_data)} raw channel edges...")\n    start_time = time.time()\n    channels_by_node = defaultdict(list)\n    total_valid_capacity = 0\n    skipped_edges_count = 0\n    valid_edges_count = 0\n\n    for edge in raw_edges_data:\n        # Basic check for essential data\n        if not all(k in edge for k in [\'channel_id\', \'node1_pub\', \'node2_pub\', \'capacity\']):\n             skipped_edges_count += 1\n             continue\n\n        node1_policy = edge.get(\'node1_policy\')\n        node2_policy = edge.get(\'node2_policy\')\n        channel_id = edge[\'channel_id\']\n        capacity_sats = int(edge.get(\'capacity\', 0))\n        chan_point = edge.get(\'chan_point\', \'\')\n\n        # Skip channels where *both* policies are missing (incomplete propagation)\n        if node1_policy is None and node2_policy is None:\n            skipped_edges_count += 1\n            continue\n\n        # Estimate channel age\n        age_blocks = get_channel_age_blocks(channel_id)\n\n        # Check Node 1\'s perspective (policy for routing *from* Node 1)\n        policy1_discarded = False\n        if node1_policy:\n            if node1_policy.get(\'disabled\', False) or \\n               node1_policy.get(\'fee_rate_milli_msat\', 0) > MAX_CHANNEL_FEE_RATE_PPM or \\n               node1_policy.get(\'fee_base_msat\', 0) > MAX_CHANNEL_BASE_FEE_MSAT:\n                policy1_discarded = True\n        else:\n             policy1_discarded = True # Treat missing policy as unusable/discarded\n\n        if not policy1_discarded:\n            processed_channel = {\n                \'channel_id\': channel_id,\n                \'chan_point\': chan_point,\n                \'peer_pubkey\': edge[\'node2_pub\'],\n                \'capacity_sats\': capacity_sats,\n                \'age_blocks\': age_blocks,\n                \'base_fee_msat\': node1_policy.get(\'fee_base_msat\', 0),\n                \'fee_rate_ppm\': node1_policy.get(\'fee_rate_milli_msat\', 0), # Note: milli_msat is ppm\n                \'min_htlc_msat\': node1_policy.get(\'min_htlc\', 0), # Assuming key \'min_htlc\' from LND RPC structure\n                \'max_htlc_msat\': node1_policy.get(\'max_htlc_msat\', 0)\n                # Add inbound fees if available and needed\n            }\n            channels_by_node[edge[\'node1_pub\']].append(processed_channel)\n\n\n        # Check Node 2\'s perspective (policy for routing *from* Node 2)\n        policy2_discarded = False\n        if node2_policy:\n             if node2_policy.get(\'disabled\', False) or \\n                node2_policy.get(\'fee_rate_milli_msat\', 0) > MAX_CHANNEL_FEE_RATE_PPM or \\n                node2_policy.get(\'fee_base_msat\', 0) > MAX_CHANNEL_BASE_FEE_MSAT:\n                 policy2_discarded = True\n        else:\n              policy2_discarded = True # Treat missing policy as unusable/discarded\n\n        if not policy2_discarded:\n             processed_channel = {\n                 \'channel_id\': channel_id,\n                 \'chan_point\': chan_point,\n                 \'peer_pubkey\': edge[\'node1_pub\'],\n                 \'capacity_sats\': capacity_sats,\n                 \'age_blocks\': age_blocks,\n                 \'base_fee_msat\': node2_policy.get(\'fee_base_msat\', 0),\n                 \'fee_rate_ppm\': node2_policy.get(\'fee_rate_milli_msat\', 0),\n                 \'min_htlc_msat\': node2_policy.get(\'min_htlc\', 0),\n                 \'max_htlc_msat\': node2_policy.get(\'max_htlc_msat\', 0)\n                 # Add inbound fees if available and needed\n             }\n             channels_by_node[edge[\'node2_pub\']].append(processed_channel)\n\n        # If at least one policy was valid, count capacity and valid edge\n        if not policy1_discarded or not policy2_discarded:\n             total_valid_capacity += capacity_sats\n             valid_edges_count += 1\n        else:\n             # Both policies were invalid/discarded\n             skipped_edges_count += 1\n\n    end_time = time.time()\n    print(f"Channel filtering finished in {end_time - start_time:.2f}s.")\n    print(f"  Total valid edges considered: {valid_edges_count}")\n    print(f"  Total capacity from valid edges: {total_valid_capacity} sats")\n    print(f"  Edges skipped (incomplete/discarded policies): {skipped_edges_count}")\n\n    # Sanity check like in hydrus\n    if len(raw_edges_data) > 0 and skipped_edges_count > len(raw_edges_data) / 2:\n         print(f"Warning: More than half ({skipped_edges_count}/{len(raw_edges_data)}) of raw edges were skipped. Graph data might be incomplete.")\n         # raise ValueError("Graph data too incomplete to proceed reliably.") # Optional: raise error\n\n    return dict(channels_by_node), total_valid_capacity, valid_edges_count\n\n\ndef pre_filter_nodes(raw_nodes_data: list, channels_by_node: dict[str, list], total_valid_capacity: int, total_valid_edges: int) -> list:\n    """\n    Performs initial filtering on the list of raw node data based on basic criteria.\n\n    Args:\n        raw_nodes_data: List of dictionaries, each representing a node from the source.\n                        Expected keys: \'pub_key\', \'alias\', \'addresses\': list[str], \'features\': dict.\n        channels_by_node: Dictionary mapping node pubkeys to their list of *valid* channels\n                          (output from filter_channels).\n        total_valid_capacity: Total capacity sum from valid channels.\n        total_valid_edges: Total count of valid, non-discarded channel edges.\n\n    Returns:\n        A list of node dictionaries that passed the pre-filtering. Each dictionary\n        is enriched with \'channels\' (list of valid channels), \'capacity_sats\', and\n        \'features_count\'.\n    """\n    if not raw_nodes_data:\n        return []\n\n    print(f"Pre-filtering {len(raw_nodes_data)} raw nodes...")\n    start_time = time.time()\n    filtered_nodes = []\n    num_initial_nodes = len(raw_nodes_data)\n    skipped_no_address = 0\n    skipped_low_capacity = 0\n    skipped_low_channels = 0\n\n    # Calculate averages (avoid division by zero)\n    avg_node_capacity = (total_valid_capacity / num_initial_nodes) if num_initial_nodes > 0 else 0\n    # Average channels per node *perspective* (edge has two perspectives)\n    avg_node_channels = (total_valid_edges * 2 / num_initial_nodes) if num_initial_nodes > 0 else 0\n    print(f"  Average Node Capacity (approx): {avg_node_capacity:.0f} sats")\n    print(f"  Average Node Channels (approx): {avg_node_channels:.1f}")\n\n    processed_nodes = 0\n    for node in raw_nodes_data:\n        processed_nodes += 1\n        if processed_nodes % 5000 == 0: # Print progress less often for nodes\n             print(f"  Processed {processed_nodes}/{num_initial_nodes} nodes...")\n\n        pubkey = node.get(\'pub_key\') # Assuming \'pub_key\' from LND RPC structure\n        if not pubkey: continue # Skip nodes without pubkey\n\n        addresses = node.get(\'addresses\', [])\n        node_valid_channels = channels_by_node.get(pubkey, [])\n        num_valid_channels = len(node_valid_channels)\n\n        # 1. Filter: No addresses\n        # Check if addresses list is present and contains at least one non-empty string\n        if not addresses or not any(addr for addr in addresses if isinstance(addr, str)):\n            skipped_no_address += 1\n            continue\n\n        # Calculate node\'s total capacity from its valid channels\n        node_capacity_sats = sum(c.get(\'capacity_sats\', 0) for c in node_valid_channels)\n\n        # 2. Filter: Capacity below average\n        if node_capacity_sats < avg_node_capacity:\n            skipped_low_capacity += 1\n            continue\n\n        # 3. Filter: Number of valid channels below average\n        if num_valid_channels < avg_node_channels:\n            skipped_low_channels += 1\n            continue\n\n        # --- Node passed pre-filtering ---\n\n        # Extract features count (simple count like hydrus)\n        features_map = node.get(\'features\', {})\n        features_count = 0\n        if isinstance(features_map, dict): # Ensure features is a dict\n             features_count = sum(1 for f in features_map.values() if isinstance(f, dict) and f.get(\'is_known\', False))\n\n        # Enrich node data for next steps\n        processed_node_data = {\n            \'pubkey\': pubkey,\n            \'alias\': node.get(\'alias\', \'\'),\n            \'addresses\': addresses,\n            \'features_count\': features_count,\n            \'capacity_sats\': node_capacity_sats, # Total capacity from *valid* channels\n            \'channels\': node_valid_channels # List of *valid* channels from this node\'s perspective\n            # Centrality will be added later\n        }\n        filtered_nodes.append(processed_node_data)\n\n    end_time = time.time()\n    print(f"Node pre-filtering finished in {end_time - start_time:.2f}s.")\n    print(f"  Nodes remaining after pre-filtering: {len(filtered_nodes)}/{num_initial_nodes}")\n    print(f"  Skipped (no address): {skipped_no_address}")\n    print(f"  Skipped (low capacity): {skipped_low_capacity}")\n    print(f"  Skipped (low channels): {skipped_low_channels}")\n\n    return filtered_nodes 
\ No newline at end of file
+# mcp/preprocessing.py
+
+import json
+import logging
+from array import array
+from collections import defaultdict
+from collections.abc import Mapping
+import time
+from typing import BinaryIO, Iterator
+
+import numpy as np
+
+try:
+    import ijson # Optional: incremental JSON parsing for stream_graph
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration Constants (adapt based on desired strictness) ---
+# Fees are often in msat/ppm, check LNBits data format
+MAX_CHANNEL_FEE_RATE_PPM = 20000 # Max allowed fee rate in ppm (Hydrus: 20k)
+MAX_CHANNEL_BASE_FEE_MSAT = 100000 # Max allowed base fee in msat (Hydrus: 100k)
+
+def get_channel_age_blocks(channel_id: int) -> int:
+    """
+    Estimates the block height (age proxy) from the channel ID.
+    Assumes standard channel ID format (block_height:tx_index:output_index).
+
+    Args:
+        channel_id: The numeric channel ID (uint64).
+
+    Returns:
+        The estimated block height (int), or 0 if ID is invalid.
+    """
+    if not isinstance(channel_id, int) or channel_id <= 0:
+        return 0
+    # Extract the first 3 bytes (24 bits) for block height
+    block_height = channel_id >> 40
+    return block_height
+
+def _edge_channels(edge: dict) -> list[tuple[str, dict]]:
+    """
+    Applies the filter_channels checks to a single raw edge.
+
+    Args:
+        edge: A raw channel edge (see filter_channels for the expected keys).
+
+    Returns:
+        A list of (node pubkey, processed channel dict) for each usable direction
+        of the edge; empty if the edge is skipped (incomplete or both policies discarded).
+    """
+    edge_channels = []
+    # Basic check for essential data
+    if not all(k in edge for k in ['channel_id', 'node1_pub', 'node2_pub', 'capacity']):
+         return edge_channels
+
+    node1_policy = edge.get('node1_policy')
+    node2_policy = edge.get('node2_policy')
+    channel_id = edge['channel_id']
+    capacity_sats = int(edge.get('capacity', 0))
+    chan_point = edge.get('chan_point', '')
+
+    # Skip channels where *both* policies are missing (incomplete propagation)
+    if node1_policy is None and node2_policy is None:
+        return edge_channels
+
+    # Estimate channel age
+    age_blocks = get_channel_age_blocks(channel_id)
+
+    # Check each node's perspective (policy for routing *from* that node)
+    for node_pub, peer_pub, policy in ((edge['node1_pub'], edge['node2_pub'], node1_policy),
+                                       (edge['node2_pub'], edge['node1_pub'], node2_policy)):
+        if not policy:
+            continue # Treat missing policy as unusable/discarded
+        if policy.get('disabled', False) or \
+           policy.get('fee_rate_milli_msat', 0) > MAX_CHANNEL_FEE_RATE_PPM or \
+           policy.get('fee_base_msat', 0) > MAX_CHANNEL_BASE_FEE_MSAT:
+            continue
+
+        processed_channel = {
+            'channel_id': channel_id,
+            'chan_point': chan_point,
+            'peer_pubkey': peer_pub,
+            'capacity_sats': capacity_sats,
+            'age_blocks': age_blocks,
+            'base_fee_msat': policy.get('fee_base_msat', 0),
+            'fee_rate_ppm': policy.get('fee_rate_milli_msat', 0), # Note: milli_msat is ppm
+            'min_htlc_msat': policy.get('min_htlc', 0), # Assuming key 'min_htlc' from LND RPC structure
+            'max_htlc_msat': policy.get('max_htlc_msat', 0)
+            # Add inbound fees if available and needed
+        }
+        edge_channels.append((node_pub, processed_channel))
+    return edge_channels
+
+def filter_channels(raw_edges_data: list) -> tuple[dict[str, list], int, int]:
+    """
+    Filters raw channel/edge data based on policies and validity.
+    Regroups valid channels by the public key of the node they belong to.
+
+    Args:
+        raw_edges_data: A list of dictionaries, each representing a channel edge
+                        from the graph source (e.g., LNBits). Expected keys per edge:
+                        'channel_id': int, 'chan_point': str, 'capacity': int (sats),
+                        'node1_pub': str, 'node2_pub': str,
+                        'node1_policy': dict or None (with 'disabled', 'fee_base_msat', 'fee_rate_milli_msat'),
+                        'node2_policy': dict or None (similar structure).
+
+    Returns:
+        A tuple containing:
+        - channels_by_node (dict[str, list]): A dictionary where keys are node pubkeys
+          and values are lists of processed channel dictionaries belonging to that node.
+          Channel dict structure: {'channel_id': int, 'chan_point': str, 'peer_pubkey': str,
+                                   'capacity_sats': int, 'age_blocks': int, 'base_fee_msat': int,
+                                   'fee_rate_ppm': int, 'min_htlc_msat': int, 'max_htlc_msat': int}
+        - total_valid_capacity (int): Sum of capacities of all valid, non-discarded channels.
+        - skipped_edges_count (int): Number of raw edges skipped due to missing policies or being discarded.
+    """
+    print(f"Filtering {len(raw_edges_data)} raw channel edges...")
+    start_time = time.time()
+    channels_by_node = defaultdict(list)
+    total_valid_capacity = 0
+    skipped_edges_count = 0
+    valid_edges_count = 0
+
+    for edge in raw_edges_data:
+        edge_channels = _edge_channels(edge)
+        if not edge_channels:
+            # Incomplete edge or both policies invalid/discarded
+            skipped_edges_count += 1
+            continue
+
+        for node_pubkey, processed_channel in edge_channels:
+            channels_by_node[node_pubkey].append(processed_channel)
+        # At least one policy was valid, count capacity and valid edge
+        total_valid_capacity += edge_channels[0][1]['capacity_sats']
+        valid_edges_count += 1
+
+    end_time = time.time()
+    print(f"Channel filtering finished in {end_time - start_time:.2f}s.")
+    print(f"  Total valid edges considered: {valid_edges_count}")
+    print(f"  Total capacity from valid edges: {total_valid_capacity} sats")
+    print(f"  Edges skipped (incomplete/discarded policies): {skipped_edges_count}")
+
+    # Sanity check like in hydrus
+    if len(raw_edges_data) > 0 and skipped_edges_count > len(raw_edges_data) / 2:
+         print(f"Warning: More than half ({skipped_edges_count}/{len(raw_edges_data)}) of raw edges were skipped. Graph data might be incomplete.")
+         # raise ValueError("Graph data too incomplete to proceed reliably.") # Optional: raise error
+
+    return dict(channels_by_node), total_valid_capacity, valid_edges_count
+
+
+class ChannelTable(Mapping):
+    """
+    Valid channels (one row per node perspective, like filter_channels) stored in
+    compact columns instead of one dict per channel.
+
+    Behaves as the channels_by_node mapping expected by pre_filter_nodes: the channel
+    dicts of a node are only built when the node is looked up.
+    """
+    _INT_FIELDS = ('channel_id', 'capacity_sats', 'age_blocks', 'base_fee_msat',
+                   'fee_rate_ppm', 'min_htlc_msat', 'max_htlc_msat')
+
+    def __init__(self):
+        self._node_index = {} # pubkey -> node number
+        self._pubkeys = []
+        self._owners = array('q')
+        self._peers = array('q')
+        self._chan_points = []
+        # int64 columns, turned into plain lists if a value does not fit
+        self._columns = {field: array('q') for field in self._INT_FIELDS}
+        self._rows = None # (rows sorted by owner, offsets per node), built on lookup
+
+    def _node(self, pubkey: str) -> int:
+        node = self._node_index.get(pubkey)
+        if node is None:
+            node = self._node_index[pubkey] = len(self._pubkeys)
+            self._pubkeys.append(pubkey)
+        return node
+
+    def append(self, node_pubkey: str, channel: dict):
+        """ Adds a processed channel (see _edge_channels) belonging to node_pubkey. """
+        self._owners.append(self._node(node_pubkey))
+        self._peers.append(self._node(channel['peer_pubkey']))
+        self._chan_points.append(channel['chan_point'])
+        for field, column in self._columns.items():
+            value = channel[field]
+            try:
+                column.append(value)
+            except (TypeError, OverflowError):
+                column = self._columns[field] = list(column)
+                column.append(value)
+        self._rows = None
+
+    def _grouped_rows(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._rows is None:
+            owners = np.array(self._owners, dtype=np.int64)
+            offsets = np.zeros(len(self._pubkeys) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(owners, minlength=len(self._pubkeys)), out=offsets[1:])
+            # Stable sort keeps the channels of a node in insertion order
+            self._rows = (np.argsort(owners, kind='stable'), offsets)
+        return self._rows
+
+    def __getitem__(self, pubkey: str) -> list:
+        node = self._node_index.get(pubkey)
+        if node is None:
+            raise KeyError(pubkey)
+        rows, offsets = self._grouped_rows()
+        if offsets[node] == offsets[node + 1]:
+            raise KeyError(pubkey) # Only seen as a peer
+        columns = self._columns
+        return [
+            {
+                'channel_id': columns['channel_id'][row],
+                'chan_point': self._chan_points[row],
+                'peer_pubkey': self._pubkeys[self._peers[row]],
+                'capacity_sats': columns['capacity_sats'][row],
+                'age_blocks': columns['age_blocks'][row],
+                'base_fee_msat': columns['base_fee_msat'][row],
+                'fee_rate_ppm': columns['fee_rate_ppm'][row],
+                'min_htlc_msat': columns['min_htlc_msat'][row],
+                'max_htlc_msat': columns['max_htlc_msat'][row],
+            }
+            for row in rows[offsets[node]:offsets[node + 1]].tolist()
+        ]
+
+    def __iter__(self) -> Iterator[str]:
+        _, offsets = self._grouped_rows()
+        for node in np.flatnonzero(np.diff(offsets)).tolist():
+            yield self._pubkeys[node]
+
+    def __len__(self) -> int:
+        _, offsets = self._grouped_rows()
+        return int(np.count_nonzero(np.diff(offsets)))
+
+
+def iter_graph_items(graph_source: BinaryIO) -> Iterator[tuple[str, dict]]:
+    """
+    Reads a DescribeGraph-like JSON document ({"nodes": [...], "edges": [...]}) and
+    yields its items one at a time.
+
+    Parsing is incremental when ijson is installed (only one item is in memory at a
+    time); otherwise the whole document is loaded with json. Nodes come first, unless
+    the source cannot be rewound: items are then yielded in document order.
+
+    Args:
+        graph_source: Binary file object with the JSON document.
+
+    Yields:
+        ('nodes', node_dict) and ('edges', edge_dict) tuples.
+    """
+    if ijson is None:
+        logger.warning("ijson is not installed, loading the whole graph document in memory")
+        graph = json.load(graph_source)
+        for section in ('nodes', 'edges'):
+            for item in graph.get(section) or []:
+                yield section, item
+        return
+
+    if graph_source.seekable():
+        # One pass per section: items are built by ijson itself (C backend), much faster
+        start = graph_source.tell()
+        for section in ('nodes', 'edges'):
+            graph_source.seek(start)
+            for item in ijson.items(graph_source, f'{section}.item', use_float=True):
+                yield section, item
+        return
+
+    builder = None
+    section = None
+    for prefix, event, value in ijson.parse(graph_source, use_float=True):
+        if builder is None:
+            if event == 'start_map' and prefix in ('nodes.item', 'edges.item'):
+                section = prefix[:-len('.item')]
+                builder = ijson.common.ObjectBuilder()
+                builder.event(event, value)
+            continue
+        builder.event(event, value)
+        if event == 'end_map' and prefix == f'{section}.item':
+            yield section, builder.value
+            builder = None
+
+
+def _count_known_features(features_map) -> int:
+    """ Simple count of the known features of a node (like hydrus). """
+    if not isinstance(features_map, dict): # Ensure features is a dict
+        return 0
+    return sum(1 for f in features_map.values() if isinstance(f, dict) and f.get('is_known', False))
+
+
+def _compact_node(node: dict) -> dict:
+    """ Keeps only the node keys used by pre_filter_nodes (features reduced to their count). """
+    return {
+        'pub_key': node.get('pub_key'),
+        'alias': node.get('alias', ''),
+        'addresses': node.get('addresses', []),
+        'features_count': _count_known_features(node.get('features', {})),
+    }
+
+
+def stream_graph(graph_source: BinaryIO) -> tuple[list, ChannelTable, int, int]:
+    """
+    Streaming equivalent of filter_channels: edges are filtered as they are parsed
+    and valid channels go into a ChannelTable, so the raw edge list is never held
+    in memory. Nodes are kept in a compact form.
+
+    Args:
+        graph_source: Binary file object with the graph JSON (see iter_graph_items),
+                      e.g. filled by LNBitsClient.download_graph_data.
+
+    Returns:
+        A tuple (raw_nodes_data, channels_by_node, total_valid_capacity, valid_edges_count)
+        to pass to pre_filter_nodes.
+    """
+    print("Streaming graph data...")
+    start_time = time.time()
+    raw_nodes_data = []
+    channels_by_node = ChannelTable()
+    total_valid_capacity = 0
+    skipped_edges_count = 0
+    valid_edges_count = 0
+
+    for section, item in iter_graph_items(graph_source):
+        if section == 'nodes':
+            raw_nodes_data.append(_compact_node(item))
+            continue
+
+        edge_channels = _edge_channels(item)
+        if not edge_channels:
+            skipped_edges_count += 1
+            continue
+        for node_pubkey, processed_channel in edge_channels:
+            channels_by_node.append(node_pubkey, processed_channel)
+        total_valid_capacity += edge_channels[0][1]['capacity_sats']
+        valid_edges_count += 1
+
+    total_edges = valid_edges_count + skipped_edges_count
+    print(f"Graph streaming finished in {time.time() - start_time:.2f}s.")
+    print(f"  Nodes read: {len(raw_nodes_data)}")
+    print(f"  Total valid edges considered: {valid_edges_count}")
+    print(f"  Total capacity from valid edges: {total_valid_capacity} sats")
+    print(f"  Edges skipped (incomplete/discarded policies): {skipped_edges_count}")
+    if total_edges > 0 and skipped_edges_count > total_edges / 2:
+         print(f"Warning: More than half ({skipped_edges_count}/{total_edges}) of raw edges were skipped. Graph data might be incomplete.")
+
+    return raw_nodes_data, channels_by_node, total_valid_capacity, valid_edges_count
+
+
+# Channel metrics exported as columns (keys of the channel dicts built by filter_channels)
+CHANNEL_METRICS = ('capacity_sats', 'age_blocks', 'base_fee_msat', 'fee_rate_ppm',
+                   'min_htlc_msat', 'max_htlc_msat')
+
+def channel_columns(channel_lists: list, metrics: tuple = CHANNEL_METRICS) -> dict:
+    """
+    Flattens per-node channel lists (as produced by filter_channels) into NumPy columns.
+
+    Args:
+        channel_lists: One list of processed channel dicts per node.
+        metrics: Channel keys to extract (default: CHANNEL_METRICS).
+
+    Returns:
+        A dictionary with:
+        - 'offsets': int64 array of size len(channel_lists) + 1; the channels of node i
+          are the rows offsets[i]:offsets[i + 1].
+        - one array per metric: int64 when every value is an int,
+          object (original values) otherwise; missing values are stored as 0.
+        - '<metric>_present': bool array, False where the channel has no value (None).
+    """
+    counts = np.fromiter((len(channels) for channels in channel_lists), dtype=np.int64,
+                         count=len(channel_lists))
+    offsets = np.zeros(len(channel_lists) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    flat = [channel for channels in channel_lists for channel in channels]
+    columns = {'offsets': offsets}
+    for metric in metrics:
+        raw = np.empty(len(flat), dtype=object)
+        raw[:] = [channel.get(metric) for channel in flat]
+        present = raw != None  # noqa: E711 (element-wise on object arrays)
+        raw[~present] = 0
+        column = np.array(raw.tolist()) if raw.size else np.zeros(0, dtype=np.int64)
+        if column.dtype.kind in 'ib':
+            column = column.astype(np.int64, copy=False)
+        else:
+            # Not only int64 values: keep the originals (exact means computed per node)
+            column = raw
+        columns[metric] = column
+        columns[f'{metric}_present'] = present
+    return columns
+
+
+def pre_filter_nodes(raw_nodes_data: list, channels_by_node: Mapping[str, list], total_valid_capacity: int, total_valid_edges: int) -> list:
+    """
+    Performs initial filtering on the list of raw node data based on basic criteria.
+
+    Args:
+        raw_nodes_data: List of dictionaries, each representing a node from the source.
+                        Expected keys: 'pub_key', 'alias', 'addresses': list[str], 'features': dict
+                        (or 'features_count': int, as in stream_graph output).
+        channels_by_node: Dictionary mapping node pubkeys to their list of *valid* channels
+                          (output from filter_channels, or the ChannelTable from stream_graph).
+        total_valid_capacity: Total capacity sum from valid channels.
+        total_valid_edges: Total count of valid, non-discarded channel edges.
+
+    Returns:
+        A list of node dictionaries that passed the pre-filtering. Each dictionary
+        is enriched with 'channels' (list of valid channels), 'capacity_sats', and
+        'features_count'.
+    """
+    if not raw_nodes_data:
+        return []
+
+    print(f"Pre-filtering {len(raw_nodes_data)} raw nodes...")
+    start_time = time.time()
+    filtered_nodes = []
+    num_initial_nodes = len(raw_nodes_data)
+    skipped_no_address = 0
+    skipped_low_capacity = 0
+    skipped_low_channels = 0
+
+    # Calculate averages (avoid division by zero)
+    avg_node_capacity = (total_valid_capacity / num_initial_nodes) if num_initial_nodes > 0 else 0
+    # Average channels per node *perspective* (edge has two perspectives)
+    avg_node_channels = (total_valid_edges * 2 / num_initial_nodes) if num_initial_nodes > 0 else 0
+    print(f"  Average Node Capacity (approx): {avg_node_capacity:.0f} sats")
+    print(f"  Average Node Channels (approx): {avg_node_channels:.1f}")
+
+    processed_nodes = 0
+    for node in raw_nodes_data:
+        processed_nodes += 1
+        if processed_nodes % 5000 == 0: # Print progress less often for nodes
+             print(f"  Processed {processed_nodes}/{num_initial_nodes} nodes...")
+
+        pubkey = node.get('pub_key') # Assuming 'pub_key' from LND RPC structure
+        if not pubkey: continue # Skip nodes without pubkey
+
+        addresses = node.get('addresses', [])
+        node_valid_channels = channels_by_node.get(pubkey, [])
+        num_valid_channels = len(node_valid_channels)
+
+        # 1. Filter: No addresses
+        # Check if addresses list is present and contains at least one non-empty string
+        if not addresses or not any(addr for addr in addresses if isinstance(addr, str)):
+            skipped_no_address += 1
+            continue
+
+        # Calculate node's total capacity from its valid channels
+        node_capacity_sats = sum(c.get('capacity_sats', 0) for c in node_valid_channels)
+
+        # 2. Filter: Capacity below average
+        if node_capacity_sats < avg_node_capacity:
+            skipped_low_capacity += 1
+            continue
+
+        # 3. Filter: Number of valid channels below average
+        if num_valid_channels < avg_node_channels:
+            skipped_low_channels += 1
+            continue
+
+        # --- Node passed pre-filtering ---
+
+        # Extract features count (simple count like hydrus), unless already counted
+        features_count = node.get('features_count')
+        if features_count is None:
+             features_count = _count_known_features(node.get('features', {}))
+
+        # Enrich node data for next steps
+        processed_node_data = {
+            'pubkey': pubkey,
+            'alias': node.get('alias', ''),
+            'addresses': addresses,
+            'features_count': features_count,
+            'capacity_sats': node_capacity_sats, # Total capacity from *valid* channels
+            'channels': node_valid_channels # List of *valid* channels from this node's perspective
+            # Centrality will be added later
+        }
+        filtered_nodes.append(processed_node_data)
+
+    end_time = time.time()
+    print(f"Node pre-filtering finished in {end_time - start_time:.2f}s.")
+    print(f"  Nodes remaining after pre-filtering: {len(filtered_nodes)}/{num_initial_nodes}")
+    print(f"  Skipped (no address): {skipped_no_address}")
+    print(f"  Skipped (low capacity): {skipped_low_capacity}")
+    print(f"  Skipped (low channels): {skipped_low_channels}")
+
+    return filtered_nodes 
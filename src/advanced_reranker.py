@@ -105,7 +105,8 @@ class AdvancedReranker:
     def rerank(
         self,
         documents: List[Document],
-        query_embedding: Optional[List[float]] = None
+        query_embedding: Optional[List[float]] = None,
+        top_n: Optional[int] = None
     ) -> List[Document]:
         """
         Rerank les documents selon critères multiples
@@ -113,6 +114,7 @@ class AdvancedReranker:
         Args:
             documents: Documents à reranker
             query_embedding: Embedding de la requête (optionnel)
+            top_n: Nombre de documents à sélectionner (tous par défaut)
             
         Returns:
             Documents rerankés
@@ -149,17 +151,20 @@ class AdvancedReranker:
         # Trier par score composite
         scored_docs.sort(key=lambda x: x['composite_score'], reverse=True)
         
-        # Appliquer pénalité de diversité
-        if self.diversity_weight > 0:
-            scored_docs = self._apply_diversity_penalty(scored_docs)
+        # Sélection MMR pour favoriser la diversité
+        if self.diversity_weight > 0 and len(scored_docs) > 1:
+            scored_docs = self._select_mmr(scored_docs, top_n)
+        elif top_n is not None:
+            scored_docs = scored_docs[:top_n]
         
         # Extraire documents
         reranked = [item['doc'] for item in scored_docs]
         
-        logger.debug(
-            f"Reranked {len(documents)} documents. "
-            f"Top score: {scored_docs[0]['composite_score']:.3f}"
-        )
+        if scored_docs:
+            logger.debug(
+                f"Reranked {len(documents)} documents. "
+                f"Top score: {scored_docs[0]['composite_score']:.3f}"
+            )
         
         return reranked
     
@@ -205,39 +210,62 @@ class AdvancedReranker:
         
         return quality_score
     
-    def _apply_diversity_penalty(
+    def _stack_embeddings(self, documents: List[Document]) -> np.ndarray:
+        """
+        Empile les embeddings en une matrice normalisée (n, d)
+        
+        Les documents sans embedding (ou de dimension différente) ont une
+        ligne nulle : similarité 0 avec tous les autres.
+        """
+        dimension = next((len(doc.embedding) for doc in documents if doc.embedding is not None and len(doc.embedding)), 0)
+        
+        if all(doc.embedding is not None and len(doc.embedding) == dimension for doc in documents):
+            # Cas courant : une seule conversion vers ndarray
+            matrix = np.asarray([doc.embedding for doc in documents], dtype=np.float32).reshape(len(documents), dimension)
+        else:
+            matrix = np.zeros((len(documents), dimension), dtype=np.float32)
+            for i, doc in enumerate(documents):
+                if doc.embedding is not None and len(doc.embedding) == dimension:
+                    matrix[i] = doc.embedding
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    
+    def _select_mmr(
         self,
-        scored_docs: List[Dict[str, Any]]
+        scored_docs: List[Dict[str, Any]],
+        top_n: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
-        Applique une pénalité pour favoriser la diversité
+        Sélection Maximal Marginal Relevance
         
-        Pénalise les documents trop similaires entre eux
+        À chaque étape, choisit le candidat maximisant
+        composite_score - diversity_weight * max_sim(candidat, sélectionnés).
+        La matrice de similarité est calculée une seule fois et le vecteur
+        max_sim est mis à jour incrémentalement après chaque sélection.
         """
-        if len(scored_docs) <= 1:
-            return scored_docs
+        n = len(scored_docs)
+        limit = n if top_n is None else max(0, min(top_n, n))
         
-        selected = [scored_docs[0]]  # Premier document toujours sélectionné
+        embeddings = self._stack_embeddings([item['doc'] for item in scored_docs])
+        similarity_matrix = embeddings @ embeddings.T
+        relevance = np.array([item['composite_score'] for item in scored_docs], dtype=np.float64)
         
-        for candidate in scored_docs[1:]:
-            # Calculer similarité avec documents déjà sélectionnés
-            max_similarity = 0.0
-            
-            for selected_item in selected:
-                similarity = self._compute_embedding_similarity(
-                    candidate['doc'].embedding,
-                    selected_item['doc'].embedding
-                )
-                max_similarity = max(max_similarity, similarity)
+        max_similarity = np.zeros(n, dtype=np.float64)
+        available = np.ones(n, dtype=bool)
+        selected: List[Dict[str, Any]] = []
+        
+        for _ in range(limit):
+            mmr_scores = np.where(available, relevance - self.diversity_weight * max_similarity, -np.inf)
+            best = int(np.argmax(mmr_scores))
             
-            # Pénalité de diversité
-            diversity_penalty = max_similarity * self.diversity_weight
-            candidate['composite_score'] -= diversity_penalty
+            item = scored_docs[best]
+            item['mmr_score'] = float(mmr_scores[best])
+            selected.append(item)
             
-            selected.append(candidate)
-        
-        # Re-trier après application pénalité
-        selected.sort(key=lambda x: x['composite_score'], reverse=True)
+            available[best] = False
+            np.maximum(max_similarity, similarity_matrix[best], out=max_similarity)
         
         return selected
     
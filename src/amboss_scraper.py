@@ -9,6 +9,7 @@ import re
 from src.models import NodeData, ChannelData, NetworkMetrics
 from src.redis_operations import RedisOperations
 from src.exceptions import AmbossAPIError
+from src.clients.http_pool import pooled_session
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -362,7 +363,7 @@ class AmbossScraper:
     async def fetch_data(self, url: str) -> Dict:
         """Récupère les données depuis l'API Amboss"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(url) as session:
                 async with session.get(url) as response:
                     if response.status != 200:
                         error_msg = await response.text()
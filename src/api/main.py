@@ -113,6 +113,19 @@ if CHATBOT_ROUTES_AVAILABLE:
 # Variables globales
 DRY_RUN = os.getenv("DRY_RUN", "true").lower() == "true"
 SIMULATOR_OUTPUT_PATH = Path("rag/RAG_assets/nodes/simulations")
+_background_tasks = set()
+
+@app.on_event("startup")
+async def precompute_lightning_betweenness():
+    """Précalcule en tâche de fond la betweenness utilisée par le scoring Lightning"""
+    if not LEGACY_ROUTES_AVAILABLE:
+        return
+    from app.db import get_database
+    from app.services.lightning_scoring import LightningScoreService
+
+    task = asyncio.create_task(LightningScoreService(await get_database()).warm_betweenness())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 # Middleware pour le logging des requêtes
 @app.middleware("http")
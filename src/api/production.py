@@ -33,6 +33,7 @@ from src.api.main import app as main_app
 from src.tools.simulator.node_simulator import NodeSimulator
 from src.optimizers.scoring_utils import evaluate_node
 from src.scanners.node_scanner import NodeScanner
+from src.clients.http_pool import close_http_clients
 
 # Configuration du logging
 logging.basicConfig(
@@ -74,6 +75,7 @@ async def lifespan(app: FastAPI):
     
     # Nettoyage
     logger.info("Arrêt de l'API MCP Production")
+    await close_http_clients()
 
 # Configuration des origines autorisées
 ALLOWED_ORIGINS = [
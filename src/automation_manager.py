@@ -6,6 +6,7 @@ import aiohttp
 from typing import Dict, List, Optional, Union
 from datetime import datetime
 from src.exceptions import LNBitsClientError
+from src.clients.http_pool import pooled_session
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -115,7 +116,7 @@ class AutomationManager:
         """Mise à jour des frais via LNbits API"""
         try:
             fee_rate_decimal = fee_rate / 100000  # Conversion de ppm en décimal (1 ppm = 0.00001)
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.lnbits_url) as session:
                 async with session.post(
                     f"{self.lnbits_url}/api/v1/channels/{channel_id}/fees",
                     headers={"X-Api-Key": self.lnbits_api_key},
@@ -253,7 +254,7 @@ class AutomationManager:
                 "direction": direction
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.lnbits_url) as session:
                 async with session.post(url, headers=headers, json=payload) as response:
                     await self.handle_lnbits_response(response)
                     
@@ -394,7 +395,7 @@ class AutomationManager:
             # Endpoint pour obtenir les informations du canal
             url = f"{self.lnbits_url}/api/v1/channels/{channel_id}"
             
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.lnbits_url) as session:
                 async with session.get(url, headers=headers) as response:
                     channel_info = await self.handle_lnbits_response(response)
                     
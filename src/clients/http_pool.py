@@ -0,0 +1,335 @@
+"""
+Pool HTTP partagé - un client longue durée par hôte amont
+
+Remplace les `async with httpx.AsyncClient()` / `aiohttp.ClientSession()`
+ouverts à chaque requête (nouvelle poignée de main TCP/TLS à chaque appel)
+par un registre au niveau du processus:
+- un client httpx (ou une session aiohttp) par hôte amont et par boucle asyncio
+- HTTP/2 activé quand le paquet `h2` est installé
+- keepalive et plafond de connexions par hôte configurables (PERF_HTTP_*)
+- fermeture centralisée dans le lifespan FastAPI (close_http_clients)
+- statistiques des pools (http_pool_stats) et métriques Prometheus si disponibles
+
+Usage:
+    async with pooled_client(url) as client:
+        response = await client.get(url, timeout=10.0)
+
+Le client n'est pas fermé en sortie de bloc: les en-têtes et timeouts
+propres à chaque appel se passent par requête.
+"""
+
+import asyncio
+import importlib.util
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import structlog
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from prometheus_client import Counter, Gauge
+except ImportError:
+    Counter = Gauge = None
+
+try:
+    from config import settings
+except ImportError:  # client utilisé hors de l'application (scripts, tests)
+    settings = None
+
+logger = structlog.get_logger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+if Counter is not None:
+    HTTP_POOL_CLIENTS_CREATED = Counter(
+        'http_pool_clients_created_total',
+        'Shared HTTP clients created per upstream host',
+        ['kind', 'host']
+    )
+    HTTP_POOL_REQUESTS = Counter(
+        'http_pool_requests_total',
+        'Requests sent through the shared HTTP clients',
+        ['kind', 'host']
+    )
+    HTTP_POOL_CONNECTIONS = Gauge(
+        'http_pool_connections',
+        'Connections held by the shared HTTP pools',
+        ['kind', 'host', 'state']
+    )
+else:
+    HTTP_POOL_CLIENTS_CREATED = HTTP_POOL_REQUESTS = HTTP_POOL_CONNECTIONS = None
+
+
+@dataclass
+class PoolConfig:
+    """Limites des pools de connexions (appliquées à chaque hôte)"""
+    max_connections_per_host: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+
+    @classmethod
+    def from_settings(cls) -> "PoolConfig":
+        """Construit la configuration depuis les variables PERF_HTTP_*"""
+        return cls(
+            max_connections_per_host=getattr(settings, "perf_http_max_connections_per_host", cls.max_connections_per_host),
+            max_keepalive_connections=getattr(settings, "perf_http_max_keepalive_connections", cls.max_keepalive_connections),
+            keepalive_expiry=getattr(settings, "perf_http_keepalive_expiry", cls.keepalive_expiry),
+            http2=getattr(settings, "perf_http2", cls.http2),
+        )
+
+
+def _origin(url: str) -> Tuple[str, str, int]:
+    """Retourne (scheme, host, port) d'une URL, port par défaut inclus"""
+    parts = urlsplit(url)
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    return scheme, host, parts.port or DEFAULT_PORTS.get(scheme, 0)
+
+
+def _verify_key(verify: Any) -> Any:
+    """Clé de registre pour le paramètre verify (bool, chemin ou SSLContext)"""
+    try:
+        hash(verify)
+        return verify
+    except TypeError:
+        return id(verify)
+
+
+@dataclass
+class _PoolEntry:
+    """Client partagé et compteurs associés"""
+    kind: str
+    host: str
+    loop: asyncio.AbstractEventLoop
+    client: Any
+    http2: bool
+    created_at: float
+    requests: int = 0
+    connections_opened: int = 0
+    connections_reused: int = 0
+
+    @property
+    def is_closed(self) -> bool:
+        closed = self.client.is_closed if self.kind == "httpx" else self.client.closed
+        return self.loop.is_closed() or closed is True
+
+
+class HTTPClientRegistry:
+    """
+    Registre des clients HTTP partagés du processus
+
+    Les clients sont indexés par (type, boucle asyncio, scheme, hôte, port,
+    verify): un client httpx/aiohttp est lié à la boucle qui a ouvert ses
+    connexions, on n'en partage donc jamais un entre deux boucles.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        self.config = config or PoolConfig.from_settings()
+        self._entries: Dict[Tuple, _PoolEntry] = {}
+
+    def _lookup(self, kind: str, url: str, verify: Any) -> Tuple[Tuple, Optional[_PoolEntry], asyncio.AbstractEventLoop]:
+        loop = asyncio.get_running_loop()
+        key = (kind, id(loop)) + _origin(url) + (_verify_key(verify),)
+        entry = self._entries.get(key)
+        if entry is not None and (entry.loop is not loop or entry.is_closed):
+            del self._entries[key]
+            entry = None
+        return key, entry, loop
+
+    def _register(self, key: Tuple, entry: _PoolEntry):
+        # Purge des clients dont la boucle a été fermée (asyncio.run successifs)
+        for stale_key in [k for k, e in self._entries.items() if e.loop.is_closed()]:
+            del self._entries[stale_key]
+        self._entries[key] = entry
+        if HTTP_POOL_CLIENTS_CREATED is not None:
+            HTTP_POOL_CLIENTS_CREATED.labels(kind=entry.kind, host=entry.host).inc()
+        logger.info("http_pool_client_created", kind=entry.kind, host=entry.host, http2=entry.http2)
+
+    def get_client(self, url: str, verify: Any = True) -> httpx.AsyncClient:
+        """
+        Retourne le client httpx partagé pour l'hôte de `url`
+
+        Args:
+            url: URL (ou URL de base) de l'hôte amont
+            verify: Vérification TLS (bool, chemin de certificat ou SSLContext)
+
+        Returns:
+            Client httpx longue durée, à ne pas fermer par l'appelant
+        """
+        key, entry, loop = self._lookup("httpx", url, verify)
+        if entry is not None:
+            return entry.client
+
+        config = self.config
+        http2 = config.http2 and HTTP2_AVAILABLE and key[2] == "https"
+        entry = _PoolEntry(kind="httpx", host=key[3], loop=loop, client=None, http2=http2, created_at=time.time())
+
+        async def count_request(request):
+            entry.requests += 1
+            if HTTP_POOL_REQUESTS is not None:
+                HTTP_POOL_REQUESTS.labels(kind="httpx", host=entry.host).inc()
+
+        entry.client = httpx.AsyncClient(
+            verify=verify,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections_per_host,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            event_hooks={"request": [count_request]},
+        )
+        self._register(key, entry)
+        return entry.client
+
+    def get_session(self, url: str, verify: Any = True) -> "aiohttp.ClientSession":
+        """
+        Retourne la session aiohttp partagée pour l'hôte de `url`
+
+        Args:
+            url: URL (ou URL de base) de l'hôte amont
+            verify: False pour désactiver la vérification TLS, ou SSLContext
+
+        Returns:
+            Session aiohttp longue durée, à ne pas fermer par l'appelant
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp n'est pas installé")
+
+        key, entry, loop = self._lookup("aiohttp", url, verify)
+        if entry is not None:
+            return entry.client
+
+        config = self.config
+        entry = _PoolEntry(kind="aiohttp", host=key[3], loop=loop, client=None, http2=False, created_at=time.time())
+
+        async def on_request_start(session, context, params):
+            entry.requests += 1
+            if HTTP_POOL_REQUESTS is not None:
+                HTTP_POOL_REQUESTS.labels(kind="aiohttp", host=entry.host).inc()
+
+        async def on_connection_create_end(session, context, params):
+            entry.connections_opened += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            entry.connections_reused += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        connector_kwargs = {} if verify is True else {"ssl": verify}
+        connector = aiohttp.TCPConnector(
+            limit=config.max_connections_per_host,
+            limit_per_host=config.max_connections_per_host,
+            keepalive_timeout=config.keepalive_expiry,
+            **connector_kwargs,
+        )
+        entry.client = aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+        self._register(key, entry)
+        return entry.client
+
+    async def close_all(self):
+        """Ferme tous les clients partagés de la boucle courante"""
+        loop = asyncio.get_running_loop()
+        for key, entry in list(self._entries.items()):
+            if entry.loop is not loop:
+                continue
+            del self._entries[key]
+            try:
+                if entry.kind == "httpx":
+                    await entry.client.aclose()
+                else:
+                    await entry.client.close()
+            except Exception as e:
+                logger.warning("http_pool_close_failed", kind=entry.kind, host=entry.host, error=str(e))
+        logger.info("http_pool_closed")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Statistiques par pool (requêtes, connexions ouvertes/inactives)
+
+        Met aussi à jour la jauge Prometheus http_pool_connections.
+        """
+        pools = []
+        for entry in self._entries.values():
+            if entry.is_closed:
+                continue
+            connections, idle = self._connection_counts(entry)
+            pools.append({
+                "kind": entry.kind,
+                "host": entry.host,
+                "http2": entry.http2,
+                "age_seconds": round(time.time() - entry.created_at, 1),
+                "requests": entry.requests,
+                "connections": connections,
+                "idle_connections": idle,
+                "connections_opened": entry.connections_opened if entry.kind == "aiohttp" else None,
+                "connections_reused": entry.connections_reused if entry.kind == "aiohttp" else None,
+                "max_connections": self.config.max_connections_per_host,
+            })
+            if HTTP_POOL_CONNECTIONS is not None and connections is not None:
+                HTTP_POOL_CONNECTIONS.labels(kind=entry.kind, host=entry.host, state="active").set(connections - idle)
+                HTTP_POOL_CONNECTIONS.labels(kind=entry.kind, host=entry.host, state="idle").set(idle)
+        return pools
+
+    @staticmethod
+    def _connection_counts(entry: _PoolEntry) -> Tuple[Optional[int], Optional[int]]:
+        """Lit l'état du pool sous-jacent (httpcore / TCPConnector), None si indisponible"""
+        try:
+            if entry.kind == "httpx":
+                pool = entry.client._transport._pool
+                connections = list(pool.connections)
+                return len(connections), sum(1 for c in connections if c.is_idle())
+            connector = entry.client.connector
+            idle = sum(len(conns) for conns in connector._conns.values())
+            return idle + len(connector._acquired), idle
+        except Exception:
+            return None, None
+
+
+http_clients = HTTPClientRegistry()
+
+
+def get_http_client(url: str, verify: Any = True) -> httpx.AsyncClient:
+    """Client httpx partagé pour l'hôte de `url` (voir HTTPClientRegistry.get_client)"""
+    return http_clients.get_client(url, verify=verify)
+
+
+def get_aiohttp_session(url: str, verify: Any = True) -> "aiohttp.ClientSession":
+    """Session aiohttp partagée pour l'hôte de `url` (voir HTTPClientRegistry.get_session)"""
+    return http_clients.get_session(url, verify=verify)
+
+
+@asynccontextmanager
+async def pooled_client(url: str, verify: Any = True):
+    """Remplaçant de `async with httpx.AsyncClient() as client` qui ne ferme pas le client"""
+    yield get_http_client(url, verify=verify)
+
+
+@asynccontextmanager
+async def pooled_session(url: str, verify: Any = True):
+    """Remplaçant de `async with aiohttp.ClientSession() as session` qui ne ferme pas la session"""
+    yield get_aiohttp_session(url, verify=verify)
+
+
+async def close_http_clients():
+    """Ferme les clients partagés (à appeler à l'arrêt, dans le lifespan FastAPI)"""
+    await http_clients.close_all()
+
+
+def http_pool_stats() -> List[Dict[str, Any]]:
+    """Statistiques des pools HTTP partagés"""
+    return http_clients.stats()
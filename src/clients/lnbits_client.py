@@ -7,6 +7,8 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 from functools import wraps
 
+from src.clients.http_pool import pooled_client
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -129,15 +131,15 @@ class LNBitsClient:
         timeout_config = httpx.Timeout(self.timeout, connect=10.0)
         
         try:
-            async with httpx.AsyncClient(timeout=timeout_config, verify=False) as client:  # verify=False pour les certificats self-signed
+            async with pooled_client(self.url, verify=False) as client:  # verify=False pour les certificats self-signed
                 if method.upper() == "GET":
-                    response = await client.get(url, headers=headers)
+                    response = await client.get(url, headers=headers, timeout=timeout_config)
                 elif method.upper() == "POST":
-                    response = await client.post(url, headers=headers, json=data)
+                    response = await client.post(url, headers=headers, json=data, timeout=timeout_config)
                 elif method.upper() == "PUT":
-                    response = await client.put(url, headers=headers, json=data)
+                    response = await client.put(url, headers=headers, json=data, timeout=timeout_config)
                 elif method.upper() == "DELETE":
-                    response = await client.delete(url, headers=headers)
+                    response = await client.delete(url, headers=headers, timeout=timeout_config)
                 else:
                     raise ValueError(f"Méthode HTTP non supportée: {method}")
                 
@@ -14,14 +14,22 @@ Ce client implémente tous les endpoints nécessaires pour MCP avec:
 
 import httpx
 import asyncio
+import bisect
 import logging
 import os
+import time
 from typing import Dict, List, Any, Optional, Union
-from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass
 import structlog
 
+from src.clients.http_pool import pooled_client
+
+try:
+    from prometheus_client import Histogram
+except ImportError:
+    Histogram = None
+
 # Configuration du logging structuré
 logger = structlog.get_logger(__name__)
 
@@ -45,9 +53,128 @@ class RetryConfig:
 
 @dataclass
 class RateLimitConfig:
-    """Configuration du rate limiting"""
+    """
+    Configuration du rate limiting (seau à jetons)
+
+    max_requests_per_minute fixe le débit soutenu, burst_size le nombre de
+    requêtes acceptées d'un coup quand le seau est plein. Les clés admin et
+    invoice ont chacune leur propre seau; None reprend le débit par défaut.
+    """
     max_requests_per_minute: int = 100
     burst_size: int = 20
+    admin_requests_per_minute: Optional[int] = None
+    invoice_requests_per_minute: Optional[int] = None
+
+
+# Bornes (secondes) de l'histogramme des temps d'attente du rate limiter
+RATE_LIMIT_WAIT_BUCKETS = (0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0)
+
+if Histogram is not None:
+    RATE_LIMIT_WAIT_SECONDS = Histogram(
+        'lnbits_rate_limit_wait_seconds',
+        'Time spent waiting for an LNBits rate limit token',
+        ['budget'],
+        buckets=RATE_LIMIT_WAIT_BUCKETS[1:]
+    )
+else:
+    RATE_LIMIT_WAIT_SECONDS = None
+
+
+class TokenBucket:
+    """
+    Seau à jetons asynchrone avec attente FIFO
+
+    Chaque appel à acquire() réserve un jeton immédiatement (le solde peut
+    devenir négatif: c'est la file d'attente) puis dort hors de toute section
+    critique jusqu'à son créneau. Les créneaux étant attribués dans l'ordre
+    d'arrivée, les requêtes sont servies en FIFO sans verrou: la réservation
+    ne contient aucun await et s'exécute donc d'un bloc dans la boucle asyncio.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, burst_size: int):
+        if requests_per_minute <= 0 or burst_size < 1:
+            raise ValueError("requests_per_minute must be > 0 and burst_size >= 1")
+        self.name = name
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst_size)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # Histogramme local (exporté par stats()), mêmes bornes que Prometheus
+        self._wait_counts = [0] * (len(RATE_LIMIT_WAIT_BUCKETS) + 1)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._acquired = 0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Réserve un jeton et retourne le temps d'attente (s) avant de l'utiliser"""
+        self._refill(time.monotonic())
+        self._tokens -= 1.0
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def release(self):
+        """Rend un jeton réservé mais non consommé (attente annulée)"""
+        self._tokens = min(self.capacity, self._tokens + 1.0)
+
+    async def acquire(self) -> float:
+        """
+        Attend un jeton
+
+        Returns:
+            Temps d'attente en secondes
+        """
+        wait_time = self.reserve()
+        if wait_time > 0:
+            logger.warning(
+                "rate_limit_reached",
+                budget=self.name,
+                wait_time=wait_time,
+                queued=self.queued
+            )
+            try:
+                await asyncio.sleep(wait_time)
+            except asyncio.CancelledError:
+                self.release()
+                raise
+        self._observe(wait_time)
+        return wait_time
+
+    def _observe(self, wait_time: float):
+        self._acquired += 1
+        self._wait_total += wait_time
+        self._wait_max = max(self._wait_max, wait_time)
+        self._wait_counts[bisect.bisect_left(RATE_LIMIT_WAIT_BUCKETS, wait_time)] += 1
+        if RATE_LIMIT_WAIT_SECONDS is not None:
+            RATE_LIMIT_WAIT_SECONDS.labels(budget=self.name).observe(wait_time)
+
+    @property
+    def queued(self) -> int:
+        """Nombre de requêtes en attente d'un jeton"""
+        return max(0, -int(self._tokens // 1))
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du seau et histogramme cumulé des temps d'attente"""
+        self._refill(time.monotonic())
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip(RATE_LIMIT_WAIT_BUCKETS + (float("inf"),), self._wait_counts):
+            cumulative += count
+            histogram["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "requests_per_minute": self.rate * 60.0,
+            "burst_size": int(self.capacity),
+            "tokens": round(max(self._tokens, 0.0), 3),
+            "queued": self.queued,
+            "acquired": self._acquired,
+            "wait_seconds_total": round(self._wait_total, 3),
+            "wait_seconds_max": round(self._wait_max, 3),
+            "wait_seconds_histogram": histogram,
+        }
 
 
 class LNBitsClientError(Exception):
@@ -137,9 +264,17 @@ class LNBitsClientV2:
         self.retry_config = retry_config or RetryConfig()
         self.rate_limit_config = rate_limit_config or RateLimitConfig()
         
-        # Rate limiting state
-        self._request_times: List[datetime] = []
-        self._rate_limit_lock = asyncio.Lock()
+        # Rate limiting: un seau à jetons par classe de clé
+        config = self.rate_limit_config
+        self._rate_limiters: Dict[str, TokenBucket] = {
+            "default": TokenBucket("default", config.max_requests_per_minute, config.burst_size),
+            "admin": TokenBucket(
+                "admin", config.admin_requests_per_minute or config.max_requests_per_minute, config.burst_size
+            ),
+            "invoice": TokenBucket(
+                "invoice", config.invoice_requests_per_minute or config.max_requests_per_minute, config.burst_size
+            ),
+        }
         
         # Build headers
         self._build_headers()
@@ -171,30 +306,18 @@ class LNBitsClientV2:
             self.admin_headers = {**base_headers, "Grpc-Metadata-macaroon": self.admin_key}
             self.invoice_headers = {**base_headers, "Grpc-Metadata-macaroon": self.invoice_key}
     
-    async def _check_rate_limit(self):
-        """Vérifie et applique le rate limiting"""
-        async with self._rate_limit_lock:
-            now = datetime.now()
-            
-            # Nettoyer les requêtes trop anciennes (> 1 minute)
-            cutoff = now - timedelta(minutes=1)
-            self._request_times = [t for t in self._request_times if t > cutoff]
-            
-            # Vérifier si on dépasse la limite
-            if len(self._request_times) >= self.rate_limit_config.max_requests_per_minute:
-                oldest = self._request_times[0]
-                wait_time = 60 - (now - oldest).total_seconds()
-                
-                if wait_time > 0:
-                    logger.warning(
-                        "rate_limit_reached",
-                        wait_time=wait_time,
-                        requests_count=len(self._request_times)
-                    )
-                    await asyncio.sleep(wait_time)
-            
-            # Enregistrer cette requête
-            self._request_times.append(now)
+    async def _check_rate_limit(self, budget: str = "default"):
+        """
+        Vérifie et applique le rate limiting
+        
+        Args:
+            budget: Classe de clé ("default", "admin" ou "invoice")
+        """
+        await self._rate_limiters[budget].acquire()
+    
+    def get_rate_limit_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Statistiques des seaux de rate limiting (jetons, file, temps d'attente)"""
+        return {budget: bucket.stats() for budget, bucket in self._rate_limiters.items()}
     
     async def _make_request(
         self,
@@ -226,8 +349,8 @@ class LNBitsClientV2:
         Raises:
             LNBitsClientError: Erreur lors de la requête
         """
-        # Rate limiting
-        await self._check_rate_limit()
+        # Rate limiting (budget séparé pour les clés admin et invoice)
+        await self._check_rate_limit("admin" if use_admin else "invoice" if use_invoice else "default")
         
         # Sélection des headers
         if use_admin:
@@ -247,17 +370,18 @@ class LNBitsClientV2:
         last_exception = None
         for attempt in range(self.retry_config.max_retries if retry else 1):
             try:
-                async with httpx.AsyncClient(verify=self.verify_ssl, timeout=self.timeout) as client:
+                # Client partagé par hôte: connexions keepalive réutilisées entre requêtes et retries
+                async with pooled_client(self.url, verify=self.verify_ssl) as client:
                     if method.upper() == "GET":
-                        response = await client.get(url, headers=request_headers, params=params)
+                        response = await client.get(url, headers=request_headers, params=params, timeout=self.timeout)
                     elif method.upper() == "POST":
-                        response = await client.post(url, headers=request_headers, json=data, params=params)
+                        response = await client.post(url, headers=request_headers, json=data, params=params, timeout=self.timeout)
                     elif method.upper() == "PUT":
-                        response = await client.put(url, headers=request_headers, json=data, params=params)
+                        response = await client.put(url, headers=request_headers, json=data, params=params, timeout=self.timeout)
                     elif method.upper() == "DELETE":
-                        response = await client.delete(url, headers=request_headers, params=params)
+                        response = await client.delete(url, headers=request_headers, params=params, timeout=self.timeout)
                     elif method.upper() == "PATCH":
-                        response = await client.patch(url, headers=request_headers, json=data, params=params)
+                        response = await client.patch(url, headers=request_headers, json=data, params=params, timeout=self.timeout)
                     else:
                         raise ValueError(f"Unsupported HTTP method: {method}")
                     
@@ -701,7 +825,12 @@ class LNBitsClientV2:
             return False
     
     async def close(self):
-        """Nettoie les ressources (pour compatibilité context manager)"""
+        """
+        Nettoie les ressources (pour compatibilité context manager)
+
+        Le client HTTP est partagé par hôte (src.clients.http_pool) et fermé
+        à l'arrêt de l'application, pas ici.
+        """
         logger.info("lnbits_client_closed")
     
     async def __aenter__(self):
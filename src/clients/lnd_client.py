@@ -1,8 +1,9 @@
-import httpx
 import os
 from typing import Dict, List, Any, Optional
 import base64
 
+from src.clients.http_pool import pooled_client
+
 class LNDClient:
     """
     Client asynchrone pour interagir avec l'API REST de LND.
@@ -31,7 +32,7 @@ class LNDClient:
         Récupère les infos d'un nœud (GET /v1/graph/node/{pub_key})
         """
         url = f"{self.base_url}/v1/graph/node/{pubkey}"
-        async with httpx.AsyncClient(verify=self._cert) as client:
+        async with pooled_client(self.base_url, verify=self._cert) as client:
             resp = await client.get(url, headers=self._headers())
             resp.raise_for_status()
             return resp.json()
@@ -41,7 +42,7 @@ class LNDClient:
         Récupère la liste des canaux ouverts (GET /v1/channels)
         """
         url = f"{self.base_url}/v1/channels"
-        async with httpx.AsyncClient(verify=self._cert) as client:
+        async with pooled_client(self.base_url, verify=self._cert) as client:
             resp = await client.get(url, headers=self._headers())
             resp.raise_for_status()
             data = resp.json()
@@ -67,7 +68,7 @@ class LNDClient:
         Récupère les infos d'un canal (GET /v1/graph/edge/{channel_id})
         """
         url = f"{self.base_url}/v1/graph/edge/{channel_id}"
-        async with httpx.AsyncClient(verify=self._cert) as client:
+        async with pooled_client(self.base_url, verify=self._cert) as client:
             resp = await client.get(url, headers=self._headers())
             resp.raise_for_status()
             return resp.json()
@@ -2,12 +2,38 @@ import aiohttp
 import asyncio
 import json
 import logging
+import time
 from typing import Any, Dict, List, Optional, AsyncIterator
 from config.rag_config import settings as rag_settings
 
 logger = logging.getLogger(__name__)
 
 
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens (~4 caractères par token)."""
+    return len(text) // 4 + 1
+
+
+def split_embedding_batches(texts: List[str], max_batch_size: int, max_batch_tokens: int) -> List[List[int]]:
+    """Découpe les textes en lots d'indices bornés en nombre de textes et en tokens estimés.
+
+    L'ordre est conservé; un texte dépassant seul le budget forme son propre lot.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_batch_size or current_tokens + tokens > max_batch_tokens):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
 class OllamaClientError(Exception):
     """Exception de base pour les erreurs du client Ollama."""
     pass
@@ -41,6 +67,10 @@ class OllamaClient:
         self.max_retries = max_retries
         self.retry_backoff = retry_backoff
         self._session: Optional[aiohttp.ClientSession] = None
+        # None: inconnu, False: serveur sans /api/embed (Ollama < 0.3.4)
+        self._batch_embed_supported: Optional[bool] = None
+        # Débit des lots du dernier appel à embed_batch
+        self.last_batch_stats: List[Dict[str, Any]] = []
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Retourne une session réutilisable avec connection pooling optimisé."""
@@ -123,12 +153,102 @@ class OllamaClient:
 
         return await self._retry_with_backoff(_embed, f"Embed failed for model {payload['model']}")
 
-    async def embed_batch(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
-        """Génère des embeddings pour une liste de textes."""
-        embeddings = []
-        for text in texts:
-            embedding = await self.embed(text, model)
-            embeddings.append(embedding)
+    async def _embed_many(self, texts: List[str], model: str) -> Optional[List[List[float]]]:
+        """Un appel à /api/embed pour plusieurs textes; None si l'endpoint est absent."""
+        url = f"{self.base_url}/api/embed"
+        payload: Dict[str, Any] = {"model": model, "input": texts}
+
+        async def _embed():
+            session = await self._get_session()
+            async with session.post(url, json=payload) as resp:
+                # Anciennes versions d'Ollama: route inconnue -> repli sur /api/embeddings
+                if resp.status in (404, 405) and self._batch_embed_supported is not True:
+                    return None
+                resp.raise_for_status()
+                data = await resp.json()
+                # Ollama /api/embed renvoie { embeddings: [[...], ...] } dans l'ordre des inputs
+                embeddings = data.get("embeddings")
+                if not embeddings or len(embeddings) != len(texts):
+                    raise OllamaClientError("No embedding returned from Ollama")
+                return embeddings
+
+        return await self._retry_with_backoff(_embed, f"Embed batch failed for model {model}")
+
+    async def embed_batch(
+        self,
+        texts: List[str],
+        model: Optional[str] = None,
+        max_batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> List[List[float]]:
+        """Génère des embeddings pour une liste de textes, dans l'ordre des textes.
+
+        Les textes sont envoyés par lots (EMBEDDING_BATCH_SIZE textes et
+        EMBEDDING_BATCH_MAX_TOKENS tokens estimés au plus) à /api/embed, avec
+        au plus EMBEDDING_MAX_CONCURRENT_BATCHES requêtes simultanées. Si le
+        serveur ne connaît pas /api/embed, repli sur des appels embed()
+        concurrents avec la même borne. Le débit de chaque lot est journalisé
+        et conservé dans last_batch_stats.
+        """
+        if not texts:
+            return []
+
+        model = model or rag_settings.EMBED_MODEL
+        max_batch_size = max_batch_size or rag_settings.EMBEDDING_BATCH_SIZE
+        max_batch_tokens = max_batch_tokens or rag_settings.EMBEDDING_BATCH_MAX_TOKENS
+        semaphore = asyncio.Semaphore(max_concurrency or rag_settings.EMBEDDING_MAX_CONCURRENT_BATCHES)
+
+        batches = split_embedding_batches(texts, max_batch_size, max_batch_tokens)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        batch_stats: List[Dict[str, Any]] = [{} for _ in batches]
+
+        async def _embed_one(text: str) -> List[float]:
+            async with semaphore:
+                return await self.embed(text, model)
+
+        async def _process(batch_number: int, indices: List[int]):
+            batch_texts = [texts[i] for i in indices]
+            start = time.perf_counter()
+            vectors = None
+            if self._batch_embed_supported is not False:
+                async with semaphore:
+                    vectors = await self._embed_many(batch_texts, model)
+                if vectors is not None:
+                    self._batch_embed_supported = True
+            if vectors is None:
+                vectors = await asyncio.gather(*(_embed_one(text) for text in batch_texts))
+                if self._batch_embed_supported is None:
+                    logger.warning("Ollama /api/embed indisponible, repli sur /api/embeddings (un texte par requête)")
+                    self._batch_embed_supported = False
+
+            for i, vector in zip(indices, vectors):
+                embeddings[i] = vector
+
+            duration = time.perf_counter() - start
+            tokens = sum(estimate_tokens(text) for text in batch_texts)
+            batch_stats[batch_number] = {
+                "texts": len(batch_texts),
+                "estimated_tokens": tokens,
+                "duration_s": round(duration, 4),
+                "texts_per_s": round(len(batch_texts) / duration, 1) if duration > 0 else None,
+                "tokens_per_s": round(tokens / duration, 1) if duration > 0 else None,
+                "batched": self._batch_embed_supported is not False,
+            }
+            logger.debug(
+                f"Embed batch {batch_number + 1}/{len(batches)}: {len(batch_texts)} texts, "
+                f"~{tokens} tokens in {duration:.2f}s ({len(batch_texts) / max(duration, 1e-9):.1f} texts/s)"
+            )
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(_process(n, indices) for n, indices in enumerate(batches)))
+        self.last_batch_stats = batch_stats
+
+        duration = time.perf_counter() - start_time
+        logger.info(
+            f"Embedded {len(texts)} texts in {len(batches)} batches in {duration:.2f}s "
+            f"({len(texts) / max(duration, 1e-9):.1f} texts/s)"
+        )
         return embeddings
 
     async def generate(
@@ -10,6 +10,8 @@ from typing import Optional, Dict, Any, List
 import asyncio
 from datetime import datetime
 
+from src.clients.http_pool import pooled_client
+
 logger = logging.getLogger("mcp.sparkseer")
 
 class SparkseerClient:
@@ -38,7 +40,7 @@ class SparkseerClient:
             return False
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with pooled_client(self.base_url) as client:
                 response = await client.get(
                     f"{self.base_url}/v1/network/summary",
                     headers=self.headers,
@@ -62,7 +64,7 @@ class SparkseerClient:
             
         for attempt in range(self.max_retries):
             try:
-                async with httpx.AsyncClient() as client:
+                async with pooled_client(self.base_url) as client:
                     # Info de base du nœud
                     response = await client.get(
                         f"{self.base_url}/v1/node/{pubkey}",
@@ -182,7 +184,7 @@ class SparkseerClient:
             return {"recommendations": []}
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with pooled_client(self.base_url) as client:
                 # Recommandations parallèles
                 tasks = [
                     self._get_channel_recommendations(client, pubkey),
@@ -318,7 +320,7 @@ class SparkseerClient:
             return {}
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with pooled_client(self.base_url) as client:
                 response = await client.get(
                     f"{self.base_url}/v1/network/summary",
                     headers=self.headers,
@@ -7,10 +7,11 @@ import logging
 import asyncio
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
-import aiohttp
 import json
 from dataclasses import dataclass
 
+from src.clients.http_pool import pooled_session
+
 logger = logging.getLogger("mcp.graph_data_manager")
 
 @dataclass
@@ -190,7 +191,7 @@ class GraphDataManager:
         """
         Récupère les données depuis mempool.space
         """
-        async with aiohttp.ClientSession() as session:
+        async with pooled_session(self.ln_apis['mempool']) as session:
             # Récupérer les nœuds
             async with session.get(f"{self.ln_apis['mempool']}/nodes/rankings") as resp:
                 if resp.status == 200:
@@ -372,7 +373,7 @@ class GraphDataManager:
         """
         # Tentative depuis mempool.space
         try:
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.ln_apis['mempool']) as session:
                 url = f"{self.ln_apis['mempool']}/nodes/{node_pubkey}"
                 async with session.get(url) as resp:
                     if resp.status == 200:
@@ -0,0 +1,431 @@
+"""
+Store d'embeddings persistant et mappé en mémoire (np.memmap)
+
+Les vecteurs sont normalisés à l'écriture (L2) puis stockés en binaire brut
+(float32 ou float16) à côté d'un fichier de métadonnées parallèle (JSON lines).
+Une recherche cosinus se réduit ainsi à un produit matrice-vecteur suivi d'un
+argpartition, sans recalcul des normes à chaque requête.
+
+Chaque écriture complète produit une nouvelle génération de fichiers ; un
+ajout (append) étend les fichiers de la génération courante sans réécrire
+l'existant. Dans les deux cas le manifeste (version, nombre de lignes) est
+remplacé atomiquement en dernier : les lecteurs ne voient que les `count`
+premières lignes publiées. Plusieurs workers peuvent donc ouvrir le même store
+en lecture seule (partage via le page cache) et détecter une nouvelle version
+avec refresh(). Les écritures (write, append) de processus différents sont
+sérialisées par un verrou flock sur le fichier store.lock.
+"""
+
+import json
+import logging
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+LOCK_FILENAME = "store.lock"
+SUPPORTED_DTYPES = ("float32", "float16")
+
+
+class MemmapEmbeddingStore:
+    """
+    Matrice d'embeddings pré-normalisés, versionnée sur disque
+
+    Les lignes de la matrice et les entrées de métadonnées partagent le même
+    index : la ligne i correspond toujours à metadata[i].
+    """
+
+    def __init__(self, path: Union[str, Path], dtype: str = "float32"):
+        """
+        Args:
+            path: Répertoire du store (créé à la première écriture)
+            dtype: Type de stockage des vecteurs ('float32' ou 'float16')
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}. Expected one of {SUPPORTED_DTYPES}")
+
+        self.path = Path(path)
+        self.dtype = dtype
+        self.version = 0
+        self.generation = 0
+        self.dimension = 0
+        self.vectors: Optional[np.ndarray] = None
+        self.metadata: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.path / MANIFEST_FILENAME
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self.path / f"vectors-v{generation}.bin"
+
+    def _metadata_path(self, generation: int) -> Path:
+        return self.path / f"chunks-v{generation}.jsonl"
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Verrou exclusif des écritures, partagé par tous les processus du store"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with open(self.path / LOCK_FILENAME, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        tmp_manifest = self.path / f"{MANIFEST_FILENAME}.tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+    @staticmethod
+    def _generation(manifest: Dict[str, Any]) -> int:
+        # Les manifestes antérieurs à l'ajout incrémental n'ont pas de génération
+        return int(manifest.get("generation", manifest["version"]))
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable embedding store manifest {self.manifest_path}: {e}")
+            return None
+
+        if manifest.get("format") != STORE_FORMAT_VERSION:
+            logger.warning(
+                f"Embedding store format {manifest.get('format')} not supported "
+                f"(expected {STORE_FORMAT_VERSION}), ignoring {self.path}"
+            )
+            return None
+        return manifest
+
+    def load(self, expected_dimension: Optional[int] = None) -> bool:
+        """
+        Ouvre la version courante du store en lecture seule
+
+        Args:
+            expected_dimension: Dimension attendue ; un store incompatible est ignoré
+
+        Returns:
+            True si un store valide a été ouvert
+        """
+        manifest = self._read_manifest()
+        if manifest is None:
+            return False
+
+        count = int(manifest["count"])
+        dimension = int(manifest["dimension"])
+        if expected_dimension and count and dimension != expected_dimension:
+            logger.warning(
+                f"Embedding store dimension {dimension} does not match "
+                f"expected {expected_dimension}, ignoring {self.path}"
+            )
+            return False
+
+        version = int(manifest["version"])
+        generation = self._generation(manifest)
+        try:
+            # Seules les `count` premières lignes sont publiées (un ajout en
+            # cours peut déjà avoir écrit des lignes au-delà)
+            metadata: List[Dict[str, Any]] = []
+            with open(self._metadata_path(generation), "r", encoding="utf-8") as f:
+                for line in f:
+                    if len(metadata) == count:
+                        break
+                    if line.strip():
+                        metadata.append(json.loads(line))
+
+            if len(metadata) != count:
+                raise ValueError(f"{len(metadata)} metadata entries for {count} vectors")
+
+            vectors = None
+            if count:
+                vectors = np.memmap(
+                    self._vectors_path(generation),
+                    dtype=manifest["dtype"],
+                    mode="r",
+                    shape=(count, dimension)
+                )
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to open embedding store {self.path} v{version}: {e}")
+            return False
+
+        self.version = version
+        self.generation = generation
+        self.dimension = dimension
+        self.dtype = manifest["dtype"]
+        self.vectors = vectors
+        self.metadata = metadata
+
+        logger.info(f"Embedding store loaded from {self.path}: v{version}, {count} vectors")
+        return True
+
+    def refresh(self) -> bool:
+        """Recharge le store si une version plus récente (écriture ou ajout) a été publiée"""
+        manifest = self._read_manifest()
+        if manifest is None or int(manifest["version"]) == self.version:
+            return False
+        return self.load()
+
+    def write(
+        self,
+        vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+        metadata: Sequence[Dict[str, Any]]
+    ) -> int:
+        """
+        Remplace le contenu du store par une nouvelle version
+
+        Args:
+            vectors: Matrice (n, dimension) de vecteurs bruts
+            metadata: Métadonnées JSON-sérialisables, une entrée par vecteur
+
+        Returns:
+            Numéro de la version écrite
+        """
+        with self._write_lock():
+            return self._write(vectors, metadata)
+
+    def _write(
+        self,
+        vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+        metadata: Sequence[Dict[str, Any]]
+    ) -> int:
+        """write() sous verrou"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = matrix.reshape(0, self.dimension)
+        if matrix.ndim != 2:
+            raise ValueError(f"Invalid vector shape: {matrix.shape}. Expected (n, dimension)")
+        if matrix.shape[0] != len(metadata):
+            raise ValueError(
+                f"Number of metadata entries ({len(metadata)}) must match "
+                f"number of vectors ({matrix.shape[0]})"
+            )
+
+        normalized = self._normalize(matrix)
+
+        previous = self._read_manifest()
+        version = max(self.version, int(previous["version"]) if previous else 0) + 1
+        generation = max(self.generation, self._generation(previous) if previous else 0) + 1
+
+        normalized.tofile(self._vectors_path(generation))
+        with open(self._metadata_path(generation), "wb") as f:
+            metadata_bytes = f.write(self._encode_metadata(metadata))
+
+        self._write_manifest({
+            "format": STORE_FORMAT_VERSION,
+            "version": version,
+            "generation": generation,
+            "count": int(normalized.shape[0]),
+            "dimension": int(normalized.shape[1]),
+            "dtype": self.dtype,
+            "metadata_bytes": metadata_bytes
+        })
+
+        self._prune_versions(keep={generation, self.generation})
+        self.load()
+        return version
+
+    def append(
+        self,
+        vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+        metadata: Sequence[Dict[str, Any]]
+    ) -> int:
+        """
+        Ajoute des vecteurs à la génération courante, sans réécrire l'existant
+
+        Les octets sont ajoutés en fin de fichiers puis le manifeste est
+        republié avec le nouveau nombre de lignes : le coût est proportionnel
+        au lot ajouté, pas à la taille du store. Un reste d'ajout interrompu
+        (au-delà du dernier manifeste) est tronqué avant d'écrire. Le manifeste
+        est relu sous le verrou : un ajout concurrent d'un autre processus est
+        pris en compte au lieu d'être écrasé.
+
+        Returns:
+            Numéro de la version publiée
+        """
+        with self._write_lock():
+            return self._append(vectors, metadata)
+
+    def _append(
+        self,
+        vectors: Union[np.ndarray, Sequence[Sequence[float]]],
+        metadata: Sequence[Dict[str, Any]]
+    ) -> int:
+        """append() sous verrou"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        manifest = self._read_manifest()
+        if manifest is None or int(manifest["count"]) == 0:
+            return self._write(matrix, list(metadata))
+
+        if matrix.size == 0:
+            return int(manifest["version"])
+        if matrix.ndim != 2:
+            raise ValueError(f"Invalid vector shape: {matrix.shape}. Expected (n, dimension)")
+        if matrix.shape[0] != len(metadata):
+            raise ValueError(
+                f"Number of metadata entries ({len(metadata)}) must match "
+                f"number of vectors ({matrix.shape[0]})"
+            )
+
+        count = int(manifest["count"])
+        dimension = int(manifest["dimension"])
+        if matrix.shape[1] != dimension:
+            raise ValueError(
+                f"Vector dimension ({matrix.shape[1]}) "
+                f"doesn't match store dimension ({dimension})"
+            )
+
+        if int(manifest["version"]) != self.version and not self.load():
+            raise ValueError(f"Cannot open embedding store {self.path} for append")
+
+        if manifest["dtype"] != self.dtype or "metadata_bytes" not in manifest:
+            # Store d'un autre format : une réécriture complète le met à niveau
+            combined = np.vstack([np.asarray(self.vectors, dtype=np.float32), matrix])
+            return self._write(combined, self.metadata + list(metadata))
+
+        generation = self._generation(manifest)
+        vectors_path = self._vectors_path(generation)
+        metadata_path = self._metadata_path(generation)
+        row_bytes = dimension * np.dtype(self.dtype).itemsize
+        metadata_bytes = int(manifest["metadata_bytes"])
+
+        normalized = self._normalize(matrix)
+        with open(vectors_path, "r+b") as f:
+            f.truncate(count * row_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(normalized.tobytes())
+        with open(metadata_path, "r+b") as f:
+            f.truncate(metadata_bytes)
+            f.seek(0, os.SEEK_END)
+            metadata_bytes += f.write(self._encode_metadata(metadata))
+
+        version = int(manifest["version"]) + 1
+        new_count = count + int(normalized.shape[0])
+        self._write_manifest({
+            **manifest,
+            "version": version,
+            "count": new_count,
+            "metadata_bytes": metadata_bytes
+        })
+
+        self.version = version
+        self.metadata = self.metadata + list(metadata)
+        self.vectors = np.memmap(vectors_path, dtype=self.dtype, mode="r", shape=(new_count, dimension))
+        return version
+
+    def _normalize(self, matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(self.dtype)
+
+    @staticmethod
+    def _encode_metadata(metadata: Sequence[Dict[str, Any]]) -> bytes:
+        return "".join(
+            json.dumps(entry, default=str, ensure_ascii=False) + "\n"
+            for entry in metadata
+        ).encode("utf-8")
+
+    def _prune_versions(self, keep: set) -> None:
+        """Supprime les anciennes générations (les lecteurs déjà mappés gardent leur inode)"""
+        for pattern in ("vectors-v*.bin", "chunks-v*.jsonl"):
+            for file in self.path.glob(pattern):
+                try:
+                    version = int(file.stem.split("-v", 1)[1])
+                except (IndexError, ValueError):
+                    continue
+                if version not in keep:
+                    try:
+                        file.unlink()
+                    except OSError:
+                        pass
+
+    def search(self, query_vector: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Recherche les k vecteurs les plus proches (similarité cosinus)
+
+        Args:
+            query_vector: Vecteur de requête (non normalisé)
+            k: Nombre de résultats
+
+        Returns:
+            Liste de tuples (index, score) triée par score décroissant
+        """
+        if self.vectors is None or len(self) == 0 or k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        if query.shape[0] != self.dimension:
+            raise ValueError(
+                f"Query vector dimension ({query.shape[0]}) "
+                f"doesn't match store dimension ({self.dimension})"
+            )
+
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+
+        scores = self.vectors @ (query / norm).astype(self.vectors.dtype)
+        return self._top_k(scores.astype(np.float32), k)
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Tuple[int, float]]]:
+        """
+        Recherche groupée : un seul produit matriciel pour toutes les requêtes
+
+        Args:
+            query_vectors: Matrice (n_queries, dimension) de requêtes
+            k: Nombre de résultats par requête
+
+        Returns:
+            Une liste de tuples (index, score) par requête
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if queries.ndim != 2:
+            raise ValueError(f"Invalid query shape: {queries.shape}. Expected (n, dimension)")
+        if self.vectors is None or len(self) == 0 or k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        if queries.shape[1] != self.dimension:
+            raise ValueError(
+                f"Query vector dimension ({queries.shape[1]}) "
+                f"doesn't match store dimension ({self.dimension})"
+            )
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        zero = norms[:, 0] == 0
+        norms[zero] = 1.0
+        scores = (self.vectors @ (queries / norms).astype(self.vectors.dtype).T).astype(np.float32).T
+
+        return [
+            [] if zero[row] else self._top_k(scores[row], k)
+            for row in range(scores.shape[0])
+        ]
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        k = min(k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(int(idx), float(scores[idx])) for idx in top]
@@ -10,6 +10,7 @@ from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import numpy as np
 from collections import Counter
+import heapq
 import math
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,12 @@ class BM25Scorer:
     """
     Implémentation BM25 pour recherche sparse
     BM25 = Best Match 25, algorithme de ranking TF-IDF amélioré
+
+    L'index est inversé : pour chaque terme, une liste de postings
+    {doc_idx: tf} construite une seule fois. Une requête ne touche que les
+    documents contenant au moins un terme de la requête, et le top-k est
+    extrait avec un tas. Les documents peuvent être ajoutés ou retirés
+    sans reconstruire le vocabulaire ; les indices restent stables.
     """
     
     def __init__(self, k1: float = 1.5, b: float = 0.75):
@@ -40,35 +47,111 @@ class BM25Scorer:
         """
         self.k1 = k1
         self.b = b
-        self.corpus = []
-        self.doc_lengths = []
+        self.corpus: List[Optional[str]] = []
+        self.doc_lengths: List[int] = []
         self.avg_doc_length = 0
-        self.idf_scores = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._num_docs = 0
+        self._total_length = 0
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        return text.lower().split()
+
+    @property
+    def num_documents(self) -> int:
+        """Nombre de documents actifs (hors documents retirés)"""
+        return self._num_docs
+
+    @property
+    def idf_scores(self) -> Dict[str, float]:
+        """IDF de chaque terme du vocabulaire, calculé depuis les postings"""
+        return {term: self._idf(len(docs)) for term, docs in self.postings.items()}
+
+    def _idf(self, freq: int) -> float:
+        # IDF = log((N - df(t) + 0.5) / (df(t) + 0.5) + 1)
+        N = self._num_docs
+        return math.log((N - freq + 0.5) / (freq + 0.5) + 1)
+
+    def _update_avg_length(self):
+        self.avg_doc_length = self._total_length / self._num_docs if self._num_docs else 0
         
     def fit(self, documents: List[str]):
         """
-        Calcule les statistiques IDF sur le corpus
+        Construit l'index inversé sur le corpus
         
         Args:
             documents: Liste de documents textuels
         """
-        self.corpus = documents
-        self.doc_lengths = [len(doc.split()) for doc in documents]
-        self.avg_doc_length = sum(self.doc_lengths) / len(self.doc_lengths) if documents else 0
+        self.corpus = []
+        self.doc_lengths = []
+        self.postings = {}
+        self._num_docs = 0
+        self._total_length = 0
+        self.add_documents(documents)
         
-        # Calculer IDF pour chaque terme
-        N = len(documents)
-        df = Counter()  # Document frequency
+        logger.info(f"BM25 fitted on {len(documents)} documents, vocab size: {len(self.postings)}")
+
+    def add_documents(self, documents: List[str]) -> List[int]:
+        """
+        Ajoute des documents à l'index sans le reconstruire
         
+        Args:
+            documents: Liste de documents textuels
+            
+        Returns:
+            Indices attribués aux nouveaux documents
+        """
+        indices = []
         for doc in documents:
-            terms = set(doc.lower().split())
-            df.update(terms)
+            doc_idx = len(self.corpus)
+            terms = self._tokenize(doc)
+            self.corpus.append(doc)
+            self.doc_lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings.setdefault(term, {})[doc_idx] = tf
+            self._num_docs += 1
+            self._total_length += len(terms)
+            indices.append(doc_idx)
         
-        # IDF = log((N - df(t) + 0.5) / (df(t) + 0.5) + 1)
-        for term, freq in df.items():
-            self.idf_scores[term] = math.log((N - freq + 0.5) / (freq + 0.5) + 1)
+        self._update_avg_length()
+        return indices
+
+    def remove_document(self, doc_idx: int) -> bool:
+        """
+        Retire un document de l'index
         
-        logger.info(f"BM25 fitted on {N} documents, vocab size: {len(self.idf_scores)}")
+        L'emplacement du document est conservé (vide) pour que les indices
+        des autres documents restent valides.
+        
+        Args:
+            doc_idx: Index du document dans le corpus
+            
+        Returns:
+            True si le document a été retiré
+        """
+        if doc_idx >= len(self.corpus) or self.corpus[doc_idx] is None:
+            return False
+        
+        for term in set(self._tokenize(self.corpus[doc_idx])):
+            docs = self.postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_idx, None)
+            if not docs:
+                del self.postings[term]
+        
+        self._num_docs -= 1
+        self._total_length -= self.doc_lengths[doc_idx]
+        self.corpus[doc_idx] = None
+        self.doc_lengths[doc_idx] = 0
+        self._update_avg_length()
+        return True
+
+    def _term_weight(self, tf: int, doc_length: int) -> float:
+        # Normalisation par longueur
+        norm = 1 - self.b + self.b * (doc_length / self.avg_doc_length)
+        return (tf * (self.k1 + 1)) / (tf + self.k1 * norm)
     
     def score(self, query: str, doc_idx: int) -> float:
         """
@@ -81,29 +164,20 @@ class BM25Scorer:
         Returns:
             Score BM25
         """
-        if doc_idx >= len(self.corpus):
+        if doc_idx >= len(self.corpus) or self.corpus[doc_idx] is None:
             return 0.0
         
-        doc = self.corpus[doc_idx]
-        doc_terms = doc.lower().split()
-        query_terms = query.lower().split()
-        
         score = 0.0
         doc_length = self.doc_lengths[doc_idx]
         
-        for term in query_terms:
-            if term not in self.idf_scores:
+        for term in self._tokenize(query):
+            docs = self.postings.get(term)
+            if not docs:
                 continue
             
             # Fréquence du terme dans le document
-            tf = doc_terms.count(term)
-            
-            # Normalisation par longueur
-            norm = 1 - self.b + self.b * (doc_length / self.avg_doc_length)
-            
-            # Score BM25 pour ce terme
-            term_score = self.idf_scores[term] * (tf * (self.k1 + 1)) / (tf + self.k1 * norm)
-            score += term_score
+            tf = docs.get(doc_idx, 0)
+            score += self._idf(len(docs)) * self._term_weight(tf, doc_length)
         
         return score
     
@@ -111,6 +185,10 @@ class BM25Scorer:
         """
         Recherche les documents les plus pertinents
         
+        Seuls les documents présents dans les postings des termes de la
+        requête sont scorés. Si moins de top_k documents correspondent, le
+        résultat est complété par des documents de score nul (ordre d'index).
+        
         Args:
             query: Requête utilisateur
             top_k: Nombre de résultats
@@ -118,9 +196,30 @@ class BM25Scorer:
         Returns:
             Liste de tuples (doc_idx, score)
         """
-        scores = [(i, self.score(query, i)) for i in range(len(self.corpus))]
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:top_k]
+        if top_k <= 0:
+            return []
+        
+        scores: Dict[int, float] = {}
+        for term in self._tokenize(query):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            
+            idf = self._idf(len(docs))
+            for doc_idx, tf in docs.items():
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + \
+                    idf * self._term_weight(tf, self.doc_lengths[doc_idx])
+        
+        results = heapq.nlargest(top_k, scores.items(), key=lambda x: (x[1], -x[0]))
+        
+        if len(results) < top_k:
+            for doc_idx, doc in enumerate(self.corpus):
+                if len(results) >= top_k:
+                    break
+                if doc is not None and doc_idx not in scores:
+                    results.append((doc_idx, 0.0))
+        
+        return results
 
 
 class HybridSearcher:
@@ -145,6 +244,8 @@ class HybridSearcher:
         self.sparse_weight = sparse_weight
         self.rrf_k = rrf_k
         self.bm25 = BM25Scorer()
+        self.documents: List[Optional[Dict[str, Any]]] = []
+        self._doc_index: Dict[str, int] = {}
         
         # Normaliser les poids
         total = dense_weight + sparse_weight
@@ -165,9 +266,54 @@ class HybridSearcher:
         """
         corpus = [doc.get('content', '') for doc in documents]
         self.bm25.fit(corpus)
-        self.documents = documents
+        self.documents = list(documents)
+        self._doc_index = {
+            doc.get('id', str(idx)): idx for idx, doc in enumerate(self.documents)
+        }
         logger.info(f"Sparse index fitted on {len(documents)} documents")
     
+    def add_sparse_documents(self, documents: List[Dict[str, Any]]):
+        """
+        Ajoute des documents à l'index BM25 existant (ingestion incrémentale)
+        
+        Les nouveaux documents reçoivent les index suivants du corpus, dans
+        l'ordre fourni ; les embeddings denses doivent suivre le même ordre.
+        
+        Args:
+            documents: Liste de documents avec 'content' et 'id'
+        """
+        indices = self.bm25.add_documents([doc.get('content', '') for doc in documents])
+        for doc_idx, doc in zip(indices, documents):
+            self.documents.append(doc)
+            self._doc_index[doc.get('id', str(doc_idx))] = doc_idx
+        
+        logger.info(
+            f"Sparse index: {len(documents)} documents added, "
+            f"corpus_size={self.bm25.num_documents}"
+        )
+    
+    def remove_sparse_documents(self, doc_ids: List[str]) -> int:
+        """
+        Retire des documents de l'index BM25 par identifiant
+        
+        Args:
+            doc_ids: Identifiants des documents à retirer
+            
+        Returns:
+            Nombre de documents effectivement retirés
+        """
+        removed = 0
+        for doc_id in doc_ids:
+            doc_idx = self._doc_index.pop(doc_id, None)
+            if doc_idx is None:
+                continue
+            if self.bm25.remove_document(doc_idx):
+                self.documents[doc_idx] = None
+                removed += 1
+        
+        logger.info(f"Sparse index: {removed} documents removed")
+        return removed
+    
     async def dense_search(
         self,
         query_embedding: List[float],
@@ -269,12 +415,20 @@ class HybridSearcher:
         Returns:
             Liste de SearchResult fusionnés et classés
         """
+        # Documents retirés (remove_sparse_documents): exclus avant fusion et
+        # troncature pour toujours renvoyer top_k résultats de rangs contigus
+        removed_count = sum(1 for doc in self.documents if doc is None)
+        
+        def is_live(doc_idx: int) -> bool:
+            return doc_idx < len(self.documents) and self.documents[doc_idx] is not None
+        
         # 1. Recherche dense
         dense_results = await self.dense_search(
             query_embedding,
             document_embeddings,
-            top_k=top_k * 2
+            top_k=top_k * 2 + removed_count
         )
+        dense_results = [result for result in dense_results if is_live(result[0])][:top_k * 2]
         
         # 2. Recherche sparse
         sparse_results = self.sparse_search(
@@ -284,13 +438,11 @@ class HybridSearcher:
         
         # 3. Fusion RRF
         fused_results = self.reciprocal_rank_fusion(dense_results, sparse_results)
+        fused_results = [result for result in fused_results if is_live(result[0])]
         
         # 4. Créer SearchResults
         results = []
         for rank, (doc_idx, rrf_score) in enumerate(fused_results[:top_k], start=1):
-            if doc_idx >= len(self.documents):
-                continue
-            
             doc = self.documents[doc_idx]
             results.append(SearchResult(
                 doc_id=doc.get('id', str(doc_idx)),
@@ -315,8 +467,8 @@ class HybridSearcher:
             'dense_weight': self.dense_weight,
             'sparse_weight': self.sparse_weight,
             'rrf_k': self.rrf_k,
-            'corpus_size': len(self.bm25.corpus),
-            'vocab_size': len(self.bm25.idf_scores),
+            'corpus_size': self.bm25.num_documents,
+            'vocab_size': len(self.bm25.postings),
             'avg_doc_length': self.bm25.avg_doc_length
         }
 
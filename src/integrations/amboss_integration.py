@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 import os
 import asyncio
-import aiohttp
 import json
 import logging
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from src.clients.http_pool import pooled_session
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -75,7 +76,7 @@ class AmbossAPIIntegration:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.amboss_api_url) as session:
                 async with session.post(
                     self.amboss_api_url,
                     headers=headers,
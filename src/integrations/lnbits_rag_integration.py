@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 import os
 import asyncio
-import aiohttp
 import json
 import logging
 from datetime import datetime
@@ -9,6 +8,7 @@ from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 from src.rag import RAGWorkflow
 from src.cache_manager import CacheManager
+from src.clients.http_pool import pooled_session
 from src.models import Document as PydanticDocument, QueryHistory as PydanticQueryHistory, SystemStats as PydanticSystemStats
 
 # Configuration du logging
@@ -56,7 +56,7 @@ class LNbitsRAGIntegration:
             await self.mongo_ops.connect()
             
             # Vérification de l'accès à LNbits
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.lnbits_url) as session:
                 async with session.get(
                     f"{self.lnbits_url}/api/v1/health",
                     ssl=self.ssl_context
@@ -99,7 +99,7 @@ class LNbitsRAGIntegration:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(self.lnbits_url) as session:
                 url = f"{self.lnbits_url}/api/v1/{endpoint}"
                 async with session.get(
                     url,
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 import os
 import asyncio
-import aiohttp
 import json
 import logging
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from src.clients.http_pool import pooled_session
+
 # Configuration du logging
 logging.basicConfig(
     level=logging.INFO,
@@ -73,7 +74,7 @@ class LNRouterAPIIntegration:
         url = f"{self.lnrouter_api_url}/{endpoint}"
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(url) as session:
                 if method.upper() == "GET":
                     async with session.get(url, headers=headers, params=params) as response:
                         if response.status == 200:
@@ -20,9 +20,21 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 from src.clients.lnbits_client import LNBitsClient
+from src.lightning.graph_store import LightningGraphStore
 
 logger = logging.getLogger(__name__)
 
+# Champs ajoutés au stockage MongoDB, absents des données LND
+STORED_ONLY_FIELDS = ("_id", "last_updated")
+# Compteur de graph_metadata incrémenté à chaque modification du graphe stocké
+# (clé des caches calculés sur le graphe complet, ex. betweenness du scoring)
+GRAPH_VERSION_ID = "graph_version"
+
+
+def _strip_stored_fields(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Retire les champs propres à MongoDB pour comparer aux données LND"""
+    return {key: value for key, value in document.items() if key not in STORED_ONLY_FIELDS}
+
 
 class NetworkGraphSync:
     """
@@ -33,7 +45,8 @@ class NetworkGraphSync:
         self,
         lnbits_client: LNBitsClient,
         db=None,
-        sync_interval: int = 3600  # 1 heure par défaut
+        sync_interval: int = 3600,  # 1 heure par défaut
+        graph_store: Optional[LightningGraphStore] = None
     ):
         """
         Initialise le synchroniseur.
@@ -42,10 +55,13 @@ class NetworkGraphSync:
             lnbits_client: Client LNBits pour récupérer le graphe
             db: Instance MongoDB (optionnel)
             sync_interval: Intervalle entre syncs (secondes)
+            graph_store: Store de graphe partagé avec les analyseurs (optionnel)
         """
         self.lnbits = lnbits_client
         self.db = db
         self.sync_interval = sync_interval
+        self.graph_store = graph_store or LightningGraphStore()
+        self._metrics_version: Optional[int] = None
         
         # Collections MongoDB
         self.nodes_collection = db["network_nodes"] if db else None
@@ -100,7 +116,7 @@ class NetworkGraphSync:
             
             for node in nodes:
                 try:
-                    await self._store_node(node)
+                    await self._store_node(dict(node))
                     sync_result["nodes_added"] += 1
                 except Exception as e:
                     logger.warning(f"Erreur stockage nœud: {e}")
@@ -112,21 +128,23 @@ class NetworkGraphSync:
             
             for channel in channels:
                 try:
-                    await self._store_channel(channel)
+                    await self._store_channel(dict(channel))
                     sync_result["channels_added"] += 1
                 except Exception as e:
                     logger.warning(f"Erreur stockage canal: {e}")
                     sync_result["errors"].append(str(e))
             
-            # 4. Construire le graphe NetworkX
-            logger.info("Construction du graphe NetworkX...")
-            await self._build_networkx_graph()
+            # 4. Mettre à jour le graphe partagé (deltas uniquement)
+            logger.info("Mise à jour du graphe NetworkX...")
+            self._sync_graph_store(nodes, channels)
             
             # 5. Calculer les métriques topologiques
             logger.info("Calcul des métriques topologiques...")
             await self._calculate_topology_metrics()
             
             # 6. Mise à jour métadonnées
+            if sync_result["nodes_added"] or sync_result["channels_added"]:
+                await self._bump_graph_version()
             self.last_sync = datetime.utcnow()
             sync_result["success"] = True
             sync_result["completed_at"] = self.last_sync.isoformat()
@@ -151,16 +169,98 @@ class NetworkGraphSync:
         """
         Effectue une synchronisation incrémentale (déltas uniquement).
         
+        Le graphe complet est comparé au store en mémoire : seuls les nœuds et
+        canaux modifiés sont écrits dans MongoDB et appliqués au graphe.
+        
         Returns:
             Statistiques de la synchronisation
         """
+        if not self.graph_store.channels:
+            return await self.full_sync()
+        
         logger.info("Synchronisation incrémentale...")
+        start_time = datetime.utcnow()
+        
+        sync_result = {
+            "success": False,
+            "started_at": start_time.isoformat(),
+            "incremental": True,
+            "nodes_updated": 0,
+            "channels_updated": 0,
+            "errors": []
+        }
+        
+        try:
+            graph_data = await self.lnbits.describe_graph()
+            if not graph_data:
+                raise Exception("Pas de données de graphe reçues")
+            
+            nodes = graph_data.get("nodes", [])
+            channels = graph_data.get("edges", [])
+            
+            for node in nodes:
+                if self.graph_store.nodes.get(node.get("pub_key")) == node:
+                    continue
+                try:
+                    await self._store_node(dict(node))
+                    sync_result["nodes_updated"] += 1
+                except Exception as e:
+                    logger.warning(f"Erreur stockage nœud: {e}")
+                    sync_result["errors"].append(str(e))
+            
+            for channel in channels:
+                if self.graph_store.channels.get(channel.get("channel_id")) == channel:
+                    continue
+                try:
+                    await self._store_channel(dict(channel))
+                    sync_result["channels_updated"] += 1
+                except Exception as e:
+                    logger.warning(f"Erreur stockage canal: {e}")
+                    sync_result["errors"].append(str(e))
+            
+            sync_result["graph_changes"] = self._sync_graph_store(nodes, channels)
+            await self._calculate_topology_metrics()
+            if (sync_result["nodes_updated"] or sync_result["channels_updated"]
+                    or any(sync_result["graph_changes"].values())):
+                await self._bump_graph_version()
+            
+            self.last_sync = datetime.utcnow()
+            sync_result["success"] = True
+            sync_result["completed_at"] = self.last_sync.isoformat()
+            sync_result["duration_seconds"] = (self.last_sync - start_time).total_seconds()
+            
+            await self._save_sync_metadata(sync_result)
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la synchronisation incrémentale: {e}")
+            sync_result["error"] = str(e)
         
-        # TODO: Implémenter sync incrémentale via getnetworkinfo + subscribeChannelGraph
-        # Pour l'instant, fallback sur full sync
+        return sync_result
+    
+    def apply_graph_deltas(self, deltas: List[Dict[str, Any]]) -> int:
+        """
+        Applique des deltas gossip (ouverture/fermeture de canal, politique).
+        
+        Args:
+            deltas: Deltas au format LightningGraphStore.apply_deltas
         
-        logger.warning("Incremental sync not implemented, falling back to full sync")
-        return await self.full_sync()
+        Returns:
+            Nombre de deltas appliqués
+        """
+        applied = self.graph_store.apply_deltas(deltas)
+        self.graph = self.graph_store.snapshot().graph
+        return applied
+    
+    def _sync_graph_store(self, nodes: List[Dict[str, Any]], channels: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Aligne le store de graphe sur les données reçues (diff)."""
+        changes = self.graph_store.sync(nodes, channels)
+        self.graph = self.graph_store.snapshot().graph
+        
+        logger.info(
+            f"Graph v{self.graph_store.version}: {self.graph.number_of_nodes()} nœuds, "
+            f"{self.graph.number_of_edges()} arêtes ({changes})"
+        )
+        return changes
     
     async def _store_node(self, node_data: Dict[str, Any]):
         """Stocke un nœud dans MongoDB."""
@@ -201,38 +301,21 @@ class NetworkGraphSync:
         )
     
     async def _build_networkx_graph(self):
-        """Construit le graphe NetworkX à partir des données MongoDB."""
+        """Recharge le graphe à partir des données MongoDB (redémarrage)."""
         if not self.nodes_collection or not self.channels_collection:
             logger.warning("MongoDB non disponible, graph non construit")
             return
         
-        # Créer graph
-        G = nx.Graph()
-        
-        # Ajouter nœuds
-        async for node in self.nodes_collection.find({}):
-            node_id = node.get("pub_key")
-            G.add_node(node_id, **node)
-        
-        # Ajouter arêtes (canaux)
-        async for channel in self.channels_collection.find({}):
-            node1 = channel.get("node1_pub")
-            node2 = channel.get("node2_pub")
-            
-            if node1 and node2 and G.has_node(node1) and G.has_node(node2):
-                G.add_edge(
-                    node1,
-                    node2,
-                    channel_id=channel.get("channel_id"),
-                    capacity=channel.get("capacity", 0)
-                )
+        # Sans les champs de stockage, le prochain incremental_sync ne voit
+        # comme modifiés que les nœuds/canaux qui ont réellement changé
+        nodes = [_strip_stored_fields(node) async for node in self.nodes_collection.find({})]
+        node_ids = {node.get("pub_key") for node in nodes}
+        channels = [
+            _strip_stored_fields(channel) async for channel in self.channels_collection.find({})
+            if channel.get("node1_pub") in node_ids and channel.get("node2_pub") in node_ids
+        ]
         
-        self.graph = G
-        
-        logger.info(
-            f"Graph construit: {G.number_of_nodes()} nœuds, "
-            f"{G.number_of_edges()} arêtes"
-        )
+        self._sync_graph_store(nodes, channels)
     
     async def _calculate_topology_metrics(self):
         """Calcule les métriques topologiques du graphe."""
@@ -240,6 +323,10 @@ class NetworkGraphSync:
             logger.warning("Pas de graphe disponible pour calcul métriques")
             return
         
+        if self._metrics_version == self.graph_store.version:
+            logger.debug("Graphe inchangé, métriques topologiques conservées")
+            return
+        
         G = self.graph
         
         try:
@@ -278,6 +365,7 @@ class NetworkGraphSync:
                 self.stats["avg_path_length"] = 0.0
             
             self.stats["last_updated"] = datetime.utcnow().isoformat()
+            self._metrics_version = self.graph_store.version
             
             logger.info(f"Métriques calculées: {self.stats}")
             
@@ -297,6 +385,17 @@ class NetworkGraphSync:
         
         await self.graph_metadata.insert_one(metadata)
     
+    async def _bump_graph_version(self):
+        """Incrémente la version du graphe stocké (invalide les caches qui en dépendent)."""
+        if not self.graph_metadata:
+            return
+        
+        await self.graph_metadata.update_one(
+            {"_id": GRAPH_VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+    
     def get_node_centrality(self, node_id: str, centrality_type: str = "betweenness") -> Optional[float]:
         """
         Calcule la centralité d'un nœud.
@@ -444,6 +543,9 @@ class NetworkGraphSync:
             "last_updated": {"$lt": cutoff}
         })
         
+        if nodes_result.deleted_count or channels_result.deleted_count:
+            await self._bump_graph_version()
+        
         logger.info(
             f"Cleanup: {nodes_result.deleted_count} nœuds et "
             f"{channels_result.deleted_count} canaux supprimés (> {days} jours)"
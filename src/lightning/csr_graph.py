@@ -0,0 +1,484 @@
+"""
+Représentation compacte (CSR) du graphe Lightning et centralités vectorisées
+
+Les nœuds reçoivent des identifiants entiers 0..n-1 ; l'adjacence est stockée
+en matrice SciPy CSR avec des tableaux parallèles de capacité et de fee_rate.
+Les centralités sont calculées sur ces tableaux :
+
+- degree : longueur des lignes CSR
+- eigenvector : itération de puissance creuse (même schéma que NetworkX, A + I)
+- closeness : BFS multi-sources bit-parallèle (64 sources par mot uint64)
+- betweenness : Brandes niveau par niveau sur les tableaux, échantillonnable (k)
+
+Les résultats sont des dicts {pubkey: valeur} identiques à ceux de NetworkX.
+"""
+
+import logging
+import math
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger("mcp.csr_graph")
+
+# Nombre de mots uint64 (64 sources chacun) traités par lot de BFS bit-parallèle
+BFS_BATCH_WORDS = 16
+
+
+class CSRGraph:
+    """
+    Graphe en adjacence CSR avec index entier des nœuds
+
+    Pour un graphe non-dirigé, chaque arête apparaît dans les deux lignes ;
+    pour un graphe dirigé, seules les arêtes sortantes sont stockées.
+    """
+
+    def __init__(
+        self,
+        nodes: List[Any],
+        adjacency: sparse.csr_matrix,
+        capacity: np.ndarray,
+        fee_rate: np.ndarray,
+        directed: bool = False
+    ):
+        self.nodes = nodes
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.adjacency = adjacency
+        self.indptr = adjacency.indptr
+        self.indices = adjacency.indices
+        self.capacity = capacity
+        self.fee_rate = fee_rate
+        self.directed = directed
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    @classmethod
+    def from_networkx(cls, graph: nx.Graph, fee_graph: Optional[nx.DiGraph] = None) -> "CSRGraph":
+        """
+        Construit la représentation CSR d'un graphe NetworkX
+
+        Args:
+            graph: Graphe source (attribut d'arête 'capacity')
+            fee_graph: Graphe dirigé optionnel fournissant 'fee_rate' par sens
+                (par défaut l'attribut 'fee_rate' de `graph`)
+        """
+        nodes = list(graph.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        fee_source = fee_graph if fee_graph is not None else graph
+
+        rows: List[int] = []
+        cols: List[int] = []
+        capacities: List[float] = []
+        fees: List[float] = []
+        for node, neighbors in graph.adjacency():
+            row = index[node]
+            fee_neighbors = fee_source[node] if node in fee_source else {}
+            for neighbor, data in neighbors.items():
+                if neighbor == node:
+                    continue
+                rows.append(row)
+                cols.append(index[neighbor])
+                capacities.append(data.get('capacity', 0) or 0)
+                fees.append(fee_neighbors.get(neighbor, {}).get('fee_rate', 0) or 0)
+
+        n = len(nodes)
+        order = np.lexsort((cols, rows)) if rows else np.zeros(0, dtype=np.int64)
+        rows_arr = np.asarray(rows, dtype=np.int64)[order]
+        cols_arr = np.asarray(cols, dtype=np.int32)[order]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows_arr, minlength=n), out=indptr[1:])
+
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(cols_arr), dtype=np.float64), cols_arr, indptr),
+            shape=(n, n)
+        )
+        return cls(
+            nodes,
+            adjacency,
+            np.asarray(capacities, dtype=np.float64)[order],
+            np.asarray(fees, dtype=np.float64)[order],
+            directed=graph.is_directed()
+        )
+
+    @classmethod
+    def from_arrays(cls, indptr: np.ndarray, indices: np.ndarray, nodes: Optional[List[Any]] = None) -> "CSRGraph":
+        """Reconstruit un CSRGraph topologique à partir de ses tableaux (ex. dans un worker)"""
+        n = len(indptr) - 1
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), indices, indptr),
+            shape=(n, n)
+        )
+        empty = np.zeros(len(indices), dtype=np.float64)
+        return cls(list(range(n)) if nodes is None else nodes, adjacency, empty, empty)
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[Any, Any]], nodes: Optional[Iterable[Any]] = None) -> "CSRGraph":
+        """
+        Construit un graphe non dirigé simple à partir d'une liste d'arêtes
+
+        Les arêtes multiples (plusieurs canaux entre deux nœuds) sont fusionnées
+        et les boucles ignorées ; les extrémités absentes de `nodes` sont ajoutées.
+
+        Args:
+            edges: Paires (u, v)
+            nodes: Nœuds à inclure, y compris isolés (ordre conservé)
+        """
+        index: Dict[Any, int] = {}
+        for node in nodes or ():
+            index.setdefault(node, len(index))
+        rows: List[int] = []
+        cols: List[int] = []
+        for u, v in edges:
+            if u == v:
+                continue
+            rows.append(index.setdefault(u, len(index)))
+            cols.append(index.setdefault(v, len(index)))
+
+        n = len(index)
+        rows_arr = np.asarray(rows + cols, dtype=np.int32)
+        cols_arr = np.asarray(cols + rows, dtype=np.int32)
+        adjacency = sparse.csr_matrix(
+            (np.ones(len(rows_arr), dtype=np.float64), (rows_arr, cols_arr)),
+            shape=(n, n)
+        )
+        adjacency.sum_duplicates()
+        adjacency.data[:] = 1.0
+        adjacency.sort_indices()
+        empty = np.zeros(adjacency.nnz, dtype=np.float64)
+        return cls(list(index), adjacency, empty, empty)
+
+    def expand(self, frontier: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Retourne les arêtes (source, voisin) sortant des nœuds de la frontière"""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return np.repeat(frontier, counts), self.indices[offsets].astype(np.int64)
+
+    def to_dict(self, values: Iterable[float]) -> Dict[Any, float]:
+        return {node: float(value) for node, value in zip(self.nodes, values)}
+
+    def sample_sources(self, k: Optional[int], seed: Optional[int] = None) -> Optional[List[int]]:
+        """Échantillonne k sources comme NetworkX (random.sample sur la liste des nœuds)"""
+        if k is None or k >= len(self.nodes):
+            return None
+        sampled = random.Random(seed).sample(self.nodes, k)
+        return [self.index[node] for node in sampled]
+
+    def bfs_levels(self, sources: np.ndarray):
+        """
+        BFS multi-sources bit-parallèle
+
+        Chaque source occupe un bit d'une matrice (n, mots) de uint64 ; un niveau
+        de BFS est un OU des frontières voisines via np.bitwise_or.reduceat sur
+        les lignes CSR.
+
+        Yields:
+            (distance, counts) où counts[j] est le nombre de nœuds découverts à
+            cette distance depuis sources[j]
+        """
+        n = len(self.nodes)
+        batch = len(sources)
+        words = (batch + 63) // 64
+        bit_positions = np.arange(batch)
+
+        frontier = np.zeros((n, words), dtype='<u8')
+        np.bitwise_or.at(
+            frontier,
+            (sources, bit_positions // 64),
+            np.left_shift(np.uint64(1), (bit_positions % 64).astype(np.uint64))
+        )
+        visited = frontier.copy()
+
+        nonempty = self.degrees > 0
+        segment_starts = self.indptr[:-1][nonempty]
+
+        distance = 0
+        while self.indices.size and frontier.any():
+            distance += 1
+            reached = np.zeros_like(frontier)
+            reached[nonempty] = np.bitwise_or.reduceat(frontier[self.indices], segment_starts, axis=0)
+            reached &= ~visited
+            visited |= reached
+
+            active = reached.any(axis=1)
+            if not active.any():
+                break
+            counts = np.unpackbits(
+                reached[active].view(np.uint8), axis=1, bitorder='little'
+            ).sum(axis=0, dtype=np.int64)[:batch]
+            yield distance, counts
+            frontier = reached
+
+    def distance_sums(self, sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nombre de nœuds atteignables et somme des distances depuis chaque source
+
+        Returns:
+            (reachable, totals), reachable incluant la source elle-même
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        reachable = np.ones(len(sources), dtype=np.int64)
+        totals = np.zeros(len(sources), dtype=np.int64)
+        step = BFS_BATCH_WORDS * 64
+        for start in range(0, len(sources), step):
+            chunk = slice(start, start + step)
+            for distance, counts in self.bfs_levels(sources[chunk]):
+                reachable[chunk] += counts
+                totals[chunk] += distance * counts
+        return reachable, totals
+
+    def distance_histograms(self, sources: np.ndarray) -> np.ndarray:
+        """
+        Histogramme des distances depuis chaque source
+
+        Returns:
+            Matrice (len(sources), distance_max + 1) : ligne j = nombre de nœuds
+            à chaque distance de sources[j] (colonne 0 = la source elle-même)
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        levels: List[np.ndarray] = [np.ones(len(sources), dtype=np.int64)]
+        step = BFS_BATCH_WORDS * 64
+        for start in range(0, len(sources), step):
+            chunk = slice(start, start + step)
+            for distance, counts in self.bfs_levels(sources[chunk]):
+                while len(levels) <= distance:
+                    levels.append(np.zeros(len(sources), dtype=np.int64))
+                levels[distance][chunk] = counts
+        return np.stack(levels, axis=1)
+
+
+def degree_centrality(csr: CSRGraph) -> Dict[Any, float]:
+    """Équivalent de nx.degree_centrality"""
+    n = len(csr)
+    if n <= 1:
+        return {node: 1.0 for node in csr.nodes}
+    return csr.to_dict(csr.degrees / (n - 1))
+
+
+def eigenvector_centrality(
+    csr: CSRGraph,
+    max_iter: int = 100,
+    tol: float = 1.0e-6
+) -> Dict[Any, float]:
+    """
+    Équivalent de nx.eigenvector_centrality (non pondéré) par itération de
+    puissance creuse sur A^T + I
+
+    Raises:
+        nx.NetworkXPointlessConcept: graphe vide
+        nx.PowerIterationFailedConvergence: pas de convergence en max_iter
+    """
+    n = len(csr)
+    if n == 0:
+        raise nx.NetworkXPointlessConcept("cannot compute centrality for the null graph")
+
+    transposed = csr.adjacency.T.tocsr()
+    x = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = x
+        x = previous + transposed @ previous
+        norm = np.sqrt(np.dot(x, x)) or 1.0
+        x = x / norm
+        if np.abs(x - previous).sum() < n * tol:
+            return csr.to_dict(x)
+    raise nx.PowerIterationFailedConvergence(max_iter)
+
+
+def closeness_centrality(
+    csr: CSRGraph,
+    k: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Dict[Any, float]:
+    """
+    Équivalent de nx.closeness_centrality (wf_improved) pour un graphe non-dirigé
+
+    Avec k, la closeness est estimée à partir de k sources échantillonnées :
+    les distances étant symétriques, chaque BFS source alimente la somme des
+    distances de tous les nœuds qu'il atteint (extrapolée d'un facteur n/k).
+    """
+    n = len(csr)
+    if n <= 1:
+        return {node: 0.0 for node in csr.nodes}
+
+    sampled = csr.sample_sources(k, seed)
+    if sampled is None:
+        reachable, totals = csr.distance_sums(np.arange(n))
+        others = reachable - 1
+    else:
+        others, totals = _sampled_distance_sums(csr, np.asarray(sampled, dtype=np.int64))
+
+    closeness = np.zeros(n)
+    mask = totals > 0
+    closeness[mask] = (others[mask] / totals[mask]) * (others[mask] / (n - 1))
+    return csr.to_dict(closeness)
+
+
+def _sampled_distance_sums(csr: CSRGraph, sources: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Estime (nœuds atteignables hors soi, somme des distances) depuis un échantillon"""
+    n = len(csr)
+    reached = np.zeros(n)
+    totals = np.zeros(n)
+    for source in sources:
+        distances = _bfs_distances(csr, int(source))
+        seen = distances > 0
+        reached[seen] += 1
+        totals[seen] += distances[seen]
+
+    # Une source ne se compte pas elle-même : normaliser sur k - 1 pour ses propres valeurs
+    scale = np.full(n, (n - 1) / len(sources))
+    if len(sources) > 1:
+        scale[sources] = (n - 1) / (len(sources) - 1)
+    else:
+        scale[sources] = 0.0
+    return np.rint(reached * scale).astype(np.int64), totals * scale
+
+
+def _bfs_distances(csr: CSRGraph, source: int) -> np.ndarray:
+    """Distances BFS depuis une source (-1 si inatteignable)"""
+    distances = np.full(len(csr), -1, dtype=np.int64)
+    distances[source] = 0
+    frontier = np.array([source], dtype=np.int64)
+    distance = 0
+    while frontier.size:
+        distance += 1
+        _, neighbors = csr.expand(frontier)
+        neighbors = np.unique(neighbors[distances[neighbors] == -1])
+        distances[neighbors] = distance
+        frontier = neighbors
+    return distances
+
+
+def betweenness_centrality(
+    csr: CSRGraph,
+    k: Optional[int] = None,
+    normalized: bool = True,
+    seed: Optional[int] = None
+) -> Dict[Any, float]:
+    """
+    Équivalent de nx.betweenness_centrality (non pondéré, sans extrémités)
+
+    Algorithme de Brandes : le BFS et l'accumulation des dépendances sont
+    vectorisés niveau par niveau sur les arêtes du DAG des plus courts chemins.
+    Avec k, les sources sont échantillonnées comme NetworkX (même seed, mêmes
+    sources) et la mise à l'échelle suit nx (sources / non-sources).
+    """
+    n = len(csr)
+    sampled = csr.sample_sources(k, seed)
+    sources = range(n) if sampled is None else sampled
+
+    betweenness = np.zeros(n)
+    for source in sources:
+        betweenness += _source_dependencies(csr, source)
+
+    _rescale(betweenness, n, normalized, csr.directed, sampled)
+    return csr.to_dict(betweenness)
+
+
+def betweenness_sample_size(
+    n: int,
+    epsilon: float,
+    delta: float,
+    max_sources: Optional[int] = None
+) -> Optional[int]:
+    """
+    Nombre de sources à échantillonner pour une betweenness normalisée à
+    ±epsilon près sur tous les nœuds avec une probabilité d'au moins 1 - delta
+
+    Chaque source contribue delta_s(v) / (n - 2) dans [0, 1] : borne de
+    Hoeffding et union sur les n nœuds, k = ln(2n / delta) / (2 epsilon²).
+    max_sources plafonne k, donc le temps de calcul, quelle que soit la taille
+    du graphe : sous le plafond, l'erreur garantie est celle de
+    betweenness_error_bound et non plus epsilon.
+    Retourne None quand k couvre le graphe (calcul exact moins coûteux).
+    """
+    if n <= 2 or epsilon <= 0:
+        return None
+    k = math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2))
+    if max_sources is not None:
+        k = min(k, max(1, max_sources))
+    return k if k < n else None
+
+
+def betweenness_error_bound(n: int, k: Optional[int], delta: float) -> float:
+    """
+    Erreur absolue garantie (probabilité 1 - delta) d'une betweenness normalisée
+    estimée sur k sources : inverse de betweenness_sample_size,
+    epsilon = sqrt(ln(2n / delta) / (2k)). 0 pour un calcul exact (k None).
+    """
+    if k is None or n <= 2:
+        return 0.0
+    return math.sqrt(math.log(2 * n / delta) / (2 * k))
+
+
+def _source_dependencies(csr: CSRGraph, source: int) -> np.ndarray:
+    """Dépendances de Brandes delta_s(v) pour une source"""
+    n = len(csr)
+    distances = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n)
+    distances[source] = 0
+    sigma[source] = 1.0
+
+    dag_levels = []
+    frontier = np.array([source], dtype=np.int64)
+    depth = 0
+    while frontier.size:
+        sources, neighbors = csr.expand(frontier)
+        discovered = np.unique(neighbors[distances[neighbors] == -1])
+        distances[discovered] = depth + 1
+
+        on_dag = distances[neighbors] == depth + 1
+        sources, neighbors = sources[on_dag], neighbors[on_dag]
+        if sources.size:
+            sigma += np.bincount(neighbors, weights=sigma[sources], minlength=n)
+            dag_levels.append((sources, neighbors))
+        frontier = discovered
+        depth += 1
+
+    delta = np.zeros(n)
+    for sources, neighbors in reversed(dag_levels):
+        contributions = sigma[sources] / sigma[neighbors] * (1.0 + delta[neighbors])
+        delta += np.bincount(sources, weights=contributions, minlength=n)
+    delta[source] = 0.0
+    return delta
+
+
+def _rescale(
+    betweenness: np.ndarray,
+    n: int,
+    normalized: bool,
+    directed: bool,
+    sampled: Optional[List[int]]
+) -> None:
+    """Mise à l'échelle de NetworkX (endpoints=False)"""
+    N = n - 1
+    if N < 2:
+        return
+
+    correction = 1 if directed else 2
+    if sampled is None:
+        betweenness *= 1 / (N * (N - 1)) if normalized else N / (N * correction)
+        return
+
+    k = len(sampled)
+    if normalized:
+        scale_source = 1 / ((k - 1) * (N - 1)) if k > 1 else math.nan
+        scale_nonsource = 1 / (k * (N - 1))
+    else:
+        scale_source = N / ((k - 1) * correction) if k > 1 else math.nan
+        scale_nonsource = N / (k * correction)
+
+    is_source = np.zeros(n, dtype=bool)
+    is_source[sampled] = True
+    betweenness *= np.where(is_source, scale_source, scale_nonsource)
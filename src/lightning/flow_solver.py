@@ -0,0 +1,156 @@
+"""
+Solveur max flow réutilisable sur graphe résiduel en tableaux (SciPy CSR)
+
+Le graphe de liquidité est converti une seule fois par version du store en
+matrice CSR de capacités entières ; chaque paire (source, target) est résolue
+par l'algorithme de Dinic de scipy.sparse.csgraph puis mise en cache. Le flow
+ne dépendant pas du montant, une seule résolution répond à tous les montants
+d'un balayage de probabilité de paiement.
+"""
+
+import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import maximum_flow
+
+from src.lightning.csr_graph import CSRGraph
+
+logger = logging.getLogger("mcp.flow_solver")
+
+# scipy.sparse.csgraph.maximum_flow travaille en int32
+INT32_MAX = np.iinfo(np.int32).max
+DEFAULT_MAX_CACHED_FLOWS = 1024
+
+
+@dataclass(frozen=True)
+class FlowResult:
+    """
+    Flow maximal d'une paire (source, target)
+
+    Seules les arêtes portant un flow positif sont conservées (en sats).
+    """
+    source: Any
+    target: Any
+    value: int
+    edges: Tuple[Tuple[Any, Any, int], ...]
+
+    def flow_dict(self) -> Dict[Any, Dict[Any, int]]:
+        """Dictionnaire {u: {v: flow}} au format de nx.maximum_flow (flows positifs)"""
+        flows: Dict[Any, Dict[Any, int]] = {}
+        for u, v, amount in self.edges:
+            flows.setdefault(u, {})[v] = amount
+        return flows
+
+    def success_probability(self, amount: Optional[int] = None) -> float:
+        """Probabilité de succès d'un paiement de `amount` sats (flow / amount)"""
+        if amount:
+            return min(1.0, self.value / amount) if amount > 0 else 1.0
+        return 1.0 if self.value > 0 else 0.0
+
+
+class MaxFlowSolver:
+    """
+    Max flow par paire sur une version figée du graphe de liquidité
+
+    Si la capacité cumulée d'un nœud dépasse l'int32, les capacités sont
+    exprimées dans une unité de 2^k sats (arrondi inférieur) : les flows
+    retournés sont alors des bornes inférieures à `unit` sats près par canal.
+    """
+
+    def __init__(
+        self,
+        graph: nx.DiGraph,
+        version: int = 0,
+        max_cached_flows: int = DEFAULT_MAX_CACHED_FLOWS
+    ):
+        self.version = version
+        self.csr = CSRGraph.from_networkx(graph)
+        self.max_cached_flows = max_cached_flows
+        self._cache: "OrderedDict[Tuple[Any, Any], FlowResult]" = OrderedDict()
+
+        capacities = np.maximum(self.csr.capacity, 0)
+        self.unit = self._capacity_unit(capacities)
+        if self.unit > 1:
+            logger.debug(f"Capacités exprimées en unités de {self.unit} sats (int32)")
+
+        n = len(self.csr)
+        self._capacity_matrix = sparse.csr_matrix(
+            ((capacities // self.unit).astype(np.int32), self.csr.indices, self.csr.indptr),
+            shape=(n, n)
+        )
+
+    def _capacity_unit(self, capacities: np.ndarray) -> int:
+        """Plus petite puissance de 2 gardant les capacités cumulées par nœud en int32"""
+        if capacities.size == 0:
+            return 1
+        rows = np.repeat(np.arange(len(self.csr)), self.csr.degrees)
+        outbound = np.bincount(rows, weights=capacities, minlength=len(self.csr))
+        inbound = np.bincount(self.csr.indices, weights=capacities, minlength=len(self.csr))
+        total = max(outbound.max(), inbound.max())
+        if total <= INT32_MAX:
+            return 1
+        return 2 ** math.ceil(math.log2(total / INT32_MAX))
+
+    def __contains__(self, node: Any) -> bool:
+        return node in self.csr.index
+
+    def solve(self, source: Any, target: Any) -> FlowResult:
+        """
+        Flow maximal de source vers target (mis en cache pour cette version)
+
+        Raises:
+            nx.NodeNotFound: source ou target absent du graphe
+            nx.NetworkXError: source et target identiques
+        """
+        key = (source, target)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        for node in key:
+            if node not in self.csr.index:
+                raise nx.NodeNotFound(f"Node {node} not in graph")
+        if source == target:
+            raise nx.NetworkXError("source and sink are the same node")
+
+        solution = maximum_flow(
+            self._capacity_matrix,
+            self.csr.index[source],
+            self.csr.index[target],
+            method='dinic'
+        )
+
+        flow = solution.flow.tocoo()
+        positive = flow.data > 0
+        nodes = self.csr.nodes
+        edges = tuple(
+            (nodes[u], nodes[v], int(amount) * self.unit)
+            for u, v, amount in zip(flow.row[positive], flow.col[positive], flow.data[positive])
+        )
+        result = FlowResult(source, target, int(solution.flow_value) * self.unit, edges)
+
+        self._cache[key] = result
+        if len(self._cache) > self.max_cached_flows:
+            self._cache.popitem(last=False)
+        return result
+
+    def max_flow_values(self, source: Any, targets: Iterable[Any]) -> Dict[Any, int]:
+        """Valeurs de max flow d'une source vers plusieurs targets (cibles inconnues ignorées)"""
+        values = {}
+        for target in targets:
+            if target == source or target not in self.csr.index or source not in self.csr.index:
+                continue
+            values[target] = self.solve(source, target).value
+        return values
+
+    def success_probabilities(self, source: Any, target: Any, amounts: List[int]) -> Dict[int, float]:
+        """Probabilités de succès pour plusieurs montants à partir d'un seul flow"""
+        result = self.solve(source, target)
+        return {amount: result.success_probability(amount) for amount in amounts}
@@ -0,0 +1,356 @@
+"""
+Store partagé du graphe Lightning Network avec mises à jour incrémentales
+Ingère des deltas de type gossip (ouverture/fermeture de canal, mise à jour de
+politique, annonce de nœud) et expose des snapshots versionnés consommés par
+LightningGraphAnalyzer, LightningMaxFlowAnalyzer et NetworkGraphSync.
+"""
+
+import networkx as nx
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+from dataclasses import dataclass
+import threading
+import logging
+
+logger = logging.getLogger("mcp.graph_store")
+
+
+@dataclass(frozen=True)
+class GraphSnapshot:
+    """
+    État figé du graphe à une version donnée
+
+    Les graphes sont des copies gelées (nx.freeze) et les dictionnaires des
+    copies : un delta appliqué au store pendant une analyse ne modifie pas un
+    snapshot déjà distribué. La copie n'est faite qu'une fois par version.
+
+    - graph: graphe non-dirigé (capacité totale du canal)
+    - directed_graph: graphe dirigé des politiques (capacité, fee_rate)
+    - liquidity_graph: graphe dirigé de liquidité (capacity = balance sortante)
+    """
+    version: int
+    graph: nx.Graph
+    directed_graph: nx.DiGraph
+    liquidity_graph: nx.DiGraph
+    node_features: Dict[str, Dict[str, Any]]
+    channel_capacities: Dict[Any, int]
+    channel_balances: Dict[Any, Tuple[int, int]]
+
+
+def _node_pubkey(node: Dict[str, Any]) -> Optional[str]:
+    return node.get('pubkey') or node.get('pub_key')
+
+
+def _node_features(node: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'alias': node.get('alias', ''),
+        'color': node.get('color', ''),
+        'capacity': node.get('total_capacity', 0),
+        'num_channels': node.get('num_channels', 0),
+        'last_update': node.get('last_update', 0)
+    }
+
+
+def _channel_fee_rate(channel: Dict[str, Any], side: str) -> int:
+    """Fee rate d'un côté du canal (format plat ou politique LND)"""
+    if f'{side}_fee_rate' in channel:
+        return channel.get(f'{side}_fee_rate') or 0
+    policy = channel.get(f'{side}_policy') or {}
+    return int(policy.get('fee_rate_milli_msat', 0) or 0)
+
+
+class LightningGraphStore:
+    """
+    Graphe Lightning maintenu incrémentalement
+
+    Les graphes NetworkX sont modifiés sur place à chaque delta au lieu d'être
+    reconstruits ; chaque modification effective incrémente `version`. Les
+    consommateurs comparent la version de leur snapshot pour savoir si leurs
+    caches dérivés (centralités, max flow...) sont encore valides.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.channels: Dict[Any, Dict[str, Any]] = {}
+
+        self._graph = nx.Graph()
+        self._directed_graph = nx.DiGraph()
+        self._liquidity_graph = nx.DiGraph()
+        self._node_features: Dict[str, Dict[str, Any]] = {}
+        self._channel_capacities: Dict[Any, int] = {}
+        self._channel_balances: Dict[Any, Tuple[int, int]] = {}
+        # Canaux ouverts par paire de nœuds (plusieurs canaux possibles)
+        self._pair_channels: Dict[frozenset, List[Any]] = {}
+
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._lock = threading.RLock()
+
+    def snapshot(self) -> GraphSnapshot:
+        """Retourne le snapshot de la version courante (mis en cache par version)"""
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != self.version:
+                self._snapshot = GraphSnapshot(
+                    version=self.version,
+                    graph=nx.freeze(self._graph.copy()),
+                    directed_graph=nx.freeze(self._directed_graph.copy()),
+                    liquidity_graph=nx.freeze(self._liquidity_graph.copy()),
+                    node_features={pubkey: dict(features) for pubkey, features in self._node_features.items()},
+                    channel_capacities=dict(self._channel_capacities),
+                    channel_balances=dict(self._channel_balances)
+                )
+            return self._snapshot
+
+    def sync(self, nodes: List[Dict], channels: List[Dict]) -> Dict[str, int]:
+        """
+        Aligne le store sur des listes complètes de nœuds et canaux
+
+        Seules les différences avec l'état courant sont appliquées : un appel
+        répété avec les mêmes données ne modifie rien et ne change pas la version.
+
+        Returns:
+            Compteurs des changements appliqués
+        """
+        with self._lock:
+            stats = {
+                'nodes_upserted': 0,
+                'nodes_removed': 0,
+                'channels_upserted': 0,
+                'channels_closed': 0
+            }
+
+            incoming_nodes = {}
+            for node in nodes:
+                pubkey = _node_pubkey(node)
+                if pubkey:
+                    incoming_nodes[pubkey] = node
+
+            incoming_channels = {}
+            for channel in channels:
+                chan_id = channel.get('channel_id')
+                if chan_id is not None and channel.get('node1_pub') and channel.get('node2_pub'):
+                    incoming_channels[chan_id] = channel
+
+            for chan_id in [c for c in self.channels if c not in incoming_channels]:
+                if self.close_channel(chan_id):
+                    stats['channels_closed'] += 1
+
+            for pubkey, node in incoming_nodes.items():
+                if self.nodes.get(pubkey) != node and self.upsert_node(node):
+                    stats['nodes_upserted'] += 1
+
+            for chan_id, channel in incoming_channels.items():
+                if self.channels.get(chan_id) != channel and self.upsert_channel(channel):
+                    stats['channels_upserted'] += 1
+
+            # Nœuds qui ne sont plus annoncés et sans canal restant
+            for pubkey in [p for p in self.nodes if p not in incoming_nodes]:
+                if self.remove_node(pubkey):
+                    stats['nodes_removed'] += 1
+
+            if any(stats.values()):
+                logger.info(f"Graph store synchronisé (v{self.version}): {stats}")
+            return stats
+
+    def apply_deltas(self, deltas: Iterable[Dict[str, Any]]) -> int:
+        """
+        Applique une séquence de deltas gossip
+
+        Types supportés: node_announcement, node_removed, channel_open,
+        channel_close, policy_update.
+
+        Returns:
+            Nombre de deltas ayant modifié le graphe
+        """
+        applied = 0
+        with self._lock:
+            for delta in deltas:
+                delta_type = delta.get('type')
+                if delta_type == 'node_announcement':
+                    changed = self.upsert_node(delta.get('node', delta))
+                elif delta_type == 'node_removed':
+                    changed = self.remove_node(delta['pubkey'])
+                elif delta_type == 'channel_open':
+                    changed = self.upsert_channel(delta.get('channel', delta))
+                elif delta_type == 'channel_close':
+                    changed = self.close_channel(delta['channel_id'])
+                elif delta_type == 'policy_update':
+                    changed = self.update_policy(
+                        delta['channel_id'],
+                        delta['node_pub'],
+                        fee_rate=delta.get('fee_rate'),
+                        balance=delta.get('balance')
+                    )
+                else:
+                    logger.warning(f"Delta de graphe inconnu ignoré: {delta_type}")
+                    continue
+                applied += int(bool(changed))
+        return applied
+
+    def upsert_node(self, node: Dict[str, Any]) -> bool:
+        """Ajoute ou met à jour un nœud (annonce)"""
+        pubkey = _node_pubkey(node)
+        if not pubkey:
+            return False
+
+        with self._lock:
+            if self.nodes.get(pubkey) == node:
+                return False
+
+            features = _node_features(node)
+            self.nodes[pubkey] = node
+            self._node_features[pubkey] = features
+
+            self._graph.add_node(pubkey, **features)
+            self._directed_graph.add_node(pubkey, **features)
+            self._liquidity_graph.add_node(pubkey, **node)
+
+            self.version += 1
+            return True
+
+    def remove_node(self, pubkey: str) -> bool:
+        """Retire un nœud annoncé ; conservé dans le graphe s'il a encore des canaux"""
+        with self._lock:
+            if pubkey not in self.nodes:
+                return False
+
+            del self.nodes[pubkey]
+            self._node_features.pop(pubkey, None)
+
+            if self._graph.has_node(pubkey) and self._graph.degree(pubkey) == 0:
+                self._graph.remove_node(pubkey)
+                self._directed_graph.remove_node(pubkey)
+                self._liquidity_graph.remove_node(pubkey)
+
+            self.version += 1
+            return True
+
+    def upsert_channel(self, channel: Dict[str, Any]) -> bool:
+        """Ouvre un canal ou remplace ses attributs"""
+        chan_id = channel.get('channel_id')
+        node1 = channel.get('node1_pub')
+        node2 = channel.get('node2_pub')
+        if chan_id is None or not node1 or not node2:
+            return False
+
+        with self._lock:
+            previous = self.channels.get(chan_id)
+            if previous == channel:
+                return False
+            if previous is not None and {previous['node1_pub'], previous['node2_pub']} != {node1, node2}:
+                self.close_channel(chan_id)
+
+            self.channels[chan_id] = channel
+            pair_channels = self._pair_channels.setdefault(frozenset((node1, node2)), [])
+            if chan_id in pair_channels:
+                pair_channels.remove(chan_id)
+            pair_channels.append(chan_id)
+
+            self._apply_channel_edges(channel)
+            self.version += 1
+            return True
+
+    def close_channel(self, chan_id: Any) -> bool:
+        """Ferme un canal ; l'arête reste si un autre canal relie la même paire"""
+        with self._lock:
+            channel = self.channels.pop(chan_id, None)
+            if channel is None:
+                return False
+
+            node1, node2 = channel['node1_pub'], channel['node2_pub']
+            pair = frozenset((node1, node2))
+            pair_channels = self._pair_channels.get(pair, [])
+            if chan_id in pair_channels:
+                pair_channels.remove(chan_id)
+
+            self._channel_capacities.pop(chan_id, None)
+            self._channel_balances.pop(chan_id, None)
+
+            if pair_channels:
+                # Le canal le plus récemment mis à jour porte les attributs de l'arête
+                self._apply_channel_edges(self.channels[pair_channels[-1]])
+            else:
+                del self._pair_channels[pair]
+                if self._graph.has_edge(node1, node2):
+                    self._graph.remove_edge(node1, node2)
+                for graph in (self._directed_graph, self._liquidity_graph):
+                    if graph.has_edge(node1, node2):
+                        graph.remove_edge(node1, node2)
+                    if graph.has_edge(node2, node1):
+                        graph.remove_edge(node2, node1)
+                self._drop_orphan_nodes((node1, node2))
+
+            self.version += 1
+            return True
+
+    def update_policy(
+        self,
+        chan_id: Any,
+        node_pub: str,
+        fee_rate: Optional[int] = None,
+        balance: Optional[int] = None
+    ) -> bool:
+        """Met à jour la politique (fee rate) ou la balance d'un côté du canal"""
+        with self._lock:
+            channel = self.channels.get(chan_id)
+            if channel is None:
+                return False
+
+            if node_pub == channel['node1_pub']:
+                side = 'node1'
+            elif node_pub == channel['node2_pub']:
+                side = 'node2'
+            else:
+                return False
+
+            updated = dict(channel)
+            if fee_rate is not None:
+                updated[f'{side}_fee_rate'] = fee_rate
+            if balance is not None:
+                capacity = int(updated.get('capacity', 0) or 0)
+                updated['node1_balance'] = balance if side == 'node1' else capacity - balance
+            if updated == channel:
+                return False
+
+            return self.upsert_channel(updated)
+
+    def _apply_channel_edges(self, channel: Dict[str, Any]) -> None:
+        node1 = channel['node1_pub']
+        node2 = channel['node2_pub']
+        chan_id = channel['channel_id']
+        capacity = int(channel.get('capacity', 0) or 0)  # LND renvoie des chaînes
+        fee1 = _channel_fee_rate(channel, 'node1')
+        fee2 = _channel_fee_rate(channel, 'node2')
+        balance1 = channel.get('node1_balance', capacity // 2)  # Estimation si inconnue
+        balance2 = capacity - balance1
+
+        self._graph.add_edge(node1, node2, capacity=capacity, channel_id=chan_id)
+
+        self._directed_graph.add_edge(node1, node2, capacity=capacity, fee_rate=fee1, channel_id=chan_id)
+        self._directed_graph.add_edge(node2, node1, capacity=capacity, fee_rate=fee2, channel_id=chan_id)
+
+        self._liquidity_graph.add_edge(node1, node2, channel_id=chan_id, capacity=balance1, fee_rate=fee1)
+        self._liquidity_graph.add_edge(node2, node1, channel_id=chan_id, capacity=balance2, fee_rate=fee2)
+
+        self._channel_capacities[chan_id] = capacity
+        self._channel_balances[chan_id] = (balance1, balance2)
+
+    def _drop_orphan_nodes(self, pubkeys: Iterable[str]) -> None:
+        """Retire les nœuds non annoncés qui n'ont plus aucun canal"""
+        for pubkey in pubkeys:
+            if pubkey not in self.nodes and self._graph.has_node(pubkey) and self._graph.degree(pubkey) == 0:
+                self._graph.remove_node(pubkey)
+                self._directed_graph.remove_node(pubkey)
+                self._liquidity_graph.remove_node(pubkey)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du store"""
+        return {
+            'version': self.version,
+            'nodes': self._graph.number_of_nodes(),
+            'channels': len(self.channels),
+            'edges': self._graph.number_of_edges()
+        }
+
+
+# Store partagé par les routes d'analyse (un seul graphe mainnet en mémoire)
+lightning_graph_store = LightningGraphStore()
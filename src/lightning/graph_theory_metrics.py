@@ -9,62 +9,156 @@ from typing import Dict, List, Tuple, Any, Optional
 from collections import defaultdict
 import logging
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+import threading
+import atexit
 import math
+import os
+
+from src.lightning.graph_store import LightningGraphStore, GraphSnapshot
+from src.lightning import csr_graph
+from src.lightning.csr_graph import CSRGraph
 
 logger = logging.getLogger("mcp.graph_theory")
 
+# Graphe CSR des workers du pool de processus (lu en mémoire partagée à l'initialisation)
+_worker_csr: Optional[CSRGraph] = None
+_worker_segments: List[shared_memory.SharedMemory] = []
+
+
+class SharedCSRArrays:
+    """Tableaux indptr/indices d'un CSR copiés une fois en mémoire partagée pour les workers"""
+
+    def __init__(self, csr: CSRGraph):
+        self.segments: List[shared_memory.SharedMemory] = []
+        self.specs: List[Tuple[str, int, str]] = []
+        for array in (csr.indptr, csr.indices):
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[:] = array
+            self.segments.append(segment)
+            self.specs.append((segment.name, len(array), array.dtype.str))
+
+    def release(self) -> None:
+        """Libère les segments (à appeler une fois les workers arrêtés)"""
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+
+def _init_hopness_worker(specs: List[Tuple[str, int, str]]) -> None:
+    """Initialise un worker avec les tableaux CSR du snapshot, sans copie"""
+    global _worker_csr
+    arrays = []
+    for name, length, dtype in specs:
+        segment = shared_memory.SharedMemory(name=name)
+        _worker_segments.append(segment)
+        arrays.append(np.ndarray((length,), dtype=np.dtype(dtype), buffer=segment.buf))
+    _worker_csr = CSRGraph.from_arrays(*arrays)
+
+
+def _hopness_histograms(sources: np.ndarray) -> np.ndarray:
+    """Calcule dans un worker les histogrammes de distances d'un lot de sources"""
+    return _worker_csr.distance_histograms(sources)
+
+
+def _process_pool_context():
+    """
+    Préfère forkserver, sinon spawn : jamais fork
+
+    Le pool est créé à la demande depuis un thread (asyncio.to_thread) d'un
+    processus multi-threadé ; un fork y copierait des verrous tenus par les
+    autres threads et pourrait bloquer les workers.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+# Pool de processus hopness partagé : créé une fois par snapshot CSR et
+# réutilisé par les appels suivants au lieu d'un démarrage à chaque calcul
+_hopness_pool: Optional[ProcessPoolExecutor] = None
+_hopness_pool_key: Optional[Tuple[CSRGraph, int]] = None
+_hopness_pool_arrays: Optional[SharedCSRArrays] = None
+_hopness_pool_lock = threading.Lock()
+
+
+def _release_hopness_pool() -> None:
+    """Arrête les workers puis libère la mémoire partagée (verrou du pool tenu)"""
+    global _hopness_pool, _hopness_pool_key, _hopness_pool_arrays
+    if _hopness_pool is not None:
+        _hopness_pool.shutdown(wait=True)
+    if _hopness_pool_arrays is not None:
+        _hopness_pool_arrays.release()
+    _hopness_pool = None
+    _hopness_pool_key = None
+    _hopness_pool_arrays = None
+
+
+def _get_hopness_pool(csr: CSRGraph, workers: int) -> ProcessPoolExecutor:
+    """Retourne le pool des workers initialisés avec `csr`, recréé si le CSR change"""
+    global _hopness_pool, _hopness_pool_key, _hopness_pool_arrays
+    with _hopness_pool_lock:
+        if _hopness_pool is None or _hopness_pool_key[0] is not csr or _hopness_pool_key[1] != workers:
+            _release_hopness_pool()
+            _hopness_pool_arrays = SharedCSRArrays(csr)
+            _hopness_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=_process_pool_context(),
+                initializer=_init_hopness_worker,
+                initargs=(_hopness_pool_arrays.specs,)
+            )
+            _hopness_pool_key = (csr, workers)
+        return _hopness_pool
+
+
+def shutdown_hopness_pool() -> None:
+    """Arrête le pool de processus hopness partagé et libère sa mémoire partagée"""
+    with _hopness_pool_lock:
+        _release_hopness_pool()
+
+
+atexit.register(shutdown_hopness_pool)
+
+
 class LightningGraphAnalyzer:
     """
     Analyseur de métriques avancées de théorie des graphes pour Lightning Network
     """
     
-    def __init__(self):
-        self.graph = nx.Graph()
-        self.directed_graph = nx.DiGraph() 
-        self.channel_capacities = {}
-        self.node_features = {}
+    def __init__(self, graph_store: Optional[LightningGraphStore] = None):
+        self.graph_store = graph_store or LightningGraphStore()
+        self._bind_snapshot(self.graph_store.snapshot())
+    
+    def _bind_snapshot(self, snapshot: GraphSnapshot) -> None:
+        """Expose les graphes d'un snapshot du store"""
+        self.snapshot = snapshot
+        self.graph = snapshot.graph
+        self.directed_graph = snapshot.directed_graph
+        self.channel_capacities = snapshot.channel_capacities
+        self.node_features = snapshot.node_features
+        self._csr: Optional[CSRGraph] = None
+    
+    @property
+    def csr(self) -> CSRGraph:
+        """Représentation CSR du snapshot courant (construite une fois par version)"""
+        if self._csr is None:
+            self._csr = CSRGraph.from_networkx(self.graph, fee_graph=self.directed_graph)
+        return self._csr
+    
+    def refresh(self) -> bool:
+        """Rattache l'analyseur à la dernière version du store si elle a changé"""
+        if self.snapshot.version == self.graph_store.version:
+            return False
+        self._bind_snapshot(self.graph_store.snapshot())
+        return True
         
     def build_graph(self, nodes: List[Dict], channels: List[Dict]) -> None:
-        """Construit les graphes dirigé et non-dirigé"""
-        self.graph.clear()
-        self.directed_graph.clear()
-        self.channel_capacities.clear()
-        self.node_features.clear()
-        
-        # Ajouter nœuds avec métadonnées
-        for node in nodes:
-            pubkey = node['pubkey']
-            features = {
-                'alias': node.get('alias', ''),
-                'color': node.get('color', ''),
-                'capacity': node.get('total_capacity', 0),
-                'num_channels': node.get('num_channels', 0),
-                'last_update': node.get('last_update', 0)
-            }
-            
-            self.graph.add_node(pubkey, **features)
-            self.directed_graph.add_node(pubkey, **features)
-            self.node_features[pubkey] = features
-            
-        # Ajouter canaux
-        for channel in channels:
-            node1 = channel['node1_pub']
-            node2 = channel['node2_pub'] 
-            capacity = channel.get('capacity', 0)
-            chan_id = channel['channel_id']
-            
-            # Graphe non-dirigé pour métriques globales
-            self.graph.add_edge(node1, node2, capacity=capacity, channel_id=chan_id)
-            
-            # Graphe dirigé pour analyse de flow
-            fee1 = channel.get('node1_fee_rate', 0)
-            fee2 = channel.get('node2_fee_rate', 0)
-            
-            self.directed_graph.add_edge(node1, node2, capacity=capacity, fee_rate=fee1, channel_id=chan_id)
-            self.directed_graph.add_edge(node2, node1, capacity=capacity, fee_rate=fee2, channel_id=chan_id)
-            
-            self.channel_capacities[chan_id] = capacity
+        """Synchronise le store de graphe (deltas uniquement) puis le snapshot"""
+        self.graph_store.sync(nodes, channels)
+        self.refresh()
     
     def calculate_centrality_metrics(self, node_pubkey: str = None) -> Dict[str, Any]:
         """
@@ -112,14 +206,14 @@ class LightningGraphAnalyzer:
                 }
             
             # Betweenness centrality pour identifier les hubs de routage
-            betweenness = nx.betweenness_centrality(self.graph, k=min(1000, self.graph.number_of_nodes()))
+            betweenness = csr_graph.betweenness_centrality(self.csr, k=min(1000, self.graph.number_of_nodes()))
             
             # Closeness centrality pour mesurer l'efficacité de routage
-            closeness = nx.closeness_centrality(self.graph)
+            closeness = csr_graph.closeness_centrality(self.csr)
             
             # Eigenvector centrality pour l'influence dans le réseau
             try:
-                eigenvector = nx.eigenvector_centrality(self.graph, max_iter=1000)
+                eigenvector = csr_graph.eigenvector_centrality(self.csr, max_iter=1000)
             except (nx.PowerIterationFailedConvergence, nx.NetworkXError):
                 eigenvector = {}
                 logger.warning("Eigenvector centrality failed to converge")
@@ -161,9 +255,22 @@ class LightningGraphAnalyzer:
             logger.error(f"Erreur calcul hubness: {str(e)}")
             return {"error": str(e)}
     
-    def calculate_hopness_metrics(self, source_nodes: List[str] = None, sample_size: int = 1000) -> Dict[str, Any]:
+    def calculate_hopness_metrics(
+        self,
+        source_nodes: List[str] = None,
+        sample_size: int = 1000,
+        parallelism: str = "process",
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Calcule les métriques de hopness - efficacité de routage par distance
+        
+        Args:
+            source_nodes: Nœuds sources (échantillon aléatoire si None)
+            sample_size: Taille de l'échantillon de sources
+            parallelism: "process" (BFS CSR par lots dans un pool de processus)
+                ou "thread" (BFS NetworkX par source)
+            max_workers: Nombre de workers (par défaut os.cpu_count())
         """
         try:
             if source_nodes is None:
@@ -175,22 +282,10 @@ class LightningGraphAnalyzer:
                     replace=False
                 ).tolist()
             
-            hopness_results = {}
-            
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                # Calcul parallèle des distances pour chaque nœud source
-                futures = {
-                    executor.submit(self._calculate_node_hopness, source): source 
-                    for source in source_nodes
-                }
-                
-                for future in futures:
-                    source = futures[future]
-                    try:
-                        result = future.result(timeout=30)
-                        hopness_results[source] = result
-                    except Exception as e:
-                        logger.warning(f"Erreur hopness pour {source}: {str(e)}")
+            if parallelism == "process":
+                hopness_results = self._calculate_hopness_multiprocess(source_nodes, max_workers)
+            else:
+                hopness_results = self._calculate_hopness_threaded(source_nodes)
             
             # Agréger les résultats
             aggregate_hopness = self._aggregate_hopness_results(hopness_results)
@@ -350,18 +445,18 @@ class LightningGraphAnalyzer:
     def _calculate_single_node_centrality(self, node_pubkey: str) -> Dict[str, float]:
         """Calcule les métriques de centralité pour un nœud"""
         # Degree centrality
-        degree_cent = nx.degree_centrality(self.graph)[node_pubkey]
+        degree_cent = csr_graph.degree_centrality(self.csr)[node_pubkey]
         
         # Betweenness centrality (échantillonné pour performance)
         k = min(1000, self.graph.number_of_nodes())
-        betweenness_cent = nx.betweenness_centrality(self.graph, k=k).get(node_pubkey, 0)
+        betweenness_cent = csr_graph.betweenness_centrality(self.csr, k=k).get(node_pubkey, 0)
         
         # Closeness centrality
-        closeness_cent = nx.closeness_centrality(self.graph).get(node_pubkey, 0)
+        closeness_cent = csr_graph.closeness_centrality(self.csr).get(node_pubkey, 0)
         
         # Eigenvector centrality
         try:
-            eigenvector_cent = nx.eigenvector_centrality(self.graph, max_iter=1000).get(node_pubkey, 0)
+            eigenvector_cent = csr_graph.eigenvector_centrality(self.csr, max_iter=1000).get(node_pubkey, 0)
         except:
             eigenvector_cent = 0
             
@@ -375,13 +470,13 @@ class LightningGraphAnalyzer:
     def _calculate_network_centrality_metrics(self) -> Dict[str, Any]:
         """Calcule les métriques de centralité pour tout le réseau"""
         # Calculer toutes les centralités
-        degree_cent = nx.degree_centrality(self.graph)
+        degree_cent = csr_graph.degree_centrality(self.csr)
         k = min(1000, self.graph.number_of_nodes())
-        betweenness_cent = nx.betweenness_centrality(self.graph, k=k)
-        closeness_cent = nx.closeness_centrality(self.graph)
+        betweenness_cent = csr_graph.betweenness_centrality(self.csr, k=k)
+        closeness_cent = csr_graph.closeness_centrality(self.csr)
         
         try:
-            eigenvector_cent = nx.eigenvector_centrality(self.graph, max_iter=1000)
+            eigenvector_cent = csr_graph.eigenvector_centrality(self.csr, max_iter=1000)
         except:
             eigenvector_cent = {}
             
@@ -430,6 +525,92 @@ class LightningGraphAnalyzer:
         
         return (n + 1 - 2 * sum(cumsum) / cumsum[-1]) / n if cumsum[-1] > 0 else 0
     
+    def _calculate_hopness_threaded(self, source_nodes: List[str]) -> Dict[str, Any]:
+        """Hopness par source via NetworkX dans un pool de threads"""
+        hopness_results = {}
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            # Calcul parallèle des distances pour chaque nœud source
+            futures = {
+                executor.submit(self._calculate_node_hopness, source): source 
+                for source in source_nodes
+            }
+            
+            for future in futures:
+                source = futures[future]
+                try:
+                    result = future.result(timeout=30)
+                    hopness_results[source] = result
+                except Exception as e:
+                    logger.warning(f"Erreur hopness pour {source}: {str(e)}")
+        
+        return hopness_results
+    
+    def _calculate_hopness_multiprocess(self, source_nodes: List[str], max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Hopness par lots de sources dans un pool de processus
+        
+        Les workers lisent le CSR une seule fois en mémoire partagée et ne
+        renvoient que des histogrammes de distances ; les métriques par source
+        sont dérivées ici des histogrammes. Le pool est conservé entre deux
+        appels tant que le snapshot ne change pas.
+        """
+        csr = self.csr
+        hopness_results = {}
+        known = []
+        for source in source_nodes:
+            if source in csr.index:
+                known.append(source)
+            else:
+                hopness_results[source] = {'error': f"Nœud {source} non trouvé"}
+        if not known:
+            return hopness_results
+        
+        sources = np.array([csr.index[source] for source in known], dtype=np.int64)
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(sources)))
+        # Lots multiples de 64 : une source par bit des mots du BFS bit-parallèle
+        chunk_size = min(csr_graph.BFS_BATCH_WORDS * 64, 64 * math.ceil(len(sources) / (64 * workers)))
+        chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+        
+        if workers == 1 or len(chunks) == 1:
+            histograms = [csr.distance_histograms(chunk) for chunk in chunks]
+        else:
+            try:
+                executor = _get_hopness_pool(csr, workers)
+                histograms = list(executor.map(_hopness_histograms, chunks))
+            except Exception as e:
+                logger.warning(f"Pool de processus hopness indisponible, calcul local: {str(e)}")
+                shutdown_hopness_pool()
+                histograms = [csr.distance_histograms(chunk) for chunk in chunks]
+        
+        for chunk_sources, histogram in zip(
+            (known[i:i + chunk_size] for i in range(0, len(known), chunk_size)),
+            histograms
+        ):
+            for source, row in zip(chunk_sources, histogram):
+                hopness_results[source] = self._hopness_from_histogram(row)
+        
+        return hopness_results
+    
+    def _hopness_from_histogram(self, histogram: np.ndarray) -> Dict[str, Any]:
+        """Métriques de hopness d'une source à partir de son histogramme de distances"""
+        distances = np.nonzero(histogram)[0]
+        reachable_nodes = int(histogram[1:].sum())
+        
+        if reachable_nodes == 0:
+            return {'reachability': 0, 'avg_distance': float('inf'), 'max_distance': 0,
+                    'routing_efficiency': 0, 'distance_distribution': {0: 1}}
+        
+        avg_distance = float(np.dot(np.arange(len(histogram)), histogram)) / reachable_nodes
+        
+        return {
+            'reachability': reachable_nodes / (self.graph.number_of_nodes() - 1),
+            'avg_distance': avg_distance,
+            'max_distance': int(distances[-1]),
+            'routing_efficiency': 1.0 / avg_distance if avg_distance > 0 else 0,
+            'distance_distribution': {int(d): int(histogram[d]) for d in distances}
+        }
+    
     def _calculate_node_hopness(self, source: str) -> Dict[str, Any]:
         """Calcule les métriques de hopness pour un nœud source"""
         try:
@@ -441,7 +622,7 @@ class LightningGraphAnalyzer:
             reachable_nodes = len(distances) - 1  # Exclure le nœud lui-même
             
             if reachable_nodes == 0:
-                return {'reachability': 0, 'avg_distance': float('inf'), 'efficiency': 0}
+                return {'reachability': 0, 'avg_distance': float('inf'), 'routing_efficiency': 0}
             
             avg_distance = sum(d for d in distances if d > 0) / reachable_nodes
             max_distance = max(distances)
@@ -477,6 +658,12 @@ class LightningGraphAnalyzer:
         avg_distances = [r['avg_distance'] for r in valid_results.values() if r['avg_distance'] != float('inf')]
         efficiencies = [r['routing_efficiency'] for r in valid_results.values()]
         
+        # Histogramme agrégé des distances (somme des histogrammes par source)
+        distance_distribution = defaultdict(int)
+        for r in valid_results.values():
+            for distance, count in r.get('distance_distribution', {}).items():
+                distance_distribution[distance] += count
+        
         return {
             'network_reachability': {
                 'mean': np.mean(reachabilities),
@@ -493,7 +680,8 @@ class LightningGraphAnalyzer:
                 'mean': np.mean(efficiencies),
                 'std': np.std(efficiencies),
                 'network_efficiency_score': np.mean(efficiencies)
-            }
+            },
+            'distance_distribution': dict(sorted(distance_distribution.items()))
         }
     
     def _analyze_capacity_distribution(self) -> Dict[str, Any]:
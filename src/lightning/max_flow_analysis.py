@@ -1,6 +1,6 @@
 """
 Max Flow Analysis pour Lightning Network - Métrique cruciale pour probabilité de succès des paiements
-Utilise les algorithmes Edmonds-Karp et Ford-Fulkerson optimisés pour Lightning Network
+Utilise l'algorithme de Dinic sur un graphe résiduel en tableaux (voir flow_solver.py)
 """
 
 import networkx as nx
@@ -10,6 +10,9 @@ from collections import defaultdict, deque
 import logging
 from datetime import datetime
 
+from src.lightning.graph_store import LightningGraphStore, GraphSnapshot
+from src.lightning.flow_solver import MaxFlowSolver, FlowResult
+
 logger = logging.getLogger("mcp.max_flow")
 
 class LightningMaxFlowAnalyzer:
@@ -18,46 +21,37 @@ class LightningMaxFlowAnalyzer:
     Calcule les probabilités de succès des paiements et l'optimisation de liquidité
     """
     
-    def __init__(self):
-        self.graph = nx.DiGraph()
-        self.channel_capacities = {}
-        self.channel_balances = {}
-        self.fee_rates = {}
+    def __init__(self, graph_store: Optional[LightningGraphStore] = None):
+        self.graph_store = graph_store or LightningGraphStore()
+        self._bind_snapshot(self.graph_store.snapshot())
+    
+    def _bind_snapshot(self, snapshot: GraphSnapshot) -> None:
+        """Expose le graphe de liquidité d'un snapshot du store"""
+        self.snapshot = snapshot
+        self.graph = snapshot.liquidity_graph
+        self.channel_capacities = snapshot.channel_capacities
+        self.channel_balances = snapshot.channel_balances
+        self._flow_solver: Optional[MaxFlowSolver] = None
+        self._flow_analyses: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    
+    @property
+    def flow_solver(self) -> MaxFlowSolver:
+        """Solveur max flow du snapshot courant (graphe résiduel construit une fois par version)"""
+        if self._flow_solver is None:
+            self._flow_solver = MaxFlowSolver(self.graph, version=self.snapshot.version)
+        return self._flow_solver
+    
+    def refresh(self) -> bool:
+        """Rattache l'analyseur à la dernière version du store si elle a changé"""
+        if self.snapshot.version == self.graph_store.version:
+            return False
+        self._bind_snapshot(self.graph_store.snapshot())
+        return True
         
     def build_network_graph(self, nodes: List[Dict], channels: List[Dict]) -> None:
-        """Construit le graphe du réseau Lightning à partir des données"""
-        self.graph.clear()
-        self.channel_capacities.clear()
-        self.channel_balances.clear()
-        self.fee_rates.clear()
-        
-        # Ajouter les nœuds
-        for node in nodes:
-            self.graph.add_node(node['pubkey'], **node)
-            
-        # Ajouter les canaux avec capacités et balances
-        for channel in channels:
-            node1 = channel['node1_pub']
-            node2 = channel['node2_pub']
-            chan_id = channel['channel_id']
-            
-            capacity = channel.get('capacity', 0)
-            balance1 = channel.get('node1_balance', capacity // 2)  # Estimation si inconnue
-            balance2 = capacity - balance1
-            
-            # Canal bidirectionnel avec balances différentes
-            self.graph.add_edge(node1, node2, 
-                               channel_id=chan_id,
-                               capacity=balance1,  # Liquidity sortante de node1
-                               fee_rate=channel.get('node1_fee_rate', 0))
-            
-            self.graph.add_edge(node2, node1,
-                               channel_id=chan_id, 
-                               capacity=balance2,  # Liquidity sortante de node2
-                               fee_rate=channel.get('node2_fee_rate', 0))
-            
-            self.channel_capacities[chan_id] = capacity
-            self.channel_balances[chan_id] = (balance1, balance2)
+        """Synchronise le store de graphe (deltas uniquement) puis le snapshot"""
+        self.graph_store.sync(nodes, channels)
+        self.refresh()
             
     def calculate_max_flow(self, source: str, target: str, amount: int = None) -> Dict[str, Any]:
         """
@@ -68,24 +62,17 @@ class LightningMaxFlowAnalyzer:
             return {"error": "Source ou target non trouvé dans le graphe"}
             
         try:
-            # Max flow avec NetworkX (utilise Edmonds-Karp)
-            flow_value, flow_dict = nx.maximum_flow(self.graph, source, target, capacity='capacity')
+            # Max flow (Dinic sur graphe résiduel CSR, mis en cache par paire et par version)
+            flow = self.flow_solver.solve(source, target)
+            analysis = self._analyze_flow(flow)
             
-            # Chemins de flow
-            paths = self._extract_flow_paths(flow_dict, source, target)
-            
-            # Probabilité de succès basée sur amount vs max_flow
-            if amount:
-                success_probability = min(1.0, flow_value / amount) if amount > 0 else 1.0
-            else:
-                success_probability = 1.0 if flow_value > 0 else 0.0
-                
             return {
-                "max_flow_value": flow_value,
-                "success_probability": success_probability,
-                "flow_paths": paths,
-                "bottleneck_analysis": self._analyze_bottlenecks(paths),
-                "liquidity_distribution": self._analyze_liquidity_distribution(source, target),
+                "max_flow_value": flow.value,
+                # Probabilité de succès basée sur amount vs max_flow
+                "success_probability": flow.success_probability(amount),
+                "flow_paths": analysis["flow_paths"],
+                "bottleneck_analysis": analysis["bottleneck_analysis"],
+                "liquidity_distribution": analysis["liquidity_distribution"],
                 "timestamp": datetime.utcnow().isoformat()
             }
             
@@ -98,14 +85,12 @@ class LightningMaxFlowAnalyzer:
         Analyse la probabilité de succès pour différents montants de paiement
         Essentiel pour l'optimisation de routage
         """
-        probabilities = {}
-        
-        for amount in amounts:
-            result = self.calculate_max_flow(source, target, amount)
-            if "error" not in result:
-                probabilities[amount] = result["success_probability"]
-            else:
-                probabilities[amount] = 0.0
+        # Un seul flow pour tous les montants
+        try:
+            probabilities = self.flow_solver.success_probabilities(source, target, amounts)
+        except Exception as e:
+            logger.warning(f"Max flow indisponible {source} -> {target}: {str(e)}")
+            probabilities = {amount: 0.0 for amount in amounts}
                 
         return {
             "payment_probabilities": probabilities,
@@ -135,13 +120,7 @@ class LightningMaxFlowAnalyzer:
         
         # Max flow vers les top nodes du réseau
         top_nodes = self._get_top_nodes_by_centrality(10)
-        max_flows_to_top = {}
-        
-        for target in top_nodes:
-            if target != node_pubkey:
-                result = self.calculate_max_flow(node_pubkey, target)
-                if "error" not in result:
-                    max_flows_to_top[target] = result["max_flow_value"]
+        max_flows_to_top = self.flow_solver.max_flow_values(node_pubkey, top_nodes)
         
         return {
             "node_pubkey": node_pubkey,
@@ -198,6 +177,22 @@ class LightningMaxFlowAnalyzer:
             "cost_analysis": self._analyze_rebalancing_costs(rebalancing_ops)
         }
     
+    def _analyze_flow(self, flow: FlowResult) -> Dict[str, Any]:
+        """Chemins, goulots et distribution de liquidité d'un flow (mis en cache par paire)"""
+        key = (flow.source, flow.target)
+        analysis = self._flow_analyses.get(key)
+        if analysis is None:
+            paths = self._extract_flow_paths(flow.flow_dict(), flow.source, flow.target)
+            analysis = {
+                "flow_paths": paths,
+                "bottleneck_analysis": self._analyze_bottlenecks(paths),
+                "liquidity_distribution": self._analyze_liquidity_distribution(flow.source, flow.target)
+            }
+            if len(self._flow_analyses) >= self.flow_solver.max_cached_flows:
+                self._flow_analyses.pop(next(iter(self._flow_analyses)))
+            self._flow_analyses[key] = analysis
+        return analysis
+    
     def _extract_flow_paths(self, flow_dict: Dict, source: str, target: str) -> List[Dict]:
         """Extrait les chemins de flow du dictionnaire NetworkX"""
         paths = []
@@ -274,10 +269,13 @@ class LightningMaxFlowAnalyzer:
             return {"analysis": "Aucun chemin trouvé entre source et target"}
     
     def _get_top_nodes_by_centrality(self, count: int) -> List[str]:
-        """Obtient les top nodes par centralité (degree centrality)"""
-        centrality = nx.degree_centrality(self.graph.to_undirected())
-        sorted_nodes = sorted(centrality.items(), key=lambda x: x[1], reverse=True)
-        return [node for node, _ in sorted_nodes[:count]]
+        """Obtient les top nodes par centralité (degree centrality du graphe non-dirigé)"""
+        csr = self.flow_solver.csr
+        adjacency = csr.adjacency
+        # Voisins distincts (entrants ou sortants), sans copie to_undirected() du graphe
+        degrees = (adjacency + adjacency.T).getnnz(axis=1)
+        order = np.argsort(-degrees, kind="stable")[:count]
+        return [csr.nodes[i] for i in order]
     
     def _find_optimal_payment_size(self, probabilities: Dict[int, float]) -> Dict[str, Any]:
         """Trouve la taille de paiement optimale"""
@@ -297,10 +295,10 @@ class LightningMaxFlowAnalyzer:
     
     def _calculate_liquidity_threshold(self, source: str, target: str) -> int:
         """Calcule le seuil de liquidité critique"""
-        result = self.calculate_max_flow(source, target)
-        if "error" not in result:
-            return result["max_flow_value"]
-        return 0
+        try:
+            return self.flow_solver.solve(source, target).value
+        except Exception:
+            return 0
     
     def _generate_payment_recommendations(self, probabilities: Dict[int, float]) -> List[str]:
         """Génère des recommandations basées sur les probabilités"""
@@ -2,7 +2,7 @@ import os
 from typing import Any, Dict, Optional
 import asyncio
 
-import httpx
+from src.clients.http_pool import pooled_client
 
 
 DEFAULT_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
@@ -45,8 +45,8 @@ class OpenAILLM:
 
         for attempt in range(self.max_retries):
             try:
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.post(url, json=payload, headers=headers)
+                async with pooled_client(url) as client:
+                    response = await client.post(url, json=payload, headers=headers, timeout=30.0)
                     response.raise_for_status()
                     return response.json()
             except Exception:  # pragma: no cover - logging handled upstream
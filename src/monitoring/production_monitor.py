@@ -91,7 +91,7 @@ class ProductionMonitor:
             return
         
         try:
-            import httpx
+            from src.clients.http_pool import pooled_client
             
             # Formatage du message
             emoji_map = {
@@ -111,7 +111,7 @@ class ProductionMonitor:
                 "parse_mode": "Markdown"
             }
             
-            async with httpx.AsyncClient() as client:
+            async with pooled_client(url) as client:
                 response = await client.post(url, json=data, timeout=10)
                 if response.status_code == 200:
                     logger.debug("Alerte Telegram envoyée")
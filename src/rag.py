@@ -7,11 +7,11 @@ from typing import Optional, Dict, Any, List, Tuple
 from uuid import uuid4
 import logging
 import numpy as np
-from sentence_transformers import util
 from transformers import GPT2Tokenizer
 from config.rag_config import settings as rag_settings
 from src.clients.ollama_client import ollama_client
 from src.rag_ollama_adapter import OllamaRAGAdapter
+from src.embedding_store import MemmapEmbeddingStore
 import redis.asyncio as redis
 import asyncio
 from src.models import Document as PydanticDocument, QueryHistory as PydanticQueryHistory, SystemStats as PydanticSystemStats
@@ -43,6 +43,12 @@ class RAGWorkflow:
         self.dimension = rag_settings.EMBED_DIMENSION
         self.embeddings_matrix = None
         self.documents = []
+        self.vector_store = MemmapEmbeddingStore(
+            rag_settings.VECTOR_STORE_PATH,
+            dtype=rag_settings.VECTOR_STORE_DTYPE
+        )
+        self._store_lock = asyncio.Lock()
+        self._load_vector_store()
         
         # Configuration Redis
         self.redis_ops = redis_ops
@@ -160,23 +166,53 @@ class RAGWorkflow:
             logger.error(f"Erreur lors de la génération de l'embedding (Ollama): {str(e)}")
             raise
 
+    def _load_vector_store(self) -> bool:
+        """Recharge la matrice persistée (mmap) sans ré-embedding au démarrage."""
+        try:
+            if not self.vector_store.load(self.dimension):
+                return False
+        except Exception as e:
+            logger.warning(f"Store d'embeddings illisible: {e}")
+            return False
+        self.documents = [entry.get("content", "") for entry in self.vector_store.metadata]
+        self.embeddings_matrix = self.vector_store.vectors
+        return True
+
+    async def _persist_embeddings(
+        self,
+        embeddings: List[List[float]],
+        entries: List[Dict[str, Any]],
+        replace: bool = False
+    ) -> None:
+        """Écrit (ou ajoute) les embeddings dans le store mmap et aligne self.documents.
+
+        L'écriture disque s'exécute hors de la boucle asyncio ; le verrou
+        sérialise les écritures concurrentes sur le même store.
+        """
+        async with self._store_lock:
+            if replace:
+                await asyncio.to_thread(self.vector_store.write, embeddings, entries)
+            elif embeddings:
+                await asyncio.to_thread(self.vector_store.append, embeddings, entries)
+        self.documents = [entry.get("content", "") for entry in self.vector_store.metadata]
+        self.embeddings_matrix = self.vector_store.vectors
+
     def find_similar_documents(self, query_embedding: np.ndarray, k: int = 5) -> List[tuple]:
         """Trouve les k documents les plus similaires à la requête."""
         if self.embeddings_matrix is None or len(self.documents) == 0:
             return []
-        
-        # Calculer les similarités cosinus
-        similarities = util.pytorch_cos_sim(
-            query_embedding.reshape(1, -1),
-            self.embeddings_matrix
-        )[0]
-        
-        # Obtenir les k documents les plus similaires
-        top_k_indices = np.argsort(similarities.numpy())[-k:][::-1]
-        results = []
-        for idx in top_k_indices:
-            results.append((self.documents[idx], float(similarities[idx])))
-        return results
+
+        # Un autre worker a pu publier une nouvelle version du store
+        if self.vector_store.refresh():
+            self.documents = [entry.get("content", "") for entry in self.vector_store.metadata]
+            self.embeddings_matrix = self.vector_store.vectors
+
+        # Vecteurs pré-normalisés : un produit matrice-vecteur + argpartition
+        return [
+            (self.documents[idx], score)
+            for idx, score in self.vector_store.search(query_embedding, k)
+            if idx < len(self.documents)
+        ]
 
     async def ingest_documents(self, directory: str):
         """Ingère des documents dans le système RAG."""
@@ -211,10 +247,11 @@ class RAGWorkflow:
             # Génération des embeddings et mise à jour de la matrice
             embeddings = []
             documents_to_persist = []
+            store_entries = []
             for index, (filename, chunk_text, start_idx, end_idx, total_tokens) in enumerate(chunks):
                 embedding = await self._get_embedding(chunk_text)
                 embeddings.append(embedding)
-                self.documents.append(chunk_text)
+                store_entries.append({"content": chunk_text, "source": filename})
 
                 # Préparer les données pour MongoDB
                 document_dict = {
@@ -236,8 +273,8 @@ class RAGWorkflow:
             for document in documents_to_persist:
                 await self.mongo_ops.save_document(PydanticDocument(**document))
 
-            # Mise à jour de la matrice d'embeddings
-            self.embeddings_matrix = np.array(embeddings).astype('float32')
+            # Mise à jour de la matrice d'embeddings (store mmap persistant)
+            await self._persist_embeddings(embeddings, store_entries)
 
             # Mise à jour des statistiques avec MongoDB
             await self._refresh_total_documents()
@@ -426,6 +463,7 @@ class RAGWorkflow:
         overlap = 50
         chunks_created = 0
         embeddings: List[List[float]] = []
+        store_entries: List[Dict[str, Any]] = []
         context_metadata: List[Dict[str, Any]] = []
 
         for i in range(0, len(tokens), chunk_size - overlap):
@@ -436,7 +474,7 @@ class RAGWorkflow:
 
             embedding = await self._get_embedding(chunk_text)
             embeddings.append(embedding)
-            self.documents.append(chunk_text)
+            store_entries.append({"content": chunk_text, "source": source})
 
             document_metadata = {
                 **metadata,
@@ -462,11 +500,7 @@ class RAGWorkflow:
             chunks_created += 1
 
         if embeddings:
-            embeddings_array = np.array(embeddings).astype("float32")
-            if self.embeddings_matrix is None:
-                self.embeddings_matrix = embeddings_array
-            else:
-                self.embeddings_matrix = np.vstack([self.embeddings_matrix, embeddings_array])
+            await self._persist_embeddings(embeddings, store_entries)
 
         await self._refresh_total_documents()
 
@@ -533,19 +567,20 @@ class RAGWorkflow:
             except Exception as exc:
                 logger.error(f"Erreur vidage cache Redis: {exc}")
                 errors.append(str(exc))
-        # Reconstruit l’index en mémoire
-        self.documents = []
+        # Reconstruit l’index (store mmap persistant)
+        store_entries = []
         embeddings_list = []
         for doc in docs:
             try:
-                self.documents.append(doc.content)
                 embeddings_list.append(doc.embedding)
+                store_entries.append({"content": doc.content, "source": getattr(doc, "source", "")})
             except Exception as e:
                 errors.append(f"doc {getattr(doc, 'id', '?')}: {e}")
-        if embeddings_list:
-            self.embeddings_matrix = np.array(embeddings_list).astype("float32")
-        else:
-            self.embeddings_matrix = None
+        try:
+            await self._persist_embeddings(embeddings_list, store_entries, replace=True)
+        except Exception as e:
+            logger.error(f"Erreur écriture store d'embeddings: {e}")
+            errors.append(str(e))
         await self._refresh_total_documents()
         return {
             "documents_processed": len(docs),
@@ -135,9 +135,15 @@ class BatchEmbeddingProcessor:
         Returns:
             Liste des embeddings pour ce batch
         """
+        # Un seul appel /api/embed pour tout le batch
+        try:
+            return await ollama_client.embed_batch(batch, model, max_batch_size=len(batch))
+        except Exception as e:
+            logger.warning(f"Batch embedding failed, falling back to per-text requests: {str(e)}")
+        
         embeddings = []
         
-        # Traiter chaque texte du batch en parallèle
+        # Repli: traiter chaque texte du batch en parallèle
         tasks = [
             self._generate_single_embedding(text, model)
             for text in batch
@@ -6,14 +6,21 @@ Dernière mise à jour: 9 janvier 2025
 """
 
 import asyncio
+import atexit
+import bisect
 import json
 import re
+import struct
+import threading
 import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, Any, List, Tuple, Union
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import hashlib
 import numpy as np
 from pathlib import Path
@@ -33,6 +40,7 @@ import aiohttp
 from config import settings
 from src.logging_config import get_logger, log_performance
 from src.performance_metrics import PerformanceTracker
+from src.embedding_store import MemmapEmbeddingStore
 from src.exceptions import RAGError, EmbeddingError, CacheError
 
 logger = get_logger(__name__)
@@ -79,108 +87,227 @@ class QueryResult:
     processing_time_ms: float
     cache_hit: bool = False
     token_usage: Dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+# Champs de payload Qdrant nécessaires pour reconstruire un chunk de contexte
+QDRANT_CONTEXT_PAYLOAD_FIELDS = ["content", "source", "token_count", "metadata", "created_at", "chunk_id"]
+
+
+@dataclass
+class RetrievedHit:
+    """Résultat de recherche dont le chunk n'est désérialisé qu'à la demande"""
+    point_id: str
+    score: float
+    payload: Optional[Dict[str, Any]] = None
+    chunk: Optional[DocumentChunk] = None
+
+    def to_chunk(self, cache: Optional[Dict[str, DocumentChunk]] = None) -> DocumentChunk:
+        """Désérialise le payload ; `cache` partage le chunk entre requêtes d'un même batch"""
+        if self.chunk is None and cache is not None:
+            self.chunk = cache.get(self.point_id)
+        if self.chunk is None:
+            payload = self.payload or {}
+            self.chunk = DocumentChunk(
+                content=payload.get("content", ""),
+                token_count=int(payload.get("token_count", 0)),
+                metadata=payload.get("metadata", {}),
+                source_file=payload.get("source", ""),
+                chunk_id=payload.get("chunk_id") or self.point_id,
+                created_at=datetime.fromisoformat(payload["created_at"]) if payload.get("created_at") else None
+            )
+            if cache is not None:
+                cache[self.point_id] = self.chunk
+        return self.chunk
+
+
+# Format binaire des embeddings en cache : en-tête fixe puis vecteur brut
+EMBEDDING_CACHE_MAGIC = b"EC"
+EMBEDDING_CACHE_FORMAT_VERSION = 1
+EMBEDDING_CACHE_DTYPES = ("float32", "float16")
+# magic, version, dtype, dimension, token_count, duration_ms
+_EMBEDDING_HEADER = struct.Struct("<2sBBIIf")
+
+
+def pack_embedding(result: EmbeddingResult, dtype: str = "float32") -> bytes:
+    """Sérialise un embedding : en-tête de 16 octets puis vecteur float32/float16 little-endian"""
+    vector = np.asarray(result.embedding, dtype=np.dtype(dtype).newbyteorder("<"))
+    header = _EMBEDDING_HEADER.pack(
+        EMBEDDING_CACHE_MAGIC,
+        EMBEDDING_CACHE_FORMAT_VERSION,
+        EMBEDDING_CACHE_DTYPES.index(dtype),
+        vector.size,
+        result.token_count,
+        result.duration_ms
+    )
+    return header + vector.tobytes()
+
+
+def unpack_embedding(data: bytes, model: str) -> EmbeddingResult:
+    """Désérialise une entrée de cache (format binaire, ou JSON des anciennes entrées)"""
+    if data[:2] != EMBEDDING_CACHE_MAGIC:
+        payload = json.loads(data)
+        return EmbeddingResult(
+            embedding=payload["embedding"],
+            model=payload["model"],
+            token_count=payload["token_count"],
+            duration_ms=payload["duration_ms"],
+            cached=True
+        )
+
+    _, version, dtype_code, dimension, token_count, duration_ms = _EMBEDDING_HEADER.unpack_from(data)
+    if version != EMBEDDING_CACHE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported embedding cache format version: {version}")
+    dtype = np.dtype(EMBEDDING_CACHE_DTYPES[dtype_code]).newbyteorder("<")
+    vector = np.frombuffer(data, dtype=dtype, count=dimension, offset=_EMBEDDING_HEADER.size)
+    return EmbeddingResult(
+        embedding=vector.tolist(),
+        model=model,
+        token_count=token_count,
+        duration_ms=duration_ms,
+        cached=True
+    )
+
+
+def _embedding_cache_key(text: str, model: str) -> str:
+    text_hash = hashlib.sha256(text.encode()).hexdigest()
+    return f"{model}:{text_hash}"
+
+
+class InMemoryEmbeddingCache:
+    """Cache LRU borné en mémoire pour les embeddings (fallback Redis et cache L1)"""
+
+    def __init__(self, default_ttl: int, max_entries: int = 50_000):
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        # Opérations synchrones : atomiques dans la boucle asyncio, sans verrou
+        self._store: "OrderedDict[str, Tuple[EmbeddingResult, float]]" = OrderedDict()
+
+    def _get_cache_key(self, text: str, model: str) -> str:
+        return _embedding_cache_key(text, model)
+
+    def lookup(self, cache_key: str) -> Optional[EmbeddingResult]:
+        """Lecture par clé, marque l'entrée comme récemment utilisée"""
+        entry = self._store.get(cache_key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._store[cache_key]
+            return None
+        self._store.move_to_end(cache_key)
+        return EmbeddingResult(
+            embedding=result.embedding,
+            model=result.model,
+            token_count=result.token_count,
+            duration_ms=result.duration_ms,
+            cached=True
+        )
+
+    def store(self, cache_key: str, result: EmbeddingResult, ttl: Optional[int] = None):
+        """Écriture par clé, évince les entrées les moins récemment utilisées au-delà de max_entries"""
+        self._store[cache_key] = (result, time.monotonic() + (ttl or self.default_ttl))
+        self._store.move_to_end(cache_key)
+        while len(self._store) > self.max_entries:
+            self._store.popitem(last=False)
+
+    async def get(self, text: str, model: str) -> Optional[EmbeddingResult]:
+        return self.lookup(self._get_cache_key(text, model))
+
+    async def get_many(self, texts: List[str], model: str) -> List[Optional[EmbeddingResult]]:
+        return [self.lookup(self._get_cache_key(text, model)) for text in texts]
+
+    async def set(self, text: str, result: EmbeddingResult, ttl: Optional[int] = None) -> bool:
+        self.store(self._get_cache_key(text, result.model), result, ttl)
+        return True
+
+    async def set_many(self, texts: List[str], results: List[EmbeddingResult], ttl: Optional[int] = None) -> bool:
+        for text, result in zip(texts, results):
+            self.store(self._get_cache_key(text, result.model), result, ttl)
+        return True
+
+    async def size(self) -> int:
+        return len(self._store)
 
 
 class RedisEmbeddingCache:
-    """Cache distribué pour les embeddings avec TTL intelligent"""
-    
-    def __init__(self, redis_client: aioredis.Redis, default_ttl: int):
+    """Cache distribué pour les embeddings (format binaire, MGET/pipelines) avec L1 LRU en mémoire"""
+
+    def __init__(self, redis_client: aioredis.Redis, default_ttl: int, dtype: str = "float32",
+                 l1_max_entries: int = 4096):
+        """
+        Args:
+            redis_client: Client Redis asynchrone
+            default_ttl: TTL par défaut des entrées (secondes)
+            dtype: Type de stockage des vecteurs ('float32' ou 'float16')
+            l1_max_entries: Taille du cache L1 en mémoire (0 pour le désactiver)
+        """
+        if dtype not in EMBEDDING_CACHE_DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}. Expected one of {EMBEDDING_CACHE_DTYPES}")
+
         self.redis = redis_client
         self.prefix = "embeddings"
         self.default_ttl = default_ttl
-    
+        self.dtype = dtype
+        self.l1 = InMemoryEmbeddingCache(default_ttl, l1_max_entries) if l1_max_entries > 0 else None
+
     def _get_cache_key(self, text: str, model: str) -> str:
         """Génère une clé de cache unique"""
-        text_hash = hashlib.sha256(text.encode()).hexdigest()
-        return f"{self.prefix}:{model}:{text_hash}"
-    
+        return f"{self.prefix}:{_embedding_cache_key(text, model)}"
+
     async def get(self, text: str, model: str) -> Optional[EmbeddingResult]:
         """Récupère un embedding du cache"""
+        return (await self.get_many([text], model))[0]
+
+    async def get_many(self, texts: List[str], model: str) -> List[Optional[EmbeddingResult]]:
+        """Récupère les embeddings de plusieurs textes : L1 puis un seul MGET pour les absents"""
+        cache_keys = [self._get_cache_key(text, model) for text in texts]
+        results: List[Optional[EmbeddingResult]] = [
+            self.l1.lookup(cache_key) if self.l1 else None for cache_key in cache_keys
+        ]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+
         try:
-            cache_key = self._get_cache_key(text, model)
-            cached_data = await self.redis.get(cache_key)
-            
-            if cached_data:
-                data = json.loads(cached_data)
-                return EmbeddingResult(
-                    embedding=data["embedding"],
-                    model=data["model"],
-                    token_count=data["token_count"],
-                    duration_ms=data["duration_ms"],
-                    cached=True
-                )
-            return None
-            
+            values = await self.redis.mget([cache_keys[i] for i in missing])
         except Exception as e:
             logger.warning("Erreur lecture cache embedding", error=str(e))
-            return None
-    
+            return results
+
+        for i, data in zip(missing, values):
+            if not data:
+                continue
+            try:
+                results[i] = unpack_embedding(data, model)
+            except Exception as e:
+                logger.warning("Entrée de cache embedding invalide", error=str(e))
+                continue
+            if self.l1:
+                self.l1.store(cache_keys[i], results[i])
+        return results
+
     async def set(self, text: str, result: EmbeddingResult, ttl: Optional[int] = None) -> bool:
         """Stocke un embedding dans le cache"""
+        return await self.set_many([text], [result], ttl)
+
+    async def set_many(self, texts: List[str], results: List[EmbeddingResult], ttl: Optional[int] = None) -> bool:
+        """Stocke plusieurs embeddings en un seul aller-retour (pipeline sans transaction)"""
         try:
-            cache_key = self._get_cache_key(text, result.model)
-            cache_data = {
-                "embedding": result.embedding,
-                "model": result.model,
-                "token_count": result.token_count,
-                "duration_ms": result.duration_ms,
-                "cached_at": datetime.utcnow().isoformat()
-            }
-            
-            await self.redis.setex(
-                cache_key,
-                ttl or self.default_ttl,
-                json.dumps(cache_data)
-            )
+            pipe = self.redis.pipeline(transaction=False)
+            for text, result in zip(texts, results):
+                cache_key = self._get_cache_key(text, result.model)
+                pipe.setex(cache_key, ttl or self.default_ttl, pack_embedding(result, self.dtype))
+                if self.l1:
+                    self.l1.store(cache_key, result, ttl)
+            await pipe.execute()
             return True
-            
+
         except Exception as e:
             logger.error("Erreur écriture cache embedding", error=str(e))
             return False
 
 
-class InMemoryEmbeddingCache:
-    """Cache en mémoire pour les embeddings (fallback lorsque Redis indisponible)"""
-
-    def __init__(self, default_ttl: int):
-        self.default_ttl = default_ttl
-        self._store: Dict[str, Tuple[EmbeddingResult, datetime]] = {}
-        self._lock = asyncio.Lock()
-
-    def _get_cache_key(self, text: str, model: str) -> str:
-        return hashlib.sha256(f"{model}:{text}".encode()).hexdigest()
-
-    async def get(self, text: str, model: str) -> Optional[EmbeddingResult]:
-        async with self._lock:
-            cache_key = self._get_cache_key(text, model)
-            result = self._store.get(cache_key)
-            if not result:
-                return None
-            embedding, expires_at = result
-            if expires_at < datetime.utcnow():
-                self._store.pop(cache_key, None)
-                return None
-            cached_copy = EmbeddingResult(
-                embedding=embedding.embedding,
-                model=embedding.model,
-                token_count=embedding.token_count,
-                duration_ms=embedding.duration_ms,
-                cached=True
-            )
-            return cached_copy
-
-    async def set(self, text: str, result: EmbeddingResult, ttl: Optional[int] = None) -> bool:
-        async with self._lock:
-            cache_key = self._get_cache_key(text, result.model)
-            expires_at = datetime.utcnow() + timedelta(seconds=ttl or self.default_ttl)
-            self._store[cache_key] = (result, expires_at)
-        return True
-
-    async def size(self) -> int:
-        async with self._lock:
-            return len(self._store)
-
-
 class AsyncEmbeddingProvider:
     """Provider d'embeddings asynchrone avec fallback intelligent"""
 
@@ -260,6 +387,50 @@ class AsyncEmbeddingProvider:
             duration_ms=duration_ms
         )
 
+    async def get_embeddings(self, texts: List[str]) -> List[EmbeddingResult]:
+        """Embeddings d'une liste de textes en un seul appel par fournisseur"""
+        if not texts:
+            return []
+
+        token_counts = [len(self.tokenizer.encode(text)) for text in texts]
+        start_time = time.time()
+        try:
+            vectors = await self._ollama.embed_batch(texts, self._rag_settings.EMBED_MODEL)
+            model = self._rag_settings.EMBED_MODEL
+            log_performance("ollama_embedding_batch", (time.time() - start_time) * 1000, batch_size=len(texts))
+        except Exception as e:
+            logger.error("Erreur embedding batch Ollama, tentative OpenAI/local", error=str(e))
+            vectors = None
+            if self.openai_client:
+                try:
+                    response = await self.openai_client.embeddings.create(
+                        model=self.openai_embedding_model,
+                        input=texts
+                    )
+                    vectors = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                    model = self.openai_embedding_model
+                except Exception as openai_error:
+                    logger.error("Erreur embedding batch OpenAI", error=str(openai_error))
+            if vectors is None:
+                logger.warning("Fallback embedding batch local", batch_size=len(texts))
+                local_model = await self._get_local_model()
+                loop = asyncio.get_event_loop()
+                encoded = await loop.run_in_executor(None, local_model.encode, texts)
+                vectors = [vector.tolist() if hasattr(vector, "tolist") else list(vector) for vector in encoded]
+                model = "all-MiniLM-L6-v2"
+
+        duration_ms = (time.time() - start_time) * 1000
+        self._embedding_dimension = len(vectors[0])
+        return [
+            EmbeddingResult(
+                embedding=list(vector),
+                model=model,
+                token_count=token_count,
+                duration_ms=duration_ms
+            )
+            for vector, token_count in zip(vectors, token_counts)
+        ]
+
     async def get_embedding(self, text: str) -> EmbeddingResult:
         # Priorité: Ollama embeddings si configuré
         try:
@@ -378,11 +549,157 @@ class AsyncLLMResponder:
         raise RAGError("Aucun fournisseur LLM disponible pour générer la réponse")
 
 
+# Fin de phrase : ponctuation suivie d'une espace
+SENTENCE_END_PATTERN = re.compile(r"[.!?] ")
+# Taille de corpus (caractères) à partir de laquelle le découpage passe en pool de processus
+PARALLEL_CHUNKING_MIN_CHARS = 200_000
+CHUNK_TOKENIZER_ENCODING = "cl100k_base"
+
+
+# Longueur en octets de chaque token, par encodage (calculée une fois par processus)
+_TOKEN_BYTE_LENGTHS: Dict[str, np.ndarray] = {}
+
+
+def _token_char_offsets(tokenizer, document: str, tokens: List[int]) -> List[int]:
+    """
+    Offsets de caractères du début de chaque token dans le document (plus len(document)
+    en dernière position), calculés en numpy à partir des longueurs en octets des tokens.
+    Un caractère multi-octets à cheval sur deux tokens revient au premier.
+    """
+    byte_lengths = _TOKEN_BYTE_LENGTHS.get(tokenizer.name)
+    if byte_lengths is None:
+        byte_lengths = np.zeros(tokenizer.max_token_value + 1, dtype=np.int64)
+        for token in range(len(byte_lengths)):
+            try:
+                byte_lengths[token] = len(tokenizer.decode_single_token_bytes(token))
+            except KeyError:
+                pass
+        _TOKEN_BYTE_LENGTHS[tokenizer.name] = byte_lengths
+
+    byte_starts = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(byte_lengths[np.asarray(tokens, dtype=np.int64)], out=byte_starts[1:])
+    # Nombre de débuts de caractères UTF-8 avant chaque octet (octets de continuation exclus)
+    data = np.frombuffer(document.encode("utf-8"), dtype=np.uint8)
+    char_starts = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum((data & 0xC0) != 0x80, out=char_starts[1:])
+    return char_starts[byte_starts].tolist()
+
+
+def chunk_document(document: str, filename: str, tokenizer, max_chunk_size: int = 512,
+                   chunk_overlap: int = 50) -> List[DocumentChunk]:
+    """
+    Divise un document en chunks de max_chunk_size tokens (avec chevauchement), coupés
+    après la dernière fin de phrase de la fenêtre lorsqu'elle dépasse 40 % du texte.
+
+    Le document est encodé une seule fois avec les offsets de caractères de chaque
+    token ; les fins de phrases sont précalculées. Chaque chunk est ensuite obtenu par
+    arithmétique d'index et recherche dichotomique, sans nouvel appel au tokenizer.
+    """
+    tokens = tokenizer.encode(document)
+    total_tokens = len(tokens)
+    if total_tokens == 0:
+        return []
+
+    text = document
+    # Le token i couvre text[starts[i]:starts[i + 1]]
+    starts = _token_char_offsets(tokenizer, document, tokens)
+    sentence_ends = [match.start() for match in SENTENCE_END_PATTERN.finditer(text)]
+    # Frontière en tokens juste après chaque ponctuation
+    sentence_boundaries = [bisect.bisect_right(starts, position, 0, total_tokens) for position in sentence_ends]
+
+    chunks: List[DocumentChunk] = []
+    start_idx = 0
+    chunk_idx = 0
+
+    while start_idx < total_tokens:
+        end_idx = min(start_idx + max_chunk_size, total_tokens)
+        char_start, char_end = starts[start_idx], starts[end_idx]
+
+        if end_idx < total_tokens:
+            # Dernière ponctuation suivie d'une espace à l'intérieur de la fenêtre
+            k = bisect.bisect_left(sentence_ends, char_end - 1) - 1
+            if k >= 0 and sentence_ends[k] - char_start > (char_end - char_start) * 0.4:
+                if sentence_boundaries[k] - start_idx > chunk_overlap:
+                    end_idx = sentence_boundaries[k]
+
+        chunk_text = text[char_start:starts[end_idx]].strip()
+        if not chunk_text:
+            start_idx = end_idx
+            continue
+
+        chunks.append(DocumentChunk(
+            content=chunk_text,
+            token_count=end_idx - start_idx,
+            source_file=filename,
+            metadata={
+                "chunk_index": chunk_idx,
+                "start_token": start_idx,
+                "end_token": end_idx,
+                "total_tokens": total_tokens
+            }
+        ))
+        chunk_idx += 1
+
+        if end_idx >= total_tokens:
+            break
+
+        previous_start = start_idx
+        if chunk_overlap > 0:
+            start_idx = max(end_idx - chunk_overlap, 0)
+        else:
+            start_idx = end_idx
+
+        if start_idx <= previous_start:
+            # Safety to avoid infinite loop if overlap misconfigured
+            start_idx = end_idx
+
+    return chunks
+
+
+def _chunk_document_worker(document: str, filename: str, max_chunk_size: int,
+                           chunk_overlap: int) -> List[DocumentChunk]:
+    """Point d'entrée des processus du pool de découpage (encodage mis en cache par tiktoken)"""
+    tokenizer = tiktoken.get_encoding(CHUNK_TOKENIZER_ENCODING)
+    return chunk_document(document, filename, tokenizer, max_chunk_size, chunk_overlap)
+
+
+# Pool de processus de découpage partagé : créé au premier gros corpus et réutilisé
+# par les ingestions suivantes au lieu de nouveaux processus à chaque appel
+_chunking_pool: Optional[ProcessPoolExecutor] = None
+_chunking_pool_workers = 0
+_chunking_pool_lock = threading.Lock()
+
+
+def _get_chunking_pool(workers: int) -> ProcessPoolExecutor:
+    """Retourne le pool de découpage à `workers` processus, recréé si la taille change"""
+    global _chunking_pool, _chunking_pool_workers
+    with _chunking_pool_lock:
+        if _chunking_pool is None or _chunking_pool_workers != workers:
+            if _chunking_pool is not None:
+                _chunking_pool.shutdown(wait=False)
+            _chunking_pool = ProcessPoolExecutor(max_workers=workers)
+            _chunking_pool_workers = workers
+        return _chunking_pool
+
+
+def shutdown_chunking_pool() -> None:
+    """Arrête le pool de processus de découpage partagé"""
+    global _chunking_pool, _chunking_pool_workers
+    with _chunking_pool_lock:
+        if _chunking_pool is not None:
+            _chunking_pool.shutdown(wait=False)
+        _chunking_pool = None
+        _chunking_pool_workers = 0
+
+
+atexit.register(shutdown_chunking_pool)
+
+
 class DocumentProcessor:
     """Processeur de documents avec chunking intelligent"""
     
     def __init__(self):
-        self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.tokenizer = tiktoken.get_encoding(CHUNK_TOKENIZER_ENCODING)
         self.max_chunk_size = 512  # tokens
         self.chunk_overlap = 50    # tokens
     
@@ -425,6 +742,37 @@ class DocumentProcessor:
             logger.error("Erreur lecture fichier", file=str(filepath), error=str(e))
             raise
     
+    async def create_chunks_async(self, documents: List[str], filenames: List[str] = None,
+                                  max_workers: int = 4) -> List[DocumentChunk]:
+        """create_chunks avec un document par tâche dans le pool de processus partagé (gros corpus)"""
+        if filenames is None:
+            filenames = [f"doc_{i}" for i in range(len(documents))]
+
+        total_chars = sum(len(document) for document in documents)
+        if max_workers <= 1 or len(documents) < 2 or total_chars < PARALLEL_CHUNKING_MIN_CHARS:
+            return self.create_chunks(documents, filenames)
+
+        loop = asyncio.get_running_loop()
+        try:
+            pool = _get_chunking_pool(max_workers)
+            results = await asyncio.gather(*[
+                loop.run_in_executor(pool, _chunk_document_worker, document, filename,
+                                     self.max_chunk_size, self.chunk_overlap)
+                for document, filename in zip(documents, filenames)
+            ])
+        except BrokenProcessPool as e:
+            logger.warning("Pool de découpage indisponible, découpage local", error=str(e))
+            shutdown_chunking_pool()
+            return self.create_chunks(documents, filenames)
+        chunks = [chunk for doc_chunks in results for chunk in doc_chunks]
+
+        logger.info("Chunks créés",
+                   total_chunks=len(chunks),
+                   avg_tokens=np.mean([c.token_count for c in chunks]),
+                   workers=min(max_workers, len(documents)))
+
+        return chunks
+
     def create_chunks(self, documents: List[str], filenames: List[str] = None) -> List[DocumentChunk]:
         """Crée des chunks intelligents à partir des documents"""
         if filenames is None:
@@ -444,65 +792,7 @@ class DocumentProcessor:
     
     def _chunk_document(self, document: str, filename: str) -> List[DocumentChunk]:
         """Divise un document en chunks en essayant de respecter les frontières de phrases"""
-        tokens = self.tokenizer.encode(document)
-        total_tokens = len(tokens)
-        if total_tokens == 0:
-            return []
-
-        chunks: List[DocumentChunk] = []
-        start_idx = 0
-        chunk_idx = 0
-
-        while start_idx < total_tokens:
-            end_idx = min(start_idx + self.max_chunk_size, total_tokens)
-            chunk_tokens = tokens[start_idx:end_idx]
-            chunk_text = self.tokenizer.decode(chunk_tokens).strip()
-
-            if not chunk_text:
-                start_idx = end_idx
-                continue
-
-            if end_idx < total_tokens:
-                last_punctuation = max(
-                    chunk_text.rfind('. '),
-                    chunk_text.rfind('! '),
-                    chunk_text.rfind('? ')
-                )
-                if last_punctuation != -1 and last_punctuation > len(chunk_text) * 0.4:
-                    trimmed_text = chunk_text[: last_punctuation + 1].strip()
-                    trimmed_tokens = self.tokenizer.encode(trimmed_text)
-                    if len(trimmed_tokens) > self.chunk_overlap:
-                        chunk_text = trimmed_text
-                        chunk_tokens = trimmed_tokens
-                        end_idx = start_idx + len(chunk_tokens)
-
-            chunk = DocumentChunk(
-                content=chunk_text,
-                token_count=len(chunk_tokens),
-                source_file=filename,
-                metadata={
-                    "chunk_index": chunk_idx,
-                    "start_token": start_idx,
-                    "end_token": end_idx,
-                    "total_tokens": total_tokens
-                }
-            )
-            chunks.append(chunk)
-            chunk_idx += 1
-
-            if end_idx >= total_tokens:
-                break
-
-            if self.chunk_overlap > 0:
-                start_idx = max(end_idx - self.chunk_overlap, 0)
-            else:
-                start_idx = end_idx
-
-            if start_idx <= chunk.metadata["start_token"]:
-                # Safety to avoid infinite loop if overlap misconfigured
-                start_idx = chunk.metadata["end_token"]
-
-        return chunks
+        return chunk_document(document, filename, self.tokenizer, self.max_chunk_size, self.chunk_overlap)
 
 
 class OptimizedRAGWorkflow:
@@ -517,6 +807,10 @@ class OptimizedRAGWorkflow:
         self.document_processor = DocumentProcessor()
         self.chunks: List[DocumentChunk] = []
         self.embeddings_matrix: Optional[np.ndarray] = None
+        self.vector_store = MemmapEmbeddingStore(
+            getattr(settings, "perf_vector_store_path", "data/rag/vector_store"),
+            dtype=getattr(settings, "perf_vector_store_dtype", "float32")
+        )
         self.qdrant_client: Optional[AsyncQdrantClient] = None
         self.qdrant_collection = settings.qdrant_collection
         self.qdrant_distance = settings.qdrant_distance.lower()
@@ -531,6 +825,7 @@ class OptimizedRAGWorkflow:
         try:
             await self._init_embedding_cache()
             await self._init_qdrant()
+            self._load_vector_store()
             self._initialized = True
             logger.info(
                 "RAG workflow initialisé",
@@ -564,7 +859,12 @@ class OptimizedRAGWorkflow:
             try:
                 self.redis_client = aioredis.from_url(redis_url)
                 await self.redis_client.ping()
-                self.embedding_cache = RedisEmbeddingCache(self.redis_client, self.embedding_cache_ttl)
+                self.embedding_cache = RedisEmbeddingCache(
+                    self.redis_client,
+                    self.embedding_cache_ttl,
+                    dtype=getattr(settings, "perf_embedding_cache_dtype", "float32"),
+                    l1_max_entries=getattr(settings, "perf_embedding_cache_l1_entries", 4096)
+                )
                 logger.info("Cache Redis initialisé pour les embeddings", redis_url=redis_url)
                 return
             except Exception as e:
@@ -573,7 +873,10 @@ class OptimizedRAGWorkflow:
                     await self.redis_client.close()
                 self.redis_client = None
 
-        self.embedding_cache = InMemoryEmbeddingCache(self.embedding_cache_ttl)
+        self.embedding_cache = InMemoryEmbeddingCache(
+            self.embedding_cache_ttl,
+            max_entries=getattr(settings, "perf_embedding_cache_max_entries", 50_000)
+        )
         logger.info("Cache d'embeddings en mémoire activé")
 
     async def _init_qdrant(self):
@@ -670,10 +973,75 @@ class OptimizedRAGWorkflow:
             return distance
         return 1.0 / (1.0 + distance)
 
+    def _load_vector_store(self) -> bool:
+        """Recharge les chunks et la matrice persistés (démarrage à froid sans ré-embedding)"""
+        if not self.vector_store.load(self.embedding_provider.embedding_dimension):
+            return False
+
+        self._chunks_from_vector_store()
+        return True
+
+    def _refresh_vector_store(self) -> None:
+        """Reprend la dernière version du store si un autre worker en a publié une"""
+        if self.vector_store.refresh():
+            self._chunks_from_vector_store()
+
+    def _chunks_from_vector_store(self) -> None:
+        """Chunks et matrice alignés sur la version ouverte du store"""
+        self.chunks = []
+        for entry in self.vector_store.metadata:
+            created_at = entry.get("created_at")
+            self.chunks.append(DocumentChunk(
+                content=entry.get("content", ""),
+                metadata=entry.get("metadata", {}),
+                token_count=int(entry.get("token_count", 0)),
+                chunk_id=entry.get("chunk_id", ""),
+                source_file=entry.get("source", ""),
+                created_at=datetime.fromisoformat(created_at) if created_at else None
+            ))
+        self.embeddings_matrix = self.vector_store.vectors
+
+    def _persist_vector_store(self, chunks: List[DocumentChunk]) -> None:
+        """Écrit les chunks embeddés dans le store mmap ; lignes et chunks restent alignés"""
+        embedded = [chunk for chunk in chunks if chunk.embedding]
+        try:
+            self.vector_store.write(
+                [chunk.embedding for chunk in embedded],
+                [
+                    {
+                        "content": chunk.content,
+                        "source": chunk.source_file,
+                        "token_count": chunk.token_count,
+                        "metadata": chunk.metadata,
+                        "created_at": (chunk.created_at or datetime.utcnow()).isoformat(),
+                        "chunk_id": chunk.chunk_id
+                    }
+                    for chunk in embedded
+                ]
+            )
+        except Exception as e:
+            logger.warning("Persistance du store d'embeddings impossible", error=str(e))
+            self.embeddings_matrix = (
+                np.array([chunk.embedding for chunk in embedded], dtype=np.float32)
+                if embedded else None
+            )
+            self.chunks = embedded
+            return
+
+        self.chunks = embedded
+        self.embeddings_matrix = self.vector_store.vectors
+
     def _find_similar_chunks_local(self, query_embedding: np.ndarray, top_k: int) -> List[Tuple[DocumentChunk, float]]:
+        self._refresh_vector_store()
         if self.embeddings_matrix is None or len(self.chunks) == 0:
             return []
 
+        if self.vector_store.vectors is not None and len(self.vector_store) == len(self.chunks):
+            return [
+                (self.chunks[idx], score)
+                for idx, score in self.vector_store.search(query_embedding, top_k)
+            ]
+
         similarities = np.dot(self.embeddings_matrix, query_embedding)
         similarities = similarities / (
             np.linalg.norm(self.embeddings_matrix, axis=1) * np.linalg.norm(query_embedding)
@@ -712,7 +1080,9 @@ class OptimizedRAGWorkflow:
             
             # Crée les chunks
             filenames = [f.name for f in Path(directory).glob("*.txt")]
-            self.chunks = self.document_processor.create_chunks(documents, filenames)
+            self.chunks = await self.document_processor.create_chunks_async(
+                documents, filenames, max_workers=getattr(settings, "perf_max_workers", 4)
+            )
             
             # Génère les embeddings en parallèle (par batch)
             batch_size = 10  # Limite pour éviter la surcharge
@@ -726,10 +1096,9 @@ class OptimizedRAGWorkflow:
             # Exécute tous les batchs
             await asyncio.gather(*embedding_tasks)
             
-            # Construit la matrice d'embeddings
+            # Construit et persiste la matrice d'embeddings (store mmap versionné)
             embeddings = [chunk.embedding for chunk in self.chunks if chunk.embedding]
-            if embeddings:
-                self.embeddings_matrix = np.array(embeddings, dtype=np.float32)
+            await asyncio.to_thread(self._persist_vector_store, self.chunks)
             
             duration = (time.time() - start_time) * 1000
             log_performance("document_ingestion", duration,
@@ -748,59 +1117,63 @@ class OptimizedRAGWorkflow:
             logger.error("Erreur ingestion documents", error=str(e))
             raise RAGError(f"Échec ingestion: {e}")
     
+    def _candidate_embedding_models(self) -> List[str]:
+        """Modèles dont un embedding en cache est réutilisable, par ordre de priorité"""
+        candidate_models = [self.embedding_provider._rag_settings.EMBED_MODEL]
+        if self.embedding_provider.openai_client:
+            candidate_models.append(self.embedding_provider.openai_embedding_model)
+        candidate_models.append("all-MiniLM-L6-v2")
+        return [model_name for model_name in candidate_models if model_name]
+
     async def _process_chunk_batch(self, chunks: List[DocumentChunk]):
-        """Traite un batch de chunks pour les embeddings"""
-        tasks = []
-        
-        for chunk in chunks:
-            task = self._get_chunk_embedding(chunk)
-            tasks.append(task)
-        
-        await asyncio.gather(*tasks, return_exceptions=True)
+        """Traite un batch de chunks pour les embeddings (lecture/écriture du cache par lot)"""
+        pending = list(chunks)
+        if self.embedding_cache:
+            for model_name in self._candidate_embedding_models():
+                if not pending:
+                    break
+                cached_results = await self.embedding_cache.get_many([chunk.content for chunk in pending], model_name)
+                missing = []
+                for chunk, cached_result in zip(pending, cached_results):
+                    if cached_result:
+                        chunk.embedding = cached_result.embedding
+                    else:
+                        missing.append(chunk)
+                pending = missing
+            logger.debug("Embeddings récupérés du cache", hits=len(chunks) - len(pending), batch_size=len(chunks))
+
+        if pending:
+            try:
+                # Génère les embeddings manquants en un seul appel
+                results = await self.embedding_provider.get_embeddings([chunk.content for chunk in pending])
+                for chunk, result in zip(pending, results):
+                    chunk.embedding = result.embedding
+                await self._ensure_qdrant_collection(len(results[0].embedding))
+
+                # Met en cache
+                if self.embedding_cache:
+                    await self.embedding_cache.set_many([chunk.content for chunk in pending], results)
+
+                logger.debug("Embeddings générés et mis en cache", batch_size=len(pending))
+
+            except Exception as e:
+                logger.error("Erreur embedding batch", batch_size=len(pending), error=str(e))
+                # Ne propage pas l'erreur pour ne pas faire échouer toute l'ingestion
 
         # Persistance dans Qdrant si disponible
         await self._upsert_chunks_to_qdrant(chunks)
-    
-    async def _get_chunk_embedding(self, chunk: DocumentChunk):
-        """Obtient l'embedding d'un chunk avec cache"""
-        try:
-            cached_result: Optional[EmbeddingResult] = None
-            if self.embedding_cache:
-                candidate_models = []
-                if self.embedding_provider.openai_client:
-                    candidate_models.append(self.embedding_provider.openai_embedding_model)
-                candidate_models.append("all-MiniLM-L6-v2")
-                for model_name in candidate_models:
-                    if not model_name:
-                        continue
-                    cached_result = await self.embedding_cache.get(chunk.content, model_name)
-                    if cached_result:
-                        break
 
+    async def _get_query_embedding(self, query_text: str) -> EmbeddingResult:
+        """Embedding de la requête, via le cache si disponible"""
+        if self.embedding_cache:
+            cached_result = await self.embedding_cache.get(query_text, self.embedding_provider._rag_settings.EMBED_MODEL)
             if cached_result:
-                chunk.embedding = cached_result.embedding
-                logger.debug("Embedding récupéré du cache", chunk_id=chunk.chunk_id)
-                return
-
-            # Génère l'embedding
-            result = await self.embedding_provider.get_embedding(chunk.content)
-            chunk.embedding = result.embedding
-            await self._ensure_qdrant_collection(len(result.embedding))
-            
-            # Met en cache
-            if self.embedding_cache:
-                await self.embedding_cache.set(chunk.content, result)
-
-            logger.debug("Embedding généré et mis en cache", 
-                        chunk_id=chunk.chunk_id,
-                        duration_ms=result.duration_ms)
+                return cached_result
+        result = await self.embedding_provider.get_embedding(query_text)
+        if self.embedding_cache:
+            await self.embedding_cache.set(query_text, result)
+        return result
 
-        except Exception as e:
-            logger.error("Erreur embedding chunk", 
-                        chunk_id=chunk.chunk_id,
-                        error=str(e))
-            # Ne propage pas l'erreur pour ne pas faire échouer tout le batch
-    
     async def query(self, query_text: str, top_k: int = 3) -> QueryResult:
         """Exécute une requête RAG optimisée"""
         if not self._initialized:
@@ -810,7 +1183,7 @@ class OptimizedRAGWorkflow:
         
         try:
             # Génère l'embedding de la requête
-            query_embedding_result = await self.embedding_provider.get_embedding(query_text)
+            query_embedding_result = await self._get_query_embedding(query_text)
             query_embedding = np.array(query_embedding_result.embedding, dtype=np.float32)
             
             # Trouve les documents similaires
@@ -859,17 +1232,9 @@ class OptimizedRAGWorkflow:
                 )
                 matched_chunks: List[Tuple[DocumentChunk, float]] = []
                 for point in search_results:
-                    payload = point.payload or {}
-                    chunk = DocumentChunk(
-                        content=payload.get("content", ""),
-                        token_count=int(payload.get("token_count", 0)),
-                        metadata=payload.get("metadata", {}),
-                        source_file=payload.get("source", ""),
-                        chunk_id=payload.get("chunk_id") or str(point.id),
-                        created_at=datetime.fromisoformat(payload["created_at"]) if payload.get("created_at") else None
-                    )
-                    similarity = self._convert_distance_to_similarity(float(point.score))
-                    matched_chunks.append((chunk, similarity))
+                    hit = RetrievedHit(point_id=str(point.id), score=float(point.score), payload=point.payload)
+                    similarity = self._convert_distance_to_similarity(hit.score)
+                    matched_chunks.append((hit.to_chunk(), similarity))
                 if matched_chunks:
                     return matched_chunks
             except Exception as e:
@@ -878,6 +1243,149 @@ class OptimizedRAGWorkflow:
         # Fallback sur la recherche en mémoire si Qdrant indisponible ou vide
         return self._find_similar_chunks_local(query_embedding, top_k)
 
+    async def query_batch(self, queries: List[str], top_k: int = 3) -> List[QueryResult]:
+        """
+        Exécute plusieurs requêtes RAG en un seul passage de retrieval
+
+        Les requêtes sont embeddées ensemble, recherchées via un seul appel
+        Qdrant (query_batch_points) et les payloads ne sont désérialisés que pour les
+        hits retenus dans le contexte LLM (une seule fois par point partagé).
+        Une requête sans contexte pertinent renvoie un résultat vide avec
+        `error` renseigné, sans faire échouer le reste du batch.
+        """
+        if not queries:
+            return []
+        if not self._initialized:
+            await self.initialize()
+
+        start_time = time.time()
+
+        try:
+            embedding_results = await self.embedding_provider.get_embeddings(queries)
+            query_matrix = np.array([result.embedding for result in embedding_results], dtype=np.float32)
+
+            hits_per_query = await self._find_similar_hits_batch(query_matrix, top_k)
+            chunk_cache: Dict[str, DocumentChunk] = {}
+            similar_per_query: List[List[Tuple[DocumentChunk, float]]] = [
+                [(hit.to_chunk(chunk_cache), hit.score) for hit in hits]
+                for hits in hits_per_query
+            ]
+
+            # Une requête sans contexte n'invalide pas les autres du batch
+            answered = [idx for idx, similar_chunks in enumerate(similar_per_query) if similar_chunks]
+            answers = dict(zip(answered, await asyncio.gather(*[
+                self.responder.generate(queries[idx], similar_per_query[idx])
+                for idx in answered
+            ])))
+
+            duration_ms = (time.time() - start_time) * 1000
+            results: List[QueryResult] = []
+            for idx, (similar_chunks, embedding_result) in enumerate(zip(similar_per_query, embedding_results)):
+                token_usage = {
+                    "query_tokens": embedding_result.token_count,
+                    "context_tokens": sum(chunk.token_count for chunk, _ in similar_chunks)
+                }
+                if idx not in answers:
+                    results.append(QueryResult(
+                        answer="",
+                        sources=[],
+                        confidence_score=0.0,
+                        processing_time_ms=duration_ms,
+                        token_usage=token_usage,
+                        error="Aucun contexte pertinent trouvé pour cette requête"
+                    ))
+                    continue
+                confidence_values = [score for _, score in similar_chunks]
+                results.append(QueryResult(
+                    answer=answers[idx],
+                    sources=[chunk for chunk, _ in similar_chunks],
+                    confidence_score=float(np.mean(confidence_values)) if confidence_values else 0.0,
+                    processing_time_ms=duration_ms,
+                    token_usage=token_usage
+                ))
+
+            log_performance("rag_query_batch", duration_ms,
+                          queries_count=len(queries),
+                          sources_count=sum(len(hits) for hits in hits_per_query))
+
+            return results
+
+        except Exception as e:
+            logger.error("Erreur requête RAG batch", error=str(e), queries_count=len(queries))
+            raise RAGError(f"Échec requête batch: {e}")
+
+    async def _qdrant_search_batch(self, query_matrix: np.ndarray, top_k: int) -> List[List[Any]]:
+        """Points Qdrant de chaque requête : query_batch_points (client >= 1.10), sinon search_batch"""
+        if hasattr(self.qdrant_client, "query_batch_points"):
+            responses = await self.qdrant_client.query_batch_points(
+                collection_name=self.qdrant_collection,
+                requests=[
+                    qmodels.QueryRequest(
+                        query=query_vector.tolist(),
+                        limit=top_k,
+                        with_payload=QDRANT_CONTEXT_PAYLOAD_FIELDS,
+                        with_vector=False
+                    )
+                    for query_vector in query_matrix
+                ]
+            )
+            return [response.points for response in responses]
+
+        return await self.qdrant_client.search_batch(
+            collection_name=self.qdrant_collection,
+            requests=[
+                qmodels.SearchRequest(
+                    vector=query_vector.tolist(),
+                    limit=top_k,
+                    with_payload=QDRANT_CONTEXT_PAYLOAD_FIELDS,
+                    with_vector=False
+                )
+                for query_vector in query_matrix
+            ]
+        )
+
+    async def _find_similar_hits_batch(self, query_matrix: np.ndarray, top_k: int) -> List[List[RetrievedHit]]:
+        """Recherche batch : un seul aller-retour Qdrant, fallback mmap local"""
+        if self.qdrant_client and self._qdrant_collection_ready:
+            try:
+                batch_results = await self._qdrant_search_batch(query_matrix, top_k)
+                hits_per_query = [
+                    [
+                        RetrievedHit(
+                            point_id=str(point.id),
+                            score=self._convert_distance_to_similarity(float(point.score)),
+                            payload=point.payload
+                        )
+                        for point in search_results
+                    ]
+                    for search_results in batch_results
+                ]
+                if any(hits_per_query):
+                    return hits_per_query
+            except Exception as e:
+                logger.error("Erreur recherche batch Qdrant", error=str(e))
+
+        self._refresh_vector_store()
+        if self.embeddings_matrix is None or len(self.chunks) == 0:
+            return [[] for _ in range(len(query_matrix))]
+
+        if self.vector_store.vectors is not None and len(self.vector_store) == len(self.chunks):
+            return [
+                [
+                    RetrievedHit(point_id=self.chunks[idx].chunk_id, score=score, chunk=self.chunks[idx])
+                    for idx, score in results
+                ]
+                for results in self.vector_store.search_batch(query_matrix, top_k)
+            ]
+
+        return [
+            [
+                RetrievedHit(point_id=chunk.chunk_id, score=score, chunk=chunk)
+                for chunk, score in self._find_similar_chunks_local(query_vector, top_k)
+            ]
+            for query_vector in query_matrix
+        ]
+
 
 # Instance globale pour réutilisation
 rag_workflow = OptimizedRAGWorkflow()
@@ -895,6 +1403,11 @@ async def query_rag(query: str, top_k: int = 3) -> QueryResult:
     """Exécute une requête RAG"""
     return await rag_workflow.query(query, top_k)
 
+async def query_rag_batch(queries: List[str], top_k: int = 3) -> List[QueryResult]:
+    """Exécute plusieurs requêtes RAG avec un retrieval groupé"""
+    return await rag_workflow.query_batch(queries, top_k)
+
 async def close_rag():
     """Ferme le système RAG"""
-    await rag_workflow.close() 
+    await rag_workflow.close()
+    shutdown_chunking_pool() 
@@ -7,6 +7,8 @@ import json
 import logging
 import os
 
+from src.clients.http_pool import pooled_session
+
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -83,7 +85,7 @@ class RequestManager:
         for attempt in range(self.max_retries):
             async with self.semaphore:
                 try:
-                    async with aiohttp.ClientSession() as session:
+                    async with pooled_session(self.base_url) as session:
                         url = f"{self.base_url}{request.endpoint}"
                         async with session.get(
                             url,
@@ -163,7 +165,7 @@ class OptimizedRequestManager:
             return cached_data
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with pooled_session(url) as session:
                 async with session.request(
                     method=method,
                     url=url,
@@ -293,7 +293,7 @@ def run_calibration_process(
     real_dist = engine._extract_distributions(processed_data)
     
     # Exécuter une simulation avec les meilleurs paramètres pour les visualisations finales
-    from .stochastic_simulator import LightningSimEnvironment
+    from .stochastic_simulator import LightningSimEnvironment, DummyDecisionEngine
     
     sim_config = {
         "simulation_days": CalibrationConfig.SIMULATION_TICKS,
@@ -303,9 +303,9 @@ def run_calibration_process(
     }
     
     simulator = LightningSimEnvironment(sim_config)
-    simulator.initialize_evolution_engines()
-    dummy_engine = None
-    final_sim_data = simulator.run_simulation(steps=CalibrationConfig.SIMULATION_TICKS, decision_engine=dummy_engine)
+    final_sim_data = simulator.run_simulation(
+        steps=CalibrationConfig.SIMULATION_TICKS, decision_engine=DummyDecisionEngine()
+    )
     
     # Extraire les distributions simulées
     sim_dist = engine._extract_distributions(final_sim_data)
@@ -20,7 +20,8 @@ from typing import Dict, Any, List, Tuple, Optional
 import itertools
 
 from .calibration_metrics import CalibrationMetrics
-from .stochastic_simulator import LightningSimEnvironment
+from .calibration_job import CalibrationJob, latin_hypercube_grid, seeded_global_random
+from .stochastic_simulator import LightningSimEnvironment, DummyDecisionEngine
 
 # Configuration du logging
 logging.basicConfig(
@@ -49,6 +50,11 @@ class CalibrationConfig:
     CONVERGENCE_THRESHOLD = None  # Sera calculé à partir des métriques individuelles
     EARLY_STOPPING_MIN_ITERATIONS = 10  # Nombre minimal d'itérations avant early stopping
     
+    # Recherche et exécution
+    SEARCH_STRATEGY = "latin_hypercube"  # Options: latin_hypercube, successive_halving
+    HALVING_ETA = 3  # Facteur de réduction entre deux paliers de successive halving
+    MAX_WORKERS = None  # Processus de simulation (None = nombre de CPU, 1 = séquentiel)
+    
     @staticmethod
     def get_time_delta():
         """Retourne le délai temporel correspondant à la granularité choisie"""
@@ -78,6 +84,8 @@ class CalibrationEngine:
         self.node_id = node_id
         self.input_data_summary = {}
         self.final_p_values = {}
+        self.job_info = {}
+        self._network_size = 0
         
         # Créer les répertoires de résultats si nécessaire
         CALIBRATION_RESULTS_PATH.mkdir(parents=True, exist_ok=True)
@@ -86,18 +94,31 @@ class CalibrationEngine:
     
     def calibrate_simulator(self, real_node_data: Dict[str, Any], 
                           param_ranges: Dict[str, np.ndarray], 
-                          iterations: int = 100) -> Tuple[Dict[str, float], float]:
+                          iterations: int = 100,
+                          strategy: Optional[str] = None,
+                          max_workers: Optional[int] = None,
+                          seed: Optional[int] = None) -> Tuple[Dict[str, float], float]:
         """
         Ajuste automatiquement les paramètres du simulateur pour minimiser la divergence avec les données réelles.
         
+        La calibration est exécutée comme un job reprenable : les résultats partiels
+        sont écrits dans CALIBRATION_CACHE_PATH et une nouvelle exécution avec les
+        mêmes données, plages et graine reprend après la dernière simulation terminée.
+        
         Args:
             real_node_data: Données collectées du nœud réel
             param_ranges: Plages de valeurs pour chaque paramètre à tester
-            iterations: Nombre d'itérations maximum
+            iterations: Nombre maximum de jeux de paramètres évalués
+            strategy: latin_hypercube ou successive_halving (CalibrationConfig.SEARCH_STRATEGY par défaut)
+            max_workers: Nombre de processus (CalibrationConfig.MAX_WORKERS par défaut)
+            seed: Graine du job (dérivée des données et des plages par défaut)
             
         Returns:
             Tuple contenant les paramètres optimaux et leur score
         """
+        strategy = strategy or CalibrationConfig.SEARCH_STRATEGY
+        max_workers = max_workers or CalibrationConfig.MAX_WORKERS
+        
         # Prétraitement des données réelles
         logger.info("Prétraitement des données réelles...")
         processed_data = self._preprocess_node_data(real_node_data)
@@ -107,91 +128,82 @@ class CalibrationEngine:
         
         # Extraction des distributions de référence
         reference_distributions = self._extract_distributions(processed_data)
+        if not reference_distributions:
+            raise ValueError("Aucune distribution exploitable dans les données du nœud")
+        self._network_size = len(processed_data)  # Même nombre de canaux
+        
+        # Identifiant du job : même configuration = même checkpoint
+        job_config = (
+            self.node_id, reference_distributions, param_ranges, iterations, strategy,
+            CalibrationConfig.SAMPLES_PER_PARAM_SET, CalibrationConfig.SIMULATION_TICKS,
+            CalibrationConfig.TIME_GRANULARITY, seed
+        )
+        job_id = CalibrationJob.job_id(*job_config)
+        if seed is None:
+            seed = int(job_id, 16)
         
-        # Génération des combinaisons de paramètres à tester
+        # Échantillonnage des jeux de paramètres (grille complète si elle est assez petite)
         logger.info("Génération des combinaisons de paramètres...")
-        param_combinations = self._generate_param_combinations(param_ranges)
-        
-        # Si trop de combinaisons, utiliser un échantillon aléatoire
-        if len(param_combinations) > iterations:
-            np.random.shuffle(param_combinations)
-            param_combinations = param_combinations[:iterations]
+        param_combinations = latin_hypercube_grid(param_ranges, iterations, seed)
+        
+        job = CalibrationJob(
+            engine=self,
+            reference_distributions=reference_distributions,
+            param_sets=param_combinations,
+            samples_per_set=CalibrationConfig.SAMPLES_PER_PARAM_SET,
+            checkpoint_path=CALIBRATION_CACHE_PATH / f"job_{job_id}.jsonl",
+            seed=seed,
+            strategy=strategy,
+            halving_eta=CalibrationConfig.HALVING_ETA,
+            max_workers=max_workers
+        )
+        self.job_info = {"job_id": job_id, "search_strategy": strategy, "seed": seed}
         
         # Initialisation des résultats
-        logger.info(f"Démarrage de la calibration avec {len(param_combinations)} combinaisons...")
+        logger.info(f"Démarrage de la calibration ({strategy}) avec {len(param_combinations)} combinaisons...")
         best_params = None
         best_score = float('inf')
+        best_samples = 0
         results_log = []
         
-        # Boucle principale de calibration
-        for i, param_dict in enumerate(param_combinations):
-            logger.info(f"Itération {i+1}/{len(param_combinations)}: {param_dict}")
-            
-            # Moyenne des résultats sur plusieurs exécutions pour robustesse
-            iteration_divergences = []
-            
-            for j in range(CalibrationConfig.SAMPLES_PER_PARAM_SET):
-                # Configuration du simulateur avec ces paramètres
-                sim_config = {
-                    "simulation_days": CalibrationConfig.SIMULATION_TICKS,
-                    "network_size": len(processed_data),  # Même nombre de canaux
-                    "time_granularity": CalibrationConfig.TIME_GRANULARITY,
-                    **param_dict
-                }
+        # Résultats produits par jeu de paramètres dès que ses simulations sont terminées
+        runs = job.run()
+        try:
+            for i, run in enumerate(runs):
+                avg_divergences, total_divergence = self._aggregate_divergences(run["sample_divergences"])
                 
-                # Exécution du simulateur
-                sim_env = LightningSimEnvironment(sim_config)
-                sim_env.initialize_evolution_engines()
+                # À fidélité égale, la divergence la plus faible l'emporte ; un jeu évalué
+                # sur plus de simulations (successive halving) prime sur un jeu éliminé
+                accepted = bool((run["samples"], -total_divergence) > (best_samples, -best_score))
                 
-                # Simulation sur la période spécifiée
-                dummy_engine = None  # Pas de moteur de décision
-                simulated_data = sim_env.run_simulation(
-                    steps=CalibrationConfig.SIMULATION_TICKS, 
-                    decision_engine=dummy_engine
-                )
+                # Log des résultats
+                result = {
+                    "iteration": run["param_index"],
+                    "params": run["params"],
+                    "samples": run["samples"],
+                    "divergences": avg_divergences,
+                    "total_divergence": total_divergence,
+                    "accepted": accepted
+                }
+                results_log.append(result)
+                logger.info(f"Jeu {i+1}/{len(param_combinations)}: {run['params']} (score: {total_divergence:.4f})")
                 
-                # Extraction des distributions simulées
-                sim_distributions = self._extract_distributions(simulated_data)
+                # Mise à jour des meilleurs paramètres
+                if accepted:
+                    best_score = total_divergence
+                    best_samples = run["samples"]
+                    best_params = dict(run["params"])
+                    logger.info(f"Nouveaux meilleurs paramètres trouvés: {best_params} (score: {best_score:.4f})")
                 
-                # Calcul des divergences
-                divergences = self._calculate_divergences(reference_distributions, sim_distributions)
-                iteration_divergences.append(divergences)
-            
-            # Moyennes des divergences sur toutes les exécutions
-            avg_divergences = {}
-            for metric in self.metrics.get_all_metrics():
-                values = [d.get(metric, 1.0) for d in iteration_divergences if metric in d]
-                if values:
-                    avg_divergences[metric] = sum(values) / len(values)
-                else:
-                    avg_divergences[metric] = 1.0  # Valeur par défaut (divergence maximale)
-            
-            # Calcul de la divergence totale pondérée
-            metric_weights = self.metrics.get_metric_weights()
-            total_divergence = sum(avg_divergences.get(metric, 0) * weight 
-                                 for metric, weight in metric_weights.items())
-            
-            # Log des résultats
-            result = {
-                "iteration": i,
-                "params": param_dict,
-                "divergences": avg_divergences,
-                "total_divergence": total_divergence,
-                "accepted": total_divergence < best_score
-            }
-            results_log.append(result)
-            
-            # Mise à jour des meilleurs paramètres
-            if total_divergence < best_score:
-                best_score = total_divergence
-                best_params = param_dict.copy()
-                logger.info(f"Nouveaux meilleurs paramètres trouvés: {best_params} (score: {best_score:.4f})")
-            
-            # Early stopping si convergence après un nombre minimum d'itérations
-            if (i >= CalibrationConfig.EARLY_STOPPING_MIN_ITERATIONS and 
-                best_score < CalibrationConfig.CONVERGENCE_THRESHOLD):
-                logger.info(f"Convergence atteinte après {i+1} itérations, arrêt anticipé.")
-                break
+                # Early stopping si convergence après un nombre minimum d'itérations
+                if (i >= CalibrationConfig.EARLY_STOPPING_MIN_ITERATIONS and 
+                    best_samples == CalibrationConfig.SAMPLES_PER_PARAM_SET and
+                    best_score < CalibrationConfig.CONVERGENCE_THRESHOLD):
+                    logger.info(f"Convergence atteinte après {i+1} itérations, arrêt anticipé.")
+                    break
+        finally:
+            # Annule les simulations en attente ; les résultats terminés restent sur disque
+            runs.close()
         
         # Calculer les p-values finales pour les meilleurs paramètres
         self._calculate_final_p_values(reference_distributions, best_params)
@@ -201,6 +213,68 @@ class CalibrationEngine:
         
         return best_params, best_score
     
+    def evaluate_sample(self, params: Dict[str, Any], seed: int,
+                        reference_distributions: Dict[str, np.ndarray]) -> Dict[str, float]:
+        """
+        Exécute une simulation pour un jeu de paramètres et calcule ses divergences
+        
+        Args:
+            params: Jeu de paramètres du simulateur
+            seed: Graine de la simulation (topologie et évolution)
+            reference_distributions: Distributions des données réelles
+            
+        Returns:
+            Dictionnaire des divergences par métrique
+        """
+        # Configuration du simulateur avec ces paramètres
+        sim_config = {
+            "simulation_days": CalibrationConfig.SIMULATION_TICKS,
+            "network_size": self._network_size,
+            "time_granularity": CalibrationConfig.TIME_GRANULARITY,
+            "record_channel_states": True,  # Distributions calculées par canal et par pas
+            "random_seed": seed,
+            **params
+        }
+        
+        # Exécution du simulateur sur la période spécifiée (pas de moteur de décision)
+        with seeded_global_random(seed):
+            sim_env = LightningSimEnvironment(sim_config)
+            simulated_data = sim_env.run_simulation(
+                steps=CalibrationConfig.SIMULATION_TICKS, 
+                decision_engine=DummyDecisionEngine()
+            )
+        
+        # Extraction des distributions simulées et calcul des divergences
+        sim_distributions = self._extract_distributions(simulated_data)
+        if not sim_distributions:
+            raise ValueError(f"La simulation n'a produit aucune distribution exploitable: {params}")
+        return self._calculate_divergences(reference_distributions, sim_distributions)
+    
+    def _aggregate_divergences(self, sample_divergences: List[Dict[str, float]]) -> Tuple[Dict[str, float], float]:
+        """
+        Moyenne les divergences de plusieurs exécutions et calcule la divergence totale pondérée
+        
+        Args:
+            sample_divergences: Divergences de chaque exécution
+            
+        Returns:
+            Tuple (divergences moyennes par métrique, divergence totale)
+        """
+        avg_divergences = {}
+        for metric in self.metrics.get_all_metrics():
+            values = [d[metric] for d in sample_divergences if metric in d]
+            if values:
+                avg_divergences[metric] = sum(values) / len(values)
+            else:
+                avg_divergences[metric] = 1.0  # Valeur par défaut (divergence maximale)
+        
+        # Calcul de la divergence totale pondérée
+        metric_weights = self.metrics.get_metric_weights()
+        total_divergence = float(sum(avg_divergences.get(metric, 0) * weight 
+                                   for metric, weight in metric_weights.items()))
+        
+        return avg_divergences, total_divergence
+    
     def _create_data_summary(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Crée un résumé des données d'entrée pour traçabilité
@@ -243,28 +317,29 @@ class CalibrationEngine:
             real_dist: Distributions des données réelles
             best_params: Meilleurs paramètres trouvés
         """
+        self.final_p_values = {}
+        if best_params is None:
+            return
+        
         # Exécuter une dernière fois le simulateur avec les meilleurs paramètres
         sim_config = {
             "simulation_days": CalibrationConfig.SIMULATION_TICKS,
-            "network_size": 5,  # Valeur par défaut
+            "network_size": self._network_size or 5,
             "time_granularity": CalibrationConfig.TIME_GRANULARITY,
             **best_params
         }
         
-        # Exécution du simulateur
+        # Exécution du simulateur (pas de moteur de décision)
         sim_env = LightningSimEnvironment(sim_config)
-        sim_env.initialize_evolution_engines()
-        dummy_engine = None
         simulated_data = sim_env.run_simulation(
             steps=CalibrationConfig.SIMULATION_TICKS, 
-            decision_engine=dummy_engine
+            decision_engine=DummyDecisionEngine()
         )
         
         # Extraction des distributions simulées
         sim_dist = self._extract_distributions(simulated_data)
         
         # Calcul des p-values pour chaque métrique
-        self.final_p_values = {}
         for metric_name, real_values in real_dist.items():
             if metric_name not in sim_dist:
                 continue
@@ -391,12 +466,15 @@ class CalibrationEngine:
         Extrait les distributions des différentes métriques à partir des données
         
         Args:
-            data: Données prétraitées
+            data: Données prétraitées (DataFrame par canal) ou résultats de
+                LightningSimEnvironment.run_simulation
             
         Returns:
             Dictionnaire des distributions
         """
         distributions = {}
+        if "history" in data:
+            data = self._simulation_to_channel_frames(data)
         
         # Volume de forwarding
         forward_volumes = []
@@ -435,6 +513,40 @@ class CalibrationEngine:
         
         return distributions
     
+    def _simulation_to_channel_frames(self, simulated_data: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+        """
+        Convertit l'historique d'une simulation au format des données prétraitées
+        
+        Chaque pas de l'historique devient une ligne par canal, avec les mêmes
+        colonnes que _preprocess_node_data (volume forwardé, taux de succès,
+        liquidité) pour comparer les distributions réelles et simulées.
+        
+        Args:
+            simulated_data: Résultats de run_simulation (record_channel_states requis)
+            
+        Returns:
+            DataFrame par canal indexé par pas de temps
+        """
+        rows: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in simulated_data.get("history", []):
+            for channel in entry.get("channel_states") or []:
+                rows.setdefault(channel.get("channel_id", "unknown"), []).append({
+                    "time_step": entry["time_step"],
+                    "forward_amount": channel.get("successful_forwards", 0.0) * channel.get("avg_forward_size", 0.0),
+                    "forward_success": channel.get("htlc_success_rate", 0.0),
+                    "local_balance": channel.get("local_balance", 0.0),
+                    "capacity": channel.get("capacity", 0.0)
+                })
+        
+        frames = {}
+        for channel_id, channel_rows in rows.items():
+            df = pd.DataFrame(channel_rows).set_index("time_step")
+            funded = df["capacity"] > 0
+            df["liquidity_ratio"] = (df["local_balance"] / df["capacity"]).where(funded)
+            df["liquidity_ratio_change"] = df["liquidity_ratio"].diff()
+            frames[channel_id] = df
+        return frames
+    
     def _calculate_fee_elasticity(self, data: Dict[str, pd.DataFrame]) -> Optional[float]:
         """
         Calcule l'élasticité des frais à partir des données
@@ -620,7 +732,8 @@ class CalibrationEngine:
             "simulation_config": {
                 "time_granularity": CalibrationConfig.TIME_GRANULARITY,
                 "simulation_ticks": CalibrationConfig.SIMULATION_TICKS,
-                "samples_per_param_set": CalibrationConfig.SAMPLES_PER_PARAM_SET
+                "samples_per_param_set": CalibrationConfig.SAMPLES_PER_PARAM_SET,
+                **self.job_info
             }
         }
         
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Job de calibration parallèle et reprenable.
+Les jeux de paramètres sont choisis par hypercube latin sur la grille (sans
+matérialiser le produit cartésien), chaque exécution (jeu, échantillon) reçoit
+une graine déterministe et est répartie sur un pool de processus. Chaque
+résultat est ajouté au fichier de checkpoint JSONL dès sa réception : une
+calibration interrompue reprend là où elle s'était arrêtée.
+
+Dernière mise à jour: 16 octobre 2026
+"""
+
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional, Iterator, Iterable
+
+import numpy as np
+
+logger = logging.getLogger("calibration_job")
+
+SEARCH_STRATEGIES = ("latin_hypercube", "successive_halving")
+
+# Moteur de calibration et distributions de référence des workers
+_worker_engine = None
+_worker_reference = None
+
+
+def _init_calibration_worker(engine, reference_distributions):
+    global _worker_engine, _worker_reference
+    _worker_engine = engine
+    _worker_reference = reference_distributions
+
+
+def _run_calibration_sample(task: Tuple[int, int, Dict[str, Any], int]) -> Tuple[int, int, Dict[str, float]]:
+    """Exécute une simulation (jeu de paramètres, échantillon) avec sa graine"""
+    param_index, sample_index, params, seed = task
+    divergences = _worker_engine.evaluate_sample(params, seed, _worker_reference)
+    return param_index, sample_index, divergences
+
+
+def _process_pool_context():
+    """Préfère fork : les workers héritent du moteur et des distributions sans sérialisation"""
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def task_seed(job_seed: int, param_index: int, sample_index: int) -> int:
+    """Graine déterministe d'une exécution, indépendante de l'ordre d'exécution"""
+    return int(np.random.SeedSequence([job_seed, param_index, sample_index]).generate_state(1)[0])
+
+
+@contextmanager
+def seeded_global_random(seed: int):
+    """Seede le module random (utilisé par ScenarioMatrix) et restaure son état à la sortie"""
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        yield
+    finally:
+        random.setstate(state)
+
+
+def _to_builtin(value: Any) -> Any:
+    return value.item() if hasattr(value, "item") else value
+
+
+def latin_hypercube_grid(param_ranges: Dict[str, np.ndarray], n: int,
+                         seed: int) -> List[Dict[str, Any]]:
+    """
+    Échantillonne n jeux distincts de la grille par hypercube latin
+
+    Chaque paramètre est découpé en n strates couvertes une fois chacune ;
+    les indices sont tirés dans la grille de valeurs de chaque paramètre.
+    La grille complète est retournée si elle contient au plus n combinaisons.
+
+    Args:
+        param_ranges: Valeurs candidates pour chaque paramètre
+        n: Nombre de jeux de paramètres souhaités
+        seed: Graine de l'échantillonnage
+
+    Returns:
+        Liste de dictionnaires de paramètres
+    """
+    names = list(param_ranges.keys())
+    values = [np.asarray(param_ranges[name]) for name in names]
+    sizes = [len(v) for v in values]
+    grid_size = math.prod(sizes)
+
+    if grid_size <= n:
+        grid = np.stack(np.unravel_index(np.arange(grid_size), sizes), axis=1) if names else np.empty((0, 0), int)
+        indices = [tuple(row) for row in grid.tolist()]
+    else:
+        rng = np.random.default_rng(seed)
+        indices = []
+        seen = set()
+        # Les doublons de la grille discrète sont complétés par de nouveaux tirages
+        for _ in range(10):
+            missing = n - len(indices)
+            if missing <= 0:
+                break
+            strata = [
+                ((rng.permutation(missing) + rng.random(missing)) / missing * size).astype(np.int64)
+                for size in sizes
+            ]
+            for combo in zip(*(s.tolist() for s in strata)):
+                if combo not in seen and len(indices) < n:
+                    seen.add(combo)
+                    indices.append(combo)
+
+    return [
+        {name: _to_builtin(values[p][i]) for p, (name, i) in enumerate(zip(names, combo))}
+        for combo in indices
+    ]
+
+
+class CalibrationJob:
+    """
+    Exécution des simulations de calibration en pool de processus
+
+    Les résultats sont produits jeu de paramètres par jeu de paramètres, dès
+    que toutes ses exécutions sont terminées, sous forme de dict
+    {param_index, params, samples, sample_divergences}.
+    """
+
+    def __init__(self, engine, reference_distributions: Dict[str, np.ndarray],
+                 param_sets: List[Dict[str, Any]], samples_per_set: int,
+                 checkpoint_path: Path, seed: int,
+                 strategy: str = "latin_hypercube", halving_eta: int = 3,
+                 max_workers: Optional[int] = None):
+        """
+        Initialise le job
+
+        Args:
+            engine: Moteur de calibration (evaluate_sample, _aggregate_divergences)
+            reference_distributions: Distributions des données réelles
+            param_sets: Jeux de paramètres à évaluer
+            samples_per_set: Nombre d'exécutions par jeu (fidélité maximale)
+            checkpoint_path: Fichier JSONL des résultats partiels
+            seed: Graine du job
+            strategy: latin_hypercube ou successive_halving
+            halving_eta: Facteur de réduction entre deux paliers de successive halving
+            max_workers: Nombre de processus (1 = exécution dans le processus courant)
+        """
+        if strategy not in SEARCH_STRATEGIES:
+            raise ValueError(f"Stratégie de recherche non supportée: {strategy}")
+
+        self.engine = engine
+        self.reference_distributions = reference_distributions
+        self.param_sets = param_sets
+        self.samples_per_set = samples_per_set
+        self.checkpoint_path = Path(checkpoint_path)
+        self.seed = seed
+        self.strategy = strategy
+        self.halving_eta = max(2, halving_eta)
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+        self.completed: Dict[Tuple[int, int], Dict[str, float]] = self._load_checkpoint()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def job_id(*parts: Any) -> str:
+        """Identifiant stable d'un job à partir de sa configuration"""
+        payload = json.dumps(parts, sort_keys=True, default=lambda o: np.asarray(o).tolist())
+        return hashlib.md5(payload.encode()).hexdigest()[:16]
+
+    def _load_checkpoint(self) -> Dict[Tuple[int, int], Dict[str, float]]:
+        """Charge les exécutions déjà terminées (ligne tronquée par un crash ignorée)"""
+        completed = {}
+        if not self.checkpoint_path.exists():
+            return completed
+
+        with open(self.checkpoint_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    completed[(record["param_index"], record["sample_index"])] = record["divergences"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+
+        if completed:
+            logger.info(f"Reprise du job: {len(completed)} exécutions déjà terminées ({self.checkpoint_path})")
+        return completed
+
+    def _record(self, checkpoint, param_index: int, sample_index: int,
+                divergences: Dict[str, float]) -> None:
+        self.completed[(param_index, sample_index)] = divergences
+        checkpoint.write(json.dumps({
+            "param_index": param_index,
+            "sample_index": sample_index,
+            "seed": task_seed(self.seed, param_index, sample_index),
+            "params": self.param_sets[param_index],
+            "divergences": divergences
+        }) + "\n")
+        checkpoint.flush()
+
+    def _tasks(self, param_indices: Iterable[int], samples: int) -> List[Tuple[int, int, Dict[str, Any], int]]:
+        return [
+            (i, j, self.param_sets[i], task_seed(self.seed, i, j))
+            for i in param_indices
+            for j in range(samples)
+            if (i, j) not in self.completed
+        ]
+
+    def _execute(self, tasks, checkpoint) -> Iterator[Tuple[int, int]]:
+        """Exécute les tâches (pool de processus ou local) et produit (param_index, sample_index)"""
+        if not tasks:
+            return
+
+        if self.max_workers > 1 and len(tasks) > 1:
+            try:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=_process_pool_context(),
+                        initializer=_init_calibration_worker,
+                        initargs=(self.engine, self.reference_distributions)
+                    )
+                futures = [self._executor.submit(_run_calibration_sample, task) for task in tasks]
+                for future in as_completed(futures):
+                    param_index, sample_index, divergences = future.result()
+                    self._record(checkpoint, param_index, sample_index, divergences)
+                    yield param_index, sample_index
+                return
+            except Exception as e:
+                logger.warning(f"Pool de processus indisponible ({e}), calcul local")
+                self._shutdown()
+                tasks = [task for task in tasks if (task[0], task[1]) not in self.completed]
+
+        for param_index, sample_index, params, seed in tasks:
+            divergences = self.engine.evaluate_sample(params, seed, self.reference_distributions)
+            self._record(checkpoint, param_index, sample_index, divergences)
+            yield param_index, sample_index
+
+    def _shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _result(self, param_index: int, samples: int) -> Dict[str, Any]:
+        return {
+            "param_index": param_index,
+            "params": self.param_sets[param_index],
+            "samples": samples,
+            "sample_divergences": [self.completed[(param_index, j)] for j in range(samples)]
+        }
+
+    def _score(self, param_index: int, samples: int) -> float:
+        _, total = self.engine._aggregate_divergences(
+            [self.completed[(param_index, j)] for j in range(samples)]
+        )
+        return total
+
+    def _run_rung(self, param_indices: List[int], samples: int, checkpoint) -> Iterator[int]:
+        """Complète `samples` exécutions par jeu et produit chaque jeu dès qu'il est terminé"""
+        remaining = {i: sum((i, j) not in self.completed for j in range(samples)) for i in param_indices}
+
+        # Jeux déjà complets dans le checkpoint
+        for i in param_indices:
+            if remaining[i] == 0:
+                yield i
+
+        for param_index, _ in self._execute(self._tasks(param_indices, samples), checkpoint):
+            remaining[param_index] -= 1
+            if remaining[param_index] == 0:
+                yield param_index
+
+    def run(self) -> Iterator[Dict[str, Any]]:
+        """
+        Exécute le job et produit les résultats par jeu de paramètres
+
+        Interrompre l'itération (break) annule les exécutions en attente ;
+        les exécutions terminées restent dans le checkpoint.
+        """
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            with open(self.checkpoint_path, "a") as checkpoint:
+                # Terminer une éventuelle ligne tronquée avant d'ajouter des résultats
+                if checkpoint.tell() > 0 and not self.checkpoint_path.read_bytes().endswith(b"\n"):
+                    checkpoint.write("\n")
+                if self.strategy == "latin_hypercube":
+                    for i in self._run_rung(list(range(len(self.param_sets))), self.samples_per_set, checkpoint):
+                        yield self._result(i, self.samples_per_set)
+                else:
+                    yield from self._successive_halving(checkpoint)
+        finally:
+            self._shutdown()
+
+    def _successive_halving(self, checkpoint) -> Iterator[Dict[str, Any]]:
+        """
+        Successive halving : tous les jeux à faible nombre d'exécutions, puis seul
+        le meilleur 1/eta est conservé et réévalué avec eta fois plus d'exécutions.
+        Un jeu éliminé est produit avec la fidélité atteinte.
+        """
+        eta = self.halving_eta
+        candidates = list(range(len(self.param_sets)))
+        rungs = min(
+            int(math.log(max(1, len(candidates)), eta)),
+            int(math.log(max(1, self.samples_per_set), eta))
+        )
+        samples = max(1, self.samples_per_set // eta ** rungs)
+
+        while True:
+            finished = list(self._run_rung(candidates, samples, checkpoint))
+            if samples >= self.samples_per_set or len(candidates) <= 1:
+                for i in finished:
+                    yield self._result(i, samples)
+                return
+
+            ranked = sorted(candidates, key=lambda i: self._score(i, samples))
+            keep = max(1, math.ceil(len(ranked) / eta))
+            for i in ranked[keep:]:
+                yield self._result(i, samples)
+
+            logger.info(f"Successive halving: {keep}/{len(ranked)} jeux conservés, "
+                        f"{min(self.samples_per_set, samples * eta)} exécutions par jeu")
+            candidates = sorted(ranked[:keep])
+            samples = min(self.samples_per_set, samples * eta)
@@ -15,7 +15,7 @@ from pathlib import Path
 from datetime import datetime, timedelta
 
 from .performance_metrics import PerformanceMetrics
-from .channel_evolution import StochasticChannelEvolution
+from .vectorized_evolution import VectorizedChannelEvolution
 from .scenario_matrix import ScenarioMatrix
 from .simulation_fixtures import SimulationFixtures
 
@@ -64,13 +64,18 @@ class LightningSimEnvironment:
                 - simulation_days: Nombre de jours à simuler
                 - noise_level: Niveau de bruit
                 - save_results: Sauvegarde des résultats
+                - random_seed: Graine du générateur aléatoire (optionnelle)
+                - record_channel_states: Conserver l'état de chaque canal dans l'historique
+                  (True par défaut ; False pour les simulations de calibration)
         """
         self.config = config
+        self.rng = np.random.default_rng(config.get("random_seed"))
         self.metrics_tracker = PerformanceMetrics()
         self.network = self._build_network_from_config(config)
         self.time_step = 0
         self.history = []
-        self.channel_evolutions = {}  # Stocke les objets d'évolution pour chaque canal
+        # Évolution de tous les canaux en structure de tableaux
+        self.evolution: Optional[VectorizedChannelEvolution] = None
         
         logger.info(f"Environnement de simulation initialisé avec {len(self.network['channels'])} canaux")
         
@@ -130,23 +135,26 @@ class LightningSimEnvironment:
     
     def initialize_evolution_engines(self) -> None:
         """
-        Initialise les moteurs d'évolution stochastique pour chaque canal
+        Initialise le moteur d'évolution stochastique vectorisé de tous les canaux
         """
-        self.channel_evolutions = {}
+        # Un canal par identifiant (le dernier l'emporte en cas de doublon)
+        channels = list({
+            channel.get("channel_id", "unknown"): channel
+            for channel in self.network["channels"]
+        }.values())
         
-        for channel in self.network["channels"]:
-            # Déterminer les facteurs de volatilité en fonction du canal
-            volatility_factors = {
-                "volume": 0.1 + 0.2 * (1 - channel.get("centrality_score", 0.5)),  # Les nœuds périphériques ont plus de volatilité
-                "success_rate": 0.05 + 0.1 * channel.get("network_volatility", 0.2),
-                "liquidity": 0.2,
-                "noise": 0.05 + 0.1 * channel.get("network_volatility", 0.2)
-            }
-            
-            # Créer un moteur d'évolution pour ce canal
-            channel_id = channel.get("channel_id", "unknown")
-            self.channel_evolutions[channel_id] = StochasticChannelEvolution(
-                channel, volatility_factors)
+        centrality = np.array([channel.get("centrality_score", 0.5) for channel in channels], dtype=np.float64)
+        network_volatility = np.array([channel.get("network_volatility", 0.2) for channel in channels], dtype=np.float64)
+        
+        # Facteurs de volatilité par canal
+        volatility_factors = {
+            "volume": 0.1 + 0.2 * (1 - centrality),  # Les nœuds périphériques ont plus de volatilité
+            "success_rate": 0.05 + 0.1 * network_volatility,
+            "liquidity": np.full(len(channels), 0.2),
+            "noise": 0.05 + 0.1 * network_volatility
+        }
+        
+        self.evolution = VectorizedChannelEvolution(channels, volatility_factors, self.rng)
     
     def get_current_state(self) -> Dict[str, Any]:
         """
@@ -156,9 +164,7 @@ class LightningSimEnvironment:
             État actuel du système
         """
         # Collecter l'état actuel de tous les canaux
-        current_channels = []
-        for channel_id, evolution in self.channel_evolutions.items():
-            current_channels.append(evolution.get_current_state())
+        current_channels = self.evolution.channel_states() if self.evolution else []
         
         # Mettre à jour le réseau
         current_network = self.network.copy()
@@ -181,10 +187,17 @@ class LightningSimEnvironment:
         Args:
             decisions: Liste des décisions à appliquer
         """
+        if not self.evolution:
+            return
+        
+        # Regrouper les décisions en vagues sans doublon de canal (ordre conservé par canal)
+        waves: List[Dict[int, Tuple[float, float, bool]]] = []
+        last_wave: Dict[int, int] = {}
+        
         for decision in decisions:
             channel_id = decision.get("channel_id")
             
-            if not channel_id or channel_id not in self.channel_evolutions:
+            if not channel_id or channel_id not in self.evolution.index:
                 logger.warning(f"Décision pour un canal inconnu: {channel_id}")
                 continue
                 
@@ -194,50 +207,50 @@ class LightningSimEnvironment:
             if action == "NO_ACTION":
                 continue
                 
-            # Préparer les changements de politique
-            policy_changes = {}
+            fee_base_change = decision.get("fee_base_change", 0)
+            fee_rate_change = decision.get("fee_rate_change", 0)
+            has_policy = True
             
             if action == "INCREASE_FEES":
-                # Extraire les montants d'augmentation
-                fee_base_change = decision.get("fee_base_change", 0)
-                fee_rate_change = decision.get("fee_rate_change", 0)
-                
                 # Si aucun montant spécifique, utiliser des valeurs par défaut
                 if fee_base_change == 0 and fee_rate_change == 0:
                     fee_base_change = 100  # +100 sats
                     fee_rate_change = 50   # +50 ppm
                     
-                policy_changes = {
-                    "fee_base_change": fee_base_change,
-                    "fee_rate_change": fee_rate_change
-                }
-                
             elif action == "DECREASE_FEES":
-                # Extraire les montants de diminution
-                fee_base_change = decision.get("fee_base_change", 0)
-                fee_rate_change = decision.get("fee_rate_change", 0)
-                
                 # Si aucun montant spécifique, utiliser des valeurs par défaut
                 if fee_base_change == 0 and fee_rate_change == 0:
                     fee_base_change = -50   # -50 sats
                     fee_rate_change = -25   # -25 ppm
                     
-                policy_changes = {
-                    "fee_base_change": fee_base_change,
-                    "fee_rate_change": fee_rate_change
-                }
-                
             elif action == "CLOSE_CHANNEL":
-                # Pour l'instant, on simule une fermeture en réduisant fortement l'activité
-                policy_changes = {
-                    "channel_closed": True
-                }
-                # Cette information sera utilisée dans le prochain pas de simulation
+                # Pour l'instant, on simule une fermeture sans changement de frais :
+                # seul l'impact aléatoire sur les forwards réussis s'applique
+                fee_base_change = 0
+                fee_rate_change = 0
                 
-            # Appliquer les changements à l'évolution du canal
-            self.channel_evolutions[channel_id].simulate_step(0, policy_changes)
+            else:
+                # Action inconnue : évolution sans changement de politique
+                fee_base_change = 0
+                fee_rate_change = 0
+                has_policy = False
+            
+            position = self.evolution.index[channel_id]
+            wave = last_wave.get(position, -1) + 1
+            if wave == len(waves):
+                waves.append({})
+            waves[wave][position] = (fee_base_change, fee_rate_change, has_policy)
+            last_wave[position] = wave
             
             logger.info(f"Décision appliquée pour canal {channel_id}: {action}")
+        
+        # Appliquer chaque vague en une passe vectorisée (pas de temps nul + impact de politique)
+        for wave in waves:
+            indices = np.fromiter(wave.keys(), dtype=np.int64, count=len(wave))
+            changes = np.array(list(wave.values()), dtype=np.float64)
+            self.evolution.step(0, indices)
+            with_policy = changes[:, 2].astype(bool)
+            self.evolution.apply_policy(indices[with_policy], changes[with_policy, 0], changes[with_policy, 1])
     
     def evolve_network(self, time_delta: int = 1) -> None:
         """
@@ -246,9 +259,9 @@ class LightningSimEnvironment:
         Args:
             time_delta: Nombre de jours à simuler
         """
-        # Faire évoluer chaque canal
-        for channel_id, evolution in self.channel_evolutions.items():
-            evolution.simulate_step(time_delta)
+        # Faire évoluer tous les canaux en une passe vectorisée
+        if self.evolution:
+            self.evolution.step(time_delta)
         
         # Mettre à jour le timestamp
         self.time_step += time_delta
@@ -260,54 +273,14 @@ class LightningSimEnvironment:
         """
         Met à jour les métriques globales basées sur l'état actuel du réseau
         """
-        # Collecter l'état de tous les canaux
-        all_channels = [evolution.get_current_state() 
-                         for evolution in self.channel_evolutions.values()]
-        
-        # Calculer les métriques
-        total_revenue = sum(channel.get("revenue", 0) for channel in all_channels)
-        total_forwards = sum(channel.get("total_forwards", 0) for channel in all_channels)
-        successful_forwards = sum(channel.get("successful_forwards", 0) for channel in all_channels)
-        
-        # Taux de succès global
-        htlc_success_rate = successful_forwards / max(1, total_forwards)
-        
-        # Efficacité du capital
-        total_capacity = sum(channel.get("capacity", 0) for channel in all_channels)
-        capital_efficiency = successful_forwards / max(1, total_capacity / 100000)
-        
-        # Coût des rebalancements (dans un vrai système, cela viendrait de données réelles)
-        # Pour la simulation, on estime un coût proportionnel aux déséquilibres
-        rebalancing_cost = sum(
-            abs(channel.get("local_balance", 0) - channel.get("capacity", 0) / 2) * 0.0001
-            for channel in all_channels
-        )
+        if self.evolution:
+            updated_metrics = self.evolution.aggregate_metrics()
+        else:
+            updated_metrics = VectorizedChannelEvolution([], {}).aggregate_metrics()
         
-        # Compétitivité des frais (moyenne pondérée par succès)
-        weighted_fee_rates = [
-            channel.get("local_fee_rate", 0) * channel.get("successful_forwards", 0)
-            for channel in all_channels
-        ]
-        avg_fee_rate = sum(weighted_fee_rates) / max(1, successful_forwards)
-        
-        # Normaliser la compétitivité (plus bas = plus compétitif, mais pas trop bas)
-        # Une échelle de 0 à 1 où 0.5 est optimal
-        fee_competitiveness = 1.0 / (1.0 + np.exp(-(avg_fee_rate - 500) / 200))
-        
-        # Rétention des pairs (canaux actifs / total)
-        peer_retention_rate = sum(1 for channel in all_channels if channel.get("active", True)) / max(1, len(all_channels))
-        
-        # Mettre à jour les métriques globales
-        updated_metrics = {
-            "revenue": total_revenue,
-            "opportunity_cost": total_forwards - successful_forwards,
-            "capital_efficiency": capital_efficiency,
-            "rebalancing_cost": rebalancing_cost,
-            "peer_retention_rate": peer_retention_rate,
-            "htlc_success_rate": htlc_success_rate,
-            "fee_competitiveness": fee_competitiveness,
-            "uptime": peer_retention_rate  # Simplification, en réalité plus complexe
-        }
+        channel_states = []
+        if self.evolution and self.config.get("record_channel_states", True):
+            channel_states = self.evolution.channel_states()
         
         self.metrics_tracker.update_metrics(updated_metrics)
         
@@ -315,7 +288,7 @@ class LightningSimEnvironment:
         self.history.append({
             "time_step": self.time_step,
             "metrics": updated_metrics.copy(),
-            "channel_states": [channel.copy() for channel in all_channels]
+            "channel_states": channel_states
         })
     
     def run_simulation(self, steps: int, decision_engine: Any) -> Dict[str, Any]:
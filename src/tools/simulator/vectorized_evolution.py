@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Moteur d'évolution stochastique vectorisé pour l'ensemble des canaux.
+Reproduit le modèle de StochasticChannelEvolution (marche aléatoire de volume,
+pression de liquidité saisonnière, bruit, élasticité aux frais) sous forme de
+structure de tableaux NumPy : un pas de simulation = quelques opérations
+vectorisées sur tous les canaux, tirées d'un np.random.Generator unique.
+
+Dernière mise à jour: 16 octobre 2026
+"""
+
+import logging
+import numpy as np
+from typing import Dict, Any, List, Optional, Sequence
+
+logger = logging.getLogger("vectorized_evolution")
+
+# Métriques numériques suivies en tableaux (valeur par défaut si absente du canal)
+STATE_DEFAULTS = {
+    "capacity": 0.0,
+    "local_balance": 0.0,
+    "remote_balance": 0.0,
+    "total_forwards": 0.0,
+    "successful_forwards": 0.0,
+    "local_fee_base_msat": 1000.0,
+    "local_fee_rate": 500.0,
+    "avg_forward_size": 50000.0,
+    "revenue": 0.0,
+    "htlc_success_rate": 0.0,
+    "centrality_score": 0.5,
+}
+
+# Paramètres des processus de StochasticChannelEvolution
+VOLUME_DRIFT = 0.01
+VOLUME_VOLATILITY = 0.05
+SEASONAL_AMPLITUDE = 0.2
+SEASONAL_PERIOD = 7
+
+
+class VectorizedChannelEvolution:
+    """
+    Évolution stochastique de tous les canaux en structure de tableaux
+
+    L'index i de chaque tableau correspond à channel_ids[i].
+    """
+
+    def __init__(self, channels: Sequence[Dict[str, Any]],
+                 volatility: Dict[str, np.ndarray],
+                 rng: Optional[np.random.Generator] = None):
+        """
+        Initialise les tableaux d'état à partir des canaux
+
+        Args:
+            channels: Paramètres initiaux des canaux
+            volatility: Tableaux de volatilité par canal (volume, success_rate, liquidity, noise)
+            rng: Générateur aléatoire (seedé pour des simulations reproductibles)
+        """
+        self.rng = rng or np.random.default_rng()
+        self.base = [dict(channel) for channel in channels]
+        self.channel_ids = [channel.get("channel_id", "unknown") for channel in self.base]
+        self.index = {channel_id: i for i, channel_id in enumerate(self.channel_ids)}
+        size = len(self.base)
+
+        self.state = {
+            metric: np.array([float(channel.get(metric, default)) for channel in self.base], dtype=np.float64)
+            for metric, default in STATE_DEFAULTS.items()
+        }
+        self.active = np.array([bool(channel.get("active", True)) for channel in self.base])
+
+        # Métriques restituées par canal : celles du canal plus les métriques dérivées
+        metrics = tuple(STATE_DEFAULTS)
+        self._state_keys = [
+            tuple(m for m in metrics if m in channel or m in ("revenue", "htlc_success_rate"))
+            for channel in self.base
+        ]
+        self._complete = [keys == metrics for keys in self._state_keys]
+
+        self.volatility = {
+            key: np.broadcast_to(np.asarray(volatility.get(key, default), dtype=np.float64), (size,))
+            for key, default in (("volume", 0.1), ("success_rate", 0.05), ("liquidity", 0.2), ("noise", 0.05))
+        }
+
+        # Processus latents : marche aléatoire de volume et saison déphasée par canal
+        self.volume_walk = np.zeros(size)
+        self.season_day = np.zeros(size, dtype=np.int64)
+        self.season_phase = self.rng.uniform(0, 2 * np.pi, size)
+
+    def __len__(self) -> int:
+        return len(self.channel_ids)
+
+    def _select(self, indices: Optional[np.ndarray]) -> np.ndarray:
+        return np.arange(len(self)) if indices is None else np.asarray(indices, dtype=np.int64)
+
+    def step(self, time_delta: int = 1, indices: Optional[np.ndarray] = None) -> None:
+        """
+        Évolution naturelle d'un pas de temps (équivalent de _apply_natural_evolution)
+
+        Args:
+            time_delta: Nombre de jours à simuler
+            indices: Canaux concernés (tous par défaut)
+        """
+        idx = self._select(indices)
+        size = idx.size
+        if size == 0:
+            return
+        s = self.state
+        rng = self.rng
+
+        self.volume_walk[idx] += VOLUME_DRIFT + rng.normal(0, VOLUME_VOLATILITY, size)
+        volume_trend = self.volume_walk[idx]
+
+        self.season_day[idx] += 1
+        liquidity_pressure = (
+            SEASONAL_AMPLITUDE * np.sin(2 * np.pi * self.season_day[idx] / SEASONAL_PERIOD + self.season_phase[idx])
+            + rng.normal(0, SEASONAL_AMPLITUDE / 3, size)
+        )
+
+        factors = {
+            "total_forwards": 1.0 + volume_trend * self.volatility["volume"][idx] * time_delta,
+            "successful_forwards": 1.0 + (volume_trend - 0.05) * self.volatility["success_rate"][idx] * time_delta,
+            "local_balance": 1.0 + liquidity_pressure * self.volatility["liquidity"][idx] * time_delta,
+        }
+        noise = self.volatility["noise"][idx]
+        for metric, factor in factors.items():
+            s[metric][idx] = np.maximum(0, s[metric][idx] * factor) * (1.0 + rng.normal(0, 1, size) * noise)
+
+        # Capacité constante : local + remote = capacity
+        capacity = s["capacity"][idx]
+        funded = capacity > 0
+        local = np.where(funded, np.clip(s["local_balance"][idx], 0, capacity), s["local_balance"][idx])
+        s["local_balance"][idx] = local
+        s["remote_balance"][idx] = np.where(funded, capacity - local, s["remote_balance"][idx])
+
+        total = s["total_forwards"][idx]
+        successful = np.minimum(s["successful_forwards"][idx], total)
+        s["successful_forwards"][idx] = successful
+        s["htlc_success_rate"][idx] = successful / np.maximum(1, total)
+
+        # Revenus = (base_fee + forward_size * fee_rate) * successful_forwards
+        fee_base = s["local_fee_base_msat"][idx] / 1000
+        fee_rate = s["local_fee_rate"][idx] / 1000000
+        s["revenue"][idx] += (fee_base + s["avg_forward_size"][idx] * fee_rate) * successful
+
+    def apply_policy(self, indices: np.ndarray, fee_base_change: np.ndarray, fee_rate_change: np.ndarray) -> None:
+        """
+        Impact des changements de politique (équivalent de _apply_policy_impact)
+
+        Args:
+            indices: Canaux concernés (sans doublon)
+            fee_base_change: Variation de frais de base (sats) par canal
+            fee_rate_change: Variation de taux (ppm) par canal
+        """
+        idx = np.asarray(indices, dtype=np.int64)
+        size = idx.size
+        if size == 0:
+            return
+        s = self.state
+        rng = self.rng
+        base_change = np.asarray(fee_base_change, dtype=np.float64)
+        rate_change = np.asarray(fee_rate_change, dtype=np.float64)
+
+        s["local_fee_base_msat"][idx] = np.where(
+            base_change != 0, np.maximum(0, s["local_fee_base_msat"][idx] + base_change * 1000),
+            s["local_fee_base_msat"][idx]
+        )
+        fee_rate = np.where(rate_change != 0, np.maximum(0, s["local_fee_rate"][idx] + rate_change), s["local_fee_rate"][idx])
+        s["local_fee_rate"][idx] = fee_rate
+
+        # Élasticité atténuée par la centralité
+        base_elasticity = -0.4 * np.log(fee_rate / 50 + 0.1) + rng.normal(0, 0.15, size)
+        adjusted_elasticity = base_elasticity * (1 - 0.7 * s["centrality_score"][idx])
+
+        previous_fee_rate = fee_rate - rate_change
+        impacted = (fee_rate > 0) & (previous_fee_rate > 0)
+        relative_change = np.divide(rate_change, previous_fee_rate, out=np.zeros(size), where=impacted)
+        volume_impact = np.where(impacted, 1 + adjusted_elasticity * relative_change, 1.0)
+        success_variance = np.where(impacted, rng.uniform(0.9, 1.1, size), 1.0)
+
+        total = s["total_forwards"][idx] * volume_impact
+        s["total_forwards"][idx] = total
+        s["successful_forwards"][idx] = np.minimum(
+            s["successful_forwards"][idx] * volume_impact * success_variance, total
+        )
+
+        # Frais en hausse : 30% de chance d'attirer de la liquidité entrante
+        capacity = s["capacity"][idx]
+        shifted = (rate_change > 0) & (rng.random(size) < 0.3) & (capacity > 0)
+        remote = np.clip(s["remote_balance"][idx] + capacity * rate_change / 10000, 0, capacity)
+        s["remote_balance"][idx] = np.where(shifted, remote, s["remote_balance"][idx])
+        s["local_balance"][idx] = np.where(shifted, capacity - remote, s["local_balance"][idx])
+
+    def aggregate_metrics(self) -> Dict[str, float]:
+        """Métriques globales du réseau calculées directement sur les tableaux"""
+        s = self.state
+        count = len(self)
+        total_forwards = float(s["total_forwards"].sum())
+        successful_forwards = float(s["successful_forwards"].sum())
+        total_capacity = float(s["capacity"].sum())
+
+        avg_fee_rate = float(np.dot(s["local_fee_rate"], s["successful_forwards"])) / max(1, successful_forwards)
+        peer_retention_rate = float(self.active.sum()) / max(1, count)
+
+        return {
+            "revenue": float(s["revenue"].sum()),
+            "opportunity_cost": total_forwards - successful_forwards,
+            "capital_efficiency": successful_forwards / max(1, total_capacity / 100000),
+            "rebalancing_cost": float(np.abs(s["local_balance"] - s["capacity"] / 2).sum() * 0.0001),
+            "peer_retention_rate": peer_retention_rate,
+            "htlc_success_rate": successful_forwards / max(1, total_forwards),
+            # Échelle de 0 à 1 où 0.5 est optimal
+            "fee_competitiveness": float(1.0 / (1.0 + np.exp(-(avg_fee_rate - 500) / 200))),
+            "uptime": peer_retention_rate
+        }
+
+    def channel_states(self) -> List[Dict[str, Any]]:
+        """Matérialise l'état de chaque canal en dict (format de get_current_state)"""
+        metrics = tuple(self.state)
+        rows = np.column_stack([self.state[m] for m in metrics]).tolist() if len(self) else []
+        states = []
+        for base, row, keys, complete in zip(self.base, rows, self._state_keys, self._complete):
+            state = base.copy()
+            if complete:
+                state.update(zip(metrics, row))
+            else:
+                values = dict(zip(metrics, row))
+                state.update((key, values[key]) for key in keys)
+            states.append(state)
+        return states
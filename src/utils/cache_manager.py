@@ -80,22 +80,47 @@ class CacheManager:
             cache_key = self._make_key(key, data_type)
             value = await redis_client.get(cache_key)
             
-            if value:
-                try:
-                    # Tentative de désérialisation JSON d'abord
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    # Fallback vers pickle pour les objets complexes
-                    try:
-                        return pickle.loads(value.encode('latin1'))
-                    except:
-                        return value
-            return None
+            return self._deserialize(value)
             
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du cache pour {key}: {str(e)}")
             return None
     
+    async def get_many(self, keys: List[str], data_type: str = None) -> Dict[str, Any]:
+        """Récupère plusieurs valeurs en un seul MGET (seules les clés présentes sont retournées)"""
+        if not keys:
+            return {}
+        try:
+            redis_client = await self._get_redis()
+            if redis_client is None:
+                return {}
+            
+            values = await redis_client.mget([self._make_key(key, data_type) for key in keys])
+            found = {}
+            for key, value in zip(keys, values):
+                value = self._deserialize(value)
+                if value is not None:
+                    found[key] = value
+            return found
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération groupée du cache ({len(keys)} clés): {str(e)}")
+            return {}
+    
+    def _deserialize(self, value: Optional[str]) -> Optional[Any]:
+        """Désérialise une valeur lue dans Redis (JSON, puis pickle)"""
+        if value:
+            try:
+                # Tentative de désérialisation JSON d'abord
+                return json.loads(value)
+            except json.JSONDecodeError:
+                # Fallback vers pickle pour les objets complexes
+                try:
+                    return pickle.loads(value.encode('latin1'))
+                except:
+                    return value
+        return None
+    
     async def set(self, key: str, value: Any, ttl: Optional[int] = None, data_type: str = None) -> bool:
         """Stocke une valeur dans le cache"""
         try:
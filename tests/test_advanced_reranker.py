@@ -0,0 +1,109 @@
+"""
+Tests unitaires pour Advanced Reranker
+"""
+
+import time
+
+import numpy as np
+from src.advanced_reranker import AdvancedReranker, LightningReranker, Document
+
+
+def make_document(doc_id, embedding, similarity):
+    return Document(
+        doc_id=doc_id,
+        content=f"content {doc_id}",
+        embedding=embedding,
+        similarity_score=similarity,
+        metadata={}
+    )
+
+
+class TestMMRSelection:
+    """Tests pour la sélection MMR"""
+    
+    def test_duplicate_is_pushed_down(self):
+        """Test un quasi-doublon passe derrière un document diversifié"""
+        documents = [
+            make_document("a", [1.0, 0.0], 0.90),
+            make_document("a_dup", [1.0, 0.01], 0.89),
+            make_document("b", [0.0, 1.0], 0.80)
+        ]
+        
+        reranker = AdvancedReranker(diversity_weight=0.5)
+        reranked = reranker.rerank(documents)
+        
+        assert [doc.doc_id for doc in reranked] == ["a", "b", "a_dup"]
+    
+    def test_no_diversity_keeps_composite_order(self):
+        """Test sans diversité : tri par score composite"""
+        documents = [
+            make_document("low", [1.0, 0.0], 0.2),
+            make_document("high", [1.0, 0.0], 0.9)
+        ]
+        
+        reranker = AdvancedReranker(diversity_weight=0.0)
+        
+        assert [doc.doc_id for doc in reranker.rerank(documents)] == ["high", "low"]
+    
+    def test_matches_naive_mmr(self):
+        """Test sélection identique à une implémentation MMR naïve"""
+        rng = np.random.default_rng(7)
+        documents = [
+            make_document(str(i), rng.normal(size=8).tolist(), float(rng.uniform()))
+            for i in range(30)
+        ]
+        documents[3].embedding = []
+        
+        reranker = LightningReranker(diversity_weight=0.3)
+        reranked = reranker.rerank(documents, top_n=10)
+        
+        scored = sorted(
+            (
+                (
+                    reranker._normalize_score(doc.similarity_score) * reranker.similarity_weight
+                    + reranker._calculate_recency_score(doc) * reranker.recency_weight
+                    + reranker._calculate_quality_score(doc) * reranker.quality_weight
+                    + doc.get_popularity_score() * reranker.popularity_weight,
+                    doc
+                )
+                for doc in documents
+            ),
+            key=lambda x: x[0],
+            reverse=True
+        )
+        
+        def similarity(a, b):
+            if not a.embedding or not b.embedding:
+                return 0.0
+            return reranker._compute_embedding_similarity(a.embedding, b.embedding)
+        
+        expected = []
+        remaining = list(scored)
+        while remaining and len(expected) < 10:
+            best = max(
+                remaining,
+                key=lambda item: item[0] - reranker.diversity_weight * max(
+                    [0.0] + [similarity(item[1], chosen) for chosen in expected]
+                )
+            )
+            expected.append(best[1])
+            remaining.remove(best)
+        
+        assert [doc.doc_id for doc in reranked] == [doc.doc_id for doc in expected]
+    
+    def test_rerank_200_candidates_is_fast(self):
+        """Test performance : 200 candidats en quelques millisecondes"""
+        rng = np.random.default_rng(0)
+        documents = [
+            make_document(str(i), rng.normal(size=768).tolist(), float(rng.uniform()))
+            for i in range(200)
+        ]
+        reranker = AdvancedReranker()
+        
+        start = time.perf_counter()
+        reranked = reranker.rerank(documents)
+        duration = time.perf_counter() - start
+        
+        assert len(reranked) == 200
+        assert len({doc.doc_id for doc in reranked}) == 200
+        assert duration < 0.5
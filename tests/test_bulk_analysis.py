@@ -0,0 +1,216 @@
+"""
+Tests unitaires pour l'analyse en masse (/api/v1/nodes/bulk-analysis) et CacheManager.get_many
+"""
+
+import asyncio
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+# app/models.py masque le paquet app/models/ : on charge les schémas MCP depuis leur fichier
+if "app.models.mcp_schemas" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location(
+        "app.models.mcp_schemas",
+        Path(__file__).resolve().parents[1] / "app" / "models" / "mcp_schemas.py"
+    )
+    _schemas = importlib.util.module_from_spec(_spec)
+    sys.modules["app.models.mcp_schemas"] = _schemas
+    _spec.loader.exec_module(_schemas)
+
+from app.models.mcp_schemas import BulkAnalysisRequest, BulkAnalysisResponse
+from app.routes import intelligence
+from src.utils.cache_manager import CacheManager
+
+
+def node_data(pubkey):
+    """Données Sparkseer minimales d'un nœud"""
+    return {
+        "node_info": {"pubkey": pubkey, "alias": f"alias-{pubkey}"},
+        "metrics": {"total_channels": 3, "total_capacity": 3_000_000},
+        "source": "sparkseer",
+    }
+
+
+class FakeRedis:
+    """Client Redis en mémoire (mget, set, setex) qui compte les appels"""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.mget_calls = []
+
+    async def mget(self, keys):
+        self.mget_calls.append(list(keys))
+        return [self.values.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+
+class FakeSparkseer:
+    """Client Sparkseer : nœuds connus, nœuds en erreur, nœuds absents"""
+
+    def __init__(self, known=(), failing=()):
+        self.known = set(known)
+        self.failing = set(failing)
+        self.calls = []
+
+    async def get_node_info(self, pubkey):
+        self.calls.append(pubkey)
+        if pubkey in self.failing:
+            raise RuntimeError("sparkseer indisponible")
+        return node_data(pubkey) if pubkey in self.known else None
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache(redis_client, monkeypatch):
+    """CacheManager branché sur le client Redis en mémoire"""
+    manager = CacheManager()
+
+    async def get_redis():
+        return redis_client
+
+    monkeypatch.setattr(manager, "_get_redis", get_redis)
+    monkeypatch.setattr(intelligence, "cache_manager", manager)
+    return manager
+
+
+@pytest.fixture
+def sparkseer(monkeypatch):
+    client = FakeSparkseer(known=["a", "b", "c"], failing=["boom"])
+    monkeypatch.setattr(intelligence, "sparkseer_client", client)
+    return client
+
+
+async def read_ndjson(response):
+    """Lit les lignes NDJSON d'une StreamingResponse"""
+    lines = [chunk async for chunk in response.body_iterator]
+    return [json.loads(line) for line in lines]
+
+
+class TestCacheManagerGetMany:
+    """Tests pour CacheManager.get_many"""
+
+    @pytest.mark.asyncio
+    async def test_single_mget(self, cache, redis_client):
+        """Test lecture groupée : un seul MGET, seules les clés présentes retournées"""
+        await cache.set("a", {"value": 1}, data_type="node_info")
+        await cache.set("b", [1, 2], data_type="node_info")
+
+        found = await cache.get_many(["a", "missing", "b"], "node_info")
+
+        assert found == {"a": {"value": 1}, "b": [1, 2]}
+        assert redis_client.mget_calls == [["mcp:node_info:a", "mcp:node_info:missing", "mcp:node_info:b"]]
+
+    @pytest.mark.asyncio
+    async def test_empty_and_unavailable(self, cache, redis_client, monkeypatch):
+        """Test aucune clé, Redis indisponible ou en erreur : dictionnaire vide"""
+        assert await cache.get_many([]) == {}
+        assert redis_client.mget_calls == []
+
+        async def failing_mget(keys):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(redis_client, "mget", failing_mget)
+        assert await cache.get_many(["a"]) == {}
+
+        async def no_redis():
+            return None
+
+        monkeypatch.setattr(cache, "_get_redis", no_redis)
+        assert await cache.get_many(["a"]) == {}
+
+
+class TestBulkNodeAnalysis:
+    """Tests pour bulk_node_analysis"""
+
+    def test_aggregated_response_by_default(self, cache, sparkseer):
+        """Test réponse JSON conforme à BulkAnalysisResponse sans paramètre stream"""
+        app = FastAPI()
+        app.include_router(intelligence.router)
+
+        with TestClient(app) as client:
+            response = client.post(
+                "/api/v1/nodes/bulk-analysis",
+                json={"pubkeys": ["a", "b", "a", "unknown", "boom"]}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        body = BulkAnalysisResponse(**response.json())
+        assert (body.total_analyzed, body.successful, body.failed) == (4, 2, 2)
+        assert sorted(result.pubkey for result in body.results) == ["a", "b"]
+        assert {error["pubkey"]: error["error"] for error in body.errors} == {
+            "unknown": "Nœud non trouvé",
+            "boom": "sparkseer indisponible",
+        }
+        assert sorted(sparkseer.calls) == ["a", "b", "boom", "unknown"]
+
+    @pytest.mark.asyncio
+    async def test_cache_hits_read_in_one_mget(self, cache, sparkseer, redis_client):
+        """Test entrées en cache lues en un MGET, Sparkseer appelé pour les seuls manquants"""
+        await cache.set(intelligence._node_info_cache_key("a"), node_data("a"), data_type="node_info")
+        request = BulkAnalysisRequest(pubkeys=["a", "b"])
+
+        response = await intelligence.bulk_node_analysis(request, stream=False)
+
+        assert len(redis_client.mget_calls) == 1
+        assert sparkseer.calls == ["b"]
+        assert {result.pubkey: result.cache_hit for result in response.results} == {"a": True, "b": False}
+
+        response = await intelligence.bulk_node_analysis(request, stream=False)
+        assert sparkseer.calls == ["b"]
+        assert all(result.cache_hit for result in response.results)
+
+    @pytest.mark.asyncio
+    async def test_ndjson_stream(self, cache, sparkseer):
+        """Test stream=true : une ligne par nœud puis une ligne summary"""
+        request = BulkAnalysisRequest(pubkeys=["a", "unknown", "c", "boom"], use_cache=False)
+
+        response = await intelligence.bulk_node_analysis(request, stream=True)
+
+        assert isinstance(response, StreamingResponse)
+        assert response.media_type == "application/x-ndjson"
+        lines = await read_ndjson(response)
+        assert [line["type"] for line in lines[:-1]].count("result") == 2
+        assert {line["pubkey"] for line in lines[:-1] if line["type"] == "result"} == {"a", "c"}
+        assert {line["pubkey"] for line in lines[:-1] if line["type"] == "error"} == {"unknown", "boom"}
+        summary = lines[-1]
+        assert summary["type"] == "summary"
+        assert (summary["total_analyzed"], summary["successful"], summary["failed"]) == (4, 2, 2)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self, cache, monkeypatch):
+        """Test appels Sparkseer simultanés limités à BULK_ANALYSIS_CONCURRENCY"""
+        monkeypatch.setattr(intelligence, "BULK_ANALYSIS_CONCURRENCY", 3)
+        in_flight = peak = 0
+
+        class SlowSparkseer:
+            async def get_node_info(self, pubkey):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return node_data(pubkey)
+
+        monkeypatch.setattr(intelligence, "sparkseer_client", SlowSparkseer())
+        request = BulkAnalysisRequest(pubkeys=[f"n{i}" for i in range(10)], use_cache=False)
+
+        response = await intelligence.bulk_node_analysis(request, stream=False)
+
+        assert response.successful == 10
+        assert peak == 3
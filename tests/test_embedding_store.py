@@ -0,0 +1,192 @@
+"""
+Tests unitaires pour le store d'embeddings mmap
+"""
+
+import multiprocessing
+
+import pytest
+import numpy as np
+from src.embedding_store import MemmapEmbeddingStore
+
+
+@pytest.fixture
+def sample_vectors():
+    rng = np.random.default_rng(42)
+    return rng.normal(size=(50, 16)).astype(np.float32)
+
+
+@pytest.fixture
+def sample_metadata():
+    return [{"content": f"chunk {i}", "source": "doc.txt"} for i in range(50)]
+
+
+def append_from_worker(path, worker, batches):
+    """Ajouts successifs depuis un processus séparé (store ouvert une seule fois)"""
+    store = MemmapEmbeddingStore(path)
+    store.load()
+    for batch in range(batches):
+        vector = np.full((1, 16), worker * batches + batch + 1, dtype=np.float32)
+        store.append(vector, [{"content": f"worker {worker} batch {batch}"}])
+
+
+class TestMemmapEmbeddingStore:
+    """Tests pour MemmapEmbeddingStore"""
+
+    def test_write_and_reload(self, tmp_path, sample_vectors, sample_metadata):
+        """Test écriture puis réouverture depuis un autre objet (autre worker)"""
+        store = MemmapEmbeddingStore(tmp_path / "store")
+        assert store.write(sample_vectors, sample_metadata) == 1
+
+        reader = MemmapEmbeddingStore(tmp_path / "store")
+        assert reader.load(expected_dimension=16)
+        assert len(reader) == 50
+        assert isinstance(reader.vectors, np.memmap)
+        assert reader.metadata[3]["content"] == "chunk 3"
+        np.testing.assert_allclose(np.linalg.norm(reader.vectors, axis=1), 1.0, rtol=1e-5)
+
+    def test_search_matches_cosine_similarity(self, tmp_path, sample_vectors, sample_metadata):
+        """Test résultats identiques à un calcul cosinus exhaustif"""
+        store = MemmapEmbeddingStore(tmp_path / "store")
+        store.write(sample_vectors, sample_metadata)
+
+        query = sample_vectors[7] + 0.1
+        expected = sample_vectors @ query / (
+            np.linalg.norm(sample_vectors, axis=1) * np.linalg.norm(query)
+        )
+        expected_top = np.argsort(expected)[::-1][:5]
+
+        results = store.search(query, k=5)
+
+        assert [idx for idx, _ in results] == list(expected_top)
+        for idx, score in results:
+            assert score == pytest.approx(float(expected[idx]), abs=1e-5)
+
+    def test_append_and_refresh(self, tmp_path, sample_vectors, sample_metadata):
+        """Test ajout incrémental et détection d'une nouvelle version"""
+        writer = MemmapEmbeddingStore(tmp_path / "store")
+        writer.write(sample_vectors[:40], sample_metadata[:40])
+
+        reader = MemmapEmbeddingStore(tmp_path / "store")
+        assert reader.load()
+        assert not reader.refresh()
+
+        writer.append(sample_vectors[40:], sample_metadata[40:])
+
+        assert reader.refresh()
+        assert len(reader) == 50
+        assert reader.version == writer.version == 2
+        assert reader.search(sample_vectors[45], k=1)[0][0] == 45
+
+    def test_float16_and_dimension_mismatch(self, tmp_path, sample_vectors, sample_metadata):
+        """Test stockage float16 et rejet d'un store de dimension différente"""
+        store = MemmapEmbeddingStore(tmp_path / "store", dtype="float16")
+        store.write(sample_vectors, sample_metadata)
+
+        assert store.vectors.dtype == np.float16
+        assert store.search(sample_vectors[0], k=1)[0][0] == 0
+        assert not MemmapEmbeddingStore(tmp_path / "store").load(expected_dimension=768)
+
+    def test_empty_store(self, tmp_path):
+        """Test store absent ou vide"""
+        store = MemmapEmbeddingStore(tmp_path / "missing")
+        assert not store.load()
+        assert store.search(np.ones(4), k=3) == []
+
+        with pytest.raises(ValueError):
+            store.write(np.ones((2, 4)), [{}])
+
+    def test_search_batch_matches_single_search(self, tmp_path, sample_vectors, sample_metadata):
+        """Test recherche groupée identique aux recherches unitaires"""
+        store = MemmapEmbeddingStore(tmp_path / "store")
+        store.write(sample_vectors, sample_metadata)
+
+        queries = np.vstack([sample_vectors[[2, 9, 30]], np.zeros((1, 16), dtype=np.float32)])
+        batch = store.search_batch(queries, k=4)
+
+        assert len(batch) == 4
+        for query, results in zip(queries[:3], batch[:3]):
+            expected = store.search(query, k=4)
+            assert [idx for idx, _ in results] == [idx for idx, _ in expected]
+            assert [s for _, s in results] == pytest.approx([s for _, s in expected], abs=1e-5)
+        assert batch[3] == []
+
+    def test_append_is_incremental(self, tmp_path, sample_vectors, sample_metadata):
+        """Test ajout en fin de fichiers de la génération courante, sans réécriture"""
+        store = MemmapEmbeddingStore(tmp_path / "store")
+        store.write(sample_vectors[:10], sample_metadata[:10])
+        vectors_file = store._vectors_path(store.generation)
+        first_rows = vectors_file.read_bytes()
+
+        for start in range(10, 50, 10):
+            store.append(sample_vectors[start:start + 10], sample_metadata[start:start + 10])
+
+        assert store.generation == 1
+        assert store.version == 5
+        assert sorted(p.name for p in (tmp_path / "store").iterdir()) == [
+            "chunks-v1.jsonl", "manifest.json", "store.lock", "vectors-v1.bin"
+        ]
+        assert vectors_file.read_bytes()[:len(first_rows)] == first_rows
+
+        reader = MemmapEmbeddingStore(tmp_path / "store")
+        assert reader.load(expected_dimension=16)
+        assert len(reader) == 50
+        assert reader.metadata[49]["content"] == "chunk 49"
+        assert reader.search(sample_vectors[33], k=1)[0][0] == 33
+
+    def test_append_ignores_unpublished_rows(self, tmp_path, sample_vectors, sample_metadata):
+        """Test reste d'un ajout interrompu : invisible au chargement puis tronqué"""
+        store = MemmapEmbeddingStore(tmp_path / "store")
+        store.write(sample_vectors[:10], sample_metadata[:10])
+
+        # Ajout interrompu avant la publication du manifeste
+        with open(store._vectors_path(1), "ab") as f:
+            f.write(b"\x00" * 7)
+        with open(store._metadata_path(1), "a", encoding="utf-8") as f:
+            f.write('{"content": "partial"')
+
+        reader = MemmapEmbeddingStore(tmp_path / "store")
+        assert reader.load()
+        assert len(reader) == 10
+
+        store.append(sample_vectors[10:20], sample_metadata[10:20])
+
+        assert reader.refresh()
+        assert [entry["content"] for entry in reader.metadata[9:11]] == ["chunk 9", "chunk 10"]
+        assert reader.search(sample_vectors[15], k=1)[0][0] == 15
+
+    def test_append_dimension_mismatch(self, tmp_path, sample_vectors, sample_metadata):
+        """Test rejet d'un ajout de dimension différente"""
+        store = MemmapEmbeddingStore(tmp_path / "store")
+        store.write(sample_vectors[:10], sample_metadata[:10])
+
+        with pytest.raises(ValueError):
+            store.append(np.ones((1, 8)), [{}])
+        assert len(store) == 10
+
+        reader = MemmapEmbeddingStore(tmp_path / "store")
+        assert reader.load()
+        assert len(reader) == 10
+
+    def test_concurrent_appends_from_processes(self, tmp_path, sample_vectors, sample_metadata):
+        """Test ajouts simultanés de plusieurs processus : aucune ligne perdue ni écrasée"""
+        path = tmp_path / "store"
+        MemmapEmbeddingStore(path).write(sample_vectors[:10], sample_metadata[:10])
+
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=append_from_worker, args=(path, worker, 5))
+            for worker in range(4)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+
+        reader = MemmapEmbeddingStore(path)
+        assert reader.load()
+        assert len(reader) == 10 + 4 * 5
+        assert sorted(entry["content"] for entry in reader.metadata[10:]) == sorted(
+            f"worker {worker} batch {batch}" for worker in range(4) for batch in range(5)
+        )
+        assert reader.version == 1 + 4 * 5
@@ -0,0 +1,97 @@
+"""
+Tests unitaires pour le solveur max flow réutilisable
+"""
+
+import random
+import pytest
+import networkx as nx
+from src.lightning.flow_solver import MaxFlowSolver
+from src.lightning.graph_store import LightningGraphStore
+from src.lightning.max_flow_analysis import LightningMaxFlowAnalyzer
+
+
+@pytest.fixture
+def liquidity_graph():
+    rng = random.Random(3)
+    graph = nx.DiGraph()
+    for u, v in nx.barabasi_albert_graph(200, 2, seed=5).edges():
+        capacity = rng.randint(10_000, 1_000_000)
+        balance = rng.randint(0, capacity)
+        graph.add_edge(str(u), str(v), capacity=balance)
+        graph.add_edge(str(v), str(u), capacity=capacity - balance)
+    return graph
+
+
+class TestMaxFlowSolver:
+    """Tests pour MaxFlowSolver"""
+
+    def test_matches_networkx(self, liquidity_graph):
+        """Test valeurs et conservation du flow identiques à nx.maximum_flow"""
+        solver = MaxFlowSolver(liquidity_graph)
+
+        for source, target in [("0", "150"), ("3", "1"), ("42", "199")]:
+            expected, _ = nx.maximum_flow(liquidity_graph, source, target)
+            result = solver.solve(source, target)
+
+            assert result.value == expected
+            flows = result.flow_dict()
+            for u, targets in flows.items():
+                for v, amount in targets.items():
+                    assert 0 < amount <= liquidity_graph[u][v]["capacity"]
+            outflow = sum(flows.get(source, {}).values())
+            assert outflow == expected
+
+    def test_cache_and_amount_sweep(self, liquidity_graph):
+        """Test un seul flow par paire pour tous les montants"""
+        solver = MaxFlowSolver(liquidity_graph, max_cached_flows=2)
+        value = solver.solve("0", "150").value
+
+        assert solver.solve("0", "150") is solver.solve("0", "150")
+        probabilities = solver.success_probabilities("0", "150", [1, value, value * 2])
+        assert probabilities == {1: 1.0, value: 1.0, value * 2: pytest.approx(0.5)}
+
+        solver.solve("0", "1")
+        solver.solve("0", "2")
+        assert ("0", "150") not in solver._cache
+
+    def test_many_targets_and_unknown_nodes(self, liquidity_graph):
+        """Test plusieurs cibles en un appel, cibles inconnues ignorées"""
+        solver = MaxFlowSolver(liquidity_graph)
+
+        values = solver.max_flow_values("0", ["1", "2", "0", "missing"])
+
+        assert set(values) == {"1", "2"}
+        with pytest.raises(nx.NodeNotFound):
+            solver.solve("0", "missing")
+
+    def test_large_capacities_use_coarser_unit(self):
+        """Test capacités au-delà de l'int32 sans débordement"""
+        graph = nx.DiGraph()
+        graph.add_edge("a", "b", capacity=3_000_000_000)
+        graph.add_edge("b", "c", capacity=4_000_000_000)
+
+        solver = MaxFlowSolver(graph)
+
+        assert solver.unit > 1
+        assert solver.solve("a", "c").value == 3_000_000_000
+
+    def test_analyzer_solver_follows_store_version(self):
+        """Test solveur reconstruit quand la version du store change"""
+        store = LightningGraphStore()
+        analyzer = LightningMaxFlowAnalyzer(store)
+        analyzer.build_network_graph([], [
+            {"channel_id": "c1", "node1_pub": "a", "node2_pub": "b", "capacity": 1000, "node1_balance": 600},
+            {"channel_id": "c2", "node1_pub": "b", "node2_pub": "c", "capacity": 1000, "node1_balance": 400}
+        ])
+        solver = analyzer.flow_solver
+        result = analyzer.analyze_payment_probability("a", "c", [200, 800])
+
+        assert result["payment_probabilities"] == {200: 1.0, 800: 0.5}
+        assert result["liquidity_threshold"] == 400
+        assert analyzer.flow_solver is solver
+
+        store.update_policy("c2", "b", balance=900)
+        analyzer.refresh()
+
+        assert analyzer.flow_solver is not solver
+        assert analyzer.calculate_max_flow("a", "c")["max_flow_value"] == 600
@@ -0,0 +1,214 @@
+"""
+Tests unitaires pour le moteur de centralité CSR
+"""
+
+import pytest
+import networkx as nx
+from src.lightning import csr_graph
+from src.lightning.csr_graph import CSRGraph
+
+
+@pytest.fixture
+def graph():
+    G = nx.disjoint_union(nx.barabasi_albert_graph(120, 2, seed=7), nx.path_graph(6))
+    G.add_node("isolated")
+    for u, v in G.edges():
+        G[u][v]["capacity"] = 1000 + u + v if isinstance(v, int) else 1000
+    return G
+
+
+def assert_same(result, expected):
+    assert result.keys() == expected.keys()
+    for node, value in expected.items():
+        assert result[node] == pytest.approx(value, abs=1e-9)
+
+
+class TestCSRGraph:
+    """Tests pour CSRGraph et les centralités vectorisées"""
+
+    def test_from_networkx(self, graph):
+        """Test index entier, adjacence symétrique et tableaux de capacité"""
+        csr = CSRGraph.from_networkx(graph)
+
+        assert len(csr) == graph.number_of_nodes()
+        assert csr.adjacency.nnz == 2 * graph.number_of_edges()
+        assert (csr.adjacency != csr.adjacency.T).nnz == 0
+        row = csr.index[0]
+        neighbors = csr.indices[csr.indptr[row]:csr.indptr[row + 1]]
+        capacities = csr.capacity[csr.indptr[row]:csr.indptr[row + 1]]
+        for neighbor, capacity in zip(neighbors, capacities):
+            assert graph[0][csr.nodes[neighbor]]["capacity"] == capacity
+
+    def test_exact_centralities_match_networkx(self, graph):
+        """Test degree, closeness, betweenness et eigenvector identiques à NetworkX"""
+        csr = CSRGraph.from_networkx(graph)
+
+        assert_same(csr_graph.degree_centrality(csr), nx.degree_centrality(graph))
+        assert_same(csr_graph.closeness_centrality(csr), nx.closeness_centrality(graph))
+        assert_same(csr_graph.betweenness_centrality(csr), nx.betweenness_centrality(graph))
+        assert_same(
+            csr_graph.betweenness_centrality(csr, normalized=False),
+            nx.betweenness_centrality(graph, normalized=False)
+        )
+        assert_same(
+            csr_graph.eigenvector_centrality(csr, max_iter=1000),
+            nx.eigenvector_centrality(graph, max_iter=1000)
+        )
+
+    def test_sampled_betweenness_matches_networkx_seed(self, graph):
+        """Test échantillonnage des sources identique à NetworkX pour une même seed"""
+        csr = CSRGraph.from_networkx(graph)
+
+        assert_same(
+            csr_graph.betweenness_centrality(csr, k=20, seed=42),
+            nx.betweenness_centrality(graph, k=20, seed=42)
+        )
+
+    def test_sampled_closeness_approximates_exact(self, graph):
+        """Test closeness échantillonnée proche de la valeur exacte"""
+        csr = CSRGraph.from_networkx(graph)
+        exact = csr_graph.closeness_centrality(csr)
+        sampled = csr_graph.closeness_centrality(csr, k=60, seed=1)
+
+        top_exact = max(exact, key=exact.get)
+        assert sampled[top_exact] == pytest.approx(exact[top_exact], rel=0.2)
+        assert sampled["isolated"] == 0.0
+
+    def test_eigenvector_convergence_failure(self):
+        """Test échec de convergence signalé comme NetworkX"""
+        csr = CSRGraph.from_networkx(nx.path_graph(50))
+
+        with pytest.raises(nx.PowerIterationFailedConvergence):
+            csr_graph.eigenvector_centrality(csr, max_iter=2)
+
+    def test_distance_histograms_match_bfs(self, graph):
+        """Test histogrammes de distances identiques aux BFS NetworkX"""
+        csr = CSRGraph.from_networkx(graph)
+        sources = [csr.index[node] for node in (0, 5, 121, "isolated")]
+
+        histograms = csr.distance_histograms(sources)
+
+        for source, row in zip(sources, histograms):
+            lengths = nx.single_source_shortest_path_length(graph, csr.nodes[source])
+            expected = [0] * len(row)
+            for distance in lengths.values():
+                expected[distance] += 1
+            assert list(row) == expected
+
+    def test_from_edges_merges_parallel_channels(self, graph):
+        """Test canaux multiples fusionnés, boucles ignorées, nœuds isolés conservés"""
+        edges = list(graph.edges()) + [(0, 1), (1, 0), (3, 3)]
+        csr = CSRGraph.from_edges(edges, nodes=graph.nodes())
+
+        assert len(csr) == graph.number_of_nodes()
+        assert csr.adjacency.nnz == 2 * graph.number_of_edges()
+        assert_same(csr_graph.betweenness_centrality(csr), nx.betweenness_centrality(graph))
+
+    def test_betweenness_sample_size(self):
+        """Test taille d'échantillon dérivée des bornes d'erreur"""
+        assert csr_graph.betweenness_sample_size(100, 0.05, 0.05) is None
+        k = csr_graph.betweenness_sample_size(15000, 0.05, 0.05)
+        assert 1000 < k < 15000
+        assert csr_graph.betweenness_sample_size(15000, 0.1, 0.05) < k
+
+    def test_betweenness_sample_size_cap(self):
+        """Test plafond de sources : échantillonnage même sous la borne de Hoeffding"""
+        assert csr_graph.betweenness_sample_size(15000, 0.02, 0.05) is None
+        assert csr_graph.betweenness_sample_size(15000, 0.02, 0.05, max_sources=1000) == 1000
+        assert csr_graph.betweenness_sample_size(500, 0.02, 0.05, max_sources=1000) is None
+
+    def test_betweenness_error_bound(self):
+        """Test erreur garantie : epsilon demandé sans plafond, erreur effective sous le plafond"""
+        k = csr_graph.betweenness_sample_size(15000, 0.1, 0.05)
+        assert csr_graph.betweenness_error_bound(15000, k, 0.05) <= 0.1
+        assert csr_graph.betweenness_error_bound(15000, 1000, 0.05) == pytest.approx(0.0816, abs=1e-4)
+        assert csr_graph.betweenness_error_bound(15000, None, 0.05) == 0.0
+
+
+class TestHopnessMultiprocess:
+    """Tests pour le calcul de hopness en pool de processus"""
+
+    def test_process_mode_matches_thread_mode(self, graph):
+        """Test mode processus identique au mode threads (NetworkX)"""
+        from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+
+        analyzer = LightningGraphAnalyzer()
+        analyzer.build_graph(
+            [{"pubkey": str(node)} for node in graph],
+            [{"channel_id": i, "node1_pub": str(u), "node2_pub": str(v), "capacity": 1000}
+             for i, (u, v) in enumerate(graph.edges())]
+        )
+        sources = [str(i) for i in range(126)] + ["unknown"]
+
+        process = analyzer.calculate_hopness_metrics(sources, parallelism="process", max_workers=2)
+        thread = analyzer.calculate_hopness_metrics(sources, parallelism="thread")
+
+        for source in sources[:-1]:
+            result = dict(process["individual_hopness"][source])
+            expected = dict(thread["individual_hopness"][source])
+            assert result.pop("distance_distribution") == expected.pop("distance_distribution")
+            assert result == pytest.approx(expected)
+        assert "error" in process["individual_hopness"]["unknown"]
+        assert process["aggregate_metrics"]["distance_distribution"] == \
+            thread["aggregate_metrics"]["distance_distribution"]
+        assert process["aggregate_metrics"]["network_distances"] == \
+            pytest.approx(thread["aggregate_metrics"]["network_distances"])
+
+    def test_process_pool_reused_per_snapshot(self, graph):
+        """Test un seul pool de processus par snapshot, recréé après un delta"""
+        from src.lightning import graph_theory_metrics
+        from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+
+        analyzer = LightningGraphAnalyzer()
+        analyzer.build_graph(
+            [{"pubkey": str(node)} for node in graph],
+            [{"channel_id": i, "node1_pub": str(u), "node2_pub": str(v), "capacity": 1000}
+             for i, (u, v) in enumerate(graph.edges())]
+        )
+        sources = [str(i) for i in range(126)]
+
+        try:
+            analyzer.calculate_hopness_metrics(sources, parallelism="process", max_workers=2)
+            pool = graph_theory_metrics._hopness_pool
+            analyzer.calculate_hopness_metrics(sources, parallelism="process", max_workers=2)
+            assert pool is not None
+            assert graph_theory_metrics._hopness_pool is pool
+
+            analyzer.graph_store.close_channel(0)
+            analyzer.refresh()
+            analyzer.calculate_hopness_metrics(sources, parallelism="process", max_workers=2)
+            assert graph_theory_metrics._hopness_pool is not pool
+        finally:
+            graph_theory_metrics.shutdown_hopness_pool()
+
+    def test_pool_started_from_thread_uses_shared_memory(self, graph):
+        """Test pool créé depuis un thread : workers sans fork, CSR partagé libéré à l'arrêt"""
+        import asyncio
+        from multiprocessing import shared_memory
+        from src.lightning import graph_theory_metrics
+        from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+
+        analyzer = LightningGraphAnalyzer()
+        analyzer.build_graph(
+            [{"pubkey": str(node)} for node in graph],
+            [{"channel_id": i, "node1_pub": str(u), "node2_pub": str(v), "capacity": 1000}
+             for i, (u, v) in enumerate(graph.edges())]
+        )
+        sources = [str(i) for i in range(126)]
+
+        try:
+            process = asyncio.run(asyncio.to_thread(
+                analyzer.calculate_hopness_metrics, sources, parallelism="process", max_workers=2
+            ))
+            context = graph_theory_metrics._hopness_pool._mp_context
+            names = [name for name, _, _ in graph_theory_metrics._hopness_pool_arrays.specs]
+        finally:
+            graph_theory_metrics.shutdown_hopness_pool()
+
+        thread = analyzer.calculate_hopness_metrics(sources, parallelism="thread")
+        assert context.get_start_method() != "fork"
+        assert process["aggregate_metrics"]["distance_distribution"] == \
+            thread["aggregate_metrics"]["distance_distribution"]
+        for name in names:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=name)
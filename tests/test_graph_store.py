@@ -0,0 +1,200 @@
+"""
+Tests unitaires pour le store de graphe Lightning partagé
+"""
+
+import pytest
+import networkx as nx
+from src.lightning.graph_store import LightningGraphStore
+from src.lightning.graph_theory_metrics import LightningGraphAnalyzer
+from src.lightning.max_flow_analysis import LightningMaxFlowAnalyzer
+from src.integrations.network_graph_sync import GRAPH_VERSION_ID, NetworkGraphSync
+
+
+@pytest.fixture
+def nodes():
+    return [{"pubkey": f"node{i}", "alias": f"Node {i}"} for i in range(4)]
+
+
+@pytest.fixture
+def channels():
+    return [
+        {"channel_id": "c1", "node1_pub": "node0", "node2_pub": "node1", "capacity": 1000,
+         "node1_fee_rate": 10, "node2_fee_rate": 20},
+        {"channel_id": "c2", "node1_pub": "node1", "node2_pub": "node2", "capacity": 2000},
+        {"channel_id": "c3", "node1_pub": "node2", "node2_pub": "node3", "capacity": 3000,
+         "node1_balance": 500}
+    ]
+
+
+class FakeCollection:
+    """Collection MongoDB minimale (upsert $set/$inc, find, insert_one)"""
+
+    def __init__(self, key):
+        self.key = key
+        self.documents = {}
+        self.updates = 0
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates += 1
+        document = self.documents.setdefault(query[self.key], {"_id": len(self.documents)})
+        document.update(update.get("$set", {}))
+        for field, step in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + step
+
+    async def insert_one(self, document):
+        pass
+
+    async def find(self, query):
+        for document in list(self.documents.values()):
+            yield dict(document)
+
+
+class FakeLNBits:
+    def __init__(self, graph_data):
+        self.graph_data = graph_data
+
+    async def describe_graph(self):
+        return self.graph_data
+
+
+def edge_set(graph):
+    return {(u, v, tuple(sorted(data.items()))) for u, v, data in graph.edges(data=True)}
+
+
+class TestLightningGraphStore:
+    """Tests pour LightningGraphStore"""
+
+    def test_sync_is_idempotent(self, nodes, channels):
+        """Test un second sync identique ne change pas la version"""
+        store = LightningGraphStore()
+        store.sync(nodes, channels)
+        version = store.version
+
+        stats = store.sync(nodes, channels)
+
+        assert store.version == version
+        assert not any(stats.values())
+        assert store.snapshot() is store.snapshot()
+
+    def test_deltas_match_full_rebuild(self, nodes, channels):
+        """Test deltas gossip équivalents à une reconstruction complète"""
+        store = LightningGraphStore()
+        store.sync(nodes, channels)
+        store.apply_deltas([
+            {"type": "channel_close", "channel_id": "c2"},
+            {"type": "channel_open", "channel": {
+                "channel_id": "c4", "node1_pub": "node0", "node2_pub": "node3", "capacity": 4000}},
+            {"type": "policy_update", "channel_id": "c1", "node_pub": "node1", "fee_rate": 50, "balance": 100}
+        ])
+
+        updated_channels = [
+            {**channels[0], "node2_fee_rate": 50, "node1_balance": 900},
+            channels[2],
+            {"channel_id": "c4", "node1_pub": "node0", "node2_pub": "node3", "capacity": 4000}
+        ]
+        rebuilt = LightningGraphStore()
+        rebuilt.sync(nodes, updated_channels)
+
+        incremental, full = store.snapshot(), rebuilt.snapshot()
+        assert edge_set(incremental.graph) == edge_set(full.graph)
+        assert edge_set(incremental.directed_graph) == edge_set(full.directed_graph)
+        assert edge_set(incremental.liquidity_graph) == edge_set(full.liquidity_graph)
+        assert incremental.channel_capacities == full.channel_capacities
+
+    def test_parallel_channels_and_orphans(self):
+        """Test fermeture d'un canal parallèle et nettoyage des nœuds orphelins"""
+        store = LightningGraphStore()
+        store.upsert_channel({"channel_id": "a", "node1_pub": "x", "node2_pub": "y", "capacity": 100})
+        store.upsert_channel({"channel_id": "b", "node1_pub": "x", "node2_pub": "y", "capacity": 200})
+
+        store.close_channel("b")
+        assert store.snapshot().graph["x"]["y"]["capacity"] == 100
+
+        store.close_channel("a")
+        assert store.snapshot().graph.number_of_nodes() == 0
+
+    def test_analyzers_share_store(self, nodes, channels):
+        """Test les analyseurs consomment le même snapshot"""
+        store = LightningGraphStore()
+        graph_analyzer = LightningGraphAnalyzer(store)
+        max_flow_analyzer = LightningMaxFlowAnalyzer(store)
+
+        graph_analyzer.build_graph(nodes, channels)
+        version = store.version
+        max_flow_analyzer.build_network_graph(nodes, channels)
+
+        assert store.version == version
+        assert graph_analyzer.snapshot.version == max_flow_analyzer.snapshot.version == version
+        assert graph_analyzer.graph.number_of_edges() == 3
+        assert max_flow_analyzer.graph["node2"]["node3"]["capacity"] == 500
+        assert max_flow_analyzer.calculate_max_flow("node0", "node3")["max_flow_value"] == 500
+
+    def test_snapshot_is_frozen(self, nodes, channels):
+        """Test un snapshot distribué n'est pas modifié par les deltas suivants"""
+        store = LightningGraphStore()
+        store.sync(nodes, channels)
+        snapshot = store.snapshot()
+
+        store.apply_deltas([
+            {"type": "channel_close", "channel_id": "c3"},
+            {"type": "policy_update", "channel_id": "c1", "node_pub": "node0", "balance": 100}
+        ])
+
+        assert snapshot.graph.number_of_edges() == 3
+        assert snapshot.liquidity_graph["node0"]["node1"]["capacity"] == 500
+        assert "c3" in snapshot.channel_capacities
+        assert snapshot.channel_balances["c1"] == (500, 500)
+        assert store.snapshot().channel_balances["c1"] == (100, 900)
+        with pytest.raises(nx.NetworkXError):
+            snapshot.graph.add_edge("node0", "node3")
+
+
+class TestNetworkGraphSyncRestart:
+    """Tests du rechargement du store depuis MongoDB"""
+
+    @pytest.mark.asyncio
+    async def test_reload_does_not_mark_everything_changed(self, channels):
+        """Test après redémarrage, un incremental_sync identique n'écrit rien"""
+        graph_data = {
+            "nodes": [{"pub_key": f"node{i}", "alias": f"Node {i}"} for i in range(4)],
+            "edges": channels
+        }
+        db = {
+            "network_nodes": FakeCollection("pub_key"),
+            "network_channels": FakeCollection("channel_id"),
+            "graph_metadata": FakeCollection("_id")
+        }
+        await NetworkGraphSync(FakeLNBits(graph_data), db=db).full_sync()
+
+        restarted = NetworkGraphSync(FakeLNBits(graph_data), db=db)
+        await restarted._build_networkx_graph()
+        version = restarted.graph_store.version
+        result = await restarted.incremental_sync()
+
+        assert result["success"]
+        assert result["nodes_updated"] == result["channels_updated"] == 0
+        assert restarted.graph_store.version == version
+        assert "_id" not in restarted.graph_store.nodes["node0"]
+
+    @pytest.mark.asyncio
+    async def test_graph_version_bumped_on_change_only(self, channels):
+        """Test version du graphe incrémentée par une sync qui modifie le graphe, pas sinon"""
+        graph_data = {
+            "nodes": [{"pub_key": f"node{i}", "alias": f"Node {i}"} for i in range(4)],
+            "edges": channels
+        }
+        metadata = FakeCollection("_id")
+        db = {
+            "network_nodes": FakeCollection("pub_key"),
+            "network_channels": FakeCollection("channel_id"),
+            "graph_metadata": metadata
+        }
+        sync = NetworkGraphSync(FakeLNBits(graph_data), db=db)
+
+        await sync.full_sync()
+        await sync.incremental_sync()
+        assert metadata.documents[GRAPH_VERSION_ID]["version"] == 1
+
+        graph_data["edges"] = channels[:2]
+        await sync.incremental_sync()
+        assert metadata.documents[GRAPH_VERSION_ID]["version"] == 2
@@ -68,6 +68,55 @@ class TestBM25Scorer:
         assert len(results) == 2
         assert results[0][0] == 0  # Premier doc le plus pertinent
         assert results[0][1] > results[1][1]  # Score décroissant
+    
+    def test_bm25_search_matches_exhaustive_scoring(self):
+        """Test index inversé : mêmes scores que le scoring document par document"""
+        documents = [
+            "lightning fees fees routing",
+            "channel liquidity and fees",
+            "routing node centrality",
+            "htlc timeout handling lightning lightning",
+            "unrelated text"
+        ]
+        
+        scorer = BM25Scorer()
+        scorer.fit(documents)
+        
+        query = "lightning fees routing"
+        expected = sorted(
+            ((i, scorer.score(query, i)) for i in range(len(documents))),
+            key=lambda x: x[1],
+            reverse=True
+        )
+        results = scorer.search(query, top_k=3)
+        
+        assert [idx for idx, _ in results] == [idx for idx, _ in expected[:3]]
+        for (_, score), (_, expected_score) in zip(results, expected):
+            assert score == pytest.approx(expected_score)
+    
+    def test_bm25_incremental_add_and_remove(self):
+        """Test ajout/retrait incrémental équivalent à un fit complet"""
+        documents = [
+            "Lightning Network fees optimization",
+            "Channel balance management",
+            "Routing node centrality"
+        ]
+        
+        incremental = BM25Scorer()
+        incremental.fit(documents[:1])
+        assert incremental.add_documents(documents[1:] + ["HTLC fees"]) == [1, 2, 3]
+        assert incremental.remove_document(3)
+        assert not incremental.remove_document(3)
+        
+        full = BM25Scorer()
+        full.fit(documents)
+        
+        assert incremental.num_documents == 3
+        assert incremental.avg_doc_length == full.avg_doc_length
+        assert incremental.idf_scores == pytest.approx(full.idf_scores)
+        assert "htlc" not in incremental.postings
+        assert incremental.search("fees", top_k=1) == full.search("fees", top_k=1)
+        assert incremental.score("HTLC fees", 3) == 0.0
 
 
 class TestHybridSearcher:
@@ -198,6 +247,38 @@ class TestHybridSearcher:
         assert results[0].rank == 1
         assert results[1].rank == 2
     
+    def test_add_and_remove_sparse_documents(self, sample_documents):
+        """Test ingestion incrémentale de l'index sparse"""
+        searcher = HybridSearcher()
+        searcher.fit_sparse(sample_documents[:2])
+        searcher.add_sparse_documents(sample_documents[2:])
+        
+        results = searcher.sparse_search("centrality betweenness", top_k=1)
+        assert results[0][0] == 2
+        
+        assert searcher.remove_sparse_documents(['doc3', 'missing']) == 1
+        results = searcher.sparse_search("centrality betweenness", top_k=3)
+        assert all(doc_idx != 2 for doc_idx, _ in results)
+        assert searcher.get_stats()['corpus_size'] == 2
+    
+    @pytest.mark.asyncio
+    async def test_hybrid_search_skips_removed_documents(self, sample_documents, sample_embeddings):
+        """Test top_k résultats de rangs contigus malgré des documents retirés"""
+        searcher = HybridSearcher()
+        searcher.fit_sparse(sample_documents)
+        searcher.remove_sparse_documents(['doc1'])
+        
+        results = await searcher.search(
+            query="Lightning Network optimization",
+            query_embedding=sample_embeddings[0],
+            document_embeddings=sample_embeddings,
+            top_k=2
+        )
+        
+        assert [r.doc_id for r in results] and 'doc1' not in [r.doc_id for r in results]
+        assert len(results) == 2
+        assert [r.rank for r in results] == [1, 2]
+    
     def test_get_stats(self, sample_documents):
         """Test statistiques"""
         searcher = HybridSearcher()
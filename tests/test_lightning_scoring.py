@@ -0,0 +1,242 @@
+"""
+Tests unitaires pour le service de scoring Lightning (app.services.lightning_scoring)
+"""
+
+import asyncio
+
+import pytest
+import numpy as np
+
+from app.services import lightning_scoring
+from app.services.lightning_scoring import LightningScoreService
+
+
+class FakeCursor:
+    """Curseur asynchrone minimal (itération, to_list)"""
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    async def to_list(self, length=None):
+        return self.documents[:length]
+
+
+def matches(document, query):
+    """Filtre MongoDB minimal : égalités et $or"""
+    return all(
+        any(matches(document, clause) for clause in value) if key == "$or" else document.get(key) == value
+        for key, value in query.items()
+    )
+
+
+class FakeCollection:
+    """Collection MongoDB en mémoire (find avec projection, bulk_write d'UpdateOne)"""
+
+    def __init__(self, documents=None):
+        self.documents = list(documents or [])
+        self.queries = []
+
+    def find(self, query=None, projection=None):
+        self.queries.append(query or {})
+        documents = [doc for doc in self.documents if matches(doc, query or {})]
+        if projection:
+            fields = [field for field, keep in projection.items() if keep and field != "_id"]
+            documents = [{field: doc[field] for field in fields if field in doc} for doc in documents]
+        return FakeCursor(documents)
+
+    async def find_one(self, query):
+        return next(iter(self.find(query).documents), None)
+
+    async def insert_one(self, document):
+        self.documents.append(dict(document))
+
+    async def estimated_document_count(self):
+        return len(self.documents)
+
+    async def create_index(self, keys):
+        pass
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.documents.append(dict(operation._doc["$setOnInsert"]))
+
+
+@pytest.fixture
+def graph_db():
+    """Graphe aléatoire connexe de 40 nœuds avec capacités variées"""
+    rng = np.random.default_rng(7)
+    node_ids = [f"node{i:02d}" for i in range(40)]
+    channels = [
+        {"node1_pub": node_ids[i], "node2_pub": node_ids[i + 1], "capacity": int(rng.integers(1e5, 1e7))}
+        for i in range(len(node_ids) - 1)
+    ]
+    for _ in range(60):
+        u, v = rng.choice(len(node_ids), size=2, replace=False)
+        channels.append({"node1_pub": node_ids[u], "node2_pub": node_ids[v], "capacity": int(rng.integers(1e5, 1e7))})
+
+    return {
+        lightning_scoring.NODES_COLLECTION: FakeCollection({"public_key": node_id} for node_id in node_ids),
+        lightning_scoring.CHANNELS_COLLECTION: FakeCollection(channels),
+        lightning_scoring.SCORES_COLLECTION: FakeCollection(),
+        lightning_scoring.CONFIG_COLLECTION: FakeCollection(),
+        lightning_scoring.GRAPH_METADATA_COLLECTION: FakeCollection(),
+    }
+
+
+def bump_graph_version(graph_db):
+    """Incrémente le compteur de version comme la synchronisation du graphe"""
+    metadata = graph_db[lightning_scoring.GRAPH_METADATA_COLLECTION]
+    counter = next((doc for doc in metadata.documents if doc["_id"] == lightning_scoring.GRAPH_VERSION_ID), None)
+    if counter is None:
+        counter = {"_id": lightning_scoring.GRAPH_VERSION_ID, "version": 0}
+        metadata.documents.append(counter)
+    counter["version"] += 1
+
+
+@pytest.fixture
+def service(graph_db, monkeypatch):
+    """Service dont l'uptime et le taux de succès sont déterministes par nœud"""
+    lightning_scoring._betweenness_cache.clear()
+    service = LightningScoreService(graph_db)
+
+    async def uptime(node_id):
+        return 90 + int(node_id[-2:]) / 4
+
+    async def success_rate(node_id):
+        return 85 + int(node_id[-2:]) / 3
+
+    monkeypatch.setattr(service, "_calculate_uptime", uptime)
+    monkeypatch.setattr(service, "_calculate_success_rate", success_rate)
+    return service
+
+
+class TestLightningScoreService:
+    """Tests pour LightningScoreService"""
+
+    @pytest.mark.asyncio
+    async def test_batch_matches_single_node_scores(self, service, graph_db):
+        """Test recalcul en lot identique au calcul nœud par nœud"""
+        node_ids = [doc["public_key"] for doc in graph_db[lightning_scoring.NODES_COLLECTION].documents]
+        single = {}
+        for node_id in node_ids:
+            score = await service.calculate_node_score(node_id)
+            single[node_id] = score.metrics
+
+        scores = graph_db[lightning_scoring.SCORES_COLLECTION]
+        scores.documents.clear()
+        assert await service.recalculate_scores(force=True) == len(node_ids)
+
+        batch = {doc["node_id"]: doc["metrics"] for doc in scores.documents}
+        assert set(batch) == set(node_ids)
+        for node_id in node_ids:
+            for component in ("centrality", "reliability", "performance", "composite"):
+                assert batch[node_id][component] == pytest.approx(getattr(single[node_id], component))
+        assert service.last_recalculation["errors"] == 0
+
+    @pytest.mark.asyncio
+    async def test_subset_recalculation_ignores_unknown_nodes(self, service):
+        """Test recalcul d'un sous-ensemble : nœuds inconnus ignorés"""
+        assert await service.recalculate_scores(["node03", "unknown", "node03"], force=True) == 1
+        assert await service.calculate_node_score("unknown") is None
+
+    @pytest.mark.asyncio
+    async def test_single_node_reads_only_its_channels(self, service, graph_db):
+        """Test calcul unitaire avec betweenness en cache : seuls les canaux du nœud sont lus"""
+        await service.warm_betweenness()
+        channels = graph_db[lightning_scoring.CHANNELS_COLLECTION]
+        expected = [c for c in channels.documents if "node05" in (c["node1_pub"], c["node2_pub"])]
+        channels.queries.clear()
+
+        detailed = await service._calculate_detailed_scores("node05")
+
+        assert channels.queries == [{"$or": [{"node1_pub": "node05"}, {"node2_pub": "node05"}]}]
+        assert detailed["centrality"]["degree"] == len(expected)
+        assert detailed["capacity"]["total"] == sum(c["capacity"] for c in expected)
+
+
+class TestGraphBetweenness:
+    """Tests du calcul partagé de la betweenness réseau"""
+
+    @pytest.fixture
+    def graph(self, graph_db):
+        nodes = list(graph_db[lightning_scoring.NODES_COLLECTION].documents)
+        channels = list(graph_db[lightning_scoring.CHANNELS_COLLECTION].documents)
+        return nodes, channels
+
+    @pytest.fixture
+    def calls(self, monkeypatch):
+        """Enregistre les calculs de Brandes lancés (k utilisé)"""
+        calls = []
+        compute = lightning_scoring.csr_graph.betweenness_centrality
+
+        def counting(csr, k=None, seed=None):
+            calls.append(k)
+            return compute(csr, k=k, seed=seed)
+
+        monkeypatch.setattr(lightning_scoring.csr_graph, "betweenness_centrality", counting)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_single_flight(self, service, graph, calls):
+        """Test requêtes concurrentes sur une version manquante : un seul calcul"""
+        version = await service._graph_version()
+        results = await asyncio.gather(*(service._graph_betweenness(version) for _ in range(8)))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert not lightning_scoring._betweenness_inflight
+
+    @pytest.mark.asyncio
+    async def test_stale_result_while_recomputing(self, service, graph_db, calls):
+        """Test calcul unitaire : version précédente servie, nouvelle calculée en arrière-plan"""
+        previous = await service._graph_betweenness(await service._graph_version())
+        graph_db[lightning_scoring.CHANNELS_COLLECTION].documents[0]["node2_pub"] = "node39"
+        bump_graph_version(graph_db)
+        version = await service._graph_version()
+
+        assert await service._graph_betweenness(version, wait=False) is previous
+        await asyncio.gather(*lightning_scoring._betweenness_inflight.values())
+
+        current = await service._graph_betweenness(version, wait=False)
+        assert current is not previous
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_version_without_graph_scan(self, service, graph_db, calls):
+        """Test version inchangée : betweenness servie sans relire le graphe"""
+        channels = graph_db[lightning_scoring.CHANNELS_COLLECTION]
+        first = await service._graph_betweenness(await service._graph_version())
+        channels.queries.clear()
+
+        assert await service._graph_betweenness(await service._graph_version()) is first
+        assert channels.queries == []
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_channel_count_changes_version(self, service, graph_db):
+        """Test canal ajouté hors synchronisation : nouvelle version"""
+        version = await service._graph_version()
+        graph_db[lightning_scoring.CHANNELS_COLLECTION].documents.append(
+            {"node1_pub": "node00", "node2_pub": "node39", "capacity": 1000}
+        )
+
+        assert await service._graph_version() != version
+
+    @pytest.mark.asyncio
+    async def test_sample_size_capped(self, graph_db, graph, calls):
+        """Test plafond de sources appliqué sous la borne d'erreur"""
+        lightning_scoring._betweenness_cache.clear()
+        service = LightningScoreService(graph_db, betweenness_max_sources=10)
+
+        await service._graph_betweenness(await service._graph_version(), graph)
+        default = LightningScoreService(graph_db)
+        await default._graph_betweenness(await default._graph_version(), graph)
+
+        assert calls == [10, None]
@@ -0,0 +1,100 @@
+"""
+Tests unitaires pour le scoring vectorisé de NodeScorer
+"""
+
+import random
+
+import pytest
+from mcp.node_scorer import NodeScorer
+from mcp.preprocessing import channel_columns
+
+WEIGHTS = {
+    "capacity": 0.2,
+    "features": 0.05,
+    "hybrid": 0.1,
+    "centrality": {"degree": 0.1, "betweenness": 0.15, "closeness": 0.1, "eigenvector": 0.05},
+    "channels": {"base_fee": 0.05, "fee_rate": 0.1, "min_htlc": 0.03, "max_htlc": 0.04, "age": 0.03},
+}
+
+
+def random_channel(rng):
+    channel = {
+        'capacity_sats': rng.randint(20_000, 10**8),
+        'age_blocks': rng.randint(500_000, 850_000),
+        'base_fee_msat': rng.choice([0, 1, 1000, rng.randint(0, 100_000)]),
+        'fee_rate_ppm': rng.randint(0, 20_000),
+        'min_htlc_msat': rng.choice([1, 1000, None]),
+        'max_htlc_msat': rng.choice([rng.randint(1, 10**11), 2**62, None]),
+    }
+    if rng.random() < 0.05:
+        channel['fee_rate_ppm'] = float(channel['fee_rate_ppm']) / 3
+    return channel
+
+
+def random_node(rng, i):
+    addresses = rng.choice([["1.2.3.4:9735"], ["abc.onion:9735"], ["abc.onion:9735", "node.example:9735"], []])
+    return {
+        'pubkey': f"{i:066x}",
+        'addresses': addresses,
+        'capacity_sats': rng.choice([rng.randint(10**5, 10**10), None]),
+        'features_count': rng.choice([rng.randint(0, 20), "n/a"]),
+        'centrality': {
+            'degree': rng.random(),
+            'betweenness': rng.choice([rng.random() / 100, None, float('nan')]),
+            'closeness': rng.random(),
+            'eigenvector': rng.random(),
+        },
+        'channels': [random_channel(rng) for _ in range(rng.choice([0, 1, 2, 5, 40]))],
+    }
+
+
+@pytest.fixture
+def nodes():
+    rng = random.Random(19)
+    return [random_node(rng, i) for i in range(400)]
+
+
+class TestNodeScorer:
+    """Tests pour le chemin colonne de NodeScorer"""
+
+    def test_channel_columns(self):
+        """Test offsets, colonnes int64/objet et masques de présence"""
+        columns = channel_columns([[{'fee_rate_ppm': 1}, {'fee_rate_ppm': None}], [], [{'fee_rate_ppm': 2.5}]])
+
+        assert columns['offsets'].tolist() == [0, 2, 2, 3]
+        assert columns['fee_rate_ppm'].dtype == object
+        assert columns['fee_rate_ppm_present'].tolist() == [True, False, True]
+        assert columns['capacity_sats'].dtype.kind == 'i'
+        assert not columns['capacity_sats_present'].any()
+
+    def test_vectorized_matches_per_node(self, nodes):
+        """Test plages et scores identiques au calcul nœud par nœud"""
+        reference = NodeScorer(WEIGHTS)
+        for node in nodes:
+            reference.update_ranges([node])
+        expected = [reference.calculate_node_score(node) for node in nodes]
+
+        scorer = NodeScorer(WEIGHTS)
+        table = scorer.build_node_table(nodes)
+        scorer.update_ranges(nodes, table)
+
+        for heuristic, reference_heuristic in zip(scorer._all_heuristics, reference._all_heuristics):
+            assert (heuristic.lowest, heuristic.highest) == (reference_heuristic.lowest, reference_heuristic.highest)
+        assert scorer.score_nodes(nodes, table) == expected
+        assert scorer.score_nodes(nodes) == expected
+
+    def test_degenerate_ranges(self):
+        """Test plage nulle, poids nul et nœuds sans canaux"""
+        nodes = [
+            {'capacity_sats': 5, 'features_count': 0, 'addresses': [], 'centrality': {}, 'channels': []},
+            {'capacity_sats': 5, 'features_count': 0, 'addresses': [], 'centrality': {}, 'channels': [{'fee_rate_ppm': 7}]},
+        ]
+        weights = dict(WEIGHTS, features=0.0)
+        reference = NodeScorer(weights)
+        reference.update_ranges(nodes)
+
+        scorer = NodeScorer(weights)
+        scorer.update_ranges(nodes)
+
+        assert scorer.score_nodes(nodes) == [reference.calculate_node_score(node) for node in nodes]
+        assert scorer.score_nodes([]) == []
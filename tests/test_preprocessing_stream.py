@@ -0,0 +1,126 @@
+"""
+Tests unitaires pour le prétraitement en flux du graphe (mcp.preprocessing)
+"""
+
+import io
+import json
+import logging
+import random
+
+import pytest
+from mcp import preprocessing
+
+
+def random_policy(rng):
+    if rng.random() < 0.1:
+        return None
+    return {
+        'disabled': rng.random() < 0.1,
+        'fee_base_msat': rng.choice([0, 1000, 200_000]),
+        'fee_rate_milli_msat': rng.choice([1, 500, 50_000]),
+        'min_htlc': 1000,
+        'max_htlc_msat': rng.randint(1, 10**10),
+    }
+
+
+@pytest.fixture
+def graph():
+    rng = random.Random(20)
+    pubkeys = [f"{i:066x}" for i in range(60)]
+    nodes = [
+        {
+            'pub_key': pubkey,
+            'alias': f"node-{i}",
+            'addresses': rng.choice([["1.2.3.4:9735"], [], ["abc.onion:9735", "node.example:9735"]]),
+            'features': {str(bit): {'name': 'f', 'is_known': rng.random() < 0.7} for bit in range(8)},
+        }
+        for i, pubkey in enumerate(pubkeys)
+    ]
+    edges = []
+    for i in range(400):
+        node1, node2 = rng.sample(pubkeys, 2)
+        edge = {
+            'channel_id': (700_000 + i) << 40,
+            'chan_point': f"{i:064x}:0",
+            'capacity': rng.randint(20_000, 10**8),
+            'node1_pub': node1,
+            'node2_pub': node2,
+            'node1_policy': random_policy(rng),
+            'node2_policy': random_policy(rng),
+        }
+        if i % 50 == 0:
+            del edge['capacity']
+        edges.append(edge)
+    return nodes, edges
+
+
+class UnseekableBytesIO(io.BytesIO):
+    """Flux non rembobinable (réponse HTTP lue au fil de l'eau)"""
+
+    def seekable(self):
+        return False
+
+
+@pytest.fixture(params=["ijson", "json"])
+def parser(request, monkeypatch):
+    if request.param == "ijson":
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(preprocessing, "ijson", None)
+    return request.param
+
+
+class TestStreamGraph:
+    """Tests pour stream_graph et ChannelTable"""
+
+    @pytest.mark.parametrize("source_class", [io.BytesIO, UnseekableBytesIO])
+    def test_same_result_as_lists(self, graph, parser, source_class):
+        """Test canaux, totaux et nœuds pré-filtrés identiques au chemin en listes"""
+        nodes, edges = graph
+        channels_by_node, total_cap, valid_edges = preprocessing.filter_channels(edges)
+        expected = preprocessing.pre_filter_nodes(nodes, channels_by_node, total_cap, valid_edges)
+
+        source = source_class(json.dumps({'nodes': nodes, 'edges': edges}).encode())
+        stream_nodes, table, stream_cap, stream_edges = preprocessing.stream_graph(source)
+
+        assert (stream_cap, stream_edges) == (total_cap, valid_edges)
+        assert dict(table) == channels_by_node
+        assert len(table) == len(channels_by_node)
+        assert expected
+        assert preprocessing.pre_filter_nodes(stream_nodes, table, stream_cap, stream_edges) == expected
+
+    def test_edges_before_nodes(self, graph, parser):
+        """Test ordre des sections indifférent"""
+        nodes, edges = graph
+        document = json.dumps({'edges': edges[:10], 'nodes': nodes[:3]}).encode()
+
+        for source in (io.BytesIO(document), UnseekableBytesIO(document)):
+            items = list(preprocessing.iter_graph_items(source))
+
+            assert [item for section, item in items if section == 'nodes'] == nodes[:3]
+            assert [item for section, item in items if section == 'edges'] == edges[:10]
+
+    def test_json_fallback_warns(self, graph, caplog, monkeypatch):
+        """Test ijson absent : repli sur json.load signalé par un avertissement"""
+        monkeypatch.setattr(preprocessing, "ijson", None)
+        nodes, edges = graph
+        source = io.BytesIO(json.dumps({'nodes': nodes[:2], 'edges': []}).encode())
+
+        with caplog.at_level(logging.WARNING, logger=preprocessing.__name__):
+            items = list(preprocessing.iter_graph_items(source))
+
+        assert [item for _, item in items] == nodes[:2]
+        assert "ijson is not installed" in caplog.text
+
+    def test_channel_table_non_int_values(self):
+        """Test colonnes converties en listes pour les valeurs non entières"""
+        table = preprocessing.ChannelTable()
+        channel = {'channel_id': 1, 'chan_point': 'a:0', 'peer_pubkey': 'B', 'capacity_sats': 10,
+                   'age_blocks': 0, 'base_fee_msat': 0, 'fee_rate_ppm': 1, 'min_htlc_msat': 1,
+                   'max_htlc_msat': 2**70}
+        table.append('A', channel)
+        table.append('A', dict(channel, fee_rate_ppm='7', max_htlc_msat=None))
+
+        assert table['A'] == [channel, dict(channel, fee_rate_ppm='7', max_htlc_msat=None)]
+        assert 'B' not in table
+        assert list(table) == ['A']
@@ -0,0 +1,152 @@
+"""
+Tests unitaires pour le découpage des documents du RAG (chunk_document, DocumentProcessor)
+"""
+
+import pytest
+
+tiktoken = pytest.importorskip("tiktoken")
+rag = pytest.importorskip("src.rag_optimized")
+from src.rag_optimized import DocumentProcessor, chunk_document
+
+SENTENCES = [
+    "Le canal est équilibré.",
+    "Les frais de routage augmentent le soir!",
+    "Faut-il ouvrir un second canal vers ce pair?",
+    "La liquidité entrante reste faible sur ce nœud.",
+    "Une rééquilibrage circulaire coûte moins de 200 sats.",
+]
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    """Encodage tiktoken hors ligne : octets, quelques fusions, accents des phrases en un token"""
+    ranks = {bytes([i]): i for i in range(256)}
+    merges = ["é", "è", "û", "œ", "an", "ca", "can", "al", "canal", " canal",
+              "es", " l", " le", "on", " d", " de", "re"]
+    for merge in merges:
+        ranks[merge.encode()] = len(ranks)
+    return tiktoken.Encoding(
+        name="test_bytes",
+        pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+
+
+@pytest.fixture
+def document():
+    return " ".join(SENTENCES[i % len(SENTENCES)] for i in range(40))
+
+
+def spans(chunks):
+    return [(c.metadata["start_token"], c.metadata["end_token"]) for c in chunks]
+
+
+class TestChunkDocument:
+    """Tests pour chunk_document"""
+
+    @pytest.mark.parametrize("max_chunk_size, chunk_overlap", [(64, 8), (100, 0), (37, 20)])
+    def test_content_matches_token_slice(self, tokenizer, document, max_chunk_size, chunk_overlap):
+        """Test texte de chaque chunk identique au décodage de sa tranche de tokens"""
+        tokens = tokenizer.encode(document)
+
+        chunks = chunk_document(document, "doc.txt", tokenizer, max_chunk_size, chunk_overlap)
+
+        assert len(chunks) > 3
+        for chunk in chunks:
+            start, end = chunk.metadata["start_token"], chunk.metadata["end_token"]
+            assert chunk.content == tokenizer.decode(tokens[start:end]).strip()
+            assert chunk.source_file == "doc.txt"
+
+    @pytest.mark.parametrize("max_chunk_size, chunk_overlap", [(64, 8), (100, 0), (37, 20)])
+    def test_sizes_and_token_counts(self, tokenizer, document, max_chunk_size, chunk_overlap):
+        """Test tailles ≤ max_chunk_size, token_count exact, document couvert jusqu'au bout"""
+        total = len(tokenizer.encode(document))
+
+        chunks = chunk_document(document, "doc.txt", tokenizer, max_chunk_size, chunk_overlap)
+
+        assert spans(chunks)[0][0] == 0
+        assert spans(chunks)[-1][1] == total
+        for chunk, (start, end) in zip(chunks, spans(chunks)):
+            assert 0 < end - start <= max_chunk_size
+            assert chunk.token_count == end - start
+            assert chunk.metadata["total_tokens"] == total
+        assert [c.metadata["chunk_index"] for c in chunks] == list(range(len(chunks)))
+
+    @pytest.mark.parametrize("chunk_overlap", [0, 8, 20])
+    def test_overlap(self, tokenizer, document, chunk_overlap):
+        """Test chaque chunk reprend les chunk_overlap derniers tokens du précédent"""
+        chunks = chunk_document(document, "doc.txt", tokenizer, 64, chunk_overlap)
+
+        for (_, previous_end), (start, _) in zip(spans(chunks), spans(chunks)[1:]):
+            assert start == previous_end - chunk_overlap
+
+    def test_cut_after_sentence_end(self, tokenizer, document):
+        """Test coupure après la dernière fin de phrase de la fenêtre"""
+        chunks = chunk_document(document, "doc.txt", tokenizer, 64, 8)
+
+        assert all(chunk.content[-1] in ".!?" for chunk in chunks[:-1])
+        assert any(chunk.token_count < 64 for chunk in chunks[:-1])
+
+    def test_no_sentence_end_cuts_at_max_size(self, tokenizer):
+        """Test texte sans ponctuation : fenêtres pleines de max_chunk_size tokens"""
+        document = " ".join(["canal"] * 100)
+
+        chunks = chunk_document(document, "doc.txt", tokenizer, 30, 5)
+
+        assert [c.token_count for c in chunks[:-1]] == [30] * (len(chunks) - 1)
+        assert spans(chunks)[-1][1] == 100
+
+    def test_multibyte_char_split_across_tokens(self, tokenizer):
+        """Test caractère réparti sur deux tokens : rattaché au premier, jamais coupé"""
+        document = "über " * 30
+        tokens = tokenizer.encode(document)
+
+        chunks = chunk_document(document, "doc.txt", tokenizer, 7, 0)
+
+        assert len(tokens) == 30 * 6
+        assert all("�" not in chunk.content for chunk in chunks)
+        assert "".join(chunk.content for chunk in chunks).replace(" ", "") == document.replace(" ", "")
+
+    def test_empty_document(self, tokenizer):
+        """Test document vide : aucun chunk"""
+        assert chunk_document("", "doc.txt", tokenizer) == []
+
+
+class TestCreateChunksAsync:
+    """Tests du découpage en pool de processus partagé"""
+
+    @pytest.fixture(autouse=True)
+    def pool(self):
+        rag.shutdown_chunking_pool()
+        yield
+        rag.shutdown_chunking_pool()
+
+    @pytest.mark.asyncio
+    async def test_same_chunks_and_pool_reused(self, document, monkeypatch):
+        """Test résultat identique au découpage local, pool réutilisé d'un appel à l'autre"""
+        monkeypatch.setattr(rag, "PARALLEL_CHUNKING_MIN_CHARS", 0)
+        processor = DocumentProcessor()
+        documents = [document, document[:500], document[1000:]]
+
+        expected = processor.create_chunks(documents, ["a", "b", "c"])
+        first = await processor.create_chunks_async(documents, ["a", "b", "c"], max_workers=2)
+        pool = rag._chunking_pool
+        second = await processor.create_chunks_async(documents, ["a", "b", "c"], max_workers=2)
+
+        def summary(chunks):
+            return [(c.source_file, c.content, c.metadata) for c in chunks]
+
+        assert summary(first) == summary(second) == summary(expected)
+        assert pool is not None
+        assert rag._chunking_pool is pool
+
+    @pytest.mark.asyncio
+    async def test_small_corpus_stays_in_process(self, document):
+        """Test petit corpus : découpage local, aucun pool créé"""
+        processor = DocumentProcessor()
+
+        chunks = await processor.create_chunks_async([document, document], max_workers=4)
+
+        assert chunks
+        assert rag._chunking_pool is None
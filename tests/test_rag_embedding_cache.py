@@ -0,0 +1,220 @@
+"""
+Tests unitaires pour le cache d'embeddings du RAG (format binaire, MGET/pipelines, L1 LRU)
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+rag = pytest.importorskip("src.rag_optimized")
+from src.rag_optimized import (
+    EmbeddingResult,
+    InMemoryEmbeddingCache,
+    RedisEmbeddingCache,
+    pack_embedding,
+    unpack_embedding,
+)
+
+MODEL = "nomic-embed-text"
+
+
+def embedding(seed, dimension=8):
+    rng = np.random.default_rng(seed)
+    return EmbeddingResult(
+        embedding=rng.normal(size=dimension).astype(np.float32).tolist(),
+        model=MODEL,
+        token_count=10 + seed,
+        duration_ms=1.5,
+    )
+
+
+class FakePipeline:
+    """Pipeline Redis : commandes mises en file, appliquées à execute()"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append((key, ttl, value))
+
+    async def execute(self):
+        self.redis.executed.append(list(self.commands))
+        for key, ttl, value in self.commands:
+            self.redis.values[key] = value
+            self.redis.ttls[key] = ttl
+
+
+class FakeRedis:
+    """Client Redis en mémoire (mget, pipeline) qui compte les allers-retours"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+        self.mget_calls = []
+        self.executed = []
+
+    async def mget(self, keys):
+        self.mget_calls.append(list(keys))
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        assert transaction is False
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def redis_client():
+    return FakeRedis()
+
+
+class TestEmbeddingPacking:
+    """Tests pour pack_embedding / unpack_embedding"""
+
+    def test_round_trip_float32(self):
+        """Test aller-retour float32 : vecteur et métadonnées identiques"""
+        result = embedding(1)
+
+        data = pack_embedding(result)
+        restored = unpack_embedding(data, MODEL)
+
+        assert len(data) == 16 + 8 * 4
+        assert restored.embedding == result.embedding
+        assert (restored.model, restored.token_count) == (MODEL, result.token_count)
+        assert restored.duration_ms == pytest.approx(result.duration_ms)
+        assert restored.cached
+
+    def test_round_trip_float16(self):
+        """Test aller-retour float16 : taille divisée par deux, précision float16"""
+        result = embedding(2)
+
+        data = pack_embedding(result, "float16")
+        restored = unpack_embedding(data, MODEL)
+
+        assert len(data) == 16 + 8 * 2
+        np.testing.assert_allclose(restored.embedding, result.embedding, rtol=1e-3, atol=1e-3)
+
+    def test_header_version_checked(self):
+        """Test version de format inconnue : ValueError"""
+        data = bytearray(pack_embedding(embedding(3)))
+        data[2] = rag.EMBEDDING_CACHE_FORMAT_VERSION + 1
+
+        with pytest.raises(ValueError, match="Unsupported embedding cache format version"):
+            unpack_embedding(bytes(data), MODEL)
+
+    def test_legacy_json_entry(self):
+        """Test ancienne entrée JSON (avant le format binaire) toujours lue"""
+        result = embedding(4)
+        legacy = json.dumps({
+            "embedding": result.embedding,
+            "model": "text-embedding-3-small",
+            "token_count": 7,
+            "duration_ms": 12.0,
+        }).encode()
+
+        restored = unpack_embedding(legacy, MODEL)
+
+        assert restored.embedding == result.embedding
+        assert (restored.model, restored.token_count, restored.cached) == ("text-embedding-3-small", 7, True)
+
+
+class TestRedisEmbeddingCache:
+    """Tests pour RedisEmbeddingCache"""
+
+    @pytest.mark.asyncio
+    async def test_set_many_single_pipeline(self, redis_client):
+        """Test set_many : un seul pipeline, entrées binaires avec TTL"""
+        cache = RedisEmbeddingCache(redis_client, default_ttl=600)
+        results = [embedding(i) for i in range(3)]
+
+        assert await cache.set_many(["a", "b", "c"], results)
+
+        assert len(redis_client.executed) == 1
+        assert len(redis_client.executed[0]) == 3
+        assert set(redis_client.ttls.values()) == {600}
+        key = cache._get_cache_key("b", MODEL)
+        assert unpack_embedding(redis_client.values[key], MODEL).embedding == results[1].embedding
+
+    @pytest.mark.asyncio
+    async def test_get_many_single_mget(self, redis_client):
+        """Test get_many sans L1 : un seul MGET, absents à None, ordre conservé"""
+        writer = RedisEmbeddingCache(redis_client, default_ttl=600)
+        await writer.set_many(["a", "c"], [embedding(0), embedding(2)])
+        cache = RedisEmbeddingCache(redis_client, default_ttl=600, l1_max_entries=0)
+
+        results = await cache.get_many(["a", "b", "c"], MODEL)
+
+        assert len(redis_client.mget_calls) == 1
+        assert [r.token_count if r else None for r in results] == [10, None, 12]
+        assert all(r.cached for r in results if r)
+
+    @pytest.mark.asyncio
+    async def test_l1_hits_skip_redis(self, redis_client):
+        """Test entrées lues une fois : servies ensuite par le L1 sans MGET"""
+        writer = RedisEmbeddingCache(redis_client, default_ttl=600)
+        await writer.set_many(["a", "b"], [embedding(0), embedding(1)])
+        cache = RedisEmbeddingCache(redis_client, default_ttl=600)
+
+        await cache.get_many(["a"], MODEL)
+        results = await cache.get_many(["a", "b"], MODEL)
+        assert redis_client.mget_calls == [
+            [cache._get_cache_key("a", MODEL)],
+            [cache._get_cache_key("b", MODEL)],
+        ]
+
+        redis_client.mget_calls.clear()
+        assert (await cache.get("b", MODEL)).embedding == results[1].embedding
+        assert redis_client.mget_calls == []
+
+    @pytest.mark.asyncio
+    async def test_set_fills_l1(self, redis_client):
+        """Test écriture : entrée disponible dans le L1 du même processus"""
+        cache = RedisEmbeddingCache(redis_client, default_ttl=600)
+        await cache.set("a", embedding(0))
+
+        assert (await cache.get("a", MODEL)).token_count == 10
+        assert redis_client.mget_calls == []
+
+    @pytest.mark.asyncio
+    async def test_invalid_entry_is_a_miss(self, redis_client):
+        """Test entrée illisible en Redis : traitée comme absente"""
+        cache = RedisEmbeddingCache(redis_client, default_ttl=600, l1_max_entries=0)
+        redis_client.values[cache._get_cache_key("a", MODEL)] = b"EC\xff garbage"
+
+        assert await cache.get_many(["a"], MODEL) == [None]
+
+    def test_unsupported_dtype(self, redis_client):
+        """Test dtype de stockage inconnu refusé"""
+        with pytest.raises(ValueError, match="Unsupported dtype"):
+            RedisEmbeddingCache(redis_client, default_ttl=600, dtype="int8")
+
+
+class TestInMemoryEmbeddingCache:
+    """Tests pour InMemoryEmbeddingCache"""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_at_cap(self):
+        """Test plafond : l'entrée la moins récemment lue est évincée"""
+        cache = InMemoryEmbeddingCache(default_ttl=600, max_entries=3)
+        await cache.set_many(["a", "b", "c"], [embedding(i) for i in range(3)])
+
+        assert await cache.get("a", MODEL) is not None
+        await cache.set("d", embedding(3))
+
+        assert await cache.size() == 3
+        assert await cache.get("b", MODEL) is None
+        assert [r.token_count for r in await cache.get_many(["a", "c", "d"], MODEL)] == [10, 12, 13]
+
+    @pytest.mark.asyncio
+    async def test_expired_entry(self, monkeypatch):
+        """Test entrée expirée : absente et retirée du cache"""
+        now = [1_000.0]
+        monkeypatch.setattr(rag.time, "monotonic", lambda: now[0])
+        cache = InMemoryEmbeddingCache(default_ttl=60)
+        await cache.set("a", embedding(0))
+
+        now[0] += 61
+
+        assert await cache.get("a", MODEL) is None
+        assert await cache.size() == 0
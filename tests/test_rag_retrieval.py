@@ -0,0 +1,268 @@
+"""
+Tests unitaires pour la recherche de contexte du RAG (store mmap local,
+recherche batch Qdrant et query_batch)
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+rag = pytest.importorskip("src.rag_optimized")
+from src.embedding_store import MemmapEmbeddingStore
+from src.rag_optimized import (
+    QDRANT_CONTEXT_PAYLOAD_FIELDS,
+    DocumentChunk,
+    EmbeddingResult,
+    OptimizedRAGWorkflow,
+    qmodels,
+)
+
+DIMENSION = 8
+
+
+def basis(index):
+    """Vecteur unitaire : la requête basis(i) a pour plus proche voisin le chunk i"""
+    vector = np.full(DIMENSION, 0.01, dtype=np.float32)
+    vector[index] = 1.0
+    return vector
+
+
+def make_chunk(index):
+    return DocumentChunk(
+        content=f"chunk {index}",
+        embedding=basis(index).tolist(),
+        metadata={"index": index},
+        token_count=5 + index,
+        chunk_id=f"c{index}",
+        source_file="doc.txt",
+    )
+
+
+def store_entry(chunk):
+    """Entrée de métadonnées au format écrit par _persist_vector_store"""
+    return {
+        "content": chunk.content,
+        "source": chunk.source_file,
+        "token_count": chunk.token_count,
+        "metadata": chunk.metadata,
+        "created_at": "2025-03-10T12:00:00",
+        "chunk_id": chunk.chunk_id,
+    }
+
+
+class ScriptedQdrant:
+    """Client Qdrant minimal : la requête basis(i) renvoie les points prévus pour i"""
+
+    def __init__(self, points_per_request=None, error=None):
+        self.points_per_request = points_per_request or {}
+        self.error = error
+        self.requests = []
+
+    def _points(self, requests, vectors):
+        self.requests.extend(requests)
+        if self.error is not None:
+            raise self.error
+        return [
+            self.points_per_request.get(int(np.argmax(vector)), [])
+            for vector in vectors
+        ]
+
+
+class FakeQdrant(ScriptedQdrant):
+    """Client Qdrant >= 1.10 : query_batch_points"""
+
+    async def query_batch_points(self, collection_name, requests):
+        points = self._points(requests, [request.query for request in requests])
+        return [SimpleNamespace(points=query_points) for query_points in points]
+
+
+class LegacyQdrant(ScriptedQdrant):
+    """Client Qdrant < 1.10 : search_batch"""
+
+    async def search_batch(self, collection_name, requests):
+        return self._points(requests, [request.vector for request in requests])
+
+
+def scored_point(index, distance):
+    """Point Qdrant dont le payload est projeté sur les champs de contexte"""
+    entry = store_entry(make_chunk(index))
+    return SimpleNamespace(id=f"p{index}", score=distance, payload=entry)
+
+
+@pytest.fixture
+def workflow(tmp_path):
+    """Workflow sans Qdrant dont le store mmap contient les chunks 0 à 3"""
+    workflow = OptimizedRAGWorkflow()
+    workflow.vector_store = MemmapEmbeddingStore(tmp_path / "store")
+    workflow._persist_vector_store([make_chunk(i) for i in range(4)])
+    return workflow
+
+
+class TestLocalSearchRefresh:
+    """Tests du rechargement du store publié par un autre worker"""
+
+    def test_new_version_from_other_worker(self, workflow, tmp_path):
+        """Test chunk ajouté par un autre worker : trouvé sans redémarrage"""
+        other_worker = MemmapEmbeddingStore(tmp_path / "store")
+        assert other_worker.load()
+        added = make_chunk(5)
+        other_worker.append([added.embedding], [store_entry(added)])
+
+        results = workflow._find_similar_chunks_local(basis(5), 1)
+
+        assert [chunk.content for chunk, _ in results] == ["chunk 5"]
+        assert len(workflow.chunks) == 5
+        assert workflow.chunks[4].metadata == {"index": 5}
+
+    def test_unchanged_store_not_reloaded(self, workflow):
+        """Test version inchangée : chunks en mémoire conservés tels quels"""
+        chunks = workflow.chunks
+
+        results = workflow._find_similar_chunks_local(basis(2), 2)
+
+        assert workflow.chunks is chunks
+        assert results[0][0] is chunks[2]
+        assert results[0][1] == pytest.approx(1.0, abs=1e-3)
+
+
+@pytest.fixture
+def batch_workflow(workflow, monkeypatch):
+    """Workflow initialisé : embeddings basis(i) pour la requête "q{i}", réponse écho"""
+
+    async def get_embeddings(texts):
+        return [
+            EmbeddingResult(
+                embedding=basis(int(text[1:])).tolist(),
+                model="test",
+                token_count=3,
+                duration_ms=1.0,
+            )
+            for text in texts
+        ]
+
+    async def generate(question, sources):
+        return f"{question}: " + ", ".join(chunk.content for chunk, _ in sources)
+
+    monkeypatch.setattr(workflow.embedding_provider, "get_embeddings", get_embeddings)
+    monkeypatch.setattr(workflow.responder, "generate", generate)
+    workflow.qdrant_distance = "cosine"
+    workflow._initialized = True
+    return workflow
+
+
+def use_qdrant(workflow, qdrant):
+    workflow.qdrant_client = qdrant
+    workflow._qdrant_collection_ready = True
+
+
+class TestFindSimilarHitsBatch:
+    """Tests pour _find_similar_hits_batch"""
+
+    @pytest.mark.asyncio
+    async def test_qdrant_single_round_trip(self, batch_workflow):
+        """Test un seul query_batch_points, payload projeté, sans vecteurs"""
+        qdrant = FakeQdrant({0: [scored_point(0, 0.1)], 1: [scored_point(1, 0.2)]})
+        use_qdrant(batch_workflow, qdrant)
+
+        hits = await batch_workflow._find_similar_hits_batch(
+            np.stack([basis(1), basis(0)]), 2
+        )
+
+        assert [[hit.point_id for hit in query_hits] for query_hits in hits] == [["p1"], ["p0"]]
+        assert hits[0][0].score == pytest.approx(0.8)
+        assert hits[0][0].chunk is None
+        assert len(qdrant.requests) == 2
+        for request in qdrant.requests:
+            assert request.with_payload == QDRANT_CONTEXT_PAYLOAD_FIELDS
+            assert request.with_vector is False
+            assert request.limit == 2
+
+    @pytest.mark.skipif(
+        not hasattr(qmodels, "SearchRequest"), reason="qdrant-client sans SearchRequest"
+    )
+    @pytest.mark.asyncio
+    async def test_legacy_client_search_batch(self, batch_workflow):
+        """Test client sans query_batch_points : un seul search_batch équivalent"""
+        qdrant = LegacyQdrant({0: [scored_point(0, 0.1)], 1: [scored_point(1, 0.2)]})
+        use_qdrant(batch_workflow, qdrant)
+
+        hits = await batch_workflow._find_similar_hits_batch(
+            np.stack([basis(1), basis(0)]), 2
+        )
+
+        assert [[hit.point_id for hit in query_hits] for query_hits in hits] == [["p1"], ["p0"]]
+        assert [request.with_payload for request in qdrant.requests] == [
+            QDRANT_CONTEXT_PAYLOAD_FIELDS
+        ] * 2
+
+    @pytest.mark.asyncio
+    async def test_local_fallback_on_qdrant_error(self, batch_workflow):
+        """Test erreur Qdrant : recherche dans le store mmap local"""
+        use_qdrant(batch_workflow, FakeQdrant(error=RuntimeError("down")))
+
+        hits = await batch_workflow._find_similar_hits_batch(
+            np.stack([basis(3), basis(1)]), 1
+        )
+
+        assert [[hit.chunk.content for hit in query_hits] for query_hits in hits] == [
+            ["chunk 3"],
+            ["chunk 1"],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_local_fallback_on_empty_qdrant(self, batch_workflow):
+        """Test collection Qdrant vide : recherche dans le store mmap local"""
+        use_qdrant(batch_workflow, FakeQdrant())
+
+        hits = await batch_workflow._find_similar_hits_batch(np.stack([basis(2)]), 1)
+
+        assert hits[0][0].chunk is batch_workflow.chunks[2]
+
+
+class TestQueryBatch:
+    """Tests pour query_batch"""
+
+    @pytest.mark.asyncio
+    async def test_results_follow_query_order(self, batch_workflow):
+        """Test sans Qdrant : un résultat par requête, dans l'ordre des requêtes"""
+        results = await batch_workflow.query_batch(["q3", "q0", "q2"], top_k=1)
+
+        assert [result.answer for result in results] == [
+            "q3: chunk 3",
+            "q0: chunk 0",
+            "q2: chunk 2",
+        ]
+        assert [result.sources[0].chunk_id for result in results] == ["c3", "c0", "c2"]
+        assert results[0].token_usage == {"query_tokens": 3, "context_tokens": 8}
+
+    @pytest.mark.asyncio
+    async def test_qdrant_payload_deserialized_once(self, batch_workflow):
+        """Test point partagé entre requêtes : un seul chunk reconstruit du payload"""
+        shared = scored_point(2, 0.1)
+        use_qdrant(batch_workflow, FakeQdrant({
+            0: [shared, scored_point(0, 0.3)],
+            1: [shared],
+        }))
+
+        results = await batch_workflow.query_batch(["q1", "q0"], top_k=2)
+
+        assert [result.answer for result in results] == [
+            "q1: chunk 2",
+            "q0: chunk 2, chunk 0",
+        ]
+        assert results[0].sources[0] is results[1].sources[0]
+        assert results[1].sources[1].metadata == {"index": 0}
+        assert results[1].confidence_score == pytest.approx(0.8)
+
+    @pytest.mark.asyncio
+    async def test_query_without_context(self, batch_workflow):
+        """Test requête sans hit : résultat vide avec erreur, le reste du batch répond"""
+        use_qdrant(batch_workflow, FakeQdrant({0: [scored_point(0, 0.1)]}))
+
+        results = await batch_workflow.query_batch(["q0", "q5"], top_k=1)
+
+        assert results[0].answer == "q0: chunk 0"
+        assert results[1].answer == ""
+        assert results[1].sources == []
+        assert results[1].error is not None
@@ -0,0 +1,54 @@
+"""
+Tests unitaires pour le registre de clients HTTP partagés (src.clients.http_pool)
+"""
+
+import asyncio
+
+import pytest
+
+from src.clients.http_pool import HTTPClientRegistry, PoolConfig
+
+
+@pytest.fixture
+def registry():
+    """Registre isolé du registre global"""
+    return HTTPClientRegistry(PoolConfig(max_connections_per_host=4, max_keepalive_connections=2))
+
+
+@pytest.mark.asyncio
+async def test_one_client_per_host(registry):
+    """Test un seul client par (scheme, hôte, port, verify)"""
+    client = registry.get_client("https://lnbits.example.com/api/v1/wallet")
+
+    assert registry.get_client("https://LNBITS.example.com:443/api/v1/payments") is client
+    assert registry.get_client("http://lnbits.example.com/api/v1/wallet") is not client
+    assert registry.get_client("https://lnbits.example.com", verify=False) is not client
+    assert registry.get_client("https://other.example.com") is not client
+
+    await registry.close_all()
+
+
+@pytest.mark.asyncio
+async def test_close_all(registry):
+    """Test fermeture des clients et recréation après fermeture"""
+    client = registry.get_client("https://lnbits.example.com")
+    assert [pool["host"] for pool in registry.stats()] == ["lnbits.example.com"]
+
+    await registry.close_all()
+
+    assert client.is_closed
+    assert registry.stats() == []
+    assert registry.get_client("https://lnbits.example.com") is not client
+    await registry.close_all()
+
+
+def test_client_not_shared_across_loops(registry):
+    """Test un client par boucle asyncio (asyncio.run successifs)"""
+    async def get_client():
+        return registry.get_client("https://lnbits.example.com")
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+
+    assert first is not second
+    assert len(registry._entries) == 1
@@ -20,6 +20,7 @@ from src.clients.lnbits_client_v2 import (
     AuthMethod,
     RetryConfig,
     RateLimitConfig,
+    TokenBucket,
     LNBitsClientError,
     LNBitsAuthError,
     LNBitsRateLimitError,
@@ -155,6 +156,55 @@ async def test_rate_limiting(client_with_rate_limit):
         assert duration >= 0
 
 
+def test_token_bucket_burst_then_rate():
+    """Test burst immédiat puis créneaux espacés au débit configuré"""
+    bucket = TokenBucket("default", requests_per_minute=60, burst_size=3)
+    
+    waits = [bucket.reserve() for _ in range(5)]
+    
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(1.0, abs=0.05)
+    assert waits[4] == pytest.approx(2.0, abs=0.05)
+    assert bucket.queued == 2
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_fifo_without_blocking():
+    """Test attente FIFO et jeton rendu quand une attente est annulée"""
+    bucket = TokenBucket("default", requests_per_minute=1200, burst_size=1)
+    order = []
+    
+    async def request(i):
+        await bucket.acquire()
+        order.append(i)
+    
+    tasks = [asyncio.create_task(request(0))]
+    cancelled = asyncio.create_task(bucket.acquire())
+    tasks += [asyncio.create_task(request(i)) for i in range(1, 4)]
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(*tasks)
+    
+    assert order == [0, 1, 2, 3]
+    stats = bucket.stats()
+    assert stats["acquired"] == 4
+    assert stats["wait_seconds_histogram"]["+Inf"] == 4
+    assert stats["wait_seconds_max"] <= 0.25
+
+
+def test_rate_limit_budgets(client_with_rate_limit):
+    """Test seaux séparés pour les clés admin et invoice"""
+    limiters = client_with_rate_limit._rate_limiters
+    
+    for _ in range(2):
+        assert limiters["admin"].reserve() == 0.0
+    
+    assert limiters["admin"].reserve() > 0
+    assert limiters["invoice"].reserve() == 0.0
+    assert limiters["default"].reserve() == 0.0
+    assert set(client_with_rate_limit.get_rate_limit_stats()) == {"default", "admin", "invoice"}
+
+
 # ═══════════════════════════════════════════════════════════
 # TESTS RETRY LOGIC
 # ═══════════════════════════════════════════════════════════
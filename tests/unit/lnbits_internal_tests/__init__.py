@@ -0,0 +1,7 @@
+"""
+Tests unitaires pour le LNbits embarqué (lnbits_internal).
+
+Les tests tournent sur une base SQLite temporaire migrée avec les
+migrations du cœur ; une dépendance LNbits non installée les marque
+comme skip, avec la dépendance manquante comme raison.
+"""
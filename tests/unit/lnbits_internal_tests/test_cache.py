@@ -0,0 +1,191 @@
+"""
+Tests unitaires pour le cache en mémoire de LNbits (lnbits_internal.utils.cache)
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("lnbits_internal.utils.cache")
+from lnbits_internal.utils import cache as cache_module
+from lnbits_internal.utils.cache import Cache
+
+
+class CountingCall:
+    """Coroutine à appels comptés, bloquée jusqu'à release()"""
+
+    def __init__(self, result="value", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = asyncio.Event()
+        self._release = asyncio.Event()
+
+    def release(self):
+        self._release.set()
+
+    async def __call__(self):
+        self.calls += 1
+        self.started.set()
+        await self._release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+class TestSingleFlight:
+    """Tests du partage d'un appel entre demandeurs concurrents (save_result)"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_call(self):
+        """Test N demandes simultanées d'une clé absente : un seul appel"""
+        cache = Cache()
+        call = CountingCall()
+
+        tasks = [asyncio.create_task(cache.save_result(call, "key")) for _ in range(10)]
+        await call.started.wait()
+        call.release()
+
+        assert await asyncio.gather(*tasks) == ["value"] * 10
+        assert call.calls == 1
+        assert cache.stats == {"hit": 9, "miss": 1, "eviction": 0}
+        assert not cache._inflight
+        assert cache.get("key") == "value"
+
+    @pytest.mark.asyncio
+    async def test_distinct_keys_not_shared(self):
+        """Test clés différentes : appels indépendants"""
+        cache = Cache()
+        first, second = CountingCall("a"), CountingCall("b")
+
+        tasks = [
+            asyncio.create_task(cache.save_result(first, "a")),
+            asyncio.create_task(cache.save_result(second, "b")),
+        ]
+        await asyncio.gather(first.started.wait(), second.started.wait())
+        first.release()
+        second.release()
+
+        assert await asyncio.gather(*tasks) == ["a", "b"]
+        assert (first.calls, second.calls) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_owner_cancelled_hands_off(self):
+        """Test appelant annulé : un demandeur en attente relance l'appel"""
+        cache = Cache()
+        cancelled = CountingCall()
+        retried = CountingCall("retried")
+        retried.release()
+
+        owner = asyncio.create_task(cache.save_result(cancelled, "key"))
+        await cancelled.started.wait()
+        waiter = asyncio.create_task(cache.save_result(retried, "key"))
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        assert await waiter == "retried"
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        assert (cancelled.calls, retried.calls) == (1, 1)
+        assert cache.get("key") == "retried"
+
+    @pytest.mark.asyncio
+    async def test_waiter_cancelled_keeps_call(self):
+        """Test demandeur en attente annulé : l'appel partagé continue"""
+        cache = Cache()
+        call = CountingCall()
+
+        owner = asyncio.create_task(cache.save_result(call, "key"))
+        await call.started.wait()
+        waiter = asyncio.create_task(cache.save_result(call, "key"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        call.release()
+
+        assert await owner == "value"
+        assert call.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_error_shared_and_not_cached(self):
+        """Test exception : relayée à tous les demandeurs, rien mis en cache"""
+        cache = Cache()
+        failing = CountingCall(error=RuntimeError("upstream down"))
+
+        tasks = [asyncio.create_task(cache.save_result(failing, "key")) for _ in range(5)]
+        await failing.started.wait()
+        failing.release()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert failing.calls == 1
+        assert not cache._inflight
+        assert cache.get("key") is None
+
+        recovered = CountingCall("ok")
+        recovered.release()
+        assert await cache.save_result(recovered, "key") == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cached_decorator(self):
+        """Test décorateur : clé dérivée des arguments, ou fournie"""
+        cache = Cache()
+        calls = []
+
+        @cache.cached(expiry=60)
+        async def square(x, offset=0):
+            calls.append(x)
+            return x * x + offset
+
+        @cache.cached(key=lambda wallet_id, **kwargs: f"balance:{wallet_id}")
+        async def balance(wallet_id, refresh=False):
+            calls.append(wallet_id)
+            return 100
+
+        assert [await square(3), await square(3), await square(3, offset=1)] == [9, 9, 10]
+        assert [await balance("w"), await balance("w", refresh=True)] == [100, 100]
+        assert calls == [3, 3, "w"]
+        assert cache.get("balance:w") == 100
+
+
+class TestCacheLRU:
+    """Tests de l'ordre LRU, du plafond et de l'expiration"""
+
+    def test_evicts_least_recently_used(self):
+        """Test plafond : l'entrée la moins récemment lue est évincée"""
+        cache = Cache(maxsize=3)
+        for key in "abc":
+            cache.set(key, key.upper(), expiry=60)
+
+        assert cache.get("a") == "A"
+        cache.set("d", "D", expiry=60)
+
+        assert cache.get("b") is None
+        assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+        assert cache.stats["eviction"] == 1
+
+    def test_set_refreshes_position(self):
+        """Test réécriture d'une clé : remise en fin d'ordre LRU"""
+        cache = Cache(maxsize=2)
+        cache.set("a", 1, expiry=60)
+        cache.set("b", 2, expiry=60)
+        cache.set("a", 3, expiry=60)
+        cache.set("c", 4, expiry=60)
+
+        assert (cache.get("a"), cache.get("b"), cache.get("c")) == (3, None, 4)
+
+    def test_expired_entries(self, monkeypatch):
+        """Test entrée expirée : absente pour get et pop, retirée du cache"""
+        now = [1_000.0]
+        monkeypatch.setattr(cache_module, "time", lambda: now[0])
+        cache = Cache()
+        cache.set("a", 1, expiry=10)
+        cache.set("b", 2, expiry=10)
+
+        now[0] += 11
+
+        assert cache.get("a", "default") == "default"
+        assert cache.pop("b") is None
+        assert not cache._values
+        assert cache.stats["miss"] == 1
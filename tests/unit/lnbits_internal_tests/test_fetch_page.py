@@ -0,0 +1,310 @@
+"""
+Tests unitaires pour la pagination par curseur (Connection.fetch_page),
+l'encodage des curseurs et PageCountCache
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("lnbits_internal.core.models")
+from lnbits_internal import db as lnbits_db
+from lnbits_internal.core.models import Payment
+from lnbits_internal.db import Filters, PageCountCache, decode_cursor, encode_cursor
+
+START = datetime(2025, 3, 10, tzinfo=timezone.utc)
+QUERY = "SELECT * FROM apipayments"
+
+
+@pytest.fixture
+async def payments_table(core_db, wallet):
+    """12 paiements : montants et dates en doublon, mémos NULL"""
+    async with core_db.connect() as conn:
+        for i in range(12):
+            await conn.insert(
+                "apipayments",
+                Payment(
+                    checking_id=f"p{i:02d}",
+                    payment_hash=f"h{i:02d}",
+                    wallet_id=wallet.id,
+                    amount=1_000 * (i % 4),
+                    fee=0,
+                    bolt11="",
+                    memo=None if i % 3 == 0 else f"memo {i % 5}",
+                    time=START + timedelta(minutes=i // 2),
+                    status="success",
+                ),
+            )
+    return core_db
+
+
+async def walk(db, **filters):
+    """Parcourt toutes les pages par curseur, retourne les pages d'identifiants"""
+    pages = []
+    cursor = None
+    async with db.connect() as conn:
+        while True:
+            page = await conn.fetch_page(
+                QUERY,
+                filters=Filters(cursor=cursor, **filters),
+                model=Payment,
+                keyset="checking_id",
+            )
+            pages.append([payment.checking_id for payment in page.data])
+            cursor = page.next_cursor
+            if not cursor:
+                return pages
+
+
+async def ordered_ids(db, order_by):
+    rows = await db.fetchall(f"{QUERY} ORDER BY {order_by}")
+    return [row["checking_id"] for row in rows]
+
+
+class TestKeysetPagination:
+    """Tests du parcours par curseur de fetch_page"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "sortby, direction",
+        [
+            (None, None),
+            ("checking_id", "desc"),
+            ("time", "desc"),
+            ("amount", "asc"),
+            ("memo", "asc"),
+            ("memo", "desc"),
+        ],
+    )
+    async def test_pages_match_full_ordering(self, payments_table, sortby, direction):
+        """Test pages consécutives : ni doublon ni trou, même ordre qu'une requête unique"""
+        pages = await walk(payments_table, limit=5, sortby=sortby, direction=direction)
+
+        column, order = sortby or "checking_id", direction or "asc"
+        expected = await ordered_ids(
+            payments_table, f"{column} {order}, checking_id {order}"
+        )
+        assert [len(page) for page in pages] == [5, 5, 2]
+        assert [checking_id for page in pages for checking_id in page] == expected
+
+    @pytest.mark.asyncio
+    async def test_exact_page_boundary(self, payments_table):
+        """Test total multiple de la limite : pas de curseur ni de page vide à la fin"""
+        pages = await walk(payments_table, limit=4, sortby="amount", direction="desc")
+
+        assert [len(page) for page in pages] == [4, 4, 4]
+
+    @pytest.mark.asyncio
+    async def test_null_sort_values(self, payments_table):
+        """Test curseur posé sur une valeur NULL : repli sur l'offset du curseur"""
+        async with payments_table.connect() as conn:
+            first = await conn.fetch_page(
+                QUERY,
+                filters=Filters(limit=3, sortby="memo", direction="asc"),
+                model=Payment,
+                keyset="checking_id",
+            )
+        # SQLite trie les NULL en tête : la page se termine sur un mémo NULL
+        assert first.data[-1].memo is None
+        assert decode_cursor(first.next_cursor)["value"] is None
+
+        pages = await walk(payments_table, limit=3, sortby="memo", direction="asc")
+        assert pages[0] == [payment.checking_id for payment in first.data]
+        assert sum(pages, []) == await ordered_ids(
+            payments_table, "memo asc, checking_id asc"
+        )
+
+    @pytest.mark.asyncio
+    async def test_seek_clause_used(self, payments_table, monkeypatch):
+        """Test pages suivantes sans OFFSET : recherche sur (tri, clé)"""
+        queries = []
+        fetchall = lnbits_db.Connection.fetchall
+
+        async def recording(self, query, values=None, model=None):
+            queries.append(query)
+            return await fetchall(self, query, values, model)
+
+        monkeypatch.setattr(lnbits_db.Connection, "fetchall", recording)
+        await walk(payments_table, limit=5, sortby="time", direction="desc")
+
+        assert "OFFSET 0" in queries[0]
+        assert all("OFFSET" not in query for query in queries[1:])
+        assert all(":cursor_key" in query for query in queries[1:])
+
+    @pytest.mark.asyncio
+    async def test_total_counted_on_request(self, payments_table):
+        """Test total compté seulement avec count=True, puis servi par le cache"""
+        lnbits_db._page_counts._counts.clear()
+        async with payments_table.connect() as conn:
+            not_counted = await conn.fetch_page(
+                QUERY, filters=Filters(limit=5), model=Payment, keyset="checking_id"
+            )
+            first = await conn.fetch_page(
+                QUERY,
+                filters=Filters(limit=5, count=True),
+                model=Payment,
+                keyset="checking_id",
+            )
+            await conn.execute("DELETE FROM apipayments WHERE checking_id = 'p11'")
+
+            cached = await conn.fetch_page(
+                QUERY,
+                filters=Filters(limit=5, cursor=first.next_cursor),
+                model=Payment,
+                keyset="checking_id",
+            )
+            recounted = await conn.fetch_page(
+                QUERY,
+                filters=Filters(limit=5, cursor=first.next_cursor, count=True),
+                model=Payment,
+                keyset="checking_id",
+            )
+            uncounted = await conn.fetch_page(
+                QUERY,
+                filters=Filters(limit=5, count=False),
+                model=Payment,
+                keyset="checking_id",
+            )
+
+        assert not_counted.total is None
+        assert first.total == 12
+        assert cached.total == 12
+        assert recounted.total == 11
+        assert uncounted.total is None
+
+    @pytest.mark.asyncio
+    async def test_tampered_cursor_rejected(self, payments_table):
+        """Test curseur modifié par le client : ValueError avant toute requête"""
+        async with payments_table.connect() as conn:
+            page = await conn.fetch_page(
+                QUERY, filters=Filters(limit=5), model=Payment, keyset="checking_id"
+            )
+            payload, signature = page.next_cursor.split(".")
+            data = json.loads(base64.urlsafe_b64decode(payload))
+            data["offset"] = 0
+            forged = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+            with pytest.raises(ValueError, match="Invalid cursor"):
+                await conn.fetch_page(
+                    QUERY,
+                    filters=Filters(limit=5, cursor=f"{forged}.{signature}"),
+                    model=Payment,
+                    keyset="checking_id",
+                )
+
+
+class TestCursorEncoding:
+    """Tests pour encode_cursor / decode_cursor"""
+
+    def test_round_trip(self):
+        """Test aller-retour : valeur datetime restituée, clé en texte"""
+        row = {"time": START, "checking_id": 42}
+
+        data = decode_cursor(encode_cursor(row, "time", "desc", "checking_id", 10))
+
+        assert data["value"] == START
+        assert (data["sort"], data["direction"]) == ("time", "desc")
+        assert (data["key"], data["offset"], data["datetime"]) == ("42", 10, True)
+
+    def test_unsupported_value_stored_as_null(self):
+        """Test valeur de tri non sérialisable : curseur sans valeur (repli offset)"""
+        cursor = encode_cursor({"extra": {"a": 1}, "id": "x"}, "extra", "asc", "id", 5)
+
+        assert decode_cursor(cursor)["value"] is None
+
+    @pytest.mark.parametrize(
+        "cursor",
+        ["", "garbage", "e30.", "e30.AAAAAAAAAAAAAAAAAAAAAA"],
+    )
+    def test_invalid_cursor(self, cursor):
+        """Test curseurs illisibles ou non signés rejetés"""
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor)
+
+    def test_signed_with_auth_secret(self, monkeypatch):
+        """Test curseur d'une autre instance (autre secret) rejeté"""
+        cursor = encode_cursor({"id": "a"}, "id", "asc", "id", 5)
+
+        monkeypatch.setattr(lnbits_db.settings, "auth_secret_key", "other-secret")
+
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            [],
+            {"sort": "id", "direction": "asc", "value": 1, "datetime": False, "offset": 0},
+            {"sort": "id", "direction": "asc", "value": 1, "datetime": False,
+             "key": "a", "offset": "0"},
+            {"sort": "time", "direction": "asc", "value": "x", "datetime": True,
+             "key": "a", "offset": 0},
+        ],
+    )
+    def test_signed_malformed_payload_rejected(self, data):
+        """Test charge signée mais incomplète ou mal typée : ValueError explicite"""
+        payload = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(f"{payload}.{lnbits_db._cursor_signature(payload)}")
+
+    def test_non_ascii_signature_rejected(self):
+        """Test signature non ASCII : ValueError (pas de TypeError de compare_digest)"""
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor("e30.é")
+
+    def test_invalid_direction_rejected(self):
+        """Test direction hors asc/desc rejetée même correctement signée"""
+        data = {"sort": "id", "direction": "sideways", "value": 1,
+                "datetime": False, "key": "a", "offset": 0}
+        payload = base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+        with pytest.raises(ValueError):
+            decode_cursor(f"{payload}.{lnbits_db._cursor_signature(payload)}")
+
+
+class TestPageCountCache:
+    """Tests pour PageCountCache"""
+
+    def test_keyed_by_database_query_and_values(self):
+        """Test totaux distincts par base, requête et valeurs"""
+        cache = PageCountCache()
+        cache.set("core", "q", {"wallet": "a"}, 3)
+
+        assert cache.get("core", "q", {"wallet": "a"}) == 3
+        assert cache.get("core", "q", {"wallet": "b"}) is None
+        assert cache.get("ext_tpos", "q", {"wallet": "a"}) is None
+        assert cache.get("core", "other", {"wallet": "a"}) is None
+
+    def test_expiry(self, monkeypatch):
+        """Test total expiré après ttl secondes"""
+        now = [1_000.0]
+        monkeypatch.setattr(lnbits_db.time, "time", lambda: now[0])
+        cache = PageCountCache(ttl=30)
+        cache.set("core", "q", {}, 7)
+
+        now[0] += 29
+        assert cache.get("core", "q", {}) == 7
+        now[0] += 2
+        assert cache.get("core", "q", {}) is None
+
+    def test_maxsize_evicts_expired_then_oldest(self, monkeypatch):
+        """Test plafond : entrées expirées purgées d'abord, puis les plus anciennes"""
+        now = [1_000.0]
+        monkeypatch.setattr(lnbits_db.time, "time", lambda: now[0])
+        cache = PageCountCache(ttl=10, maxsize=3)
+        cache.set("core", "expired", {}, 1)
+        now[0] += 5
+        cache.set("core", "a", {}, 2)
+        cache.set("core", "b", {}, 3)
+        now[0] += 6
+
+        cache.set("core", "c", {}, 4)
+        assert cache.get("core", "a", {}) == 2
+        assert len(cache._counts) == 3
+
+        cache.set("core", "d", {}, 5)
+        assert cache.get("core", "a", {}) is None
+        assert [cache.get("core", q, {}) for q in "bcd"] == [3, 4, 5]
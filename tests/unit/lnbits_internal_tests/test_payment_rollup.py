@@ -0,0 +1,235 @@
+"""
+Tests unitaires pour l'agrégat journalier des paiements (apipayments_daily)
+et Connection.transaction()
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("lnbits_internal.core.crud.payments")
+from lnbits_internal.core import migrations
+from lnbits_internal.core.crud import payments
+from lnbits_internal.core.models import CreatePayment, Payment, PaymentState
+from lnbits_internal.db import Filters
+
+DAY = datetime(2025, 3, 10, tzinfo=timezone.utc)
+
+
+def create_data(wallet_id, payment_hash, amount_msat, **kwargs):
+    return CreatePayment(
+        wallet_id=wallet_id,
+        payment_hash=payment_hash,
+        bolt11=f"lnbc_{payment_hash}",
+        amount_msat=amount_msat,
+        memo="",
+        **kwargs,
+    )
+
+
+def raw_payment(wallet_id, checking_id, amount, status, time, fee=0, tag=None):
+    return Payment(
+        checking_id=checking_id,
+        payment_hash=checking_id,
+        wallet_id=wallet_id,
+        amount=amount,
+        fee=fee,
+        bolt11=f"lnbc_{checking_id}",
+        status=status,
+        tag=tag,
+        time=time,
+    )
+
+
+async def rollup_rows(db):
+    """Lignes non vides de l'agrégat, indexées par (statut, direction)"""
+    rows = await db.fetchall(
+        "SELECT * FROM apipayments_daily WHERE payments_count != 0"
+    )
+    return {(row["status"], row["direction"]): row for row in rows}
+
+
+async def insert_history(db, wallet_id):
+    """Paiements sur trois jours, insérés sans passer par l'agrégat"""
+    history = [
+        ("in1", 50_000, PaymentState.SUCCESS, DAY, 0, "tpos"),
+        ("in2", 20_000, PaymentState.SUCCESS, DAY + timedelta(hours=5), 0, None),
+        ("in3", 7_000, PaymentState.PENDING, DAY + timedelta(hours=6), 0, None),
+        ("out1", -10_000, PaymentState.SUCCESS, DAY + timedelta(days=1), -200, None),
+        ("out2", -3_000, PaymentState.PENDING, DAY + timedelta(days=1, hours=2), -10, None),
+        ("out3", -4_000, PaymentState.FAILED, DAY + timedelta(days=2), 0, "tpos"),
+    ]
+    async with db.connect() as conn:
+        for checking_id, amount, status, time, fee, tag in history:
+            await conn.insert(
+                "apipayments",
+                raw_payment(wallet_id, checking_id, amount, status, time, fee, tag),
+            )
+
+
+class TestRollupMaintenance:
+    """Tests des deltas appliqués à l'agrégat par les écritures de paiements"""
+
+    @pytest.mark.asyncio
+    async def test_create_payment(self, core_db, wallet):
+        """Test création : une ligne (jour, statut, direction) incrémentée"""
+        await payments.create_payment("a", create_data(wallet.id, "a", 1_000))
+        await payments.create_payment("b", create_data(wallet.id, "b", 2_000))
+        await payments.create_payment("c", create_data(wallet.id, "c", -500, fee=-20))
+
+        rows = await rollup_rows(core_db)
+        incoming = rows[(PaymentState.PENDING.value, "in")]
+        assert (incoming["payments_count"], incoming["amount"]) == (2, 3_000)
+        outgoing = rows[(PaymentState.PENDING.value, "out")]
+        assert (outgoing["payments_count"], outgoing["amount"]) == (1, -500)
+        assert (outgoing["fee"], outgoing["abs_fee"]) == (-20, 20)
+        assert incoming["wallet_id"] == wallet.id
+
+    @pytest.mark.asyncio
+    async def test_status_change_moves_payment(self, core_db, wallet):
+        """Test changement de statut : retiré de l'ancienne ligne, ajouté à la nouvelle"""
+        payment = await payments.create_payment("a", create_data(wallet.id, "a", 1_000))
+        await payments.create_payment("b", create_data(wallet.id, "b", 4_000))
+
+        payment.status = PaymentState.SUCCESS
+        await payments.update_payment(payment)
+
+        rows = await rollup_rows(core_db)
+        assert rows[(PaymentState.PENDING.value, "in")]["amount"] == 4_000
+        assert rows[(PaymentState.SUCCESS.value, "in")]["amount"] == 1_000
+        assert rows[(PaymentState.SUCCESS.value, "in")]["payments_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_wallet_payment(self, core_db, wallet):
+        """Test suppression : le paiement sort de l'agrégat"""
+        await payments.create_payment("a", create_data(wallet.id, "a", 1_000))
+        await payments.create_payment("b", create_data(wallet.id, "b", 2_000))
+
+        await payments.delete_wallet_payment("a", wallet.id)
+        await payments.delete_wallet_payment("b", "other-wallet")
+
+        assert await payments.get_payment("a") is None
+        row = (await rollup_rows(core_db))[(PaymentState.PENDING.value, "in")]
+        assert (row["payments_count"], row["amount"]) == (1, 2_000)
+
+    @pytest.mark.asyncio
+    async def test_delete_expired_invoices(self, core_db, wallet):
+        """Test purge des factures expirées : leurs lignes retombent à zéro"""
+        expired = datetime.now(timezone.utc) - timedelta(hours=1)
+        await payments.create_payment(
+            "a", create_data(wallet.id, "a", 1_000, expiry=expired)
+        )
+        await payments.create_payment("b", create_data(wallet.id, "b", -700))
+
+        await payments.delete_expired_invoices()
+
+        rows = await rollup_rows(core_db)
+        assert list(rows) == [(PaymentState.PENDING.value, "out")]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_rolls_back_rollup(self, core_db, wallet, monkeypatch):
+        """Test échec de l'écriture : ni paiement ni delta ne sont conservés"""
+        payment = await payments.create_payment("a", create_data(wallet.id, "a", 1_000))
+
+        async def failing_update(*args, **kwargs):
+            raise RuntimeError("write failed")
+
+        async with core_db.connect() as conn:
+            monkeypatch.setattr(conn, "update", failing_update)
+            payment.status = PaymentState.SUCCESS
+            with pytest.raises(RuntimeError):
+                await payments.update_payment(payment, conn=conn)
+
+        rows = await rollup_rows(core_db)
+        assert list(rows) == [(PaymentState.PENDING.value, "in")]
+        assert (await payments.get_payment("a")).status == PaymentState.PENDING.value
+
+
+class TestRollupBackfill:
+    """Tests de la migration m032 et de la reconstruction de l'agrégat"""
+
+    @pytest.mark.asyncio
+    async def test_m032_backfills_existing_payments(self, core_db, wallet):
+        """Test migration sur des paiements existants : même résultat que rebuild"""
+        await insert_history(core_db, wallet.id)
+        async with core_db.connect() as conn:
+            await conn.execute("DROP TABLE apipayments_daily")
+            await migrations.m032_add_daily_payment_rollup(conn)
+        migrated = await core_db.fetchall(
+            "SELECT * FROM apipayments_daily ORDER BY time, status, direction, tag"
+        )
+
+        await payments.rebuild_daily_payment_rollup()
+        rebuilt = await core_db.fetchall(
+            "SELECT * FROM apipayments_daily ORDER BY time, status, direction, tag"
+        )
+
+        assert migrated == rebuilt
+        assert sum(row["payments_count"] for row in migrated) == 6
+        assert {row["tag"] for row in migrated} == {"", "tpos"}
+
+    @pytest.mark.asyncio
+    async def test_stats_match_raw_queries(self, core_db, wallet, monkeypatch):
+        """Test statistiques lues dans l'agrégat identiques au GROUP BY brut"""
+        await insert_history(core_db, wallet.id)
+        await payments.rebuild_daily_payment_rollup()
+
+        async def all_stats():
+            return (
+                await payments.get_daily_stats(),
+                await payments.get_payment_count_stats("status"),
+                await payments.get_payment_count_stats("tag"),
+                await payments.get_payments_history(wallet.id, "day"),
+                await payments.get_payments_history(wallet.id, "month"),
+            )
+
+        assert payments._use_rollup(Filters())
+        from_rollup = await all_stats()
+        monkeypatch.setattr(payments, "_use_rollup", lambda filters: False)
+        from_raw = await all_stats()
+
+        daily_in, daily_out = from_rollup[0]
+        assert [stat.payments_count for stat in daily_in] == [2]
+        assert [stat.payments_count for stat in daily_out] == [2]
+        assert from_rollup[0] == from_raw[0]
+        assert from_rollup[1] == from_raw[1]
+        # le GROUP BY brut renvoie NULL pour les paiements sans tag, l'agrégat ""
+        assert {(s.field or "", s.total) for s in from_rollup[2]} == {
+            (s.field or "", s.total) for s in from_raw[2]
+        }
+        assert from_rollup[3] == from_raw[3]
+        assert from_rollup[4] == from_raw[4]
+
+
+class TestConnectionTransaction:
+    """Tests pour Connection.transaction()"""
+
+    @pytest.mark.asyncio
+    async def test_commit_on_exit(self, core_db, wallet):
+        """Test écritures validées ensemble en sortie de bloc"""
+        async with core_db.connect() as conn:
+            async with conn.transaction():
+                await conn.insert("apipayments", raw_payment(wallet.id, "a", 1, "success", DAY))
+                async with conn.transaction():
+                    await conn.insert("apipayments", raw_payment(wallet.id, "b", 2, "success", DAY))
+
+        assert await payments.get_payment("a") is not None
+        assert await payments.get_payment("b") is not None
+
+    @pytest.mark.asyncio
+    async def test_rollback_on_error(self, core_db, wallet):
+        """Test exception dans le bloc (ou un bloc imbriqué) : tout est annulé"""
+        async with core_db.connect() as conn:
+            with pytest.raises(ValueError):
+                async with conn.transaction():
+                    await conn.insert("apipayments", raw_payment(wallet.id, "a", 1, "success", DAY))
+                    async with conn.transaction():
+                        await conn.insert("apipayments", raw_payment(wallet.id, "b", 2, "success", DAY))
+                        raise ValueError("abort")
+
+            # hors transaction, chaque écriture est de nouveau validée aussitôt
+            await conn.insert("apipayments", raw_payment(wallet.id, "c", 3, "success", DAY))
+
+        assert await payments.get_payment("a") is None
+        assert await payments.get_payment("b") is None
+        assert await payments.get_payment("c") is not None
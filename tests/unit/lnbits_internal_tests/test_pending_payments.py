@@ -0,0 +1,214 @@
+"""
+Tests unitaires pour la vérification groupée des paiements en attente
+(update_pending_payments_batch, reconcile_pending_payments)
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("lnbits_internal.core.services.payments")
+from lnbits_internal.core.crud import payments as crud
+from lnbits_internal.core.models import Payment, PaymentState
+from lnbits_internal.core.models import payments as payment_models
+from lnbits_internal.core.services import payments as services
+from lnbits_internal.utils.cache import cache
+from lnbits_internal.wallets.base import (
+    PaymentFailedStatus,
+    PaymentPendingStatus,
+    PaymentSuccessStatus,
+)
+
+START = datetime(2025, 3, 10, tzinfo=timezone.utc)
+# reconcile_pending_payments patche asyncio.sleep pour rythmer ses tours
+_sleep = asyncio.sleep
+
+# statut renvoyé par la source de financement pour chaque paiement en attente
+FUNDING_STATUSES = {
+    "in-paid": PaymentSuccessStatus(),
+    "in-expired": PaymentFailedStatus(),
+    "in-open": PaymentPendingStatus(),
+    "out-sent": PaymentSuccessStatus(fee_msat=-12),
+    "out-failed": PaymentFailedStatus(),
+    "out-inflight": PaymentPendingStatus(),
+}
+
+
+class FakeFundingSource:
+    """Source de financement : statuts fixés, appels et concurrence mesurés"""
+
+    def __init__(self, statuses, errors=()):
+        self.statuses = statuses
+        self.errors = set(errors)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _status(self, checking_id):
+        self.calls.append(checking_id)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await _sleep(0.001)
+            if checking_id in self.errors:
+                raise ConnectionError("node unreachable")
+            return self.statuses[checking_id]
+        finally:
+            self.in_flight -= 1
+
+    async def get_invoice_status(self, checking_id):
+        return await self._status(checking_id)
+
+    async def get_payment_status(self, checking_id):
+        return await self._status(checking_id)
+
+
+@pytest.fixture
+def funding(monkeypatch):
+    source = FakeFundingSource(FUNDING_STATUSES)
+    monkeypatch.setattr(payment_models, "get_funding_source", lambda: source)
+    cache._values.clear()
+    yield source
+    cache._values.clear()
+
+
+@pytest.fixture
+async def pending(core_db, wallet):
+    """Un paiement en attente par statut, plus un paiement interne et un réglé"""
+    async with core_db.connect() as conn:
+        for i, checking_id in enumerate([*FUNDING_STATUSES, "internal_x", "done"]):
+            amount = -1_000 if checking_id.startswith("out") else 1_000
+            await conn.insert(
+                "apipayments",
+                Payment(
+                    checking_id=checking_id,
+                    payment_hash=checking_id,
+                    wallet_id=wallet.id,
+                    amount=amount,
+                    fee=0,
+                    bolt11="",
+                    status=PaymentState.SUCCESS if checking_id == "done" else PaymentState.PENDING,
+                    time=START + timedelta(minutes=i),
+                ),
+            )
+    await crud.rebuild_daily_payment_rollup()
+    return await crud.get_payments(wallet_id=wallet.id, pending=True, exclude_uncheckable=True)
+
+
+async def snapshot(db):
+    """Statuts des paiements et contenu de l'agrégat journalier"""
+    statuses = await db.fetchall("SELECT checking_id, status FROM apipayments ORDER BY checking_id")
+    rollup = await db.fetchall(
+        "SELECT * FROM apipayments_daily WHERE payments_count != 0"
+        " ORDER BY status, direction"
+    )
+    return [dict(row) for row in statuses], [dict(row) for row in rollup]
+
+
+async def reset_pending(db, checking_ids):
+    """Remet les paiements en attente (et l'agrégat) dans leur état initial"""
+    async with db.connect() as conn:
+        for checking_id in checking_ids:
+            await conn.execute(
+                "UPDATE apipayments SET status = 'pending' WHERE checking_id = :id",
+                {"id": checking_id},
+            )
+    await crud.rebuild_daily_payment_rollup()
+
+
+class TestUpdatePendingPaymentsBatch:
+    """Tests pour update_pending_payments_batch"""
+
+    @pytest.mark.asyncio
+    async def test_matches_sequential_updates(self, core_db, funding, pending):
+        """Test résultat identique à update_pending_payment appelé paiement par paiement"""
+        checking_ids = [payment.checking_id for payment in pending]
+        assert sorted(checking_ids) == sorted(FUNDING_STATUSES)
+
+        sequential = [await services.update_pending_payment(p) for p in pending]
+        expected = await snapshot(core_db)
+
+        await reset_pending(core_db, checking_ids)
+        fresh = await crud.get_payments(pending=True, exclude_uncheckable=True)
+        settled = await services.update_pending_payments_batch(fresh)
+
+        assert await snapshot(core_db) == expected
+        assert sorted(p.checking_id for p in settled) == sorted(
+            p.checking_id for p, changed in zip(pending, sequential) if changed
+        )
+        statuses = {row["checking_id"]: row["status"] for row in expected[0]}
+        assert statuses == {
+            "done": "success",
+            "in-expired": "failed",
+            "in-open": "pending",
+            "in-paid": "success",
+            "internal_x": "pending",
+            "out-failed": "failed",
+            "out-inflight": "pending",
+            "out-sent": "success",
+        }
+
+    @pytest.mark.asyncio
+    async def test_failing_check_skipped(self, core_db, funding, pending):
+        """Test vérification en erreur : paiement laissé en attente, les autres réglés"""
+        funding.errors = {"in-paid"}
+
+        settled = await services.update_pending_payments_batch(pending)
+
+        statuses = {row["checking_id"]: row["status"] for row in (await snapshot(core_db))[0]}
+        assert statuses["in-paid"] == "pending"
+        assert statuses["out-sent"] == "success"
+        assert sorted(p.checking_id for p in settled) == [
+            "in-expired", "out-failed", "out-sent"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self, funding, pending):
+        """Test appels simultanés à la source de financement plafonnés"""
+        await services.update_pending_payments_batch(pending, concurrency=2)
+
+        assert funding.peak == 2
+        assert sorted(funding.calls) == sorted(FUNDING_STATUSES)
+
+    @pytest.mark.asyncio
+    async def test_wallet_update_skips_recent_checks(self, wallet, funding, pending):
+        """Test update_pending_payments : paiements vérifiés récemment ignorés"""
+        await services.update_pending_payments_batch(pending[:2])
+        funding.calls.clear()
+
+        await services.update_pending_payments(wallet.id)
+
+        assert sorted(funding.calls) == sorted(p.checking_id for p in pending[2:])
+
+
+class TestReconcilePendingPayments:
+    """Tests pour la tâche de fond reconcile_pending_payments"""
+
+    @pytest.mark.asyncio
+    async def test_walks_pending_payments_by_batches(self, core_db, funding, pending, monkeypatch):
+        """Test parcours par lots du plus ancien au plus récent, puis reprise au début"""
+        monkeypatch.setattr(services, "PENDING_RECONCILE_BATCH", 2)
+        monkeypatch.setattr(services.settings, "lnbits_running", True)
+        rounds = []
+
+        async def next_round(seconds):
+            rounds.append(list(funding.calls))
+            funding.calls.clear()
+            cache._values.clear()
+            if len(rounds) == 4:
+                services.settings.lnbits_running = False
+
+        monkeypatch.setattr(services.asyncio, "sleep", next_round)
+        await services.reconcile_pending_payments()
+
+        assert rounds[:3] == [
+            ["in-paid", "in-expired"],
+            ["in-open", "out-sent"],
+            ["out-failed", "out-inflight"],
+        ]
+        # seuls les paiements encore en attente sont revus au tour suivant
+        assert rounds[3] == ["in-open", "out-inflight"]
+        statuses = {row["checking_id"]: row["status"] for row in (await snapshot(core_db))[0]}
+        assert statuses["in-paid"] == statuses["out-sent"] == "success"
+        assert statuses["in-expired"] == statuses["out-failed"] == "failed"
@@ -0,0 +1,166 @@
+"""
+Tests unitaires pour le suivi des retraits sur 24h (agrégat par minute
+apipayments_withdrawn, get_wallet_withdrawn_24h, check_wallet_daily_withdraw_limit)
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("lnbits_internal.core.services.payments")
+from lnbits_internal.core import migrations
+from lnbits_internal.core.crud import payments
+from lnbits_internal.core.models import CreatePayment, Payment, PaymentState
+from lnbits_internal.core.services import payments as services
+from lnbits_internal.db import Database
+
+
+def payment(wallet_id, checking_id, amount, status, time):
+    return Payment(
+        checking_id=checking_id,
+        payment_hash=checking_id,
+        wallet_id=wallet_id,
+        amount=amount,
+        fee=0,
+        bolt11="",
+        status=status,
+        time=time,
+    )
+
+
+def create_data(wallet_id, payment_hash, amount_msat):
+    return CreatePayment(
+        wallet_id=wallet_id,
+        payment_hash=payment_hash,
+        bolt11=f"lnbc_{payment_hash}",
+        amount_msat=amount_msat,
+        memo="",
+    )
+
+
+async def insert_history(db, wallet_id):
+    """Paiements insérés sans passer par l'agrégat (3 000 msat retirés sur 24h)"""
+    now = datetime.now(timezone.utc)
+    async with db.connect() as conn:
+        for checking_id, amount, status, time in [
+            ("out1", -1_000, PaymentState.SUCCESS, now - timedelta(hours=2)),
+            ("out2", -2_000, PaymentState.PENDING, now - timedelta(hours=1)),
+            ("out3", -4_000, PaymentState.FAILED, now - timedelta(hours=1)),
+            ("old", -8_000, PaymentState.SUCCESS, now - timedelta(hours=25)),
+            ("in1", 16_000, PaymentState.SUCCESS, now - timedelta(hours=1)),
+        ]:
+            await conn.insert(
+                "apipayments", payment(wallet_id, checking_id, amount, status, time)
+            )
+
+
+class TestWalletWithdrawn24h:
+    """Tests pour get_wallet_withdrawn_24h"""
+
+    @pytest.mark.asyncio
+    async def test_follows_payment_writes(self, wallet):
+        """Test créations, changements de statut et suppressions reflétés dans la somme"""
+        first = await payments.create_payment("a", create_data(wallet.id, "a", -1_000))
+        await payments.create_payment("b", create_data(wallet.id, "b", -2_000))
+        await payments.create_payment("in", create_data(wallet.id, "in", 5_000))
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 3_000
+
+        first.status = PaymentState.FAILED
+        await payments.update_payment(first)
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 2_000
+
+        second = await payments.get_payment("b")
+        second.status = PaymentState.SUCCESS
+        await payments.update_payment(second, "b2")
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 2_000
+
+        await payments.delete_wallet_payment("b2", wallet.id)
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 0
+
+    @pytest.mark.asyncio
+    async def test_shared_between_workers(self, core_db, wallet):
+        """Test retrait d'un autre processus (autre moteur, même base) compté"""
+        await payments.create_payment("a", create_data(wallet.id, "a", -1_000))
+
+        other_worker = Database("database")
+        try:
+            async with other_worker.connect() as conn:
+                await payments.create_payment(
+                    "b", create_data(wallet.id, "b", -2_000), conn=conn
+                )
+                withdrawn = await payments.get_wallet_withdrawn_24h(wallet.id, conn)
+        finally:
+            await other_worker.engine.dispose()
+
+        assert withdrawn == 3_000
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 3_000
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_writes_not_counted(self, core_db, wallet):
+        """Test transaction annulée : paiement et agrégat annulés ensemble"""
+        async with core_db.connect() as conn:
+            with pytest.raises(RuntimeError):
+                async with conn.transaction():
+                    await payments.create_payment(
+                        "a", create_data(wallet.id, "a", -1_000), conn=conn
+                    )
+                    withdrawn = await payments.get_wallet_withdrawn_24h(
+                        wallet.id, conn=conn
+                    )
+                    assert withdrawn == 1_000
+                    raise RuntimeError("abort")
+
+        assert await payments.get_payment("a") is None
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 0
+
+    @pytest.mark.asyncio
+    async def test_old_buckets_excluded_and_pruned(self, core_db, wallet, monkeypatch):
+        """Test minutes de plus de 24h ignorées puis supprimées par le nettoyage"""
+        await payments.create_payment("a", create_data(wallet.id, "a", -1_000))
+        clock = payments.time()
+        monkeypatch.setattr(payments, "time", lambda: clock + 23 * 3600)
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 1_000
+
+        monkeypatch.setattr(payments, "time", lambda: clock + 24 * 3600 + 120)
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 0
+
+        await payments.delete_expired_invoices()
+        rows = await core_db.fetchall("SELECT * FROM apipayments_withdrawn")
+        assert rows == []
+
+    @pytest.mark.asyncio
+    async def test_m034_backfills_last_24h(self, core_db, wallet):
+        """Test migration : retraits en attente ou réussis des dernières 24h repris"""
+        await insert_history(core_db, wallet.id)
+        async with core_db.connect() as conn:
+            await conn.execute("DROP TABLE apipayments_withdrawn")
+            await migrations.m034_add_withdraw_minute_rollup(conn)
+
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 3_000
+
+    @pytest.mark.asyncio
+    async def test_rebuild_matches_migration(self, core_db, wallet):
+        """Test reconstruction des agrégats : même somme, minutes anciennes écartées"""
+        await insert_history(core_db, wallet.id)
+
+        await payments.rebuild_daily_payment_rollup()
+
+        assert await payments.get_wallet_withdrawn_24h(wallet.id) == 3_000
+        rows = await core_db.fetchall("SELECT * FROM apipayments_withdrawn")
+        assert sorted(row["amount"] for row in rows) == [1_000, 2_000]
+
+
+class TestDailyWithdrawLimit:
+    """Tests pour check_wallet_daily_withdraw_limit"""
+
+    @pytest.mark.asyncio
+    async def test_limit_reached(self, wallet, monkeypatch):
+        """Test retrait au-delà de la limite journalière refusé"""
+        monkeypatch.setattr(
+            services.settings, "lnbits_wallet_limit_daily_max_withdraw", 3
+        )
+        await payments.create_payment("a", create_data(wallet.id, "a", -2_000))
+
+        await services.check_wallet_daily_withdraw_limit(wallet.id, 1_000)
+        with pytest.raises(ValueError, match="Daily withdrawal limit of 3 sats"):
+            await services.check_wallet_daily_withdraw_limit(wallet.id, 1_001)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Tests unitaires pour le job de calibration parallèle et reprenable.
+
+Dernière mise à jour: 16 octobre 2026
+"""
+
+import unittest
+import tempfile
+import shutil
+import os
+from pathlib import Path
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import numpy as np
+from typing import Dict, Any, List
+
+# Ajuster le chemin d'imports pour les tests
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.tools.simulator.calibration_job import CalibrationJob, latin_hypercube_grid, task_seed
+from src.tools.simulator import calibration_engine
+from src.tools.simulator.calibration_engine import CalibrationConfig, CalibrationEngine
+
+
+class SeededEngine:
+    """Moteur de calibration minimal : divergence déterministe dérivée de la graine"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def evaluate_sample(self, params: Dict[str, Any], seed: int, reference) -> Dict[str, float]:
+        self.calls += 1
+        noise = np.random.default_rng(seed).random() * 0.1
+        return {"metric": abs(params["a"] - 0.3) + noise}
+
+    def _aggregate_divergences(self, sample_divergences: List[Dict[str, float]]):
+        total = sum(d["metric"] for d in sample_divergences) / len(sample_divergences)
+        return {"metric": total}, total
+
+
+class TestCalibrationJob(unittest.TestCase):
+    """Tests pour CalibrationJob et l'échantillonnage hypercube latin"""
+
+    def setUp(self):
+        """Créer un répertoire temporaire pour les checkpoints"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.checkpoint = Path(self.temp_dir) / "job.jsonl"
+        self.param_sets = latin_hypercube_grid(
+            {"a": np.linspace(0, 1, 11), "b": np.arange(7)}, 12, seed=5
+        )
+
+    def tearDown(self):
+        """Nettoyer le répertoire temporaire"""
+        shutil.rmtree(self.temp_dir)
+
+    def make_job(self, engine, **kwargs):
+        options = {"samples_per_set": 4, "seed": 11, "max_workers": 1}
+        options.update(kwargs)
+        return CalibrationJob(engine, {}, self.param_sets, checkpoint_path=self.checkpoint, **options)
+
+    def test_latin_hypercube_grid(self):
+        """Tester jeux distincts, strates couvertes et grille complète si petite"""
+        self.assertEqual(len(self.param_sets), 12)
+        combos = {(p["a"], p["b"]) for p in self.param_sets}
+        self.assertEqual(len(combos), 12)
+        # Chaque paramètre couvre toute sa plage
+        self.assertGreaterEqual(len({p["b"] for p in self.param_sets}), 6)
+        self.assertIsInstance(self.param_sets[0]["b"], int)
+        self.assertEqual(self.param_sets, latin_hypercube_grid(
+            {"a": np.linspace(0, 1, 11), "b": np.arange(7)}, 12, seed=5
+        ))
+
+        grid = latin_hypercube_grid({"a": [1, 2], "b": [3, 4, 5]}, 100, seed=0)
+        self.assertEqual(len(grid), 6)
+
+    def test_resume_after_interruption(self):
+        """Tester la reprise : seules les exécutions manquantes sont relancées"""
+        reference = [run["sample_divergences"] for run in self.make_job(SeededEngine()).run()]
+        self.checkpoint.unlink()
+
+        engine = SeededEngine()
+        runs = self.make_job(engine).run()
+        for _ in range(5):
+            next(runs)
+        runs.close()
+        self.assertEqual(engine.calls, 20)
+
+        # Ligne tronquée par un crash pendant l'écriture
+        with open(self.checkpoint, "a") as f:
+            f.write('{"param_index": 5, "sample_')
+
+        resumed_engine = SeededEngine()
+        resumed = [run["sample_divergences"] for run in self.make_job(resumed_engine).run()]
+
+        self.assertEqual(resumed_engine.calls, 48 - 20)
+        self.assertEqual(resumed, reference)
+
+    def test_process_pool_matches_sequential(self):
+        """Tester résultats identiques en pool de processus (graines par tâche)"""
+        sequential = {
+            run["param_index"]: run["sample_divergences"]
+            for run in self.make_job(SeededEngine()).run()
+        }
+        self.checkpoint.unlink()
+
+        pooled = {
+            run["param_index"]: run["sample_divergences"]
+            for run in self.make_job(SeededEngine(), max_workers=2).run()
+        }
+
+        self.assertEqual(pooled, sequential)
+        self.assertEqual(task_seed(11, 3, 1), task_seed(11, 3, 1))
+        self.assertNotEqual(task_seed(11, 3, 1), task_seed(11, 1, 3))
+
+    def test_successive_halving(self):
+        """Tester élimination progressive : seuls les meilleurs jeux atteignent la fidélité maximale"""
+        engine = SeededEngine()
+        runs = list(self.make_job(engine, samples_per_set=9, strategy="successive_halving").run())
+
+        self.assertEqual(sorted(run["param_index"] for run in runs), list(range(12)))
+        finalists = [run for run in runs if run["samples"] == 9]
+        self.assertTrue(1 <= len(finalists) < 12)
+        self.assertLess(engine.calls, 12 * 9)
+
+        best = min(finalists, key=lambda run: abs(run["params"]["a"] - 0.3))
+        closest = min(abs(p["a"] - 0.3) for p in self.param_sets)
+        self.assertAlmostEqual(abs(best["params"]["a"] - 0.3), closest, delta=0.2)
+
+        with self.assertRaises(ValueError):
+            self.make_job(engine, strategy="random")
+
+
+
+def make_node_data(channels: int = 3, days: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+    """Historique de forwards réaliste : 4 relevés par jour et par canal"""
+    rng = np.random.default_rng(3)
+    start = datetime(2026, 1, 1)
+    data = {}
+    for channel in range(channels):
+        capacity = 2_000_000 * (channel + 1)
+        balance = capacity / 2
+        records = []
+        for i in range(days * 4):
+            balance = float(np.clip(balance + rng.normal(0, capacity * 0.03), 0, capacity))
+            records.append({
+                "timestamp": (start + timedelta(hours=6 * i)).isoformat(),
+                "forward_amount": float(rng.lognormal(11, 1)),
+                "forward_success": float(rng.random() < 0.9),
+                "local_balance": balance,
+                "capacity": capacity
+            })
+        data[f"chan{channel}"] = records
+    return data
+
+
+class TestCalibrationEngineEndToEnd(unittest.TestCase):
+    """Calibration complète avec le vrai simulateur (LightningSimEnvironment)"""
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        patches = [
+            patch.object(calibration_engine, "CALIBRATION_RESULTS_PATH", self.temp_dir),
+            patch.object(calibration_engine, "CALIBRATION_CACHE_PATH", self.temp_dir / "cache"),
+            patch.object(calibration_engine, "CALIBRATION_ARCHIVE_PATH", self.temp_dir / "archive"),
+            patch.object(CalibrationConfig, "SAMPLES_PER_PARAM_SET", 2),
+            patch.object(CalibrationConfig, "SIMULATION_TICKS", 7),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.engine = CalibrationEngine(node_id="test")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_evaluate_sample_uses_simulated_distributions(self):
+        """Tester divergences calculées sur les distributions simulées (pas de repli à 1.0)"""
+        reference = self.engine._extract_distributions(self.engine._preprocess_node_data(make_node_data()))
+        self.engine._network_size = 3
+
+        divergences = self.engine.evaluate_sample({"noise_level": 0.1}, seed=7, reference_distributions=reference)
+
+        self.assertEqual(set(divergences), {
+            "forward_volume_distribution", "success_rate_distribution", "liquidity_ratio_evolution"
+        })
+        for value in divergences.values():
+            self.assertGreaterEqual(value, 0.0)
+            self.assertLessEqual(value, 1.0)
+        self.assertNotEqual(divergences, self.engine.evaluate_sample(
+            {"noise_level": 0.1}, seed=8, reference_distributions=reference
+        ))
+
+    def test_calibrate_simulator(self):
+        """Tester une calibration complète : scores distincts et p-values finales"""
+        best_params, best_score = self.engine.calibrate_simulator(
+            make_node_data(), {"noise_level": np.linspace(0.05, 0.2, 4)},
+            iterations=4, max_workers=1, seed=1
+        )
+
+        self.assertIn(best_params["noise_level"], np.linspace(0.05, 0.2, 4))
+        # Poids des métriques calculées (0.9) : la divergence de repli 1.0 n'est comptée que pour fee_elasticity
+        self.assertLess(best_score, 1.0)
+        self.assertTrue(self.engine.final_p_values)
+
+    def test_calibrate_without_usable_data(self):
+        """Tester l'échec explicite quand aucune distribution de référence n'est exploitable"""
+        with self.assertRaises(ValueError):
+            self.engine.calibrate_simulator({"chan0": [{"timestamp": "2026-01-01"}]}, {"noise_level": [0.1]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ from src.clients.ollama_client import (
     OllamaClientError,
     OllamaTimeoutError,
     OllamaModelNotFoundError,
+    split_embedding_batches,
 )
 
 
@@ -79,18 +80,45 @@ async def test_embed_no_embedding_error(ollama_client):
 
 @pytest.mark.asyncio
 async def test_embed_batch(ollama_client):
-    """Test de génération d'embeddings en batch."""
-    with patch.object(ollama_client, 'embed') as mock_embed:
-        mock_embed.side_effect = [
-            [0.1, 0.2, 0.3],
-            [0.4, 0.5, 0.6],
-            [0.7, 0.8, 0.9],
-        ]
+    """Test de génération d'embeddings en batch via /api/embed (ordre préservé)."""
+    async def fake_embed_many(texts, model):
+        await asyncio.sleep(0.01 * (3 - len(texts)))  # Lots terminés dans le désordre
+        return [[float(text[-1])] for text in texts]
+    
+    with patch.object(ollama_client, '_embed_many', side_effect=fake_embed_many) as mock_embed_many, \
+         patch.object(ollama_client, 'embed') as mock_embed:
+        embeddings = await ollama_client.embed_batch(
+            ["text1", "text2", "text3", "text4", "text5"], max_batch_size=2
+        )
+        
+        assert embeddings == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert mock_embed_many.call_count == 3
+        mock_embed.assert_not_called()
+        assert [stats["texts"] for stats in ollama_client.last_batch_stats] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_embed_batch_fallback(ollama_client):
+    """Test du repli sur /api/embeddings quand /api/embed est absent."""
+    with patch.object(ollama_client, '_embed_many', return_value=None) as mock_embed_many, \
+         patch.object(ollama_client, 'embed') as mock_embed:
+        mock_embed.side_effect = lambda text, model: [float(text[-1])]
         
         embeddings = await ollama_client.embed_batch(["text1", "text2", "text3"])
-        assert len(embeddings) == 3
-        assert embeddings[0] == [0.1, 0.2, 0.3]
-        assert embeddings[2] == [0.7, 0.8, 0.9]
+        assert embeddings == [[1.0], [2.0], [3.0]]
+        
+        await ollama_client.embed_batch(["text4"])
+        assert mock_embed_many.call_count == 1
+        assert mock_embed.call_count == 4
+
+
+def test_split_embedding_batches():
+    """Test du découpage par nombre de textes et budget de tokens."""
+    texts = ["a" * 40, "b" * 40, "c" * 400, "d", "e", "f"]
+    
+    assert split_embedding_batches(texts, max_batch_size=10, max_batch_tokens=30) == [[0, 1], [2], [3, 4, 5]]
+    assert split_embedding_batches(texts, max_batch_size=2, max_batch_tokens=1000) == [[0, 1], [2, 3], [4, 5]]
+    assert split_embedding_batches([], max_batch_size=2, max_batch_tokens=10) == []
 
 
 @pytest.mark.asyncio
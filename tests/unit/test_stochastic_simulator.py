@@ -20,6 +20,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 
 from src.tools.simulator.performance_metrics import PerformanceMetrics
 from src.tools.simulator.channel_evolution import StochasticChannelEvolution
+from src.tools.simulator.vectorized_evolution import VectorizedChannelEvolution
 from src.tools.simulator.scenario_matrix import ScenarioMatrix
 from src.tools.simulator.simulation_fixtures import SimulationFixtures
 from src.tools.simulator.stochastic_simulator import (
@@ -188,6 +189,86 @@ class TestChannelEvolution(unittest.TestCase):
         # Donc on ne peut pas faire d'assertion stricte ici
 
 
+class TestVectorizedChannelEvolution(unittest.TestCase):
+    """Tests pour la classe VectorizedChannelEvolution"""
+    
+    def setUp(self):
+        """Initialiser les objets pour les tests"""
+        self.channels = [
+            {
+                "channel_id": f"chan_{i}",
+                "capacity": 5000000,
+                "local_balance": 1000000 * (i + 1),
+                "remote_balance": 5000000 - 1000000 * (i + 1),
+                "total_forwards": 100,
+                "successful_forwards": 95,
+                "local_fee_base_msat": 1000,
+                "local_fee_rate": 500,
+                "centrality_score": 0.5,
+                "avg_forward_size": 50000,
+                "revenue": 0,
+                "active": True
+            }
+            for i in range(4)
+        ]
+        self.volatility = {
+            "volume": np.full(4, 0.1),
+            "success_rate": np.full(4, 0.05),
+            "liquidity": np.full(4, 0.2),
+            "noise": np.full(4, 0.05)
+        }
+    
+    def _evolution(self, seed=7):
+        return VectorizedChannelEvolution(self.channels, self.volatility, np.random.default_rng(seed))
+    
+    def test_seeded_steps_are_reproducible(self):
+        """Tester la reproductibilité avec un générateur seedé"""
+        first, second = self._evolution(), self._evolution()
+        for _ in range(10):
+            first.step(1)
+            second.step(1)
+        
+        self.assertEqual(first.channel_states(), second.channel_states())
+    
+    def test_step_invariants(self):
+        """Tester les invariants : capacité constante, forwards cohérents, revenus croissants"""
+        evolution = self._evolution()
+        for _ in range(20):
+            evolution.step(1)
+        
+        for state in evolution.channel_states():
+            self.assertAlmostEqual(state["local_balance"] + state["remote_balance"], state["capacity"])
+            self.assertLessEqual(state["successful_forwards"], state["total_forwards"])
+            self.assertGreater(state["revenue"], 0)
+            self.assertEqual(state["channel_id"], self.channels[evolution.index[state["channel_id"]]]["channel_id"])
+    
+    def test_policy_on_subset(self):
+        """Tester l'application d'une politique à un sous-ensemble de canaux"""
+        evolution = self._evolution()
+        indices = np.array([1, 3])
+        
+        evolution.step(0, indices)
+        evolution.apply_policy(indices, np.array([100.0, 0.0]), np.array([50.0, -25.0]))
+        
+        fee_rates = evolution.state["local_fee_rate"]
+        self.assertEqual(list(fee_rates), [500, 550, 500, 475])
+        self.assertEqual(evolution.state["local_fee_base_msat"][1], 101000)
+        self.assertEqual(list(evolution.season_day), [0, 1, 0, 1])
+    
+    def test_aggregate_metrics_match_channel_states(self):
+        """Tester les métriques globales vectorisées contre une somme sur les états"""
+        evolution = self._evolution()
+        evolution.step(1)
+        states = evolution.channel_states()
+        metrics = evolution.aggregate_metrics()
+        
+        self.assertAlmostEqual(metrics["revenue"], sum(s["revenue"] for s in states))
+        total = sum(s["total_forwards"] for s in states)
+        successful = sum(s["successful_forwards"] for s in states)
+        self.assertAlmostEqual(metrics["htlc_success_rate"], successful / total)
+        self.assertAlmostEqual(metrics["opportunity_cost"], total - successful)
+
+
 class TestScenarioMatrix(unittest.TestCase):
     """Tests pour la classe ScenarioMatrix"""
     